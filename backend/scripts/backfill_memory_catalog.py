@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+從 Chroma 回填記憶目錄（memory_metadata）
+
+用法（於 backend 目錄執行）:
+    python scripts/backfill_memory_catalog.py [--batch-size 500]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.config import settings  # noqa: E402
+from src.services.memory_service import MemoryService  # noqa: E402
+from src.storage.database import DatabaseManager  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="從 Chroma 回填記憶目錄")
+    parser.add_argument("--batch-size", type=int, default=500, help="每個交易寫入的記憶數")
+    args = parser.parse_args()
+
+    DatabaseManager.initialize(settings.database_url)
+    try:
+        MemoryService.initialize()
+        count = MemoryService.backfill_catalog(batch_size=args.batch_size)
+        print(f"✅ 已回填 {count} 條記憶")
+    finally:
+        DatabaseManager.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
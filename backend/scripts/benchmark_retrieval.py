@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+記憶檢索評估：比較 vector 與 hybrid 模式的延遲與 recall@k
+
+資料集為 JSONL，每行一個查詢:
+    {"user_id": "...", "query": "0050 還要繼續扣款嗎", "relevant": ["mem_id_1", "mem_id_2"]}
+
+用法（於 backend 目錄執行，需已設定 .env 並有既有記憶）:
+    python scripts/benchmark_retrieval.py dataset.jsonl --k 3 5 10
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.config import settings  # noqa: E402
+from src.services.memory_service import MemoryService  # noqa: E402
+from src.storage.database import DatabaseManager  # noqa: E402
+
+MODES = ("vector", "hybrid")
+
+
+def evaluate(cases: List[Dict], mode: str, ks: List[int]) -> Dict:
+    """
+    對單一檢索模式執行所有查詢
+
+    Args:
+        cases: 查詢案例
+        mode: 檢索模式
+        ks: 要計算 recall 的 k 值
+
+    Returns:
+        Dict: 延遲（毫秒）與各 k 的平均 recall
+    """
+    max_k = max(ks)
+    latencies = []
+    recalls = {k: [] for k in ks}
+    for case in cases:
+        relevant = set(case["relevant"])
+        start = time.perf_counter()
+        results = MemoryService.search_memories(case["user_id"], case["query"], top_k=max_k, mode=mode)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ranked = [m["id"] for m in results]
+        for k in ks:
+            hits = len(relevant.intersection(ranked[:k]))
+            recalls[k].append(hits / len(relevant) if relevant else 1.0)
+
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "recall": {k: statistics.mean(values) for k, values in recalls.items()},
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="比較 vector 與 hybrid 檢索的延遲與 recall@k")
+    parser.add_argument("dataset", type=Path, help="JSONL 查詢資料集")
+    parser.add_argument("--k", type=int, nargs="+", default=[3, 5, 10], help="recall@k 的 k 值")
+    args = parser.parse_args()
+
+    cases = [json.loads(line) for line in args.dataset.read_text(encoding="utf-8").splitlines() if line.strip()]
+    if not cases:
+        print("❌ 資料集為空")
+        return 1
+
+    DatabaseManager.initialize(settings.database_url)
+    try:
+        MemoryService.initialize()
+        reports = {mode: evaluate(cases, mode, args.k) for mode in MODES}
+    finally:
+        DatabaseManager.close()
+
+    header = f"{'mode':<8}{'p50 ms':>10}{'p95 ms':>10}" + "".join(f"{'R@' + str(k):>8}" for k in args.k)
+    print(f"查詢數: {len(cases)}")
+    print(header)
+    print("-" * len(header))
+    for mode, report in reports.items():
+        row = f"{mode:<8}{report['p50_ms']:>10.1f}{report['p95_ms']:>10.1f}"
+        row += "".join(f"{report['recall'][k]:>8.3f}" for k in args.k)
+        print(row)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
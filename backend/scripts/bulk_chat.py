@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+批量聊天
+
+輸入為 NDJSON，每行一筆記錄：
+    {"id": "u1-2024-06-01", "user_id": "<uuid>", "conversation_id": "12", "message": "最近的投資狀況如何？"}
+（id 與 conversation_id 為選用；未提供 id 時以行號作為檢查點鍵，重新執行時輸入順序須相同）
+
+用法（於 backend 目錄執行）:
+    python scripts/bulk_chat.py --input checkins.ndjson --output results.ndjson --job-id nightly-2024-06-01
+    cat checkins.ndjson | python scripts/bulk_chat.py --output results.ndjson --concurrency 16 --rate 10
+
+以相同 --job-id 重新執行時會跳過已成功的記錄，並將結果附加於 --output 檔案之後。
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.config import settings  # noqa: E402
+from src.services.bulk_chat_service import BulkChatReport, BulkChatService  # noqa: E402
+from src.services.embedding_service import EmbeddingService  # noqa: E402
+from src.services.llm_service import LLMService  # noqa: E402
+from src.services.memory_service import MemoryService  # noqa: E402
+from src.storage.database import DatabaseManager  # noqa: E402
+from src.utils.exceptions import MemoryError  # noqa: E402
+
+
+def print_progress(report: BulkChatReport) -> None:
+    """將進度輸出至 stderr"""
+    print(
+        f"已處理 {report.processed}（失敗 {report.failed}，跳過 {report.skipped}），"
+        f"{report.records_per_second:.1f} 筆/秒",
+        file=sys.stderr,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="以 ConversationService 批量處理聊天記錄")
+    parser.add_argument("--input", default="-", help="NDJSON 輸入檔（預設 stdin）")
+    parser.add_argument("--output", required=True, help="NDJSON 結果檔（以附加模式寫入；stdout 用於日誌）")
+    parser.add_argument("--job-id", help="作業 ID（用於檢查點，預設以時間產生）")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.bulk_chat_concurrency,
+        help="並行處理的記錄數",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=settings.bulk_chat_rate_per_second,
+        help="每秒開始的記錄數上限（上游受限時自動減速，0 表示不限制）",
+    )
+    parser.add_argument("--progress-every", type=int, default=100, help="每處理幾筆輸出一次進度")
+    args = parser.parse_args()
+
+    DatabaseManager.initialize(settings.database_url)
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    output = open(args.output, "a", encoding="utf-8")
+    try:
+        EmbeddingService.initialize()
+        LLMService.initialize()
+        try:
+            MemoryService.initialize()
+        except MemoryError as e:
+            # 與 API 相同：本地提供者於記憶服務不可用時以無記憶模式執行
+            if settings.llm_provider != "local":
+                raise
+            print(f"記憶服務不可用，以無記憶模式執行: {e.message}", file=sys.stderr)
+
+        report = asyncio.run(
+            BulkChatService.run(
+                source,
+                output,
+                job_id=args.job_id,
+                concurrency=args.concurrency,
+                rate=args.rate,
+                progress_every=args.progress_every,
+                on_progress=print_progress,
+            )
+        )
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        output.close()
+        DatabaseManager.close()
+
+    print(f"作業 ID: {report.job_id}", file=sys.stderr)
+    print(
+        f"成功: {report.succeeded}，失敗: {report.failed}，跳過（已完成）: {report.skipped}，"
+        f"減速次數: {report.throttled}，耗時: {report.elapsed_seconds:.1f} 秒",
+        file=sys.stderr,
+    )
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
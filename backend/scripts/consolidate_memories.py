@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+離線合併重複記憶
+
+用法（於 backend 目錄執行）:
+    python scripts/consolidate_memories.py --dry-run
+    python scripts/consolidate_memories.py --job-id weekly-2024-06 --threshold 0.9 --llm-merge
+
+以相同 --job-id 重新執行時會跳過已完成的使用者。
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.config import settings  # noqa: E402
+from src.services.memory_consolidation_service import MemoryConsolidationService  # noqa: E402
+from src.services.memory_service import MemoryService  # noqa: E402
+from src.storage.database import DatabaseManager  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="離線合併語義重複的記憶")
+    parser.add_argument("--job-id", help="作業 ID（用於檢查點，預設以時間產生）")
+    parser.add_argument("--user-id", action="append", dest="user_ids", help="僅處理指定使用者（可重複）")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=settings.memory_consolidation_threshold,
+        help="視為重複的餘弦相似度",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="只輸出報告，不修改記憶")
+    parser.add_argument("--llm-merge", action="store_true", help="以 LLM 將群內內容合併後寫回代表記憶")
+    parser.add_argument("--verbose", action="store_true", help="列出每一群的內容")
+    args = parser.parse_args()
+
+    DatabaseManager.initialize(settings.database_url)
+    try:
+        MemoryService.initialize()
+        report = MemoryConsolidationService.run(
+            job_id=args.job_id,
+            user_ids=args.user_ids,
+            threshold=args.threshold,
+            dry_run=args.dry_run,
+            llm_merge=args.llm_merge,
+        )
+    finally:
+        DatabaseManager.close()
+
+    mode = "（試跑，未修改）" if report.dry_run else ""
+    print(f"作業 ID: {report.job_id}{mode}")
+    print(f"掃描使用者: {report.users_scanned}，跳過（已完成）: {report.users_skipped}，失敗: {report.users_failed}")
+    print(f"重複群: {report.clusters}，回收記憶: {report.rows_reclaimed}")
+    if args.verbose:
+        for plan in report.merges:
+            print(f"\n[{plan['user_id'][:8]}] 保留 {plan['canonical_id']}，刪除 {len(plan['duplicate_ids'])} 條")
+            for content in plan["contents"]:
+                print(f"  - {content}")
+    return 1 if report.users_failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
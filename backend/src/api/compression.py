@@ -0,0 +1,159 @@
+"""
+回應壓縮中介軟體
+
+依據 Accept-Encoding 協商 Brotli 或 gzip 壓縮，
+僅壓縮超過最小門檻的完整回應，串流回應則原樣傳遞。
+"""
+
+import gzip
+from typing import List, Optional, Sequence
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def negotiate_encoding(accept_encoding: str, available: Sequence[str]) -> Optional[str]:
+    """
+    從 Accept-Encoding 標頭選出壓縮編碼
+
+    依照 q 值排序，相同 q 值時以 available 的順序為優先。
+
+    Args:
+        accept_encoding: Accept-Encoding 標頭內容
+        available: 伺服器支援的編碼（依偏好排序）
+
+    Returns:
+        Optional[str]: 選中的編碼，無可用編碼時返回 None
+    """
+    weights = {}
+    for item in accept_encoding.split(","):
+        parts = item.strip().split(";")
+        name = parts[0].strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            key, _, value = param.strip().partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+
+    best = None
+    best_q = 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Brotli / gzip 壓縮中介軟體
+
+    - 已設定 Content-Encoding 的回應不重複壓縮
+    - 小於 minimum_size 的回應不壓縮
+    - 串流回應（多段 body）與排除的媒體類型直接傳遞
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+        excluded_media_types: Sequence[str] = ("text/event-stream",),
+    ) -> None:
+        """
+        初始化中介軟體
+
+        Args:
+            app: 下游 ASGI 應用
+            minimum_size: 壓縮門檻（位元組）
+            gzip_level: gzip 壓縮等級（1-9）
+            brotli_quality: Brotli 壓縮品質（0-11）
+            excluded_media_types: 不壓縮的媒體類型
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.excluded_media_types = tuple(excluded_media_types)
+        self.available: List[str] = (["br"] if brotli is not None else []) + ["gzip"]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        encoding = negotiate_encoding(headers.get("accept-encoding", ""), self.available)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        """依編碼壓縮內容"""
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+
+class _CompressionResponder:
+    """單一請求的回應攔截器"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream = send
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            # 延後送出標頭，等確定是否壓縮後再調整
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            media_type = headers.get("content-type", "").split(";")[0].strip()
+            self.passthrough = (
+                "content-encoding" in headers
+                or media_type in self.middleware.excluded_media_types
+            )
+            return
+
+        if message_type != "http.response.body" or self.started:
+            await self.downstream(message)
+            return
+
+        self.started = True
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        # 串流回應、排除類型或過小的回應：原樣傳遞
+        if self.passthrough or more_body or len(body) < self.middleware.minimum_size:
+            await self.downstream(self.initial_message)
+            await self.downstream(message)
+            return
+
+        compressed = self.middleware.compress(body, self.encoding)
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers["Content-Length"] = str(len(compressed))
+        headers.add_vary_header("Accept-Encoding")
+
+        await self.downstream(self.initial_message)
+        await self.downstream({"type": "http.response.body", "body": compressed})
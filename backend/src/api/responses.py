@@ -0,0 +1,53 @@
+"""
+API 回應類別
+
+提供高效能 JSON 回應，用於已由服務層組裝完成的可信任資料，
+避免 Pydantic 模型的重複驗證與序列化。
+"""
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """
+    將內容序列化為 JSON 位元組
+
+    優先使用 orjson；未安裝時退回標準庫 json（保留非 ASCII 字元）。
+
+    Args:
+        content: 可 JSON 序列化的內容
+
+    Returns:
+        bytes: UTF-8 編碼的 JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str,
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    高效能 JSON 回應
+
+    直接序列化字典內容，不經過 response_model 驗證。
+    僅用於由內部模型（例如 Message.to_dict()）產生的資料。
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        """序列化回應內容"""
+        return dumps(content)
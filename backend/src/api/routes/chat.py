@@ -6,8 +6,8 @@
 
 from typing import Optional
 
-from fastapi import APIRouter, status, Request
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Header, status, Request
+from fastapi.responses import JSONResponse, Response
 
 from ...config import settings
 from ...utils.logger import get_logger
@@ -17,17 +17,22 @@ from ...utils.exceptions import (
     LLMError,
     DatabaseError,
     NotFoundError,
+    IdempotencyKeyMismatchError,
+    RateLimitError,
+    QuotaExceededError,
 )
-from ...services.conversation_service import ConversationService
+from ...services.conversation_service import ConversationService, serialize_turn
+from ...services.idempotency_service import IdempotencyService
+from ...services.retry import deadline_scope
+from ...services.turn_scheduler import conversation_scheduler
+from ..responses import FastJSONResponse
 from ..schemas.chat import (
     ChatRequest,
     ChatResponse,
-    ChatDataResponse,
     ConversationResponse,
     CreateConversationRequest,
     CreateConversationResponse,
     MessageListResponse,
-    MemoryUsedResponse,
 )
 
 logger = get_logger(__name__)
@@ -38,6 +43,26 @@ router = APIRouter(
 )
 
 
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    以弱比較判斷 If-None-Match 是否符合目前的 ETag
+
+    Args:
+        if_none_match: If-None-Match 標頭（可為逗號分隔的多個 ETag 或 *）
+        etag: 目前的 ETag
+
+    Returns:
+        bool: 是否符合
+    """
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
 @router.post(
     "/conversations",
     response_model=CreateConversationResponse,
@@ -108,53 +133,117 @@ async def create_conversation(
 async def chat(
     request: Request,
     payload: ChatRequest,
+    idempotency_key: Optional[str] = Header(None),
 ):
     """
     發送聊天訊息
 
     處理使用者訊息，自動儲存、記憶擷取、LLM 回應、儲存流程。
+    提供 Idempotency-Key 標頭時，重複的請求會重播第一次的回應，
+    不會重複儲存訊息或呼叫 LLM。
 
     Args:
         request: FastAPI 請求物件
         payload: 聊天請求
+        idempotency_key: Idempotency-Key 標頭（選用）
 
     Returns:
         ChatResponse: 聊天回應
     """
+    if not idempotency_key:
+        return await _process_chat(request, payload)
+
+    if len(idempotency_key) > 255:
+        return JSONResponse(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            content={
+                "code": "VALIDATION_ERROR",
+                "message": "Idempotency-Key 長度不可超過 255 字元",
+                "details": {"field": "Idempotency-Key"},
+                "request_id": request.state.request_id,
+            },
+        )
+
+    async def handler():
+        response = await _process_chat(request, payload)
+        # Content-Type 與 Content-Length 由重播的 Response 重新產生
+        headers = {
+            name: value
+            for name, value in response.headers.items()
+            if name not in ("content-type", "content-length")
+        }
+        return response.status_code, response.body.decode("utf-8"), headers
+
+    try:
+        status_code, body, headers, replayed = await IdempotencyService.execute(
+            payload.user_id,
+            idempotency_key,
+            IdempotencyService.fingerprint(payload.model_dump()),
+            handler,
+        )
+    except IdempotencyKeyMismatchError as e:
+        logger.warning(f"[{request.state.request_id}] 冪等鍵衝突: key={idempotency_key}")
+        return JSONResponse(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            content={
+                "code": e.code,
+                "message": str(e),
+                "request_id": request.state.request_id,
+            },
+        )
+    except DatabaseError as e:
+        logger.error(f"[{request.state.request_id}] 冪等鍵查詢失敗: {str(e)}")
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={
+                "code": "DATABASE_ERROR",
+                "message": "資料庫操作失敗",
+                "request_id": request.state.request_id,
+            },
+        )
+
+    return Response(
+        content=body,
+        status_code=status_code,
+        media_type="application/json",
+        headers={**headers, "Idempotent-Replayed": "true" if replayed else "false"},
+    )
+
+
+async def _process_chat(request: Request, payload: ChatRequest) -> Response:
+    """
+    執行單次聊天流程並轉換為 HTTP 回應
+
+    Args:
+        request: FastAPI 請求物件
+        payload: 聊天請求
+
+    Returns:
+        Response: 成功或錯誤回應
+    """
     try:
         logger.info(
             f"[{request.state.request_id}] 聊天請求: user_id={payload.user_id}, "
             f"conversation_id={payload.conversation_id}"
         )
 
-        result = ConversationService.process_message(
-            user_id=payload.user_id,
-            conversation_id=payload.conversation_id,
-            message=payload.message,
-        )
-
-        # 轉換記憶列表為 MemoryUsedResponse
-        memories_used = []
-        for mem in result.get("memories_used", []):
-            if isinstance(mem, dict):
-                memories_used.append(
-                    MemoryUsedResponse(
-                        id=mem.get("id", ""),
-                        content=mem.get("content", ""),
-                        metadata=mem.get("metadata"),
-                    )
-                )
-
-        # 構造回應
-        return ChatResponse(
-            code="SUCCESS",
-            message="聊天回應已生成",
-            data=ChatDataResponse(
-                conversation_id=str(result.get("conversation_id", "")),
-                user_message=result.get("user_message"),
-                assistant_message=result.get("assistant_message"),
-                memories_used=memories_used,
-            ),
+        # 同一對話的回合依序執行，不同對話於執行緒池並行；上游重試不超過請求期限
+        with deadline_scope(settings.response_timeout_seconds):
+            result = await conversation_scheduler.run(
+                payload.conversation_id,
+                ConversationService.process_message,
+                user_id=payload.user_id,
+                conversation_id=payload.conversation_id,
+                message=payload.message,
+            )
+
+        # 快速路徑：服務層回傳的資料已由內部模型組裝，直接序列化
+        return FastJSONResponse(
+            content={
+                "code": "SUCCESS",
+                "message": "聊天回應已生成",
+                "data": serialize_turn(result),
+            },
         )
 
     except ValidationError as e:
@@ -169,6 +258,30 @@ async def chat(
             },
         )
 
+    except QuotaExceededError as e:
+        logger.warning(f"[{request.state.request_id}] 每日 token 配額已用完: user_id={payload.user_id}")
+        return JSONResponse(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            content={
+                "code": e.code,
+                "message": e.message,
+                "request_id": request.state.request_id,
+            },
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    except RateLimitError as e:
+        logger.warning(f"[{request.state.request_id}] 對話佇列已滿: {str(e)}")
+        return JSONResponse(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            content={
+                "code": "RATE_LIMITED",
+                "message": "同一對話的訊息過多，請稍後再試",
+                "request_id": request.state.request_id,
+            },
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
     except LLMError as e:
         logger.error(f"[{request.state.request_id}] LLM 錯誤: {str(e)}")
         return JSONResponse(
@@ -224,47 +337,59 @@ async def chat(
 )
 async def get_conversation_messages(
     request: Request,
-    conversation_id: int,
+    conversation_id: str,
     limit: int = 50,
+    after_id: Optional[int] = None,
+    if_none_match: Optional[str] = Header(None),
 ):
     """
     取得對話訊息
 
+    回應附帶 ETag；若 If-None-Match 與目前狀態相符則返回 304，
+    不載入任何訊息。提供 after_id 時僅返回新於該 ID 的訊息。
+
     Args:
         request: FastAPI 請求物件
         conversation_id: 對話 ID
         limit: 最大返回數量
+        after_id: 增量查詢起點（僅返回 ID 大於此值的訊息）
+        if_none_match: If-None-Match 標頭
 
     Returns:
         MessageListResponse: 訊息列表
     """
     try:
         logger.info(
-            f"[{request.state.request_id}] 取得對話訊息: conversation_id={conversation_id}"
+            f"[{request.state.request_id}] 取得對話訊息: conversation_id={conversation_id}, "
+            f"after_id={after_id}"
         )
 
+        # 僅讀取對話資料列即可判斷歷史是否變更
+        conversation = ConversationService.get_conversation(conversation_id)
+        etag = ConversationService.get_history_etag(conversation)
+        cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        if if_none_match and _etag_matches(if_none_match, etag):
+            logger.info(f"[{request.state.request_id}] 對話歷史未變更，返回 304")
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+
         messages_data = ConversationService.get_conversation_history(
             conversation_id,
             limit=limit,
+            after_id=after_id,
         )
 
-        return MessageListResponse(
-            code="SUCCESS",
-            data=[
-                {
-                    "id": msg["id"],
-                    "conversation_id": msg["conversation_id"],
-                    "role": msg["role"],
-                    "content": msg["content"],
-                    "timestamp": msg["timestamp"],
-                    "token_count": msg["token_count"],
-                }
-                for msg in messages_data
-            ],
-            meta={
-                "total": len(messages_data),
-                "count": len(messages_data),
+        return FastJSONResponse(
+            content={
+                "code": "SUCCESS",
+                "data": messages_data,
+                "meta": {
+                    "total": conversation.message_count,
+                    "count": len(messages_data),
+                    "last_id": messages_data[-1]["id"] if messages_data else after_id,
+                },
             },
+            headers=cache_headers,
         )
 
     except NotFoundError as e:
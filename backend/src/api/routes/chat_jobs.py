@@ -0,0 +1,154 @@
+"""
+非同步聊天作業 API 路由
+
+POST /chat/jobs 立即返回 202 與作業 ID，回合於背景執行；
+以 GET /chat/jobs/{job_id} 輪詢結果，或提供 callback_url 於完成時接收通知。
+"""
+
+from fastapi import APIRouter, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+from ...utils.logger import get_logger
+from ...utils.exceptions import DatabaseError, NotFoundError, ValidationError
+from ...services.chat_job_service import (
+    STATUS_QUEUED,
+    STATUS_RUNNING,
+    ChatJobService,
+    check_callback_url,
+)
+from ..responses import FastJSONResponse
+from ..schemas.chat import ChatJobRequest
+
+logger = get_logger(__name__)
+
+router = APIRouter(
+    prefix="/api/v1",
+    tags=["Chat"],
+)
+
+# 作業未完成時建議的輪詢間隔（秒）
+POLL_INTERVAL_SECONDS = 1
+
+
+@router.post(
+    "/chat/jobs",
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def create_chat_job(
+    request: Request,
+    payload: ChatJobRequest,
+):
+    """
+    建立非同步聊天作業
+
+    Args:
+        request: FastAPI 請求物件
+        payload: 聊天作業請求
+
+    Returns:
+        202 回應，含作業狀態與 Location 標頭
+    """
+    callback_url = str(payload.callback_url) if payload.callback_url else None
+    try:
+        if callback_url:
+            await run_in_threadpool(check_callback_url, callback_url)
+        job = await run_in_threadpool(
+            ChatJobService.create,
+            payload.user_id,
+            payload.message,
+            conversation_id=payload.conversation_id,
+            callback_url=callback_url,
+        )
+        ChatJobService.start(job["id"])
+        logger.info(f"[{request.state.request_id}] 聊天作業已排入佇列: job_id={job['id']}")
+
+        return FastJSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={
+                "code": "ACCEPTED",
+                "message": "聊天作業已排入佇列",
+                "data": ChatJobService.to_response(job),
+            },
+            headers={"Location": f"/api/v1/chat/jobs/{job['id']}"},
+        )
+
+    except ValidationError as e:
+        logger.warning(f"[{request.state.request_id}] 回呼網址被拒絕: {str(e)}")
+        return JSONResponse(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            content={
+                "code": "VALIDATION_ERROR",
+                "message": str(e),
+                "details": e.details,
+                "request_id": request.state.request_id,
+            },
+        )
+
+    except DatabaseError as e:
+        logger.error(f"[{request.state.request_id}] 資料庫錯誤: {str(e)}")
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={
+                "code": "DATABASE_ERROR",
+                "message": "資料庫操作失敗",
+                "request_id": request.state.request_id,
+            },
+        )
+
+
+@router.get(
+    "/chat/jobs/{job_id}",
+    status_code=status.HTTP_200_OK,
+)
+async def get_chat_job(
+    request: Request,
+    job_id: str,
+):
+    """
+    取得聊天作業狀態與結果
+
+    作業尚未完成時附帶 Retry-After 標頭作為建議的輪詢間隔。
+
+    Args:
+        request: FastAPI 請求物件
+        job_id: 作業 ID
+
+    Returns:
+        作業狀態；成功時含與 POST /chat 相同結構的 result，失敗時含 error
+    """
+    try:
+        job = await run_in_threadpool(ChatJobService.get, job_id)
+        headers = {}
+        if job["status"] in (STATUS_QUEUED, STATUS_RUNNING):
+            headers["Retry-After"] = str(POLL_INTERVAL_SECONDS)
+
+        return FastJSONResponse(
+            content={
+                "code": "SUCCESS",
+                "data": ChatJobService.to_response(job),
+            },
+            headers=headers,
+        )
+
+    except NotFoundError as e:
+        logger.warning(f"[{request.state.request_id}] 聊天作業未找到: {str(e)}")
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={
+                "code": "NOT_FOUND",
+                "message": "聊天作業未找到",
+                "request_id": request.state.request_id,
+            },
+        )
+
+    except DatabaseError as e:
+        logger.error(f"[{request.state.request_id}] 資料庫錯誤: {str(e)}")
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={
+                "code": "DATABASE_ERROR",
+                "message": "資料庫操作失敗",
+                "request_id": request.state.request_id,
+            },
+        )
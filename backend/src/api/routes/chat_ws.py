@@ -0,0 +1,231 @@
+"""
+WebSocket 聊天路由
+
+一條連線即一個對話工作階段：連線時驗證使用者並確認對話擁有權一次，
+對話、近期訊息、摘要與投資輪廓於連線期間保留在記憶體中。
+
+協定（JSON 文字訊框）：
+    客戶端 → {"type": "message", "message": "..."} 或 {"type": "ping"}
+    伺服器 → {"type": "session", "conversation_id": "...", "history": n}
+             {"type": "chunk", "delta": "..."}（回應片段，可多個）
+             {"type": "done", "data": {...}}（與 POST /chat 的 data 相同，助理訊息以此為準）
+             {"type": "error", "code": "...", "message": "..."}
+             {"type": "pong"}
+
+回應片段經由有上限的佇列送出：客戶端讀取過慢時生成暫停，單次送出超過
+ws_send_timeout_seconds 則中斷連線；超過 ws_idle_timeout_seconds 未收到訊框時關閉連線。
+"""
+
+import asyncio
+import concurrent.futures
+import json
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
+
+from ...config import settings
+from ...utils.logger import get_logger
+from ...utils.exceptions import ApplicationError, QuotaExceededError, RateLimitError, ValidationError
+from ...services.chat_session import ChatSession
+from ...services.conversation_service import ConversationService, serialize_turn
+from ...services.retry import deadline_scope
+from ...services.turn_scheduler import conversation_scheduler
+from ..responses import dumps
+
+logger = get_logger(__name__)
+
+router = APIRouter(
+    prefix="/api/v1",
+    tags=["Chat"],
+)
+
+
+class SlowConsumerError(Exception):
+    """客戶端讀取過慢"""
+
+
+async def _send(websocket: WebSocket, payload: Dict[str, Any]) -> None:
+    """送出 JSON 訊框（超過 ws_send_timeout_seconds 視為客戶端讀取過慢）"""
+    try:
+        await asyncio.wait_for(
+            websocket.send_text(dumps(payload).decode("utf-8")),
+            timeout=settings.ws_send_timeout_seconds,
+        )
+    except asyncio.TimeoutError:
+        raise SlowConsumerError()
+
+
+def _error_frame(error: ApplicationError) -> Dict[str, Any]:
+    """轉換為錯誤訊框"""
+    if isinstance(error, QuotaExceededError):
+        return {"type": "error", "code": error.code, "message": error.message, "retry_after": error.retry_after}
+    if isinstance(error, RateLimitError):
+        return {
+            "type": "error",
+            "code": "RATE_LIMITED",
+            "message": "同一對話的訊息過多，請稍後再試",
+            "retry_after": error.retry_after,
+        }
+    if isinstance(error, ValidationError):
+        return {"type": "error", "code": "VALIDATION_ERROR", "message": error.message, "details": error.details}
+    return {"type": "error", "code": error.code, "message": error.message}
+
+
+async def _stop_sender(sender: asyncio.Task, chunks: asyncio.Queue) -> None:
+    """
+    通知送出端結束並等待（送出端的例外優先於回合結果）
+
+    送出端可能因讀取過慢已停止而留下已滿的佇列，因此結束標記與送出端同時等待，
+    不會在無人消化的佇列上阻塞。
+
+    Args:
+        sender: 送出端工作
+        chunks: 回應片段佇列
+
+    Raises:
+        SlowConsumerError: 如果客戶端讀取過慢
+        WebSocketDisconnect: 如果連線中斷
+    """
+    if not sender.done():
+        stop = asyncio.ensure_future(chunks.put(None))
+        await asyncio.wait({sender, stop}, return_when=asyncio.FIRST_COMPLETED)
+        if not stop.done():
+            stop.cancel()
+    await sender
+
+
+async def _run_turn(websocket: WebSocket, session: ChatSession, message: str) -> None:
+    """
+    執行一個回合並串流回應片段
+
+    片段由執行緒池中的生成端放入有上限的佇列，送出端逐一送出；佇列已滿時生成端等待，
+    送出端停止後生成端立即中止。
+
+    Args:
+        websocket: WebSocket 連線
+        session: 對話工作階段
+        message: 使用者訊息
+
+    Raises:
+        SlowConsumerError: 如果客戶端讀取過慢
+        WebSocketDisconnect: 如果連線中斷
+    """
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue = asyncio.Queue(maxsize=max(1, settings.ws_send_queue_size))
+
+    async def send_chunks() -> None:
+        while True:
+            delta = await chunks.get()
+            if delta is None:
+                return
+            await _send(websocket, {"type": "chunk", "delta": delta})
+
+    sender = asyncio.create_task(send_chunks())
+
+    def on_chunk(delta: str) -> None:
+        # 於執行緒池中呼叫：佇列已滿時阻塞生成，直到送出端消化或逾時
+        if sender.done():
+            raise ConnectionError("WebSocket 送出已停止")
+        pending = asyncio.run_coroutine_threadsafe(chunks.put(delta), loop)
+        try:
+            pending.result(timeout=settings.ws_send_timeout_seconds)
+        except concurrent.futures.TimeoutError:
+            pending.cancel()
+            raise ConnectionError("WebSocket 送出逾時")
+
+    result: Optional[Dict] = None
+    error: Optional[ApplicationError] = None
+    try:
+        with deadline_scope(settings.response_timeout_seconds):
+            result = await conversation_scheduler.run(
+                session.conversation.id,
+                ConversationService.process_message,
+                user_id=session.user_id,
+                message=message,
+                session=session,
+                on_chunk=on_chunk,
+            )
+    except ApplicationError as e:
+        error = e
+    except Exception as e:
+        logger.error(f"WebSocket 回合發生未預期的錯誤: {str(e)}", exc_info=e)
+        error = ApplicationError("伺服器內部錯誤")
+    finally:
+        await _stop_sender(sender, chunks)
+
+    if error is not None:
+        logger.warning(f"WebSocket 回合失敗: conversation_id={session.conversation.id}, code={error.code}")
+        await _send(websocket, _error_frame(error))
+        return
+    await _send(websocket, {"type": "done", "data": serialize_turn(result)})
+
+
+@router.websocket("/chat/ws")
+async def chat_websocket(
+    websocket: WebSocket,
+    user_id: str,
+    conversation_id: Optional[str] = None,
+):
+    """
+    WebSocket 聊天
+
+    Args:
+        websocket: WebSocket 連線
+        user_id: 使用者 ID（查詢參數）
+        conversation_id: 對話 ID（查詢參數，無則建立新對話）
+    """
+    await websocket.accept()
+    try:
+        session = await run_in_threadpool(ConversationService.open_session, user_id, conversation_id)
+    except ApplicationError as e:
+        logger.warning(f"WebSocket 工作階段開啟失敗: user_id={user_id}, code={e.code}")
+        await _send(websocket, _error_frame(e))
+        close_code = status.WS_1008_POLICY_VIOLATION if isinstance(e, ValidationError) else status.WS_1011_INTERNAL_ERROR
+        await websocket.close(code=close_code)
+        return
+
+    conversation = session.conversation.id
+    logger.info(f"WebSocket 已連線: conversation_id={conversation}")
+    try:
+        await _send(
+            websocket,
+            {"type": "session", "conversation_id": str(conversation), "history": len(session.history())},
+        )
+        while True:
+            try:
+                message = await asyncio.wait_for(websocket.receive(), timeout=settings.ws_idle_timeout_seconds)
+            except asyncio.TimeoutError:
+                logger.info(f"WebSocket 閒置逾時: conversation_id={conversation}")
+                await _send(websocket, {"type": "error", "code": "IDLE_TIMEOUT", "message": "連線閒置過久"})
+                await websocket.close(code=status.WS_1000_NORMAL_CLOSURE)
+                return
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", status.WS_1000_NORMAL_CLOSURE))
+
+            text = message.get("text")
+            if text is None:
+                # 二進位訊框：receive_text() 會拋出 KeyError 並以 1011 中斷連線
+                await _send(websocket, {"type": "error", "code": "INVALID_FRAME", "message": "僅支援文字訊框"})
+                continue
+
+            try:
+                frame = json.loads(text)
+            except json.JSONDecodeError:
+                frame = None
+            if not isinstance(frame, dict):
+                await _send(websocket, {"type": "error", "code": "INVALID_FRAME", "message": "訊框必須為 JSON 物件"})
+                continue
+
+            if frame.get("type") == "ping":
+                await _send(websocket, {"type": "pong"})
+            elif frame.get("type") == "message":
+                await _run_turn(websocket, session, frame.get("message") or "")
+            else:
+                await _send(websocket, {"type": "error", "code": "INVALID_FRAME", "message": "不支援的訊框類型"})
+
+    except WebSocketDisconnect:
+        logger.info(f"WebSocket 已中斷: conversation_id={conversation}")
+    except SlowConsumerError:
+        logger.warning(f"WebSocket 客戶端讀取過慢，中斷連線: conversation_id={conversation}")
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
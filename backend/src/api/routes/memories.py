@@ -0,0 +1,282 @@
+"""
+記憶 API 路由
+
+實作記憶管理端點（contracts/memories.yaml）。
+列表、計數與單筆查詢由本地記憶目錄（memory_metadata）以索引查詢提供，
+僅語義搜索、更新與刪除需要存取向量儲存。
+"""
+
+import uuid
+from typing import Dict, List, Literal, Optional
+
+from fastapi import APIRouter, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
+
+from ...utils.logger import get_logger
+from ...utils.exceptions import MemoryNotFoundError, ValidationError
+from ...services.memory_service import MemoryService
+from ...storage.memory_store import MemoryMetadataStore
+from ..responses import FastJSONResponse
+from ..schemas.memories import (
+    BatchDeleteRequest,
+    BatchDeleteResponse,
+    MemoryCategory,
+    MemoryDetail,
+    MemoryListResponse,
+    MemorySearchRequest,
+    MemorySearchResponse,
+    MemoryUpdateRequest,
+)
+
+logger = get_logger(__name__)
+
+router = APIRouter(
+    prefix="/api/v1",
+    tags=["Memories"],
+)
+
+
+def _memory_not_found(request: Request) -> JSONResponse:
+    """記憶不存在的錯誤回應"""
+    return JSONResponse(
+        status_code=status.HTTP_404_NOT_FOUND,
+        content={
+            "code": "MEMORY_NOT_FOUND",
+            "message": "找不到指定的記憶",
+            "request_id": request.state.request_id,
+        },
+    )
+
+
+def _memory_responses(memories: List[Dict], category: Optional[str] = None) -> List[Dict]:
+    """
+    將 MemoryService 的記憶字典轉為 MemoryResponse 結構
+
+    Args:
+        memories: search_memories 或 get_latest_memories 的結果
+        category: 類別篩選（選用）
+
+    Returns:
+        List[Dict]: MemoryResponse 字典列表
+    """
+    results = []
+    for mem in memories:
+        metadata = mem.get("metadata") or {}
+        if category and metadata.get("category") != category:
+            continue
+        results.append(
+            {
+                "memory_id": mem.get("id", ""),
+                "content": mem.get("content", ""),
+                "category": metadata.get("category"),
+                "created_at": metadata.get("created_at") or None,
+                "relevance": metadata.get("relevance"),
+            }
+        )
+    return results
+
+
+@router.get(
+    "/memories",
+    response_model=MemoryListResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def list_memories(
+    request: Request,
+    user_id: str,
+    query: Optional[str] = None,
+    category: Optional[MemoryCategory] = None,
+    limit: int = Query(20, ge=1, le=100),
+    sort_by: Literal["relevance", "created_at"] = "relevance",
+    cursor: Optional[str] = None,
+):
+    """
+    檢索使用者的記憶
+
+    未提供 query（或依建立時間排序）時直接查詢記憶目錄，依建立時間新到舊排序並以
+    cursor / next_cursor 進行鍵集分頁；提供 query 且依相關性排序時使用語義搜索（類別於搜索中篩選）。
+    total 一律為記憶目錄中的計數。
+
+    Args:
+        request: FastAPI 請求物件
+        user_id: 使用者 UUID
+        query: 語義搜索關鍵字（選用）
+        category: 類別篩選（選用）
+        limit: 返回數量上限
+        sort_by: 排序方式
+        cursor: 分頁游標（上一頁回應的 next_cursor）
+
+    Returns:
+        MemoryListResponse: 記憶列表
+    """
+    try:
+        uuid.UUID(user_id)
+    except ValueError:
+        raise ValidationError("user_id 必須為有效的 UUID 格式", {"field": "user_id"})
+
+    logger.info(
+        f"[{request.state.request_id}] 列出記憶: user_id={user_id}, "
+        f"query={query!r}, category={category}"
+    )
+
+    total = MemoryMetadataStore.count_by_user(user_id, category)
+    next_cursor = None
+
+    if query and sort_by == "relevance":
+        memories = await run_in_threadpool(
+            MemoryService.search_memories, user_id, query, top_k=limit, category=category
+        )
+    else:
+        try:
+            memories, next_cursor = MemoryService.get_latest_memories_page(
+                user_id, limit=limit, category=category, cursor=cursor
+            )
+        except ValueError as e:
+            raise ValidationError(str(e), {"field": "cursor"})
+
+    return FastJSONResponse(
+        content={
+            "user_id": user_id,
+            "total": total,
+            "memories": _memory_responses(memories, category),
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+@router.post(
+    "/memories/search",
+    response_model=MemorySearchResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def search_memories(request: Request, payload: MemorySearchRequest):
+    """
+    語義搜索記憶
+
+    Args:
+        request: FastAPI 請求物件
+        payload: 搜索請求
+
+    Returns:
+        MemorySearchResponse: 相關記憶
+    """
+    logger.info(f"[{request.state.request_id}] 搜索記憶: user_id={payload.user_id}")
+    memories = await run_in_threadpool(
+        MemoryService.search_memories, payload.user_id, payload.query, top_k=payload.top_k
+    )
+    return FastJSONResponse(
+        content={
+            "user_id": payload.user_id,
+            "query": payload.query,
+            "results": _memory_responses(memories),
+        }
+    )
+
+
+@router.post(
+    "/memories/batch-delete",
+    response_model=BatchDeleteResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def batch_delete_memories(request: Request, payload: BatchDeleteRequest):
+    """
+    批量刪除記憶
+
+    Args:
+        request: FastAPI 請求物件
+        payload: 批量刪除請求
+
+    Returns:
+        BatchDeleteResponse: 刪除結果
+    """
+    logger.info(
+        f"[{request.state.request_id}] 批量刪除記憶: user_id={payload.user_id}, "
+        f"category={payload.category}"
+    )
+    deleted = await run_in_threadpool(
+        MemoryService.delete_user_memories, payload.user_id, payload.category
+    )
+    return BatchDeleteResponse(deleted_count=deleted, message=f"已成功刪除 {deleted} 條記憶")
+
+
+@router.get(
+    "/memories/{memory_id}",
+    response_model=MemoryDetail,
+    status_code=status.HTTP_200_OK,
+)
+async def get_memory(request: Request, memory_id: str):
+    """
+    取得單一記憶
+
+    Args:
+        request: FastAPI 請求物件
+        memory_id: 記憶 ID
+
+    Returns:
+        MemoryDetail: 記憶詳細資訊
+    """
+    memory = MemoryMetadataStore.get(memory_id)
+    if memory is None:
+        return _memory_not_found(request)
+    return FastJSONResponse(content=memory)
+
+
+@router.put(
+    "/memories/{memory_id}",
+    response_model=MemoryDetail,
+    status_code=status.HTTP_200_OK,
+)
+async def update_memory(request: Request, memory_id: str, payload: MemoryUpdateRequest):
+    """
+    更新記憶內容
+
+    Args:
+        request: FastAPI 請求物件
+        memory_id: 記憶 ID
+        payload: 更新請求
+
+    Returns:
+        MemoryDetail: 更新後的記憶
+    """
+    logger.info(f"[{request.state.request_id}] 更新記憶: memory_id={memory_id}")
+    try:
+        memory = await run_in_threadpool(
+            MemoryService.update_memory, memory_id, payload.content, payload.category
+        )
+    except MemoryNotFoundError:
+        return _memory_not_found(request)
+    return FastJSONResponse(content=memory)
+
+
+@router.delete(
+    "/memories/{memory_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+async def delete_memory(request: Request, memory_id: str):
+    """
+    刪除單一記憶（同步刪除向量資料庫中的記錄）
+
+    Args:
+        request: FastAPI 請求物件
+        memory_id: 記憶 ID
+
+    Returns:
+        Response: 204 無內容
+    """
+    memory = MemoryMetadataStore.get(memory_id)
+    if memory is None:
+        return _memory_not_found(request)
+
+    logger.info(f"[{request.state.request_id}] 刪除記憶: memory_id={memory_id}")
+    deleted = await run_in_threadpool(MemoryService.delete_memory, memory["user_id"], memory_id)
+    if not deleted:
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={
+                "code": "MEMORY_ERROR",
+                "message": "無法處理記憶操作",
+                "request_id": request.state.request_id,
+            },
+        )
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -5,7 +5,7 @@
 """
 
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, HttpUrl, field_validator
 import uuid
 
 
@@ -64,6 +64,22 @@ class ChatRequest(BaseModel):
         }
 
 
+class ChatJobRequest(ChatRequest):
+    """非同步聊天作業請求"""
+
+    callback_url: Optional[HttpUrl] = Field(None, description="作業完成時以 POST 通知的網址（http/https）")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "user_id": "550e8400-e29b-41d4-a716-446655440000",
+                "conversation_id": 1,
+                "message": "我偏好投資科技股",
+                "callback_url": "https://example.com/hooks/chat",
+            }
+        }
+
+
 class MessageResponse(BaseModel):
     """訊息回應"""
 
@@ -229,6 +245,7 @@ class MessageListResponse(BaseModel):
                 "meta": {
                     "total": 1,
                     "count": 1,
+                    "last_id": 1,
                 },
             }
         }
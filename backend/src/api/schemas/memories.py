@@ -0,0 +1,135 @@
+"""
+記憶 API 結構定義
+
+定義記憶管理相關的 Pydantic 模型（contracts/memories.yaml）。
+"""
+
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field, field_validator
+import uuid
+
+MemoryCategory = Literal["preference", "fact", "behavior"]
+
+
+def _validate_uuid(v: str) -> str:
+    """驗證 user_id 為有效 UUID"""
+    try:
+        uuid.UUID(v)
+        return v
+    except (ValueError, TypeError):
+        raise ValueError("user_id 必須為有效的 UUID 格式")
+
+
+class MemoryResponse(BaseModel):
+    """記憶列表項目"""
+
+    memory_id: str = Field(..., description="記憶唯一識別碼")
+    content: str = Field(..., description="記憶內容")
+    category: Optional[str] = Field(None, description="記憶分類")
+    created_at: Optional[str] = Field(None, description="建立時間")
+    relevance: Optional[float] = Field(None, description="相關性分數（語義搜索時提供）")
+
+
+class MemoryListResponse(BaseModel):
+    """記憶列表回應"""
+
+    user_id: str = Field(..., description="使用者 UUID")
+    total: int = Field(..., description="總記憶數量")
+    memories: List[MemoryResponse] = Field(..., description="記憶列表")
+    next_cursor: Optional[str] = Field(None, description="下一頁游標（依建立時間列出時提供）")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "user_id": "550e8400-e29b-41d4-a716-446655440000",
+                "total": 15,
+                "memories": [
+                    {
+                        "memory_id": "mem_abc123",
+                        "content": "使用者偏好長期投資科技股",
+                        "category": "preference",
+                        "created_at": "2025-01-15T10:30:05",
+                        "relevance": None,
+                    },
+                ],
+                "next_cursor": "WyIyMDI1LTAxLTE1VDEwOjMwOjA1IiwgIm1lbV9hYmMxMjMiXQ",
+            }
+        }
+
+
+class MemoryDetail(BaseModel):
+    """記憶詳細資訊"""
+
+    memory_id: str = Field(..., description="記憶唯一識別碼")
+    user_id: str = Field(..., description="所屬使用者 UUID")
+    content: str = Field(..., description="記憶內容")
+    category: Optional[str] = Field(None, description="記憶分類")
+    source_message_id: Optional[int] = Field(None, description="來源訊息 ID")
+    created_at: Optional[str] = Field(None, description="建立時間")
+    updated_at: Optional[str] = Field(None, description="更新時間")
+    relevance: Optional[float] = Field(None, description="相關性分數")
+
+
+class MemoryUpdateRequest(BaseModel):
+    """記憶更新請求"""
+
+    content: str = Field(..., min_length=1, max_length=500, description="更新後的記憶內容")
+    category: Optional[MemoryCategory] = Field(None, description="更新後的分類")
+
+    @field_validator("content")
+    @classmethod
+    def validate_content(cls, v: str) -> str:
+        """驗證記憶內容"""
+        if not v.strip():
+            raise ValueError("記憶內容不能為空")
+        return v.strip()
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "content": "使用者偏好長期投資美股科技股，特別是 AI 相關企業",
+                "category": "preference",
+            }
+        }
+
+
+class BatchDeleteRequest(BaseModel):
+    """批量刪除請求"""
+
+    user_id: str = Field(..., description="使用者 UUID")
+    category: Optional[MemoryCategory] = Field(None, description="僅刪除特定分類（留空則刪除全部）")
+
+    @field_validator("user_id")
+    @classmethod
+    def validate_user_id(cls, v: str) -> str:
+        """驗證 user_id 為有效 UUID"""
+        return _validate_uuid(v)
+
+
+class BatchDeleteResponse(BaseModel):
+    """批量刪除回應"""
+
+    deleted_count: int = Field(..., description="已刪除的記憶數量")
+    message: str = Field(..., description="操作結果訊息")
+
+
+class MemorySearchRequest(BaseModel):
+    """語義搜索請求"""
+
+    user_id: str = Field(..., description="使用者 UUID")
+    query: str = Field(..., min_length=1, description="搜索查詢（自然語言）")
+    top_k: int = Field(5, ge=1, le=20, description="返回結果數量")
+
+    @field_validator("user_id")
+    @classmethod
+    def validate_user_id(cls, v: str) -> str:
+        """驗證 user_id 為有效 UUID"""
+        return _validate_uuid(v)
+
+
+class MemorySearchResponse(BaseModel):
+    """語義搜索回應"""
+
+    user_id: str = Field(..., description="使用者 UUID")
+    query: str = Field(..., description="原始查詢文字")
+    results: List[MemoryResponse] = Field(..., description="相關記憶")
@@ -6,17 +6,45 @@
 """
 
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 
 class Settings(BaseSettings):
     """應用程式設定類別"""
 
+    # Model Provider ("local" = deterministic offline provider for development and profiling)
+    llm_provider: Literal["gemini", "local"] = "gemini"
+    local_embedding_dim: int = 768
+    local_llm_latency_ms: float = 0.0  # Simulated generation latency of the local provider
+
     # Google API Configuration
     google_api_key: str
     mem0_llm_model: str = "gemini-2.0-flash"
     mem0_embedder_model: str = "text-embedding-004"
 
+    # Model Routing (simple turns go to the fast model, complex ones to mem0_llm_model)
+    llm_routing_enabled: bool = True
+    llm_fast_model: str = "gemini-2.0-flash-lite"
+    llm_fast_max_output_tokens: int = 256
+    llm_strong_max_output_tokens: int = 500
+    llm_fast_max_chars: int = 40  # Longer messages are routed to the strong model
+    llm_route_memory_threshold: int = 2  # Turns with this many injected memories use the strong model
+
+    # Upstream Retries (exponential backoff with full jitter, bounded by a process-wide budget)
+    retry_max_attempts: int = 3
+    retry_base_delay_ms: float = 200.0
+    retry_max_delay_ms: float = 2000.0
+    retry_budget_ratio: float = 0.1  # Retries add at most this fraction of extra upstream load
+    retry_budget_max_tokens: float = 10.0  # Burst of retries allowed before the ratio applies
+
+    # Hedged Generation (streamed; a second attempt starts when the first token is slower than the quantile)
+    llm_hedging_enabled: bool = False
+    llm_hedge_quantile: float = 0.9
+    llm_hedge_min_samples: int = 20  # First-token latency samples required before hedging
+    llm_hedge_budget_ratio: float = 0.1  # At most this fraction of requests start a hedge
+    llm_hedge_budget_max_tokens: float = 5.0
+    llm_hedge_max_workers: int = 16
+
     # Database Configuration
     database_url: str = "sqlite:///./data/app.db"
     chroma_path: str = "./data/chroma"
@@ -36,16 +64,74 @@ class Settings(BaseSettings):
     # Rate Limiting
     rate_limit_chat_per_minute: int = 10
     rate_limit_general_per_minute: int = 50
+    user_daily_token_quota: int = 200000  # Prompt + completion tokens per user per day; 0 = unlimited
 
     # Performance
     response_timeout_seconds: int = 30
     memory_search_top_k: int = 5
     memory_retrieval_top_k: int = 5  # Number of memories to retrieve
+    memory_retrieval_mode: Literal["vector", "hybrid"] = "vector"  # hybrid = vector + FTS5 BM25 fused by RRF
+    memory_hybrid_candidate_multiplier: int = 3  # Candidates fetched per retriever = top_k * multiplier
+    memory_rrf_k: int = 60  # Reciprocal-rank fusion constant
+    memory_rerank_enabled: bool = True  # MMR re-ranking of retrieved memories
+    memory_mmr_lambda: float = 0.7  # 1.0 = pure relevance, lower = more diversity
+    memory_min_similarity: float = 0.5  # Cosine similarity cutoff for injected memories
+    memory_duplicate_similarity: float = 0.92  # Memories this similar to a selected one are dropped
+    embedding_cache_size: int = 1024  # Cached query embeddings (LRU)
+    memory_profile_skip_search: bool = False  # Skip vector search when the investor profile covers the turn
     conversation_context_window: int = 10  # Number of recent messages to include in context
+    llm_prompt_token_budget: int = 8000  # Oldest history is dropped beyond this estimate; 0 = unlimited
+    token_calibration_min_samples: int = 20  # Provider-reported prompts needed to calibrate the estimator
+    token_calibration_every: int = 100  # Recalibrate after this many provider-reported prompts; 0 = startup only
+    token_calibration_samples: int = 500  # Most recent provider-reported prompts used for calibration
+    conversation_summary_enabled: bool = True  # Fold messages leaving the window into a rolling summary
+    conversation_summary_every_turns: int = 3  # Refresh once this many turns have left the window
+    conversation_summary_batch_messages: int = 40  # Max messages folded per refresh
+    conversation_summary_max_chars: int = 800
+    conversation_queue_max_depth: int = 3  # Max queued + running turns per conversation
+
+    # SQLite Group Commit
+    group_commit_enabled: bool = True
+    group_commit_interval_ms: float = 2.0  # Max wait for more writes to join a batch
+    group_commit_max_batch: int = 256
+
+    # Semantic Response Cache (non-personalized turns only)
+    response_cache_enabled: bool = True
+    response_cache_similarity: float = 0.95  # Cosine similarity at which a cached answer is reused
+    response_cache_ttl_seconds: int = 86400
+    response_cache_max_entries: int = 1000
+
+    # Idempotency
+    idempotency_ttl_hours: int = 24  # How long completed /chat responses are replayable
+
+    # Asynchronous Chat Jobs (POST /chat/jobs)
+    chat_job_workers: int = 4  # Jobs processed concurrently
+    chat_job_timeout_seconds: int = 120  # Deadline of a single job turn
+    chat_job_ttl_hours: int = 24  # Finished jobs are purged after this
+    chat_job_callback_timeout_seconds: float = 10.0
+
+    # WebSocket Chat (/api/v1/chat/ws)
+    ws_idle_timeout_seconds: int = 300  # Connections without a client frame for this long are closed
+    ws_send_queue_size: int = 32  # Streamed chunks buffered per connection before generation pauses
+    ws_send_timeout_seconds: float = 10.0  # Clients that stall a send this long are disconnected
+
+    # Bulk Chat (scripts/bulk_chat.py)
+    bulk_chat_concurrency: int = 8  # Records processed concurrently
+    bulk_chat_rate_per_second: float = 5.0  # Starting pace; halved on upstream throttling, 0 = unpaced
+
+    # Response Compression
+    compression_minimum_size: int = 1024  # Bytes; smaller responses are sent as-is
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 5
 
     # Memory Management
     memory_ttl_days: int = 30
     memory_max_per_user: int = 1000
+    memory_eviction_policy: Literal["lru", "decay", "oldest"] = "lru"  # Applied when a user exceeds the cap
+    memory_decay_half_life_days: float = 7.0  # Half-life of the "decay" policy score
+    memory_sweep_interval_seconds: int = 3600  # Background TTL sweep interval
+    memory_sweep_batch_size: int = 100
+    memory_consolidation_threshold: float = 0.9  # Cosine similarity at which memories are merged offline
 
     class Config:
         """Pydantic 設定"""
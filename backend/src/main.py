@@ -4,6 +4,7 @@ FastAPI 主應用程式
 啟動 FastAPI 應用程式，設置中介軟體、異常處理器、以及路由。
 """
 
+import asyncio
 from contextlib import asynccontextmanager
 from typing import Callable
 import uuid
@@ -24,10 +25,19 @@ from .utils.exceptions import (
     NotFoundError,
     RateLimitError,
 )
+from .api.compression import CompressionMiddleware
 from .storage.database import DatabaseManager
 from .services.embedding_service import EmbeddingService
 from .services.llm_service import LLMService
 from .services.memory_service import MemoryService
+from .services.idempotency_service import IdempotencyService
+from .services.memory_lifecycle_service import MemoryLifecycleService
+from .services.chat_job_service import ChatJobService
+from .services.hedging import llm_hedger
+from .services.model_router import ModelRouter
+from .services.retry import retry_budget
+from .services.summary_service import ConversationSummaryService
+from .services.usage_service import UsageService
 
 logger = get_logger(__name__)
 
@@ -46,6 +56,9 @@ async def lifespan(app: FastAPI):
         DatabaseManager.initialize(settings.database_url)
         logger.info("資料庫已初始化")
 
+        IdempotencyService.purge_expired()
+        UsageService.calibrate_estimator()
+
         # 初始化服務
         EmbeddingService.initialize()
         logger.info("嵌入服務已初始化")
@@ -53,8 +66,26 @@ async def lifespan(app: FastAPI):
         LLMService.initialize()
         logger.info("LLM 服務已初始化")
 
-        MemoryService.initialize()
-        logger.info("記憶服務已初始化")
+        try:
+            MemoryService.initialize()
+            logger.info("記憶服務已初始化")
+        except MemoryError as e:
+            # 本地提供者用於離線開發與效能分析，記憶服務不可用時以無記憶模式啟動
+            if settings.llm_provider != "local":
+                raise
+            logger.warning(f"記憶服務不可用，以無記憶模式啟動: {e.message}")
+
+        # 繼續執行重新啟動前未完成的聊天作業
+        ChatJobService.purge_expired()
+        ChatJobService.resume_pending()
+
+        # 背景分批清除過期記憶
+        sweeper = asyncio.create_task(
+            MemoryLifecycleService.run_sweeper(
+                MemoryService.sweep_expired,
+                settings.memory_sweep_interval_seconds,
+            )
+        )
 
     except Exception as e:
         logger.error(f"應用程式啟動失敗: {str(e)}")
@@ -64,6 +95,10 @@ async def lifespan(app: FastAPI):
 
     # 關閉事件
     logger.info("應用程式關閉中...")
+    sweeper.cancel()
+    ChatJobService.shutdown()
+    ConversationSummaryService.shutdown()
+    llm_hedger.shutdown()
     try:
         DatabaseManager.close()
         logger.info("資料庫連線已關閉")
@@ -90,6 +125,15 @@ app.add_middleware(
 )
 
 
+# 設置回應壓縮中介軟體（Brotli / gzip，串流回應不壓縮）
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compression_minimum_size,
+    gzip_level=settings.compression_gzip_level,
+    brotli_quality=settings.compression_brotli_quality,
+)
+
+
 # 請求 ID 中介軟體
 @app.middleware("http")
 async def add_request_id_middleware(request: Request, call_next: Callable):
@@ -272,10 +316,34 @@ async def health_check():
     }
 
 
+@app.get("/metrics/routing", tags=["Health"])
+async def routing_metrics():
+    """模型路由統計：每條路由的請求數、決策原因與延遲"""
+    return {"routes": ModelRouter.stats()}
+
+
+@app.get("/metrics/retries", tags=["Health"])
+async def retry_metrics():
+    """上游重試統計：請求數、重試數、因預算不足放棄的重試數"""
+    return {"budget": retry_budget.stats()}
+
+
+@app.get("/metrics/hedging", tags=["Health"])
+async def hedging_metrics():
+    """對沖生成統計：對沖率、對沖勝出數與 p99 改善"""
+    return {"hedging": llm_hedger.stats()}
+
+
 # 註冊路由
 from .api.routes import chat as chat_routes
+from .api.routes import chat_jobs as chat_job_routes
+from .api.routes import chat_ws as chat_ws_routes
+from .api.routes import memories as memory_routes
 
 app.include_router(chat_routes.router)
+app.include_router(chat_job_routes.router)
+app.include_router(chat_ws_routes.router)
+app.include_router(memory_routes.router)
 
 
 # 根路由
@@ -8,6 +8,8 @@ from dataclasses import dataclass, asdict
 from datetime import datetime
 from typing import List, Optional
 
+from ..utils.tokens import estimate_tokens
+
 
 @dataclass
 class ConversationDB:
@@ -146,7 +148,7 @@ class Message:
         self.role = role
         self.content = content
         self.timestamp = timestamp or datetime.now().isoformat()
-        self.token_count = token_count or len(content.split())
+        self.token_count = token_count if token_count is not None else estimate_tokens(content)
 
     def to_db_model(self) -> MessageDB:
         """轉換為資料庫模型"""
@@ -0,0 +1,54 @@
+"""Model provider module initialization"""
+
+import threading
+from typing import Optional
+
+from ..config import settings
+from .base import SAFETY_OFF, SAFETY_RELAXED, GenerationResult, LLMProvider, TokenUsage
+
+_provider: Optional[LLMProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_provider() -> LLMProvider:
+    """
+    取得目前設定（llm_provider）的模型提供者，首次呼叫時建立
+
+    Returns:
+        LLMProvider: 模型提供者
+    """
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            if settings.llm_provider == "local":
+                from .local import LocalProvider
+
+                _provider = LocalProvider()
+            else:
+                from .gemini import GeminiProvider
+
+                _provider = GeminiProvider()
+        return _provider
+
+
+def set_provider(provider: Optional[LLMProvider]) -> None:
+    """
+    替換模型提供者（None 表示下次依設定重新建立）
+
+    Args:
+        provider: 模型提供者
+    """
+    global _provider
+    with _provider_lock:
+        _provider = provider
+
+
+__all__ = [
+    "GenerationResult",
+    "LLMProvider",
+    "SAFETY_OFF",
+    "SAFETY_RELAXED",
+    "TokenUsage",
+    "get_provider",
+    "set_provider",
+]
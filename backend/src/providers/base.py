@@ -0,0 +1,149 @@
+"""
+模型提供者介面
+
+定義生成、串流生成、嵌入與批量嵌入的共同介面，服務層只依賴此介面，
+實際呼叫由 Gemini 或本地提供者實作。
+"""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+# 安全過濾等級
+SAFETY_RELAXED = "relaxed"  # 只阻擋最嚴重的內容
+SAFETY_OFF = "off"  # 不阻擋
+
+
+@dataclass
+class TokenUsage:
+    """單次生成的 token 用量"""
+
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    # 由供應商端快取內容提供的提示 token（已包含於 prompt_tokens）
+    cached_tokens: int = 0
+    # 供應商未回報用量、改以本地估算
+    estimated: bool = False
+
+    @property
+    def total_tokens(self) -> int:
+        """提示與回應的 token 總數"""
+        return self.prompt_tokens + self.completion_tokens
+
+
+@dataclass
+class GenerationResult:
+    """生成結果"""
+
+    text: str
+    finish_reason: Optional[str] = None
+    # 被安全過濾阻擋的原因："SAFETY"（回應被阻擋）或提示的 block_reason
+    blocked_reason: Optional[str] = None
+    # 供應商回報的用量（未回報時為 None）
+    usage: Optional[TokenUsage] = None
+
+    @property
+    def blocked(self) -> bool:
+        """是否被安全過濾阻擋"""
+        return self.blocked_reason is not None
+
+
+class LLMProvider(ABC):
+    """模型提供者"""
+
+    name: str = ""
+
+    @abstractmethod
+    def generate(
+        self,
+        contents: List[Dict],
+        model: str,
+        system_instruction: Optional[str] = None,
+        temperature: float = 0.7,
+        max_output_tokens: int = 500,
+        safety: Optional[str] = None,
+    ) -> GenerationResult:
+        """
+        生成回應
+
+        Args:
+            contents: 多輪內容 [{"role": "user" | "model", "parts": [str]}, ...]
+            model: 模型名稱
+            system_instruction: 系統指令（選用）
+            temperature: 取樣溫度
+            max_output_tokens: 輸出 token 上限
+            safety: 安全過濾等級（SAFETY_RELAXED / SAFETY_OFF，None 為提供者預設）
+
+        Returns:
+            GenerationResult: 生成結果
+
+        Raises:
+            LLMError: 如果呼叫失敗
+        """
+
+    @abstractmethod
+    def stream(
+        self,
+        contents: List[Dict],
+        model: str,
+        system_instruction: Optional[str] = None,
+        temperature: float = 0.7,
+        max_output_tokens: int = 500,
+        safety: Optional[str] = None,
+    ) -> Iterator[str]:
+        """
+        串流生成回應
+
+        Args:
+            參數同 generate
+
+        Yields:
+            str: 回應片段
+
+        Raises:
+            LLMError: 如果呼叫失敗
+        """
+
+    @abstractmethod
+    def embed(self, text: str) -> List[float]:
+        """
+        將文本轉換為向量
+
+        Args:
+            text: 要嵌入的文本
+
+        Returns:
+            List[float]: 向量表示
+
+        Raises:
+            LLMError: 如果嵌入失敗
+        """
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        批量嵌入文本（預設逐筆呼叫 embed）
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            List[List[float]]: 向量列表，順序與輸入相同
+
+        Raises:
+            LLMError: 如果嵌入失敗
+        """
+        return [self.embed(text) for text in texts]
+
+    def mem0_config(self) -> Optional[Dict]:
+        """
+        Mem0 的 llm / embedder 設定
+
+        Returns:
+            Optional[Dict]: {"llm": ..., "embedder": ...}，提供者無對應的 Mem0 設定時返回 None
+        """
+        return None
+
+    @staticmethod
+    def single_turn(prompt: str) -> List[Dict]:
+        """將單一提示轉為 contents"""
+        return [{"role": "user", "parts": [prompt]}]
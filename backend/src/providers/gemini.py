@@ -0,0 +1,282 @@
+"""
+Google Gemini 提供者
+
+以 google.generativeai 實作生成、串流與嵌入。系統指令在 SDK 支援時以
+system_instruction 傳入，否則併入第一個使用者回合。
+
+不使用明確的快取內容（CachedContent）：固定的系統指令遠低於供應商的最小快取
+token 數，個人化的輪廓與記憶又每位使用者、每回合不同，沒有可快取的穩定前綴。
+系統指令維持位元組相同，由供應商的隱式前綴快取重複使用，命中的 token 數記錄於
+TokenUsage.cached_tokens。
+"""
+
+import functools
+import inspect
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import google.generativeai as genai
+
+from ..config import settings
+from ..utils.exceptions import LLMError
+from ..utils.logger import get_logger
+from .base import SAFETY_OFF, SAFETY_RELAXED, GenerationResult, LLMProvider, TokenUsage
+
+logger = get_logger(__name__)
+
+_HARM_CATEGORIES = (
+    "HARM_CATEGORY_HARASSMENT",
+    "HARM_CATEGORY_HATE_SPEECH",
+    "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+    "HARM_CATEGORY_DANGEROUS_CONTENT",
+)
+
+_SAFETY_THRESHOLDS = {
+    SAFETY_RELAXED: "BLOCK_ONLY_HIGH",
+    SAFETY_OFF: "BLOCK_NONE",
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _supports_system_instruction() -> bool:
+    """已安裝的 SDK 是否支援 GenerativeModel(system_instruction=...)"""
+    try:
+        return "system_instruction" in inspect.signature(genai.GenerativeModel).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def _reason_name(reason: Any) -> Optional[str]:
+    """取得 finish_reason / block_reason 的名稱"""
+    if not reason:
+        return None
+    return reason.name if hasattr(reason, "name") else str(reason)
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini 提供者"""
+
+    name = "gemini"
+
+    def __init__(self):
+        """設定 API 金鑰"""
+        genai.configure(api_key=settings.google_api_key)
+        # (模型名稱, 系統指令) -> 模型
+        self._models: Dict[Tuple[str, Optional[str]], Any] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _safety_settings(safety: Optional[str]) -> Optional[List[Dict]]:
+        """轉換為 Gemini 安全設定"""
+        if safety is None:
+            return None
+        threshold = getattr(genai.types.HarmBlockThreshold, _SAFETY_THRESHOLDS[safety])
+        return [
+            {"category": getattr(genai.types.HarmCategory, category), "threshold": threshold}
+            for category in _HARM_CATEGORIES
+        ]
+
+    @staticmethod
+    def _inline_system_instruction(contents: List[Dict], system_instruction: str) -> List[Dict]:
+        """將系統指令併入第一個使用者回合（SDK 不支援 system_instruction 時使用）"""
+        if contents and contents[0]["role"] == "user":
+            first = {"role": "user", "parts": [f"{system_instruction}\n{contents[0]['parts'][0]}"]}
+            return [first] + contents[1:]
+        return [{"role": "user", "parts": [system_instruction]}] + contents
+
+    def _model(self, model_name: str, system_instruction: Optional[str]) -> Tuple[Any, bool]:
+        """
+        取得模型（每組 (模型名稱, 系統指令) 建立一次）
+
+        Args:
+            model_name: Gemini 模型名稱
+            system_instruction: 系統指令（選用）
+
+        Returns:
+            Tuple[Any, bool]: (模型, 是否已帶系統指令)
+        """
+        if not system_instruction or not _supports_system_instruction():
+            return self._get_or_create(model_name, None), False
+        return self._get_or_create(model_name, system_instruction), True
+
+    def _get_or_create(self, model_name: str, system_instruction: Optional[str]) -> Any:
+        """取得或建立模型"""
+        key = (model_name, system_instruction)
+        with self._lock:
+            if key not in self._models:
+                if system_instruction:
+                    self._models[key] = genai.GenerativeModel(
+                        model_name, system_instruction=system_instruction
+                    )
+                else:
+                    self._models[key] = genai.GenerativeModel(model_name)
+            return self._models[key]
+
+    def _prepare(
+        self,
+        contents: List[Dict],
+        model: str,
+        system_instruction: Optional[str],
+        temperature: float,
+        max_output_tokens: int,
+        safety: Optional[str],
+    ) -> Tuple[Any, List[Dict], Dict]:
+        """取得模型並組裝 generate_content 參數"""
+        gemini_model, has_instruction = self._model(model, system_instruction)
+        if system_instruction and not has_instruction:
+            contents = self._inline_system_instruction(contents, system_instruction)
+        kwargs: Dict[str, Any] = {
+            "generation_config": genai.types.GenerationConfig(
+                temperature=temperature,
+                max_output_tokens=max_output_tokens,
+            ),
+        }
+        safety_settings = self._safety_settings(safety)
+        if safety_settings is not None:
+            kwargs["safety_settings"] = safety_settings
+        logger.debug(f"發送 Gemini 請求: model={model}, turns={len(contents)}, system_instruction={has_instruction}")
+        return gemini_model, contents, kwargs
+
+    @staticmethod
+    def _usage(response: Any) -> Optional[TokenUsage]:
+        """取出回應的 usage_metadata（舊版 SDK 不提供時返回 None）"""
+        metadata = getattr(response, "usage_metadata", None)
+        if metadata is None:
+            return None
+
+        def count(field: str) -> int:
+            value = getattr(metadata, field, 0)
+            return value if isinstance(value, int) else 0
+
+        usage = TokenUsage(
+            prompt_tokens=count("prompt_token_count"),
+            completion_tokens=count("candidates_token_count"),
+            cached_tokens=count("cached_content_token_count"),
+        )
+        return usage if usage.total_tokens else None
+
+    @staticmethod
+    def _parse(response: Any) -> GenerationResult:
+        """
+        解析 Gemini 回應（避免觸發 response.text 快速訪問器的異常）
+
+        Args:
+            response: generate_content 的回應
+
+        Returns:
+            GenerationResult: 生成結果
+        """
+        finish_reason = _reason_name(getattr(response, "finish_reason", None))
+        if finish_reason == "SAFETY":
+            return GenerationResult(text="", finish_reason=finish_reason, blocked_reason="SAFETY")
+
+        prompt_feedback = getattr(response, "prompt_feedback", None)
+        if prompt_feedback is not None and prompt_feedback.block_reason:
+            return GenerationResult(
+                text="", finish_reason=finish_reason, blocked_reason=str(prompt_feedback.block_reason)
+            )
+
+        candidates = getattr(response, "candidates", None) or []
+        if not candidates:
+            return GenerationResult(text="", finish_reason=finish_reason)
+
+        candidate = candidates[0]
+        text = ""
+        if candidate.content and hasattr(candidate.content, "parts") and candidate.content.parts:
+            text = "".join(part.text for part in candidate.content.parts if hasattr(part, "text"))
+        if text:
+            return GenerationResult(text=text, finish_reason=finish_reason)
+
+        candidate_reason = _reason_name(getattr(candidate, "finish_reason", None))
+        safety_ratings = getattr(candidate, "safety_ratings", None)
+        logger.warning(
+            f"Gemini 回應為空: finish_reason={finish_reason}, candidate_finish_reason={candidate_reason}"
+        )
+        if safety_ratings:
+            logger.warning(f"Safety ratings: {safety_ratings}")
+        if candidate_reason == "SAFETY":
+            return GenerationResult(text="", finish_reason=candidate_reason, blocked_reason="SAFETY")
+        return GenerationResult(text="", finish_reason=finish_reason or candidate_reason)
+
+    def generate(
+        self,
+        contents: List[Dict],
+        model: str,
+        system_instruction: Optional[str] = None,
+        temperature: float = 0.7,
+        max_output_tokens: int = 500,
+        safety: Optional[str] = None,
+    ) -> GenerationResult:
+        """生成回應（見 LLMProvider.generate）"""
+        gemini_model, contents, kwargs = self._prepare(
+            contents, model, system_instruction, temperature, max_output_tokens, safety
+        )
+        try:
+            response = gemini_model.generate_content(contents, **kwargs)
+            result = self._parse(response)
+            result.usage = self._usage(response)
+            return result
+        except ValueError as e:
+            # 通常由 response.text 快速訪問器拋出
+            raise LLMError(f"LLM 回應無效: {str(e)}")
+
+    def stream(
+        self,
+        contents: List[Dict],
+        model: str,
+        system_instruction: Optional[str] = None,
+        temperature: float = 0.7,
+        max_output_tokens: int = 500,
+        safety: Optional[str] = None,
+    ) -> Iterator[str]:
+        """串流生成回應（見 LLMProvider.stream）"""
+        gemini_model, contents, kwargs = self._prepare(
+            contents, model, system_instruction, temperature, max_output_tokens, safety
+        )
+        for chunk in gemini_model.generate_content(contents, stream=True, **kwargs):
+            text = self._parse(chunk).text
+            if text:
+                yield text
+
+    def embed(self, text: str) -> List[float]:
+        """將文本轉換為向量（見 LLMProvider.embed）"""
+        response = genai.embed_content(
+            model=f"models/{settings.mem0_embedder_model}",
+            content=text,
+        )
+        if "embedding" not in response:
+            raise LLMError("嵌入回應不包含向量")
+        return response["embedding"]
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """以單一 API 呼叫批量嵌入（見 LLMProvider.embed_batch）"""
+        if not texts:
+            return []
+        response = genai.embed_content(
+            model=f"models/{settings.mem0_embedder_model}",
+            content=list(texts),
+        )
+        if "embedding" not in response:
+            raise LLMError("嵌入回應不包含向量")
+        return response["embedding"]
+
+    def mem0_config(self) -> Optional[Dict]:
+        """Mem0 使用 Gemini 作為 llm 與 embedder"""
+        return {
+            "llm": {
+                "provider": "gemini",
+                "config": {
+                    "model": settings.mem0_llm_model,
+                    "temperature": 0.7,
+                    "max_tokens": 2000,
+                    "api_key": settings.google_api_key,
+                },
+            },
+            "embedder": {
+                "provider": "gemini",
+                "config": {
+                    "model": f"models/{settings.mem0_embedder_model}",
+                    "api_key": settings.google_api_key,
+                },
+            },
+        }
@@ -0,0 +1,108 @@
+"""
+本地確定性提供者
+
+不需網路與 API 金鑰：嵌入為特徵雜湊向量（相同文字得到相同向量，字詞重疊越多越相似），
+生成為固定模板回應並可模擬延遲（local_llm_latency_ms），用於離線啟動、測試與效能分析。
+"""
+
+import hashlib
+import time
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from ..config import settings
+from ..storage.memory_fts import MemoryFtsIndex
+from ..utils.tokens import uncalibrated_tokens
+from .base import GenerationResult, LLMProvider, TokenUsage
+
+# 串流時每個片段的字元數
+_STREAM_CHUNK_CHARS = 16
+
+_CURRENT_QUESTION_MARKER = "【當前提問】\n"
+
+
+class LocalProvider(LLMProvider):
+    """本地確定性提供者"""
+
+    name = "local"
+
+    def __init__(self, dim: Optional[int] = None, latency_ms: Optional[float] = None):
+        """
+        初始化提供者
+
+        Args:
+            dim: 嵌入維度（預設 local_embedding_dim）
+            latency_ms: 每次生成的模擬延遲（預設 local_llm_latency_ms）
+        """
+        self.dim = dim or settings.local_embedding_dim
+        self.latency_ms = settings.local_llm_latency_ms if latency_ms is None else latency_ms
+
+    @staticmethod
+    def _question(contents: List[Dict]) -> str:
+        """取出最後一個使用者回合的提問"""
+        for turn in reversed(contents):
+            if turn.get("role") == "user" and turn.get("parts"):
+                text = str(turn["parts"][0])
+                return text.rsplit(_CURRENT_QUESTION_MARKER, 1)[-1].strip()
+        return ""
+
+    def _render(self, contents: List[Dict], max_output_tokens: int) -> str:
+        """以模板產生回應（長度以輸出 token 上限的字元數截斷）"""
+        question = self._question(contents)
+        text = f"[local] 已收到您的問題：{question}（對話回合數: {len(contents)}）"
+        return text[:max(1, max_output_tokens)]
+
+    def generate(
+        self,
+        contents: List[Dict],
+        model: str,
+        system_instruction: Optional[str] = None,
+        temperature: float = 0.7,
+        max_output_tokens: int = 500,
+        safety: Optional[str] = None,
+    ) -> GenerationResult:
+        """產生模板回應（見 LLMProvider.generate）"""
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000)
+        text = self._render(contents, max_output_tokens)
+        prompt = [system_instruction or ""] + [str(part) for turn in contents for part in turn.get("parts", [])]
+        usage = TokenUsage(
+            prompt_tokens=sum(uncalibrated_tokens(part) for part in prompt),
+            completion_tokens=uncalibrated_tokens(text),
+        )
+        return GenerationResult(text=text, finish_reason="STOP", usage=usage)
+
+    def stream(
+        self,
+        contents: List[Dict],
+        model: str,
+        system_instruction: Optional[str] = None,
+        temperature: float = 0.7,
+        max_output_tokens: int = 500,
+        safety: Optional[str] = None,
+    ) -> Iterator[str]:
+        """分片串流模板回應，模擬延遲平均分攤於各片段（見 LLMProvider.stream）"""
+        text = self._render(contents, max_output_tokens)
+        chunks = [text[i:i + _STREAM_CHUNK_CHARS] for i in range(0, len(text), _STREAM_CHUNK_CHARS)]
+        delay = self.latency_ms / 1000 / len(chunks) if chunks else 0.0
+        for chunk in chunks:
+            if delay > 0:
+                time.sleep(delay)
+            yield chunk
+
+    def embed(self, text: str) -> List[float]:
+        """
+        特徵雜湊嵌入（見 LLMProvider.embed）
+
+        每個詞以 SHA-256 決定維度與正負號後累加，最後正規化為單位向量。
+        """
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in MemoryFtsIndex.tokenize(text) or [text]:
+            digest = hashlib.sha256(token.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dim
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector.tolist()
@@ -0,0 +1,314 @@
+"""
+批量聊天服務
+
+離線作業：讀取 NDJSON 記錄（user_id、conversation_id、message，可含記錄 id），
+以有限並行數經由與 /chat 相同的 ConversationService 流程處理，結果逐行寫出為 NDJSON。
+同一對話的記錄依輸入順序執行；成功的記錄寫入檢查點，以相同 job_id 重新執行時會跳過。
+請求節奏依上游回饋調整：出現上游重試或 LLM 錯誤時減半，之後逐步回升至設定值。
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional, Set, TextIO
+
+from ..config import settings
+from ..storage.database import DatabaseManager
+from ..utils.exceptions import (
+    ApplicationError,
+    DatabaseError,
+    LLMError,
+    QuotaExceededError,
+    RateLimitError,
+    ValidationError,
+)
+from ..utils.logger import get_logger
+from .conversation_service import ConversationService, serialize_turn
+from .retry import deadline_scope, retry_budget
+from .turn_scheduler import KeyedScheduler
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class BulkChatReport:
+    """批量聊天作業報告"""
+
+    job_id: str
+    processed: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0
+    throttled: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def records_per_second(self) -> float:
+        """處理速率"""
+        return self.processed / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+
+class AdaptivePacer:
+    """依上游回饋調整的請求節奏（加法增加、乘法減少）"""
+
+    def __init__(self, rate: float, min_rate: float = 0.1, recovery: float = 0.1):
+        """
+        初始化節奏控制
+
+        Args:
+            rate: 目標速率（每秒開始的記錄數，0 表示不限制）
+            min_rate: 減速的下限
+            recovery: 每次成功回升目標速率的比例
+        """
+        self.target_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.recovery = recovery
+        self._next_start = 0.0
+
+    async def wait(self) -> None:
+        """等待到下一個可開始的時間點"""
+        if self.target_rate <= 0:
+            return
+        now = time.monotonic()
+        delay = self._next_start - now
+        self._next_start = max(now, self._next_start) + 1.0 / self.rate
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def on_throttled(self) -> None:
+        """上游受限時減半速率"""
+        self.rate = max(self.min_rate, self.rate / 2)
+
+    def on_success(self) -> None:
+        """成功時逐步回升速率"""
+        self.rate = min(self.target_rate, self.rate + self.target_rate * self.recovery)
+
+
+class BulkChatService:
+    """批量聊天服務"""
+
+    @staticmethod
+    def completed_keys(job_id: str) -> Set[str]:
+        """
+        取得作業已成功的記錄
+
+        Args:
+            job_id: 作業 ID
+
+        Returns:
+            Set[str]: 已寫入檢查點的記錄鍵
+
+        Raises:
+            DatabaseError: 如果查詢失敗
+        """
+        try:
+            conn = DatabaseManager.get_connection()
+            rows = conn.execute(
+                "SELECT record_key FROM bulk_chat_checkpoints WHERE job_id = ?",
+                (job_id,),
+            ).fetchall()
+            return {row[0] for row in rows}
+
+        except Exception as e:
+            logger.error(f"查詢批量聊天檢查點失敗: {str(e)}")
+            raise DatabaseError(f"無法查詢批量聊天檢查點: {str(e)}")
+
+    @staticmethod
+    def save_checkpoint(job_id: str, record_key: str, conversation_id: Optional[str]) -> None:
+        """
+        記錄記錄已成功處理
+
+        Args:
+            job_id: 作業 ID
+            record_key: 記錄鍵
+            conversation_id: 處理後的對話 ID
+
+        Raises:
+            DatabaseError: 如果寫入失敗
+        """
+
+        def insert(cursor) -> None:
+            cursor.execute(
+                """
+                INSERT OR REPLACE INTO bulk_chat_checkpoints
+                    (job_id, record_key, conversation_id, completed_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                (job_id, record_key, conversation_id, datetime.now().isoformat()),
+            )
+
+        try:
+            DatabaseManager.execute_write(insert)
+
+        except Exception as e:
+            logger.error(f"寫入批量聊天檢查點失敗: {str(e)}")
+            raise DatabaseError(f"無法寫入批量聊天檢查點: {str(e)}")
+
+    @staticmethod
+    def parse_record(line: str, line_number: int) -> Dict:
+        """
+        解析一行 NDJSON 記錄
+
+        Args:
+            line: 輸入行
+            line_number: 行號（記錄未提供 id 時作為記錄鍵）
+
+        Returns:
+            Dict: 含 key、user_id、conversation_id、message
+
+        Raises:
+            ValidationError: 如果不是 JSON 物件
+        """
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValidationError(f"第 {line_number} 行不是有效的 JSON: {e.msg}")
+        if not isinstance(record, dict):
+            raise ValidationError(f"第 {line_number} 行必須為 JSON 物件")
+
+        conversation_id = record.get("conversation_id")
+        return {
+            "key": str(record.get("id") or f"line-{line_number}"),
+            "user_id": record.get("user_id") or "",
+            "conversation_id": str(conversation_id) if conversation_id is not None else None,
+            "message": record.get("message") or "",
+        }
+
+    @classmethod
+    async def run(
+        cls,
+        lines: Iterable[str],
+        output: TextIO,
+        job_id: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        rate: Optional[float] = None,
+        progress_every: int = 100,
+        on_progress: Optional[Callable[[BulkChatReport], None]] = None,
+    ) -> BulkChatReport:
+        """
+        執行批量聊天作業
+
+        輸入逐行讀取，進行中的記錄不超過並行數，因此可處理任意長度的串流。
+
+        Args:
+            lines: NDJSON 輸入行
+            output: 結果輸出（每筆記錄一行 JSON）
+            job_id: 作業 ID（相同 ID 重新執行時跳過已成功的記錄；預設以時間產生）
+            concurrency: 並行數（預設 bulk_chat_concurrency）
+            rate: 每秒開始的記錄數（預設 bulk_chat_rate_per_second，0 表示不限制）
+            progress_every: 每處理幾筆回報一次進度
+            on_progress: 進度回呼
+
+        Returns:
+            BulkChatReport: 作業報告
+        """
+        job_id = job_id or datetime.now().strftime("bulk-chat-%Y%m%d%H%M%S")
+        concurrency = max(1, concurrency or settings.bulk_chat_concurrency)
+        pacer = AdaptivePacer(settings.bulk_chat_rate_per_second if rate is None else rate)
+        report = BulkChatReport(job_id=job_id)
+        done = cls.completed_keys(job_id)
+
+        # 進行中的記錄不超過並行數，同一對話排隊的記錄數也不會超過此上限
+        scheduler = KeyedScheduler(max_depth=concurrency)
+        slots = asyncio.Semaphore(concurrency)
+        tasks: Set[asyncio.Task] = set()
+        started = time.monotonic()
+        upstream_retries = retry_budget.retries + retry_budget.rejected
+
+        def emit(record: Dict, result: Optional[Dict] = None, error: Optional[ApplicationError] = None) -> None:
+            nonlocal upstream_retries
+            line = {
+                "key": record["key"],
+                "user_id": record["user_id"],
+                "conversation_id": result["conversation_id"] if result else record["conversation_id"],
+            }
+            if error is None:
+                line.update(status="succeeded", result=result)
+                report.succeeded += 1
+            else:
+                line.update(status="failed", error={"code": error.code, "message": error.message})
+                report.failed += 1
+            output.write(json.dumps(line, ensure_ascii=False, default=str) + "\n")
+            output.flush()
+
+            # 上游重試增加或 LLM 受限時減速
+            retries = retry_budget.retries + retry_budget.rejected
+            throttled = retries > upstream_retries or isinstance(error, LLMError) or (
+                isinstance(error, RateLimitError) and not isinstance(error, QuotaExceededError)
+            )
+            upstream_retries = retries
+            if throttled:
+                report.throttled += 1
+                pacer.on_throttled()
+            elif error is None:
+                pacer.on_success()
+
+            report.processed += 1
+            report.elapsed_seconds = time.monotonic() - started
+            if progress_every > 0 and report.processed % progress_every == 0:
+                logger.info(
+                    f"批量聊天進度: job_id={job_id}, processed={report.processed}, "
+                    f"failed={report.failed}, skipped={report.skipped}, "
+                    f"rate={report.records_per_second:.1f}/s, pace={pacer.rate:.2f}/s"
+                )
+                if on_progress:
+                    on_progress(report)
+
+        async def process(record: Dict) -> None:
+            try:
+                with deadline_scope(settings.chat_job_timeout_seconds):
+                    result = await scheduler.run(
+                        record["conversation_id"],
+                        ConversationService.process_message,
+                        user_id=record["user_id"],
+                        conversation_id=record["conversation_id"],
+                        message=record["message"],
+                    )
+            except ApplicationError as e:
+                emit(record, error=e)
+                return
+            except Exception as e:
+                logger.error(f"批量聊天記錄失敗: key={record['key']}, {str(e)[:200]}")
+                emit(record, error=ApplicationError("伺服器內部錯誤"))
+                return
+
+            payload = serialize_turn(result)
+            emit(record, result=payload)
+            try:
+                cls.save_checkpoint(job_id, record["key"], payload["conversation_id"])
+            except DatabaseError:
+                # 未寫入檢查點，下次以相同 job_id 執行時會重新處理此記錄
+                pass
+
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = cls.parse_record(line, line_number)
+            except ValidationError as e:
+                emit({"key": f"line-{line_number}", "user_id": "", "conversation_id": None}, error=e)
+                continue
+            if record["key"] in done:
+                report.skipped += 1
+                continue
+
+            await slots.acquire()
+            await pacer.wait()
+            task = asyncio.create_task(process(record))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+        if tasks:
+            await asyncio.gather(*tasks)
+
+        report.elapsed_seconds = time.monotonic() - started
+        logger.info(
+            f"批量聊天作業完成: job_id={job_id}, processed={report.processed}, "
+            f"succeeded={report.succeeded}, failed={report.failed}, skipped={report.skipped}, "
+            f"throttled={report.throttled}, elapsed={report.elapsed_seconds:.1f}s"
+        )
+        return report
@@ -0,0 +1,477 @@
+"""
+非同步聊天作業服務
+
+POST /chat/jobs 建立作業後立即返回，回合於背景以有限的工作槽執行（同一對話仍經由
+conversation_scheduler 依序處理），客戶端以 GET /chat/jobs/{id} 輪詢，或於完成時
+收到 callback_url 的 POST 通知。作業狀態保存於 SQLite：重新啟動時，排隊中的作業會重新
+排入佇列；中斷於執行中的作業可能已儲存訊息或呼叫 LLM，為避免重複執行回合，標記為失敗
+（JOB_INTERRUPTED），由客戶端決定是否重新提交。
+"""
+
+import asyncio
+import ipaddress
+import json
+import socket
+import urllib.parse
+import urllib.request
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+
+from ..config import settings
+from ..storage.database import DatabaseManager
+from ..utils.exceptions import (
+    ApplicationError,
+    ChatJobNotFoundError,
+    DatabaseError,
+    QuotaExceededError,
+    RateLimitError,
+    ValidationError,
+)
+from ..utils.logger import get_logger
+from .conversation_service import ConversationService, serialize_turn
+from .retry import RetryBudget, call_with_retry, deadline_scope, remaining_time
+from .turn_scheduler import conversation_scheduler
+
+logger = get_logger(__name__)
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+
+# 重新啟動時中斷於執行中的作業
+INTERRUPTED_ERROR_CODE = "JOB_INTERRUPTED"
+INTERRUPTED_ERROR_MESSAGE = "作業執行中伺服器重新啟動，回合可能未完成，請確認對話後重新提交"
+
+_JOB_COLUMNS = (
+    "id, user_id, conversation_id, message, callback_url, status, result, "
+    "error_code, error_message, callback_status, created_at, started_at, completed_at"
+)
+
+
+class _NoRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """不跟隨重新導向（3xx 視為回呼失敗），避免被導向至內部網址"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_callback_opener = urllib.request.build_opener(_NoRedirectHandler())
+
+
+def check_callback_url(url: str) -> None:
+    """
+    確認回呼網址指向公開位址
+
+    解析主機名稱的所有位址，拒絕私有、迴路、鏈路本地（含雲端中繼資料）、保留與多播位址，
+    避免伺服器代為請求內部服務。
+
+    Args:
+        url: 回呼網址
+
+    Raises:
+        ValidationError: 如果網址無效、無法解析或指向非公開位址
+    """
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValidationError("回呼網址必須為 http 或 https", details={"field": "callback_url"})
+    try:
+        addresses = socket.getaddrinfo(parts.hostname, parts.port, proto=socket.IPPROTO_TCP)
+    except (OSError, ValueError) as e:
+        raise ValidationError(
+            "無法解析回呼網址的主機",
+            details={"field": "callback_url", "reason": str(e)[:100]},
+        )
+
+    for *_, sockaddr in addresses:
+        address = ipaddress.ip_address(sockaddr[0].split("%", 1)[0])
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            raise ValidationError(
+                "回呼網址不可指向內部位址",
+                details={"field": "callback_url", "reason": "non-public address"},
+            )
+
+
+class ChatJobService:
+    """非同步聊天作業服務"""
+
+    # 執行中的背景作業（保留參照避免被回收）
+    _tasks: Set[asyncio.Task] = set()
+    _slots: Optional[asyncio.Semaphore] = None
+    # 回呼重試與 LLM 重試分開計算預算
+    _callback_budget = RetryBudget(
+        ratio=settings.retry_budget_ratio,
+        max_tokens=settings.retry_budget_max_tokens,
+    )
+
+    @staticmethod
+    def _row_to_job(row) -> Dict[str, Any]:
+        """將資料列轉換為作業字典"""
+        job = dict(zip([column.strip() for column in _JOB_COLUMNS.split(",")], row))
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    @staticmethod
+    def to_response(job: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        轉換為 API 回應資料（輪詢與回呼共用）
+
+        Args:
+            job: 作業字典
+
+        Returns:
+            Dict[str, Any]: 不含訊息內容與回呼網址的作業狀態
+        """
+        error = None
+        if job["error_code"]:
+            error = {"code": job["error_code"], "message": job["error_message"]}
+        return {
+            "id": job["id"],
+            "status": job["status"],
+            "user_id": job["user_id"],
+            "conversation_id": job["conversation_id"],
+            "result": job["result"],
+            "error": error,
+            "callback_status": job["callback_status"],
+            "created_at": job["created_at"],
+            "started_at": job["started_at"],
+            "completed_at": job["completed_at"],
+        }
+
+    @staticmethod
+    def create(
+        user_id: str,
+        message: str,
+        conversation_id: Optional[str] = None,
+        callback_url: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        建立排隊中的作業
+
+        Args:
+            user_id: 使用者 ID
+            message: 使用者訊息
+            conversation_id: 對話 ID（無則建立新對話）
+            callback_url: 完成時通知的網址（選用）
+
+        Returns:
+            Dict[str, Any]: 作業字典
+
+        Raises:
+            DatabaseError: 如果儲存失敗
+        """
+        job_id = uuid.uuid4().hex
+        now = datetime.now().isoformat()
+
+        def insert_job(cursor) -> None:
+            cursor.execute(
+                """
+                INSERT INTO chat_jobs (
+                    id, user_id, conversation_id, message, callback_url, status, created_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (job_id, user_id, conversation_id, message, callback_url, STATUS_QUEUED, now),
+            )
+
+        try:
+            DatabaseManager.execute_write(insert_job)
+        except Exception as e:
+            logger.error(f"建立聊天作業失敗: {str(e)}")
+            raise DatabaseError(f"無法建立聊天作業: {str(e)}")
+
+        logger.info(f"聊天作業已建立: job_id={job_id}, user_id={user_id}")
+        return ChatJobService.get(job_id)
+
+    @staticmethod
+    def get(job_id: str) -> Dict[str, Any]:
+        """
+        取得作業
+
+        Args:
+            job_id: 作業 ID
+
+        Returns:
+            Dict[str, Any]: 作業字典
+
+        Raises:
+            ChatJobNotFoundError: 如果作業不存在
+            DatabaseError: 如果查詢失敗
+        """
+        try:
+            conn = DatabaseManager.get_connection()
+            row = conn.execute(
+                f"SELECT {_JOB_COLUMNS} FROM chat_jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        except Exception as e:
+            logger.error(f"查詢聊天作業失敗: {str(e)}")
+            raise DatabaseError(f"無法查詢聊天作業: {str(e)}")
+
+        if not row:
+            raise ChatJobNotFoundError(job_id)
+        return ChatJobService._row_to_job(row)
+
+    @staticmethod
+    def _claim(job_id: str) -> bool:
+        """將排隊中的作業標記為執行中（已被其他工作者取得時返回 False）"""
+
+        def mark_running(cursor) -> int:
+            cursor.execute(
+                "UPDATE chat_jobs SET status = ?, started_at = ? WHERE id = ? AND status = ?",
+                (STATUS_RUNNING, datetime.now().isoformat(), job_id, STATUS_QUEUED),
+            )
+            return cursor.rowcount
+
+        return DatabaseManager.execute_write(mark_running) == 1
+
+    @staticmethod
+    def _finish(
+        job_id: str,
+        status: str,
+        result: Optional[Dict] = None,
+        error: Optional[ApplicationError] = None,
+    ) -> None:
+        """記錄作業結果"""
+
+        def mark_finished(cursor) -> None:
+            cursor.execute(
+                """
+                UPDATE chat_jobs
+                SET status = ?, result = ?, error_code = ?, error_message = ?, completed_at = ?
+                WHERE id = ?
+                """,
+                (
+                    status,
+                    json.dumps(result, ensure_ascii=False, default=str) if result is not None else None,
+                    error.code if error else None,
+                    error.message if error else None,
+                    datetime.now().isoformat(),
+                    job_id,
+                ),
+            )
+
+        DatabaseManager.execute_write(mark_finished)
+
+    @staticmethod
+    async def _run_turn(job: Dict[str, Any]) -> Dict:
+        """
+        排程執行回合；對話佇列已滿時等待後重試（不超過作業期限），而非如 /chat 直接拒絕
+
+        Args:
+            job: 作業字典
+
+        Returns:
+            Dict: process_message 的返回值
+        """
+        while True:
+            try:
+                return await conversation_scheduler.run(
+                    job["conversation_id"],
+                    ConversationService.process_message,
+                    user_id=job["user_id"],
+                    conversation_id=job["conversation_id"],
+                    message=job["message"],
+                )
+            except QuotaExceededError:
+                raise
+            except RateLimitError as e:
+                remaining = remaining_time()
+                if remaining is not None and remaining <= e.retry_after:
+                    raise
+                await asyncio.sleep(e.retry_after)
+
+    @classmethod
+    async def run(cls, job_id: str) -> None:
+        """
+        執行作業（同一對話的回合依序執行）並於完成後通知回呼網址
+
+        Args:
+            job_id: 作業 ID
+        """
+        # 寫入會等待群組提交，於執行緒池執行避免阻塞事件迴圈
+        if not await run_in_threadpool(cls._claim, job_id):
+            return
+        job = await run_in_threadpool(cls.get, job_id)
+
+        try:
+            with deadline_scope(settings.chat_job_timeout_seconds):
+                result = await cls._run_turn(job)
+            await run_in_threadpool(
+                cls._finish, job_id, STATUS_SUCCEEDED, result=serialize_turn(result)
+            )
+            logger.info(f"聊天作業完成: job_id={job_id}")
+        except ApplicationError as e:
+            logger.warning(f"聊天作業失敗: job_id={job_id}, code={e.code}")
+            await run_in_threadpool(cls._finish, job_id, STATUS_FAILED, error=e)
+        except Exception as e:
+            logger.error(f"聊天作業發生未預期的錯誤: job_id={job_id}, {str(e)}", exc_info=e)
+            await run_in_threadpool(
+                cls._finish, job_id, STATUS_FAILED, error=ApplicationError("伺服器內部錯誤")
+            )
+
+        if job["callback_url"]:
+            await cls._notify(await run_in_threadpool(cls.get, job_id))
+
+    @classmethod
+    async def _notify(cls, job: Dict[str, Any]) -> None:
+        """
+        以 POST 將作業結果送至回呼網址（暫時性錯誤依重試策略重試）
+
+        送出前重新確認網址指向公開位址，且不跟隨重新導向。
+        """
+        body = json.dumps(cls.to_response(job), ensure_ascii=False, default=str).encode("utf-8")
+
+        def post() -> None:
+            check_callback_url(job["callback_url"])
+            request = urllib.request.Request(
+                job["callback_url"],
+                data=body,
+                headers={"Content-Type": "application/json"},
+                method="POST",
+            )
+            with _callback_opener.open(request, timeout=settings.chat_job_callback_timeout_seconds):
+                pass
+
+        try:
+            await run_in_threadpool(
+                call_with_retry, post, "chat_job_callback", budget=cls._callback_budget
+            )
+            callback_status = "delivered"
+        except Exception as e:
+            logger.warning(f"聊天作業回呼失敗: job_id={job['id']}, {str(e)[:100]}")
+            callback_status = "failed"
+
+        def mark_callback(cursor) -> None:
+            cursor.execute(
+                "UPDATE chat_jobs SET callback_status = ? WHERE id = ?",
+                (callback_status, job["id"]),
+            )
+
+        await run_in_threadpool(DatabaseManager.execute_write, mark_callback)
+
+    @classmethod
+    async def _work(cls, job_id: str) -> None:
+        """於工作槽內執行作業"""
+        if cls._slots is None:
+            cls._slots = asyncio.Semaphore(max(1, settings.chat_job_workers))
+        async with cls._slots:
+            try:
+                await cls.run(job_id)
+            except Exception as e:
+                logger.error(f"聊天作業執行失敗: job_id={job_id}, {str(e)}", exc_info=e)
+
+    @classmethod
+    def start(cls, job_id: str) -> None:
+        """
+        於背景排程作業（需在事件迴圈中呼叫）
+
+        Args:
+            job_id: 作業 ID
+        """
+        cls._spawn(cls._work(job_id))
+
+    @classmethod
+    def _spawn(cls, coro) -> None:
+        """於背景執行協程並保留參照"""
+        task = asyncio.get_running_loop().create_task(coro)
+        cls._tasks.add(task)
+        task.add_done_callback(cls._tasks.discard)
+
+    @classmethod
+    def resume_pending(cls) -> int:
+        """
+        啟動時處理未完成的作業
+
+        排隊中的作業重新排程；中斷於執行中的作業標記為失敗（JOB_INTERRUPTED）而非重新執行，
+        避免重複儲存訊息、重複呼叫 LLM 與重複擷取記憶，有回呼網址者送出失敗通知。
+
+        Returns:
+            int: 重新排程的作業數
+
+        Raises:
+            DatabaseError: 如果查詢失敗
+        """
+
+        def fail_interrupted(cursor) -> List[str]:
+            interrupted = cursor.execute(
+                "SELECT id FROM chat_jobs WHERE status = ? AND callback_url IS NOT NULL",
+                (STATUS_RUNNING,),
+            ).fetchall()
+            cursor.execute(
+                """
+                UPDATE chat_jobs
+                SET status = ?, error_code = ?, error_message = ?, completed_at = ?
+                WHERE status = ?
+                """,
+                (
+                    STATUS_FAILED,
+                    INTERRUPTED_ERROR_CODE,
+                    INTERRUPTED_ERROR_MESSAGE,
+                    datetime.now().isoformat(),
+                    STATUS_RUNNING,
+                ),
+            )
+            if cursor.rowcount:
+                logger.warning(f"{cursor.rowcount} 個聊天作業於執行中被中斷，已標記為失敗")
+            return [row[0] for row in interrupted]
+
+        try:
+            to_notify = DatabaseManager.execute_write(fail_interrupted)
+            rows = DatabaseManager.get_connection().execute(
+                "SELECT id FROM chat_jobs WHERE status = ? ORDER BY created_at",
+                (STATUS_QUEUED,),
+            ).fetchall()
+        except Exception as e:
+            logger.error(f"查詢未完成的聊天作業失敗: {str(e)}")
+            raise DatabaseError(f"無法查詢未完成的聊天作業: {str(e)}")
+
+        for job_id in to_notify:
+            cls._spawn(cls._notify(cls.get(job_id)))
+        for row in rows:
+            cls.start(row[0])
+        if rows:
+            logger.info(f"已重新排程 {len(rows)} 個未完成的聊天作業")
+        return len(rows)
+
+    @staticmethod
+    def purge_expired() -> int:
+        """
+        刪除超過保存期限的已完成作業
+
+        Returns:
+            int: 刪除的作業數
+
+        Raises:
+            DatabaseError: 如果刪除失敗
+        """
+        cutoff = datetime.now() - timedelta(hours=settings.chat_job_ttl_hours)
+
+        def delete_expired(cursor) -> int:
+            cursor.execute(
+                "DELETE FROM chat_jobs WHERE status IN (?, ?) AND completed_at <= ?",
+                (STATUS_SUCCEEDED, STATUS_FAILED, cutoff.isoformat()),
+            )
+            return cursor.rowcount
+
+        try:
+            count = DatabaseManager.execute_write(delete_expired)
+            if count:
+                logger.info(f"已清理 {count} 個過期聊天作業")
+            return count
+        except Exception as e:
+            logger.error(f"清理聊天作業失敗: {str(e)}")
+            raise DatabaseError(f"無法清理聊天作業: {str(e)}")
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """取消背景作業（狀態仍為執行中的作業於下次啟動時標記為中斷）"""
+        for task in list(cls._tasks):
+            task.cancel()
+        cls._tasks.clear()
+        cls._slots = None
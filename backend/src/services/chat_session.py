@@ -0,0 +1,110 @@
+"""
+對話工作階段
+
+WebSocket 連線期間保留的對話狀態：由 ConversationService.open_session 開啟時驗證使用者並
+確認對話擁有權一次，
+之後的回合直接使用記憶體中的對話、近期訊息緩衝（摘要涵蓋位置之後的訊息）、滾動摘要與投資輪廓，
+不再每回合重新查詢。緩衝只包含本工作階段寫入的訊息與開啟時載入的歷史；
+其他通道（例如 POST /chat）同時寫入同一對話時，需重新連線才會納入。
+"""
+
+from collections import deque
+from concurrent.futures import Future
+from typing import Deque, Dict, List, Optional, Tuple
+
+from ..config import settings
+from ..models.conversation import Conversation, Message
+from ..storage.storage_service import StorageService
+from ..utils.logger import get_logger
+from .profile_service import InvestorProfile, ProfileService
+from .summary_service import ConversationSummaryService
+
+logger = get_logger(__name__)
+
+
+class ChatSession:
+    """對話工作階段（同一工作階段的回合須依序執行）"""
+
+    def __init__(self, user_id: str, conversation: Conversation):
+        """
+        初始化工作階段
+
+        Args:
+            user_id: 已驗證的使用者 ID
+            conversation: 已確認屬於該使用者的對話
+        """
+        self.user_id = user_id
+        self.conversation = conversation
+        self.profile: Optional[InvestorProfile] = None
+        self.summary: Optional[str] = None
+        # (訊息 ID, LLM 上下文格式的訊息)
+        self._recent: Deque[Tuple[int, Dict]] = deque(maxlen=ConversationSummaryService.history_limit())
+
+    def preload(self) -> None:
+        """載入摘要之後的訊息、滾動摘要與投資輪廓"""
+        self._recent.clear()
+        self.summary, _, messages = ConversationSummaryService.load_context(self.conversation.id)
+        for message in messages:
+            self.append(message)
+        self.reload_profile()
+        logger.info(
+            f"工作階段已開啟: conversation_id={self.conversation.id}, "
+            f"history={len(self._recent)}, profile={self.profile is not None}"
+        )
+
+    def append(self, message: Message) -> None:
+        """
+        加入訊息至近期訊息緩衝（超過歷史上限時捨棄最舊的訊息）
+
+        Args:
+            message: 已儲存的訊息
+        """
+        self._recent.append(
+            (
+                message.id,
+                {
+                    "role": message.role,
+                    "content": message.content,
+                },
+            )
+        )
+
+    def history(self) -> List[Dict]:
+        """近期訊息（由舊到新，LLM 上下文格式）"""
+        return [entry for _, entry in self._recent]
+
+    def reload_summary(self) -> None:
+        """重新讀取滾動摘要（停用摘要時為 None），並捨棄已併入摘要的訊息"""
+        if not settings.conversation_summary_enabled:
+            self.summary = None
+            return
+        try:
+            self.summary, through_id = StorageService.get_conversation_summary(self.conversation.id)
+        except Exception as e:
+            logger.warning(f"讀取對話摘要失敗 (沿用快取): {str(e)[:100]}")
+            return
+        while self._recent and self._recent[0][0] <= through_id:
+            self._recent.popleft()
+
+    def reload_profile(self) -> None:
+        """重新讀取投資輪廓"""
+        try:
+            self.profile = ProfileService.get_profile(self.user_id)
+        except Exception as e:
+            logger.warning(f"取得投資輪廓失敗 (沿用快取): {str(e)[:100]}")
+
+    def track_summary_refresh(self, refresh: Optional[Future]) -> None:
+        """
+        背景摘要刷新完成且已更新時重新讀取摘要
+
+        Args:
+            refresh: ConversationSummaryService.schedule_refresh 返回的工作（None 表示未排程）
+        """
+        if refresh is None:
+            return
+
+        def on_done(future: Future) -> None:
+            if not future.cancelled() and future.exception() is None and future.result():
+                self.reload_summary()
+
+        refresh.add_done_callback(on_done)
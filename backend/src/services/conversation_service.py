@@ -4,11 +4,14 @@
 協調對話流程：儲存訊息 → 擷取記憶 → 呼叫 LLM → 儲存回應。
 """
 
-from typing import List, Optional, Dict
+from typing import Callable, List, Optional, Dict, Tuple
+import hashlib
+import time
 import uuid
 
 from ..config import settings
 from ..utils.logger import get_logger
+from ..utils.tokens import estimate_tokens
 from ..utils.exceptions import (
     ValidationError,
     MemoryError,
@@ -18,12 +21,45 @@ from ..utils.exceptions import (
 )
 from ..storage.storage_service import StorageService
 from ..services.memory_service import MemoryService
-from ..services.llm_service import LLMService
+from ..services.embedding_service import EmbeddingService
+from ..services.llm_service import FALLBACK_RESPONSES, LLMService
+from ..services.profile_service import ProfileService
+from ..services.model_router import ModelRouter
+from ..services.response_cache import response_cache
+from ..services.summary_service import ConversationSummaryService
+from ..services.usage_service import UsageService
+from ..services.chat_session import ChatSession
 from ..models.conversation import Conversation, Message
 
 logger = get_logger(__name__)
 
 
+def serialize_turn(result: Dict) -> Dict:
+    """
+    將 process_message 的結果轉換為 API 回應資料（/chat 與聊天作業共用）
+
+    Args:
+        result: process_message 的返回值
+
+    Returns:
+        Dict: 含 conversation_id、user_message、assistant_message、memories_used
+    """
+    return {
+        "conversation_id": str(result.get("conversation_id", "")),
+        "user_message": result.get("user_message"),
+        "assistant_message": result.get("assistant_message"),
+        "memories_used": [
+            {
+                "id": mem.get("id", ""),
+                "content": mem.get("content", ""),
+                "metadata": mem.get("metadata"),
+            }
+            for mem in result.get("memories_used", [])
+            if isinstance(mem, dict)
+        ],
+    }
+
+
 class ConversationService:
     """對話服務"""
 
@@ -150,11 +186,84 @@ class ConversationService:
             logger.error(f"取得或建立對話失敗: {str(e)}")
             raise DatabaseError(f"無法處理對話: {str(e)}")
 
+    @staticmethod
+    def _cache_eligible(
+        memories: List,
+        profile: Optional[str],
+        history: List[Dict],
+        summary: Optional[str],
+    ) -> bool:
+        """
+        判斷回合是否可使用語義回應快取
+
+        只有未注入任何使用者資訊（記憶、投資輪廓、對話摘要）且沒有先前對話的回合，
+        回應才與使用者無關，可跨使用者共用；快取鍵不含歷史，追問（例如「它呢？」）
+        的答案取決於先前對話，不可共用。
+
+        Args:
+            memories: 注入的記憶
+            profile: 投資輪廓文字
+            history: 對話歷史（含本回合的使用者訊息）
+            summary: 對話摘要
+
+        Returns:
+            bool: 是否可使用快取
+        """
+        if not settings.response_cache_enabled or memories or profile or summary:
+            return False
+        return len(history) <= 1
+
+    @staticmethod
+    def _lookup_cached_response(message: str) -> Tuple[Optional[List[float]], Optional[str]]:
+        """
+        以訊息向量查詢語義回應快取
+
+        Args:
+            message: 使用者訊息
+
+        Returns:
+            Tuple[Optional[List[float]], Optional[str]]: (查詢向量, 快取回應)；嵌入失敗時皆為 None
+        """
+        try:
+            vector = EmbeddingService.embed_text(message.strip())
+        except Exception as e:
+            logger.warning(f"語義快取查詢失敗 (略過): {str(e)[:100]}")
+            return None, None
+        cached = response_cache.lookup(vector)
+        return vector, cached.response if cached else None
+
+    @staticmethod
+    def open_session(user_id: str, conversation_id: Optional[str] = None) -> ChatSession:
+        """
+        開啟對話工作階段（驗證使用者與對話擁有權一次，並預載上下文）
+
+        Args:
+            user_id: 使用者 ID
+            conversation_id: 對話 ID（無則建立新對話）
+
+        Returns:
+            ChatSession: 工作階段
+
+        Raises:
+            ValidationError: 如果 user_id 無效或對話不屬於該使用者
+            DatabaseError: 如果資料庫操作失敗
+        """
+        conversation = ConversationService.get_or_create_conversation(user_id, conversation_id)
+        session = ChatSession(user_id, conversation)
+        try:
+            session.preload()
+        except Exception as e:
+            logger.error(f"預載工作階段失敗: {str(e)}")
+            raise DatabaseError(f"無法開啟工作階段: {str(e)}")
+        return session
+
     @staticmethod
     def process_message(
         user_id: str,
         conversation_id: Optional[int] = None,
         message: str = "",
+        session: Optional[ChatSession] = None,
+        on_chunk: Optional[Callable[[str], None]] = None,
     ) -> Dict:
         """
         處理使用者訊息完整流程
@@ -163,34 +272,54 @@ class ConversationService:
         1. 驗證輸入
         2. 取得或建立對話
         3. 儲存使用者訊息
-        4. 從訊息擷取記憶
-        5. 搜索相關記憶
+        4. 從訊息擷取記憶（同時更新投資輪廓）
+        5. 取得投資輪廓，輪廓未涵蓋時搜索相關記憶
         6. 呼叫 LLM 生成回應
         7. 儲存助理回應
+        8. 背景刷新對話的滾動摘要
+
+        提供工作階段時，對話、近期訊息、摘要與投資輪廓取自工作階段，
+        不再每回合查詢（conversation_id 被忽略）。
 
         Args:
             user_id: 使用者 ID
             conversation_id: 對話 ID（可選）
             message: 使用者訊息
+            session: 對話工作階段（選用，須屬於 user_id）
+            on_chunk: 回應片段回呼（選用，提供時串流生成）
 
         Returns:
             Dict: 包含回應的字典
 
         Raises:
             ValidationError: 如果輸入無效
+            QuotaExceededError: 如果超過每日 token 配額
             LLMError: 如果 LLM 呼叫失敗
             DatabaseError: 如果資料庫操作失敗
         """
-        # 步驟 1: 驗證輸入
-        ConversationService.validate_user_id(user_id)
+        # 步驟 1: 驗證輸入並檢查每日 token 配額（超過時不儲存訊息）
+        if session is None:
+            ConversationService.validate_user_id(user_id)
+        elif session.user_id != user_id:
+            raise ValidationError(
+                "工作階段不屬於該使用者",
+                details={"field": "user_id", "reason": "session owner mismatch"},
+            )
         ConversationService.validate_message(message)
+        UsageService.check_quota(
+            user_id,
+            estimate_tokens(message) + settings.llm_strong_max_output_tokens,
+        )
 
         try:
-            # 步驟 2: 取得或建立對話
-            conversation = ConversationService.get_or_create_conversation(
-                user_id,
-                conversation_id,
-            )
+            # 步驟 2: 取得或建立對話（工作階段已於開啟時確認擁有權）
+            if session is not None:
+                conversation = session.conversation
+            else:
+                conversation = ConversationService.get_or_create_conversation(
+                    user_id,
+                    conversation_id,
+                )
 
             logger.info(
                 f"[對話 {conversation.id}] 開始處理訊息",
@@ -203,6 +332,9 @@ class ConversationService:
                 message,
             )
 
+            if session is not None:
+                session.append(user_msg)
+
             logger.info(
                 f"[對話 {conversation.id}] 使用者訊息已儲存: message_id={user_msg.id}"
             )
@@ -220,6 +352,9 @@ class ConversationService:
                     logger.info(
                         f"[Step 4] 記憶已提取並儲存: memory_id={memory_id}"
                     )
+                    # 新記憶可能更新了投資輪廓
+                    if session is not None:
+                        session.reload_profile()
                 else:
                     logger.info(
                         f"[Step 4] Mem0 未提取到可儲存的偏好"
@@ -231,16 +366,28 @@ class ConversationService:
                 import traceback
                 logger.debug(f"   記憶提取錯誤堆棧: {traceback.format_exc()}")
 
-            # 步驟 5: 搜索相關記憶
+            # 步驟 5: 取得投資輪廓並視需要搜索相關記憶
+            profile = None
+            if session is not None:
+                profile = session.profile
+            else:
+                try:
+                    profile = ProfileService.get_profile(user_id)
+                except Exception as e:
+                    logger.warning(f"[Step 5] 取得投資輪廓失敗 (降級): {str(e)[:100]}")
+
             memories_used = []
             try:
-                logger.info(f"[Step 5] 開始搜索記憶: user_id={user_id[:8]}..., query={message!r}")
-                
-                memories = MemoryService.search_memories(
-                    user_id,
-                    message,
-                    top_k=settings.memory_retrieval_top_k,
-                )
+                if not ProfileService.needs_search(message, profile):
+                    logger.info(f"[Step 5] 投資輪廓已涵蓋，略過記憶搜索: user_id={user_id[:8]}...")
+                    memories = []
+                else:
+                    logger.info(f"[Step 5] 開始搜索記憶: user_id={user_id[:8]}..., query={message!r}")
+                    memories = MemoryService.search_memories(
+                        user_id,
+                        message,
+                        top_k=settings.memory_retrieval_top_k,
+                    )
                 memories_used = memories
                 
                 logger.info(
@@ -259,31 +406,65 @@ class ConversationService:
                 import traceback
                 logger.debug(f"   詳細錯誤: {traceback.format_exc()}")
 
-            # 步驟 6: 取得對話歷史（用於上下文）
-            conversation_history = StorageService.get_conversation_messages(
-                conversation.id,
-                limit=settings.conversation_context_window,
-            )
+            # 步驟 6: 取得對話歷史（用於上下文）：摘要之後的訊息原文，更早的內容由滾動摘要提供
+            if session is not None:
+                history = session.history()
+                summary = session.summary
+            else:
+                summary, _, conversation_history = ConversationSummaryService.load_context(
+                    conversation.id
+                )
 
-            # 轉換為 LLM 格式
-            history = [
-                {
-                    "role": msg.role,
-                    "content": msg.content,
-                }
-                for msg in conversation_history
-            ]
-
-            # 步驟 7: 呼叫 LLM 生成回應
-            assistant_response = LLMService.generate_response(
-                user_input=message,
-                memories=memories_used,
-                conversation_history=history,
-            )
+                # 轉換為 LLM 格式
+                history = [
+                    {
+                        "role": msg.role,
+                        "content": msg.content,
+                    }
+                    for msg in conversation_history
+                ]
+
+            # 步驟 7: 呼叫 LLM 生成回應（非個人化的回合先查詢語義回應快取）
+            profile_text = profile.to_prompt() if profile else None
+            cache_vector, assistant_response = None, None
+            if ConversationService._cache_eligible(memories_used, profile_text, history, summary):
+                cache_vector, assistant_response = ConversationService._lookup_cached_response(message)
+
+            if assistant_response is not None:
+                logger.info(f"[對話 {conversation.id}] 語義快取命中，略過 LLM")
+                if on_chunk is not None:
+                    on_chunk(assistant_response)
+            else:
+                # 依回合複雜度選擇模型與輸出上限
+                decision = ModelRouter.classify(
+                    message,
+                    memory_count=len(memories_used),
+                    has_profile=bool(profile_text),
+                )
+                started = time.perf_counter()
+                ok = False
+                try:
+                    assistant_response = LLMService.generate_response(
+                        user_input=message,
+                        memories=memories_used,
+                        conversation_history=history,
+                        profile=profile_text,
+                        summary=summary,
+                        model_name=decision.model,
+                        max_output_tokens=decision.max_output_tokens,
+                        user_id=user_id,
+                        conversation_id=conversation.id,
+                        on_chunk=on_chunk,
+                    )
+                    ok = True
+                finally:
+                    ModelRouter.record(decision, (time.perf_counter() - started) * 1000, ok=ok)
+                if cache_vector is not None and assistant_response not in FALLBACK_RESPONSES:
+                    response_cache.store(cache_vector, message, assistant_response)
 
-            logger.info(
-                f"[對話 {conversation.id}] LLM 回應已生成"
-            )
+                logger.info(
+                    f"[對話 {conversation.id}] LLM 回應已生成"
+                )
 
             # 步驟 8: 儲存助理回應
             assistant_msg = StorageService.save_message(
@@ -292,10 +473,18 @@ class ConversationService:
                 assistant_response,
             )
 
+            if session is not None:
+                session.append(assistant_msg)
+
             logger.info(
                 f"[對話 {conversation.id}] 助理回應已儲存: message_id={assistant_msg.id}"
             )
 
+            # 步驟 9: 背景刷新滾動摘要（移出視窗的回合累積足夠時才呼叫 LLM）
+            refresh = ConversationSummaryService.schedule_refresh(conversation.id)
+            if session is not None:
+                session.track_summary_refresh(refresh)
+
             # 返回完整回應
             return {
                 "conversation_id": conversation.id,
@@ -321,6 +510,7 @@ class ConversationService:
     def get_conversation_history(
         conversation_id: int,
         limit: int = 50,
+        after_id: Optional[int] = None,
     ) -> List[Dict]:
         """
         取得對話歷史
@@ -328,6 +518,7 @@ class ConversationService:
         Args:
             conversation_id: 對話 ID
             limit: 最大返回數量
+            after_id: 僅返回 ID 大於此值的訊息（選用）
 
         Returns:
             List[Dict]: 訊息歷史
@@ -339,6 +530,7 @@ class ConversationService:
             messages = StorageService.get_conversation_messages(
                 conversation_id,
                 limit=limit,
+                after_id=after_id,
             )
 
             return [msg.to_dict() for msg in messages]
@@ -346,3 +538,38 @@ class ConversationService:
         except Exception as e:
             logger.error(f"取得對話歷史失敗: {str(e)}")
             raise DatabaseError(f"無法取得對話歷史: {str(e)}")
+
+    @staticmethod
+    def get_conversation(conversation_id: int) -> Conversation:
+        """
+        取得對話（僅讀取 conversations 資料列，不載入訊息）
+
+        Args:
+            conversation_id: 對話 ID
+
+        Returns:
+            Conversation: 對話物件
+
+        Raises:
+            NotFoundError: 如果對話不存在
+            DatabaseError: 如果查詢失敗
+        """
+        return StorageService.get_conversation(conversation_id)
+
+    @staticmethod
+    def get_history_etag(conversation: Conversation) -> str:
+        """
+        計算對話歷史的 ETag
+
+        由 conversations 資料列的 (id, message_count, last_activity) 推導，
+        每次儲存訊息都會更新這兩個欄位，因此不需載入訊息即可判斷是否變更。
+
+        Args:
+            conversation: 對話物件
+
+        Returns:
+            str: 弱 ETag（例如 W/"3f2a..."）
+        """
+        state = f"{conversation.id}:{conversation.message_count}:{conversation.last_activity}"
+        digest = hashlib.sha1(state.encode("utf-8")).hexdigest()
+        return f'W/"{digest}"'
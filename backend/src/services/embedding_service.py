@@ -1,16 +1,18 @@
 """
-嵌入服務模組：Google Embeddings API 整合
+嵌入服務模組：文本向量化
 
-此模組提供文本向量化功能，用於語義搜索。
+此模組透過模型提供者（Gemini 或本地提供者）將文本向量化，用於語義搜索。
 """
 
-from typing import List
-
-import google.generativeai as genai
+import threading
+from collections import OrderedDict
+from typing import List, Optional
 
 from ..config import settings
+from ..providers import LLMProvider, get_provider
 from ..utils.logger import get_logger
 from ..utils.exceptions import LLMError
+from .retry import call_with_retry
 
 logger = get_logger(__name__)
 
@@ -18,16 +20,19 @@ logger = get_logger(__name__)
 class EmbeddingService:
     """嵌入服務"""
 
-    _client = None
+    _provider: Optional[LLMProvider] = None
+    # 文本 -> 向量的 LRU 快取（重複的查詢不必重新呼叫 API）
+    _cache: "OrderedDict[str, List[float]]" = OrderedDict()
+    _cache_lock = threading.Lock()
 
     @classmethod
     def initialize(cls) -> None:
-        """初始化 Google Embeddings 客戶端"""
+        """初始化模型提供者"""
         try:
-            genai.configure(api_key=settings.google_api_key)
-            logger.info("Google Embeddings 客戶端已初始化")
+            cls._provider = get_provider()
+            logger.info(f"嵌入提供者已初始化: {cls._provider.name}")
         except Exception as e:
-            logger.error(f"Google Embeddings 初始化失敗: {str(e)}")
+            logger.error(f"嵌入提供者初始化失敗: {str(e)}")
             raise LLMError(f"無法初始化嵌入服務: {str(e)}")
 
     @classmethod
@@ -44,24 +49,36 @@ class EmbeddingService:
         Raises:
             LLMError: 如果嵌入失敗
         """
+        with cls._cache_lock:
+            cached = cls._cache.get(text)
+            if cached is not None:
+                cls._cache.move_to_end(text)
+                return cached
+
         try:
-            response = genai.embed_content(
-                model=f"models/{settings.mem0_embedder_model}",
-                content=text,
-            )
-            if "embedding" in response:
-                return response["embedding"]
-            else:
-                raise LLMError("嵌入回應不包含向量")
+            if cls._provider is None:
+                cls.initialize()
+
+            embedding = call_with_retry(lambda: cls._provider.embed(text), name="embed")
+            cls._remember(text, embedding)
+            return embedding
 
         except Exception as e:
             logger.error(f"文本嵌入失敗: {str(e)}")
             raise LLMError(f"無法嵌入文本: {str(e)}")
 
+    @classmethod
+    def _remember(cls, text: str, embedding: List[float]) -> None:
+        """寫入 LRU 快取"""
+        with cls._cache_lock:
+            cls._cache[text] = embedding
+            while len(cls._cache) > settings.embedding_cache_size:
+                cls._cache.popitem(last=False)
+
     @classmethod
     def embed_batch(cls, texts: List[str]) -> List[List[float]]:
         """
-        批量嵌入文本
+        批量嵌入文本（快取未命中的文本以單一提供者呼叫嵌入）
 
         Args:
             texts: 文本列表
@@ -73,11 +90,21 @@ class EmbeddingService:
             LLMError: 如果嵌入失敗
         """
         try:
-            embeddings = []
-            for text in texts:
-                embedding = cls.embed_text(text)
-                embeddings.append(embedding)
-            return embeddings
+            with cls._cache_lock:
+                cached = {text: cls._cache[text] for text in texts if text in cls._cache}
+            missing = list(dict.fromkeys(text for text in texts if text not in cached))
+
+            if missing:
+                if cls._provider is None:
+                    cls.initialize()
+                embeddings = call_with_retry(lambda: cls._provider.embed_batch(missing), name="embed_batch")
+                if len(embeddings) != len(missing):
+                    raise LLMError("批量嵌入回應數量與輸入不符")
+                for text, embedding in zip(missing, embeddings):
+                    cls._remember(text, embedding)
+                    cached[text] = embedding
+
+            return [cached[text] for text in texts]
 
         except LLMError:
             raise
@@ -0,0 +1,262 @@
+"""
+對沖請求
+
+以串流方式呼叫生成：第一次嘗試在觀測到的首個片段延遲（TTFT）p90 內仍未產生首個片段時，
+啟動第二次嘗試，先完成者勝出，另一個嘗試停止讀取並關閉串流。對沖次數受預算限制
+（llm_hedge_budget_ratio），觀測樣本不足時不對沖。
+
+統計中的 p99_unhedged_ms 為「不對沖時」p99 的下界估計：對沖勝出的請求，
+以被取消的主要嘗試實際結束（下一個片段到達）時已經過的時間作為其延遲。
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, Iterator, List, Optional
+
+from ..config import settings
+from ..utils.logger import get_logger
+from .retry import RetryBudget, remaining_time
+
+logger = get_logger(__name__)
+
+# 保留的延遲樣本數
+_LATENCY_SAMPLES = 1000
+
+
+def _quantile(samples: List[float], q: float) -> float:
+    """取已排序樣本的分位數"""
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+class _Attempt:
+    """單次串流嘗試"""
+
+    def __init__(self, stream_fn: Callable[[], Iterator[str]], started_at: float):
+        self.stream_fn = stream_fn
+        self.started_at = started_at
+        self.first_token = threading.Event()
+        self.cancelled = threading.Event()
+        self.ttft: Optional[float] = None
+        self.future: Optional[Future] = None
+
+    def run(self) -> str:
+        """讀取串流直到結束或被取消"""
+        chunks = []
+        stream = self.stream_fn()
+        try:
+            for chunk in stream:
+                if self.ttft is None:
+                    self.ttft = time.monotonic() - self.started_at
+                    self.first_token.set()
+                if self.cancelled.is_set():
+                    break
+                chunks.append(chunk)
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+            # 嘗試結束（含失敗）時也喚醒等待首個片段的呼叫端
+            self.first_token.set()
+        return "".join(chunks)
+
+    def cancel(self) -> None:
+        """取消嘗試（尚未開始則不執行，執行中則於下一個片段停止）"""
+        self.cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+
+class HedgedGenerator:
+    """對沖生成器"""
+
+    def __init__(self, quantile: float, min_samples: int, budget: RetryBudget, max_workers: int):
+        """
+        初始化對沖生成器
+
+        Args:
+            quantile: 觸發對沖的 TTFT 分位數
+            min_samples: 開始對沖前需要的 TTFT 樣本數
+            budget: 對沖預算
+            max_workers: 執行嘗試的執行緒數
+        """
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.budget = budget
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._ttft: Deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+        self._latency: Deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+        self._unhedged_latency: Deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        """取得（必要時建立）執行緒池"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="llm-hedge"
+                )
+            return self._executor
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        取得觸發對沖的等待秒數
+
+        Returns:
+            Optional[float]: TTFT 分位數，樣本不足時返回 None
+        """
+        with self._lock:
+            if len(self._ttft) < max(1, self.min_samples):
+                return None
+            return _quantile(sorted(self._ttft), self.quantile)
+
+    def _submit(self, stream_fn: Callable[[], Iterator[str]], started_at: float) -> _Attempt:
+        """提交一次嘗試"""
+        attempt = _Attempt(stream_fn, started_at)
+        attempt.future = self._pool().submit(attempt.run)
+        return attempt
+
+    def generate(self, stream_fn: Callable[[], Iterator[str]]) -> str:
+        """
+        執行對沖生成
+
+        Args:
+            stream_fn: 建立新串流的函式（每次嘗試呼叫一次）
+
+        Returns:
+            str: 勝出嘗試的完整回應
+
+        Raises:
+            TimeoutError: 如果超過請求期限仍無嘗試完成
+            Exception: 所有嘗試皆失敗時拋出最後一個錯誤
+        """
+        self.budget.record_request()
+        started_at = time.monotonic()
+        primary = self._submit(stream_fn, started_at)
+        attempts = [primary]
+
+        delay = self.hedge_delay()
+        if delay is not None and not primary.first_token.wait(delay):
+            if self.budget.try_spend():
+                # 對沖嘗試的 TTFT 自其本身開始計算，不含等待對沖的時間
+                attempts.append(self._submit(stream_fn, time.monotonic()))
+                logger.info(f"[Hedge] 首個片段超過 {delay * 1000:.0f}ms，啟動對沖嘗試")
+
+        pending = {attempt.future: attempt for attempt in attempts}
+        winner: Optional[_Attempt] = None
+        error: Optional[BaseException] = None
+        while pending and winner is None:
+            done, _ = wait(list(pending), timeout=remaining_time(), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                attempt = pending.pop(future)
+                if future.exception() is None:
+                    winner = attempt
+                    break
+                error = future.exception()
+
+        for attempt in attempts:
+            if attempt is not winner:
+                attempt.cancel()
+
+        if winner is None:
+            if error is not None and not pending:
+                raise error
+            raise TimeoutError("對沖生成超過請求期限")
+
+        self._record(attempts, winner, time.monotonic() - started_at)
+        return winner.future.result()
+
+    def _record(self, attempts: List[_Attempt], winner: _Attempt, latency: float) -> None:
+        """記錄 TTFT、延遲與對沖結果"""
+        primary = attempts[0]
+        with self._lock:
+            self.requests += 1
+            for attempt in attempts:
+                # 落敗的主要嘗試由 _record_unhedged 記錄
+                if attempt.ttft is not None and (attempt is not primary or winner is primary):
+                    self._ttft.append(attempt.ttft)
+            self._latency.append(latency)
+            if len(attempts) > 1:
+                self.hedged += 1
+                if winner is not primary:
+                    self.hedge_wins += 1
+            if winner is primary:
+                self._unhedged_latency.append(latency)
+
+        if winner is not primary:
+            # 被取消的主要嘗試在下一個片段到達時才結束，屆時經過的時間即其延遲的下界
+            primary.future.add_done_callback(
+                lambda _: self._record_unhedged(primary, max(latency, time.monotonic() - primary.started_at))
+            )
+
+    def _record_unhedged(self, primary: _Attempt, latency: float) -> None:
+        """記錄對沖勝出時主要嘗試的延遲下界"""
+        with self._lock:
+            if primary.ttft is not None:
+                self._ttft.append(primary.ttft)
+            self._unhedged_latency.append(latency)
+
+    def stats(self) -> Dict:
+        """
+        取得對沖統計
+
+        Returns:
+            Dict: 請求數、對沖率、對沖勝出數、觸發門檻與 p99 改善（毫秒）
+        """
+        with self._lock:
+            latency = sorted(self._latency)
+            unhedged = sorted(self._unhedged_latency)
+            requests, hedged, hedge_wins = self.requests, self.hedged, self.hedge_wins
+        delay = self.hedge_delay()
+        result = {
+            "requests": requests,
+            "hedged": hedged,
+            "hedge_rate": round(hedged / requests, 4) if requests else 0.0,
+            "hedge_wins": hedge_wins,
+            "budget_rejected": self.budget.stats()["rejected"],
+            "hedge_delay_ms": round(delay * 1000, 1) if delay is not None else None,
+        }
+        if latency and unhedged:
+            p99 = _quantile(latency, 0.99) * 1000
+            p99_unhedged = _quantile(unhedged, 0.99) * 1000
+            result.update({
+                "p99_ms": round(p99, 1),
+                "p99_unhedged_ms": round(p99_unhedged, 1),
+                "p99_improvement_ms": round(p99_unhedged - p99, 1),
+            })
+        return result
+
+    def reset(self) -> None:
+        """清除樣本與統計"""
+        with self._lock:
+            self._ttft.clear()
+            self._latency.clear()
+            self._unhedged_latency.clear()
+            self.requests = self.hedged = self.hedge_wins = 0
+        self.budget.reset()
+
+    def shutdown(self) -> None:
+        """關閉執行緒池（不等待進行中的嘗試）"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# 全域對沖生成器
+llm_hedger = HedgedGenerator(
+    quantile=settings.llm_hedge_quantile,
+    min_samples=settings.llm_hedge_min_samples,
+    budget=RetryBudget(
+        ratio=settings.llm_hedge_budget_ratio,
+        max_tokens=settings.llm_hedge_budget_max_tokens,
+    ),
+    max_workers=settings.llm_hedge_max_workers,
+)
@@ -0,0 +1,281 @@
+"""
+冪等服務
+
+為 POST /chat 提供 Idempotency-Key 支援：已完成的回應（狀態碼、內容與標頭）儲存於 SQLite
+並在 TTL 內重播，同一鍵的並行請求共用進行中的結果（single-flight），避免重複儲存訊息與
+重複呼叫 LLM。發起請求的客戶端中斷時回合仍會完成並儲存，等待中的請求與之後的重試可取得結果。
+可重試的結果（408/409/425/429 與 5xx）不儲存，客戶端依 Retry-After 等待後
+以同一鍵重試時會重新執行。
+"""
+
+import asyncio
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from ..config import settings
+from ..utils.logger import get_logger
+from ..utils.exceptions import DatabaseError, IdempotencyKeyMismatchError
+from ..storage.database import DatabaseManager
+
+logger = get_logger(__name__)
+
+# 客戶端稍後重試可能成功的狀態碼（另含所有 5xx），不儲存
+_RETRYABLE_STATUS_CODES = frozenset({408, 409, 425, 429})
+
+
+@dataclass
+class StoredResponse:
+    """已儲存的回應"""
+
+    status_code: int
+    body: str
+    request_hash: str
+    headers: Dict[str, str]
+
+
+class IdempotencyService:
+    """冪等服務"""
+
+    # (user_id, key) -> (request_hash, 進行中的回合)
+    _inflight: Dict[Tuple[str, str], Tuple[str, asyncio.Task]] = {}
+
+    @staticmethod
+    def fingerprint(payload: dict) -> str:
+        """
+        計算請求內容指紋
+
+        Args:
+            payload: 請求內容
+
+        Returns:
+            str: SHA-256 十六進位摘要
+        """
+        canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def get_stored(user_id: str, key: str) -> Optional[StoredResponse]:
+        """
+        取得未過期的已儲存回應
+
+        Args:
+            user_id: 使用者 ID
+            key: 冪等鍵
+
+        Returns:
+            Optional[StoredResponse]: 已儲存的回應，不存在或已過期時返回 None
+
+        Raises:
+            DatabaseError: 如果查詢失敗
+        """
+        try:
+            conn = DatabaseManager.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT status_code, response_body, request_hash, response_headers
+                FROM idempotency_keys
+                WHERE user_id = ? AND idempotency_key = ? AND expires_at > ?
+                """,
+                (user_id, key, datetime.now().isoformat()),
+            )
+            row = cursor.fetchone()
+            if not row:
+                return None
+            return StoredResponse(
+                status_code=row[0],
+                body=row[1],
+                request_hash=row[2],
+                headers=json.loads(row[3]) if row[3] else {},
+            )
+
+        except Exception as e:
+            logger.error(f"查詢冪等鍵失敗: {str(e)}")
+            raise DatabaseError(f"無法查詢冪等鍵: {str(e)}")
+
+    @staticmethod
+    def store(
+        user_id: str,
+        key: str,
+        request_hash: str,
+        status_code: int,
+        body: str,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """
+        儲存已完成的回應
+
+        Args:
+            user_id: 使用者 ID
+            key: 冪等鍵
+            request_hash: 請求內容指紋
+            status_code: HTTP 狀態碼
+            body: 回應內容（JSON 字串）
+            headers: 重播時一併返回的回應標頭
+
+        Raises:
+            DatabaseError: 如果儲存失敗
+        """
+        now = datetime.now()
+        expires_at = now + timedelta(hours=settings.idempotency_ttl_hours)
+
+        def upsert(cursor) -> None:
+            cursor.execute(
+                """
+                INSERT OR REPLACE INTO idempotency_keys
+                    (user_id, idempotency_key, request_hash, status_code, response_body,
+                     response_headers, created_at, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    user_id,
+                    key,
+                    request_hash,
+                    status_code,
+                    body,
+                    json.dumps(headers or {}, ensure_ascii=False),
+                    now.isoformat(),
+                    expires_at.isoformat(),
+                ),
+            )
+
+        try:
+            DatabaseManager.execute_write(upsert)
+
+        except Exception as e:
+            logger.error(f"儲存冪等鍵失敗: {str(e)}")
+            raise DatabaseError(f"無法儲存冪等鍵: {str(e)}")
+
+    @staticmethod
+    def is_storable(status_code: int) -> bool:
+        """
+        判斷結果是否可儲存重播（可重試的狀態碼不儲存）
+
+        Args:
+            status_code: HTTP 狀態碼
+
+        Returns:
+            bool: 是否儲存
+        """
+        return status_code < 500 and status_code not in _RETRYABLE_STATUS_CODES
+
+    @classmethod
+    async def execute(
+        cls,
+        user_id: str,
+        key: str,
+        request_hash: str,
+        handler: Callable[[], Awaitable[Tuple[int, str, Dict[str, str]]]],
+    ) -> Tuple[int, str, Dict[str, str], bool]:
+        """
+        以冪等方式執行請求
+
+        1. 已有未過期的儲存回應：直接重播
+        2. 同一鍵仍在處理中：等待同一個結果（single-flight）
+        3. 否則在獨立的工作中執行 handler 並儲存不可重試的結果；呼叫端被取消時工作繼續執行
+
+        Args:
+            user_id: 使用者 ID
+            key: 冪等鍵
+            request_hash: 請求內容指紋
+            handler: 實際處理請求的協程，返回 (status_code, body, headers)
+
+        Returns:
+            Tuple[int, str, Dict[str, str], bool]: (status_code, body, headers, 是否為重播)
+
+        Raises:
+            IdempotencyKeyMismatchError: 如果同一鍵用於不同的請求內容
+            DatabaseError: 如果查詢已儲存的回應失敗（此時不執行 handler）
+        """
+        scope = (user_id, key)
+
+        stored = await run_in_threadpool(cls.get_stored, user_id, key)
+        if stored is not None:
+            if stored.request_hash != request_hash:
+                raise IdempotencyKeyMismatchError(key)
+            logger.info(f"重播冪等回應: key={key}")
+            return stored.status_code, stored.body, stored.headers, True
+
+        inflight = cls._inflight.get(scope)
+        if inflight is not None:
+            inflight_hash, task = inflight
+            if inflight_hash != request_hash:
+                raise IdempotencyKeyMismatchError(key)
+            logger.info(f"等待進行中的冪等請求: key={key}")
+            status_code, body, headers = await asyncio.shield(task)
+            return status_code, body, headers, True
+
+        task = asyncio.ensure_future(cls._run(scope, request_hash, handler))
+        # 避免呼叫端已取消、沒有等待者時出現 "exception was never retrieved" 警告
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        cls._inflight[scope] = (request_hash, task)
+        status_code, body, headers = await asyncio.shield(task)
+        return status_code, body, headers, False
+
+    @classmethod
+    async def _run(
+        cls,
+        scope: Tuple[str, str],
+        request_hash: str,
+        handler: Callable[[], Awaitable[Tuple[int, str, Dict[str, str]]]],
+    ) -> Tuple[int, str, Dict[str, str]]:
+        """
+        執行 handler 並儲存不可重試的結果，完成後移除進行中的記錄
+
+        Args:
+            scope: (user_id, key)
+            request_hash: 請求內容指紋
+            handler: 實際處理請求的協程
+
+        Returns:
+            Tuple[int, str, Dict[str, str]]: (status_code, body, headers)
+        """
+        user_id, key = scope
+        try:
+            status_code, body, headers = await handler()
+            # 可重試的結果不儲存，讓客戶端重試時重新執行
+            if cls.is_storable(status_code):
+                try:
+                    await run_in_threadpool(
+                        cls.store, user_id, key, request_hash, status_code, body, headers
+                    )
+                except DatabaseError as e:
+                    # 回合已完成，仍返回結果；之後以同一鍵重試時會重新執行
+                    logger.warning(f"冪等回應未儲存: key={key}, {str(e)[:100]}")
+            return status_code, body, headers
+        finally:
+            cls._inflight.pop(scope, None)
+
+    @staticmethod
+    def purge_expired() -> int:
+        """
+        刪除過期的冪等鍵
+
+        Returns:
+            int: 刪除的記錄數
+
+        Raises:
+            DatabaseError: 如果刪除失敗
+        """
+
+        def delete_expired(cursor) -> int:
+            cursor.execute(
+                "DELETE FROM idempotency_keys WHERE expires_at <= ?",
+                (datetime.now().isoformat(),),
+            )
+            return cursor.rowcount
+
+        try:
+            count = DatabaseManager.execute_write(delete_expired)
+            if count:
+                logger.info(f"已清理 {count} 個過期冪等鍵")
+            return count
+
+        except Exception as e:
+            logger.error(f"清理冪等鍵失敗: {str(e)}")
+            raise DatabaseError(f"無法清理冪等鍵: {str(e)}")
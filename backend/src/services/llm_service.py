@@ -1,50 +1,203 @@
 """
-LLM 服務模組：Google Gemini 2.5 Flash 整合
+LLM 服務模組：對話、偏好提取、記憶合併與對話摘要
 
-此模組提供大型語言模型的對話功能。
+此模組組裝提示並透過模型提供者（Gemini 或本地提供者）生成回應。
 """
 
-from typing import List, Optional
-
-import google.generativeai as genai
+from typing import Callable, Dict, List, Optional
 
 from ..config import settings
+from ..providers import SAFETY_OFF, SAFETY_RELAXED, GenerationResult, LLMProvider, TokenUsage, get_provider
 from ..utils.logger import get_logger
 from ..utils.exceptions import LLMError
+from ..utils.tokens import estimate_tokens, uncalibrated_tokens
+from .hedging import llm_hedger
+from .retry import call_with_retry
+from .usage_service import UsageService
 
 logger = get_logger(__name__)
 
+# 靜態系統指令：所有請求相同，作為可由供應商快取的前綴；個人化內容一律放在 contents
+SYSTEM_INSTRUCTION = """你是一個專業、友善的投資顧問助理。
+請根據使用者的需求提供資訊和建議。
+使用繁體中文回應，保持簡潔明瞭。
+
+回應要求：
+- 請基於已知的使用者信息（如果提供）來個人化回應
+- 避免重複詢問已知的信息
+- 提供具體的投資建議而非泛泛而談
+- 如果尚缺相關信息，可詢問但要指出已知內容
+"""
+
+# 回應被阻擋或為空時返回的備用回應
+SAFETY_FALLBACK_RESPONSE = "感謝您的提問。為了提供更好的服務，請用不同的方式表達您的問題。"
+BLOCKED_FALLBACK_RESPONSE = "感謝您的提問。我們無法處理此請求，請稍後重試或使用不同的方式表達。"
+EMPTY_FALLBACK_RESPONSE = "感謝您的提問。請稍後重試。"
+FALLBACK_RESPONSES = (SAFETY_FALLBACK_RESPONSE, BLOCKED_FALLBACK_RESPONSE, EMPTY_FALLBACK_RESPONSE)
+
 
 class LLMService:
     """LLM 服務"""
 
-    _model = None
+    _provider: Optional[LLMProvider] = None
 
     @classmethod
     def initialize(cls) -> None:
-        """初始化 Google Gemini 客戶端"""
+        """初始化模型提供者"""
         try:
-            genai.configure(api_key=settings.google_api_key)
-            cls._model = genai.GenerativeModel(settings.mem0_llm_model)
-            logger.info(f"Google Gemini 客戶端已初始化: {settings.mem0_llm_model}")
+            cls._provider = get_provider()
+            logger.info(f"LLM 提供者已初始化: {cls._provider.name}, model={settings.mem0_llm_model}")
         except Exception as e:
-            logger.error(f"Google Gemini 初始化失敗: {str(e)}")
+            logger.error(f"LLM 提供者初始化失敗: {str(e)}")
             raise LLMError(f"無法初始化 LLM 服務: {str(e)}")
 
+    @staticmethod
+    def _memory_lines(memories: Optional[List]) -> List[str]:
+        """取出記憶內容（支援字典或字串格式），略過空白內容"""
+        lines = []
+        for memory in memories or []:
+            content = memory.get("content", "") if isinstance(memory, dict) else str(memory)
+            if content and content.strip():
+                lines.append(content.strip())
+        return lines
+
+    @classmethod
+    def build_contents(
+        cls,
+        user_input: str,
+        memories: Optional[List] = None,
+        conversation_history: Optional[List[dict]] = None,
+        profile: Optional[str] = None,
+        summary: Optional[str] = None,
+    ) -> List[Dict]:
+        """
+        組裝 Gemini 多輪 contents
+
+        對話歷史轉為 user / model 回合（相鄰同角色合併），投資輪廓、記憶與摘要
+        放在最後一個使用者回合的開頭，系統指令則維持不變以便快取。
+        超過提示預算（llm_prompt_token_budget）時捨棄最舊的歷史訊息。
+
+        Args:
+            user_input: 使用者輸入
+            memories: 相關記憶列表
+            conversation_history: 對話歷史（可含本回合已儲存的使用者訊息）
+            profile: 投資輪廓精簡文字
+            summary: 早期對話摘要
+
+        Returns:
+            List[Dict]: [{"role": "user" | "model", "parts": [str]}, ...]
+        """
+        history = list(conversation_history or [])
+        # 本回合的使用者訊息已先寫入歷史，避免重複
+        if history and history[-1].get("role") == "user" and history[-1].get("content") == user_input:
+            history.pop()
+
+        context = []
+        if profile:
+            context.append(f"使用者投資輪廓：\n{profile}")
+        memory_lines = cls._memory_lines(memories)
+        if memory_lines:
+            context.append("已知的使用者信息與投資偏好：\n" + "\n".join(f"• {line}" for line in memory_lines))
+        if summary:
+            context.append(f"先前對話摘要：\n{summary}")
+        final_turn = "\n\n".join(context + [f"【當前提問】\n{user_input}"])
+        history = cls._fit_history(history, estimate_tokens(SYSTEM_INSTRUCTION) + estimate_tokens(final_turn))
+
+        contents: List[Dict] = []
+        for msg in history + [{"role": "user", "content": final_turn}]:
+            role = "model" if msg.get("role") == "assistant" else "user"
+            text = msg.get("content", "")
+            if not text:
+                continue
+            if contents and contents[-1]["role"] == role:
+                contents[-1]["parts"][0] += f"\n\n{text}"
+            else:
+                contents.append({"role": role, "parts": [text]})
+        return contents
+
+    @staticmethod
+    def _fit_history(history: List[Dict], reserved_tokens: int) -> List[Dict]:
+        """
+        由新到舊保留符合提示預算的歷史訊息
+
+        Args:
+            history: 對話歷史（依時間順序）
+            reserved_tokens: 系統指令與最後回合已占用的 token 數
+
+        Returns:
+            List[Dict]: 保留的歷史（不以助理訊息開頭）
+        """
+        budget = settings.llm_prompt_token_budget
+        if budget <= 0:
+            return history
+
+        remaining = budget - reserved_tokens
+        kept = 0
+        for msg in reversed(history):
+            # 一律以內容估算（依文字快取）：舊訊息儲存的 token_count 以空白切分計算，不可用於預算
+            cost = estimate_tokens(msg.get("content", ""))
+            if cost > remaining:
+                break
+            remaining -= cost
+            kept += 1
+        if kept == len(history):
+            return history
+
+        fitted = history[len(history) - kept:]
+        while fitted and fitted[0].get("role") == "assistant":
+            fitted = fitted[1:]
+        logger.debug(f"提示超過預算，捨棄 {len(history) - len(fitted)} 則最舊的歷史訊息")
+        return fitted
+
+    @staticmethod
+    def _prompt_parts(contents: List[Dict]) -> List[str]:
+        """提示的所有文字片段（含系統指令）"""
+        return [SYSTEM_INSTRUCTION] + [str(part) for turn in contents for part in turn["parts"]]
+
+    @staticmethod
+    def estimate_prompt_tokens(contents: List[Dict]) -> int:
+        """
+        估算提示（含系統指令）的 token 數
+
+        Args:
+            contents: build_contents 組裝的 contents
+
+        Returns:
+            int: 估算的 token 數
+        """
+        return sum(estimate_tokens(part) for part in LLMService._prompt_parts(contents))
+
     @classmethod
     def generate_response(
         cls,
         user_input: str,
         memories: Optional[List] = None,
         conversation_history: Optional[List[dict]] = None,
+        profile: Optional[str] = None,
+        summary: Optional[str] = None,
+        model_name: Optional[str] = None,
+        max_output_tokens: Optional[int] = None,
+        user_id: Optional[str] = None,
+        conversation_id: Optional[int] = None,
+        on_chunk: Optional[Callable[[str], None]] = None,
     ) -> str:
         """
         生成 LLM 回應（US2 T039 改進）
 
+        提供 on_chunk 時以串流生成並逐片段回呼；已送出片段後發生的錯誤不再重試，
+        避免重複的片段。回應被阻擋或為空時，回呼收到的內容與返回的備用回應不同。
+
         Args:
             user_input: 使用者輸入
             memories: 相關記憶列表（可以是字串或字典列表）
             conversation_history: 對話歷史（選用）
+            profile: 使用者投資輪廓的精簡文字（選用）
+            summary: 已移出上下文視窗的早期對話摘要（選用）
+            model_name: 使用的模型（預設 mem0_llm_model）
+            max_output_tokens: 輸出 token 上限（預設 llm_strong_max_output_tokens）
+            user_id: 使用者 ID（提供時記錄 token 用量）
+            conversation_id: 對話 ID（選用，隨用量記錄）
+            on_chunk: 回應片段回呼（選用）
 
         Returns:
             str: LLM 回應
@@ -53,211 +206,83 @@ class LLMService:
             LLMError: 如果生成失敗
         """
         try:
-            if cls._model is None:
+            if cls._provider is None:
                 cls.initialize()
 
-            # 構建系統提示 - 使用簡潔中性的措辭
-            system_prompt = """你是一個專業、友善的投資顧問助理。
-請根據使用者的需求提供資訊和建議。
-使用繁體中文回應，保持簡潔明瞭。
-"""
-
-            # 新增記憶上下文（US2 T039）
-            # 詳細的記憶診斷日誌
-            logger.info(f"[LLM] memories 類型: {type(memories)}, 值: {memories}")
-            
-            if memories and len(memories) > 0:
-                logger.info(f"[LLM] 注入記憶: 共 {len(memories)} 個")
-                
-                # 提取實際的記憶內容
-                memory_contents = []
-                for idx, memory in enumerate(memories):
-                    # 支援字典格式（新增）或字串格式（舊版本相容）
-                    if isinstance(memory, dict):
-                        content = memory.get("content", "")
-                        logger.info(f"  [{idx+1}] 字典記憶: id={memory.get('id', 'N/A')}, content={content!r}")
-                    else:
-                        content = str(memory)
-                        logger.info(f"  [{idx+1}] 字符記憶: {content!r}")
-                    
-                    if content:
-                        memory_contents.append(content)
-                        logger.info(f"      [OK] 記憶內容有效: {content[:50]}...")
-                    else:
-                        logger.warning(f"      [WARN] 記憶內容為空")
-                
-                # 只有當有實際記憶內容時，才添加到 system prompt
-                if memory_contents:
-                    memory_context = "已知的使用者信息與投資偏好：\n"
-                    for content in memory_contents:
-                        memory_context += f"• {content}\n"
-                    memory_context += "\n請基於上述使用者信息提供個人化的投資建議。\n"
-                    system_prompt += memory_context
-                    logger.info(f"[LLM] 記憶已成功注入到 prompt ({len(memory_contents)} 項)")
-                else:
-                    logger.warning(f"[LLM] 記憶結果有 {len(memories)} 個但內容全為空")
-            else:
-                logger.info(f"[LLM] 未找到記憶 (memories 為空或 None), memories={memories!r}")
-
-            # 構建對話歷史上下文
-            history_context = ""
-            if conversation_history:
-                history_context = "\n對話歷史：\n"
-                for msg in conversation_history:
-                    role = msg.get("role", "unknown")
-                    content = msg.get("content", "")
-                    if role == "user":
-                        history_context += f"使用者: {content}\n"
-                    elif role == "assistant":
-                        history_context += f"助理: {content}\n"
-                
-                system_prompt += history_context
-
-            # 構建提示
-            full_prompt = f"""{system_prompt}
-
-【對話記錄】
-{history_context if history_context else "(首次對話)"}
-
-【當前提問】
-{user_input}
-
-【要求】
-- 請基於已知的使用者信息（如果提供）來個人化回應
-- 避免重複詢問已知的信息
-- 提供具體的投資建議而非泛泛而談
-- 如果尚缺相關信息，可詢問但要指出已知內容
-
-【回應】
-"""
-
-            # 配置安全設定 - 使用寬鬆的安全級別以支援金融/投資內容
-            # BLOCK_ONLY_HIGH 只阻擋最嚴重的內容
-            safety_settings = [
-                {
-                    "category": genai.types.HarmCategory.HARM_CATEGORY_HARASSMENT,
-                    "threshold": genai.types.HarmBlockThreshold.BLOCK_ONLY_HIGH,
-                },
-                {
-                    "category": genai.types.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
-                    "threshold": genai.types.HarmBlockThreshold.BLOCK_ONLY_HIGH,
-                },
-                {
-                    "category": genai.types.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
-                    "threshold": genai.types.HarmBlockThreshold.BLOCK_ONLY_HIGH,
-                },
-                {
-                    "category": genai.types.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
-                    "threshold": genai.types.HarmBlockThreshold.BLOCK_ONLY_HIGH,
-                },
-            ]
-
-            logger.debug(f"發送 LLM 請求，prompt 長度: {len(full_prompt)} 字元，記憶數: {len(memories) if memories else 0}")
-
-            # 呼叫模型
-            response = cls._model.generate_content(
-                full_prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.7,
-                    max_output_tokens=500,
-                ),
-                safety_settings=safety_settings,
+            contents = cls.build_contents(
+                user_input,
+                memories=memories,
+                conversation_history=conversation_history,
+                profile=profile,
+                summary=summary,
+            )
+            logger.debug(f"發送 LLM 請求: turns={len(contents)}, 記憶數: {len(memories) if memories else 0}")
+
+            # 使用寬鬆的安全級別以支援金融/投資內容（只阻擋最嚴重的內容）
+            request = dict(
+                model=model_name or settings.mem0_llm_model,
+                system_instruction=SYSTEM_INSTRUCTION,
+                temperature=0.7,
+                max_output_tokens=max_output_tokens or settings.llm_strong_max_output_tokens,
+                safety=SAFETY_RELAXED,
             )
 
-            logger.debug(f"LLM 回應狀態: finish_reason={getattr(response, 'finish_reason', 'unknown')}")
-
-            # 取得 finish_reason
-            finish_reason = getattr(response, 'finish_reason', None)
-            finish_reason_name = finish_reason.name if finish_reason and hasattr(finish_reason, 'name') else str(finish_reason)
-            
-            logger.debug(f"finish_reason 詳情: {finish_reason} (name={finish_reason_name})")
-
-            # 檢查 finish_reason 以判斷是否因為安全原因被阻擋
-            if finish_reason and finish_reason_name == "SAFETY":
-                logger.warning(
-                    f"LLM 回應因安全原因被阻擋 (finish_reason=SAFETY)，使用備用回應"
-                )
-                # 返回備用回應而不是拋出異常
-                return "感謝您的提問。為了提供更好的服務，請用不同的方式表達您的問題。"
-
-            # 檢查是否有 prompt_feedback 中的阻擋原因
-            if hasattr(response, 'prompt_feedback') and response.prompt_feedback.block_reason:
-                logger.warning(
-                    f"LLM 回應被安全過濾器阻擋。"
-                    f"Block reason: {response.prompt_feedback.block_reason}，使用備用回應"
+            def generate() -> GenerationResult:
+                if settings.llm_hedging_enabled:
+                    # 對沖模式以串流判斷首個片段延遲；串流不回報阻擋原因，被阻擋時為空回應
+                    text = llm_hedger.generate(lambda: cls._provider.stream(contents, **request))
+                    if on_chunk is not None and text:
+                        on_chunk(text)
+                    return GenerationResult(text=text)
+                if on_chunk is None:
+                    return cls._provider.generate(contents, **request)
+
+                chunks: List[str] = []
+                try:
+                    for chunk in cls._provider.stream(contents, **request):
+                        chunks.append(chunk)
+                        on_chunk(chunk)
+                except Exception as e:
+                    if chunks:
+                        # LLMError 不屬於可重試的錯誤
+                        raise LLMError(f"串流中斷: {str(e)}")
+                    raise
+                return GenerationResult(text="".join(chunks))
+
+            # 暫時性錯誤依重試預算重試
+            result = call_with_retry(generate, name="generate")
+
+            if user_id:
+                usage = result.usage or TokenUsage(
+                    prompt_tokens=cls.estimate_prompt_tokens(contents),
+                    completion_tokens=estimate_tokens(result.text),
+                    estimated=True,
                 )
-                # 返回備用回應而不是拋出異常
-                return "感謝您的提問。我們無法處理此請求，請稍後重試或使用不同的方式表達。"
-
-            # 安全地取得回應文本，避免觸發快速訪問器異常
-            try:
-                text = None
-                if response and response.candidates and len(response.candidates) > 0:
-                    candidate = response.candidates[0]
-                    # 檢查是否有內容和部分
-                    if candidate.content and hasattr(candidate.content, 'parts'):
-                        parts = candidate.content.parts
-                        if parts:  # 檢查 parts 是否不為空
-                            text = "".join(part.text for part in parts if hasattr(part, 'text'))
-                
-                # 如果成功取得文本
-                if text:
-                    # 計算實際注入的記憶數
-                    actual_memories_used = len([m for m in (memories or []) if m and m.get("content", "").strip()]) if memories else 0
-                    
-                    logger.info(
-                        f"[LLM] 回應成功 (tokens: {len(text.split())}, "
-                        f"finish_reason: {finish_reason_name}, "
-                        f"memories_injected: {actual_memories_used}, "
-                        f"memories_searched: {len(memories) if memories else 0})"
-                    )
-                    return text
-                
-                # 如果沒有找到有效的回應部分，記錄詳細信息用於調試
-                has_candidates = response and response.candidates and len(response.candidates) > 0
-                has_content = has_candidates and response.candidates[0].content is not None
-                has_parts = has_content and hasattr(response.candidates[0].content, 'parts')
-                parts_content = response.candidates[0].content.parts if has_parts else None
-                parts_len = len(parts_content) if parts_content else 0
-                
-                # 檢查安全評級和候選者的阻擋原因
-                candidate_finish_reason = None
-                safety_ratings = None
-                if has_candidates:
-                    candidate = response.candidates[0]
-                    candidate_finish_reason = getattr(candidate, 'finish_reason', None)
-                    safety_ratings = getattr(candidate, 'safety_ratings', None)
-                
-                logger.warning(
-                    f"LLM 回應為空: "
-                    f"finish_reason={finish_reason_name}, "
-                    f"candidate_finish_reason={candidate_finish_reason}, "
-                    f"has_candidates={has_candidates}, "
-                    f"has_content={has_content}, "
-                    f"has_parts={has_parts}, "
-                    f"parts_len={parts_len}"
+                UsageService.record(
+                    user_id,
+                    request["model"],
+                    usage,
+                    conversation_id=conversation_id,
+                    local_estimate=sum(uncalibrated_tokens(part) for part in cls._prompt_parts(contents)),
                 )
-                
-                # 記錄安全評級以便診斷
-                if safety_ratings:
-                    logger.warning(f"Safety ratings: {safety_ratings}")
-                
-                # 如果候選者的 finish_reason 是 SAFETY
-                if candidate_finish_reason:
-                    candidate_finish_reason_name = candidate_finish_reason.name if hasattr(candidate_finish_reason, 'name') else str(candidate_finish_reason)
-                    if candidate_finish_reason_name == "SAFETY":
-                        logger.warning("候選者因安全原因被阻擋，使用備用回應")
-                        return "感謝您的提問。為了提供更好的服務，請用不同的方式表達您的問題。"
-                
-                # 回應為空，可能是由於內容審核或其他原因，返回備用回應
+
+            if result.blocked_reason == "SAFETY":
+                logger.warning("LLM 回應因安全原因被阻擋 (finish_reason=SAFETY)，使用備用回應")
+                return SAFETY_FALLBACK_RESPONSE
+            if result.blocked:
+                logger.warning(f"LLM 回應被安全過濾器阻擋。Block reason: {result.blocked_reason}，使用備用回應")
+                return BLOCKED_FALLBACK_RESPONSE
+            if not result.text:
                 logger.warning("LLM 回應為空，返回備用回應")
-                return "感謝您的提問。請稍後重試。"
-            except ValueError as e:
-                # 這通常是由 response.text 快速訪問器拋出的
-                logger.error(
-                    f"LLM 回應無效 (ValueError): {str(e)}"
-                )
-                raise LLMError(f"LLM 回應無效: {str(e)}")
+                return EMPTY_FALLBACK_RESPONSE
+
+            logger.info(
+                f"[LLM] 回應成功 (tokens: {estimate_tokens(result.text)}, "
+                f"finish_reason: {result.finish_reason}, "
+                f"memories_injected: {len(cls._memory_lines(memories))}, "
+                f"memories_searched: {len(memories) if memories else 0})"
+            )
+            return result.text
 
         except Exception as e:
             logger.error(f"LLM 生成失敗: {str(e)}")
@@ -278,7 +303,7 @@ class LLMService:
             LLMError: 如果提取失敗
         """
         try:
-            if cls._model is None:
+            if cls._provider is None:
                 cls.initialize()
 
             extraction_prompt = f"""分析以下文本，提取任何投資相關的偏好、目標或風險偏好。
@@ -289,77 +314,117 @@ class LLMService:
 
 提取的偏好:"""
 
-            # 配置安全設定 - 暫時使用最寬鬆的設定進行測試
-            safety_settings = [
-                {
-                    "category": genai.types.HarmCategory.HARM_CATEGORY_HARASSMENT,
-                    "threshold": genai.types.HarmBlockThreshold.BLOCK_NONE,
-                },
-                {
-                    "category": genai.types.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
-                    "threshold": genai.types.HarmBlockThreshold.BLOCK_NONE,
-                },
-                {
-                    "category": genai.types.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
-                    "threshold": genai.types.HarmBlockThreshold.BLOCK_NONE,
-                },
-                {
-                    "category": genai.types.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
-                    "threshold": genai.types.HarmBlockThreshold.BLOCK_NONE,
-                },
-            ]
-
-            response = cls._model.generate_content(
-                extraction_prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.3,
-                    max_output_tokens=200,
-                ),
-                safety_settings=safety_settings,
+            # 使用最寬鬆的安全設定
+            result = cls._provider.generate(
+                LLMProvider.single_turn(extraction_prompt),
+                model=settings.mem0_llm_model,
+                temperature=0.3,
+                max_output_tokens=200,
+                safety=SAFETY_OFF,
             )
-
-            # 檢查 finish_reason 以判斷是否因為安全原因被阻擋
-            finish_reason = getattr(response, 'finish_reason', None)
-            if finish_reason and finish_reason.name == "SAFETY":
-                logger.warning(
-                    f"偏好提取因安全原因被阻擋 (finish_reason=SAFETY)"
-                )
+            if result.blocked:
+                logger.warning(f"偏好提取被安全過濾器阻擋: block_reason={result.blocked_reason}")
                 return None
 
-            # 檢查是否有 prompt_feedback 中的阻擋原因
-            if hasattr(response, 'prompt_feedback') and response.prompt_feedback.block_reason:
-                logger.warning(
-                    f"偏好提取被安全過濾器阻擋: block_reason={response.prompt_feedback.block_reason}"
-                )
-                return None
-
-            # 安全地取得回應文本
-            try:
-                if response and response.candidates and len(response.candidates) > 0:
-                    candidate = response.candidates[0]
-                    # 檢查是否有內容
-                    if candidate.content and hasattr(candidate.content, 'parts'):
-                        parts = candidate.content.parts
-                        if parts and len(parts) > 0:
-                            text = "".join(part.text for part in parts if hasattr(part, 'text'))
-                            if text:
-                                result = text.strip()
-                                if result == "NONE":
-                                    logger.debug("用戶消息中未找到投資偏好")
-                                    return None
-                                logger.info(f"成功提取投資偏好: {result[:100]}")
-                                return result
-                
-                # 如果沒有找到有效的回應部分
-                logger.debug(
-                    f"偏好提取未返回有效回應，finish_reason: {finish_reason}"
-                )
+            extracted = result.text.strip()
+            if not extracted:
+                logger.debug(f"偏好提取未返回有效回應，finish_reason: {result.finish_reason}")
                 return None
-            except ValueError as e:
-                # 這通常是由快速訪問器拋出的
-                logger.debug(f"偏好提取回應無效: {str(e)}")
+            if extracted == "NONE":
+                logger.debug("用戶消息中未找到投資偏好")
                 return None
+            logger.info(f"成功提取投資偏好: {extracted[:100]}")
+            return extracted
 
         except Exception as e:
             logger.error(f"偏好提取失敗: {str(e)}")
             return None
+
+    @classmethod
+    def merge_memories(cls, contents: List[str]) -> Optional[str]:
+        """
+        將多條重複的記憶合併為一條
+
+        Args:
+            contents: 記憶內容列表
+
+        Returns:
+            Optional[str]: 合併後的記憶，失敗或回應無效時返回 None
+        """
+        try:
+            if cls._provider is None:
+                cls.initialize()
+
+            listing = "\n".join(f"- {content}" for content in contents)
+            merge_prompt = f"""以下是同一位使用者的數條內容重複的記憶。
+請合併為一條簡潔的記憶，保留所有不重複的事實（例如金額、代號、日期），
+若內容有衝突以較具體的描述為準。只返回合併後的記憶，不要加入任何其他解釋。
+
+記憶:
+{listing}
+
+合併後的記憶:"""
+
+            result = cls._provider.generate(
+                LLMProvider.single_turn(merge_prompt),
+                model=settings.mem0_llm_model,
+                temperature=0.0,
+                max_output_tokens=200,
+            )
+            merged = result.text.strip()
+            return merged or None
+
+        except Exception as e:
+            logger.warning(f"記憶合併失敗: {str(e)[:100]}")
+            return None
+
+    @classmethod
+    def summarize_conversation(
+        cls,
+        previous_summary: Optional[str],
+        messages: List[dict],
+        max_chars: int = 800,
+    ) -> Optional[str]:
+        """
+        將移出上下文視窗的訊息併入滾動摘要
+
+        Args:
+            previous_summary: 目前的摘要（選用）
+            messages: 要併入的訊息（依時間順序，含 role 與 content）
+            max_chars: 摘要長度上限（字元）
+
+        Returns:
+            Optional[str]: 新摘要，失敗或回應無效時返回 None
+        """
+        try:
+            if cls._provider is None:
+                cls.initialize()
+
+            transcript = "\n".join(
+                f"{'使用者' if msg.get('role') == 'user' else '助理'}: {msg.get('content', '')}"
+                for msg in messages
+            )
+            summary_prompt = f"""請更新以下投資諮詢對話的摘要。
+保留使用者提到的目標、金額、標的、決定與尚未解決的問題，省略寒暄與重複內容。
+摘要以繁體中文撰寫，不超過 {max_chars} 字，只返回摘要本身。
+
+目前摘要:
+{previous_summary or "(無)"}
+
+新的對話內容:
+{transcript}
+
+更新後的摘要:"""
+
+            result = cls._provider.generate(
+                LLMProvider.single_turn(summary_prompt),
+                model=settings.mem0_llm_model,
+                temperature=0.2,
+                max_output_tokens=max(64, max_chars),
+            )
+            summary = result.text.strip()
+            return summary[:max_chars] or None
+
+        except Exception as e:
+            logger.warning(f"對話摘要失敗: {str(e)[:100]}")
+            return None
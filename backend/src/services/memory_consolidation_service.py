@@ -0,0 +1,287 @@
+"""
+記憶合併服務
+
+離線作業：找出同一使用者中語義幾乎相同的記憶並合併為一條，回收重複的向量與目錄記錄。
+每位使用者的記憶向量一次以矩陣乘法算出兩兩餘弦相似度，群內任兩條記憶的相似度
+皆須達門檻（完全連結），避免 A≈B、B≈C 串接而合併彼此無關的 A 與 C；
+每群保留一條代表記憶（可選擇以 LLM 改寫為合併後內容），其餘刪除。
+完成的使用者寫入檢查點，以相同 job_id 重新執行時會跳過。
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from ..config import settings
+from ..utils.logger import get_logger
+from ..utils.exceptions import DatabaseError
+from ..storage.database import DatabaseManager
+from ..storage.memory_store import MemoryMetadataStore, MemoryUsage
+from .llm_service import LLMService
+from .memory_service import MemoryService
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class ConsolidationReport:
+    """記憶合併作業報告"""
+
+    job_id: str
+    dry_run: bool
+    users_scanned: int = 0
+    users_skipped: int = 0
+    users_failed: int = 0
+    clusters: int = 0
+    rows_reclaimed: int = 0
+    merges: List[Dict] = field(default_factory=list)
+
+
+class MemoryConsolidationService:
+    """記憶合併服務"""
+
+    @staticmethod
+    def find_clusters(vectors: Sequence[Sequence[float]], threshold: float) -> List[List[int]]:
+        """
+        將相似度達門檻的向量分群
+
+        相似度矩陣一次算出後依索引貪婪分群：尚未分群的記憶只有與群內所有成員的相似度
+        皆達門檻時才加入（完全連結），因此不會經由中間成員串接不相似的記憶。
+        只返回包含兩個以上成員的群。
+
+        Args:
+            vectors: 向量（n × d）
+            threshold: 視為重複的餘弦相似度
+
+        Returns:
+            List[List[int]]: 各群成員的索引（群內與群間皆依索引排序）
+        """
+        if len(vectors) < 2:
+            return []
+
+        docs = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(docs, axis=1, keepdims=True)
+        docs = docs / np.where(norms == 0, 1.0, norms)
+        similar = (docs @ docs.T) >= threshold
+
+        assigned = np.zeros(len(docs), dtype=bool)
+        clusters: List[List[int]] = []
+        for seed in range(len(docs)):
+            if assigned[seed]:
+                continue
+            assigned[seed] = True
+            members = [seed]
+            # 與種子相似且尚未分群的候選，逐一確認與目前所有成員皆相似
+            for candidate in np.nonzero(similar[seed] & ~assigned)[0].tolist():
+                if similar[candidate, members].all():
+                    members.append(candidate)
+                    assigned[candidate] = True
+            if len(members) > 1:
+                clusters.append(members)
+        return clusters
+
+    @staticmethod
+    def choose_canonical(usages: Sequence[MemoryUsage]) -> int:
+        """
+        選出一群記憶中的代表記憶
+
+        依命中次數、最後存取時間、建立時間依序比較，取最常用且最新的記憶。
+
+        Args:
+            usages: 群內記憶的使用紀錄
+
+        Returns:
+            int: 代表記憶的索引
+        """
+        return max(
+            range(len(usages)),
+            key=lambda i: (
+                usages[i].hit_count or 0,
+                usages[i].last_accessed_at or "",
+                usages[i].created_at or "",
+            ),
+        )
+
+    @staticmethod
+    def completed_users(job_id: str) -> Set[str]:
+        """
+        取得作業已完成的使用者
+
+        Args:
+            job_id: 作業 ID
+
+        Returns:
+            Set[str]: 已寫入檢查點的使用者 ID
+
+        Raises:
+            DatabaseError: 如果查詢失敗
+        """
+        try:
+            conn = DatabaseManager.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT user_id FROM consolidation_checkpoints WHERE job_id = ?",
+                (job_id,),
+            )
+            return {row[0] for row in cursor.fetchall()}
+
+        except Exception as e:
+            logger.error(f"查詢合併檢查點失敗: {str(e)}")
+            raise DatabaseError(f"無法查詢合併檢查點: {str(e)}")
+
+    @staticmethod
+    def save_checkpoint(job_id: str, user_id: str, clusters: int, reclaimed: int) -> None:
+        """
+        記錄使用者已完成合併
+
+        Args:
+            job_id: 作業 ID
+            user_id: 使用者 ID
+            clusters: 合併的群數
+            reclaimed: 刪除的記憶數
+
+        Raises:
+            DatabaseError: 如果寫入失敗
+        """
+
+        def insert(cursor) -> None:
+            cursor.execute(
+                """
+                INSERT OR REPLACE INTO consolidation_checkpoints
+                    (job_id, user_id, clusters, reclaimed, completed_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (job_id, user_id, clusters, reclaimed, datetime.now().isoformat()),
+            )
+
+        try:
+            DatabaseManager.execute_write(insert)
+
+        except Exception as e:
+            logger.error(f"寫入合併檢查點失敗: {str(e)}")
+            raise DatabaseError(f"無法寫入合併檢查點: {str(e)}")
+
+    @classmethod
+    def plan_user(cls, user_id: str, threshold: float) -> List[Dict]:
+        """
+        找出使用者記憶中的重複群
+
+        Args:
+            user_id: 使用者 ID
+            threshold: 視為重複的餘弦相似度
+
+        Returns:
+            List[Dict]: 每群的 canonical_id、duplicate_ids 與 contents（代表記憶在前）
+        """
+        usages = {usage.memory_id: usage for usage in MemoryMetadataStore.get_usage(user_id)}
+        if len(usages) < 2:
+            return []
+
+        records = MemoryMetadataStore.list_by_user(user_id, limit=len(usages))
+        contents = {record["memory_id"]: record["content"] for record in records}
+        vectors = MemoryService.get_vectors(list(usages))
+        # 只比較目錄與向量儲存中都存在的記憶
+        memory_ids = [memory_id for memory_id in usages if memory_id in vectors and memory_id in contents]
+
+        plans = []
+        for members in cls.find_clusters([vectors[memory_id] for memory_id in memory_ids], threshold):
+            group = [memory_ids[i] for i in members]
+            canonical = group[cls.choose_canonical([usages[memory_id] for memory_id in group])]
+            duplicates = [memory_id for memory_id in group if memory_id != canonical]
+            plans.append(
+                {
+                    "user_id": user_id,
+                    "canonical_id": canonical,
+                    "duplicate_ids": duplicates,
+                    "contents": [contents[canonical]] + [contents[memory_id] for memory_id in duplicates],
+                }
+            )
+        return plans
+
+    @staticmethod
+    def apply_plan(plan: Dict, llm_merge: bool = False) -> int:
+        """
+        合併一群記憶：保留代表記憶（可選擇以 LLM 改寫內容）並刪除其餘記憶
+
+        Args:
+            plan: plan_user 返回的群
+            llm_merge: 是否以 LLM 將群內內容合併後寫回代表記憶
+
+        Returns:
+            int: 刪除的記憶數
+        """
+        if llm_merge:
+            merged = LLMService.merge_memories(plan["contents"])
+            if merged and merged != plan["contents"][0]:
+                MemoryService.update_memory(plan["canonical_id"], merged)
+                plan["merged_content"] = merged
+
+        return sum(
+            1
+            for memory_id in plan["duplicate_ids"]
+            if MemoryService.delete_memory(plan["user_id"], memory_id)
+        )
+
+    @classmethod
+    def run(
+        cls,
+        job_id: Optional[str] = None,
+        user_ids: Optional[List[str]] = None,
+        threshold: Optional[float] = None,
+        dry_run: bool = False,
+        llm_merge: bool = False,
+    ) -> ConsolidationReport:
+        """
+        執行記憶合併作業
+
+        Args:
+            job_id: 作業 ID（相同 ID 重新執行時跳過已完成的使用者；預設以時間產生）
+            user_ids: 僅處理指定使用者（預設為所有擁有記憶的使用者）
+            threshold: 視為重複的餘弦相似度（預設使用設定值）
+            dry_run: 只產生報告，不修改記憶也不寫入檢查點
+            llm_merge: 是否以 LLM 合併群內內容
+
+        Returns:
+            ConsolidationReport: 作業報告
+        """
+        job_id = job_id or datetime.now().strftime("consolidate-%Y%m%d%H%M%S")
+        threshold = threshold if threshold is not None else settings.memory_consolidation_threshold
+        report = ConsolidationReport(job_id=job_id, dry_run=dry_run)
+
+        done = set() if dry_run else cls.completed_users(job_id)
+        for user_id in user_ids if user_ids is not None else MemoryMetadataStore.list_user_ids():
+            if user_id in done:
+                report.users_skipped += 1
+                continue
+
+            report.users_scanned += 1
+            try:
+                plans = cls.plan_user(user_id, threshold)
+                reclaimed = 0
+                for plan in plans:
+                    reclaimed += len(plan["duplicate_ids"]) if dry_run else cls.apply_plan(plan, llm_merge)
+                if not dry_run:
+                    cls.save_checkpoint(job_id, user_id, len(plans), reclaimed)
+            except Exception as e:
+                # 未寫入檢查點，下次以相同 job_id 執行時重試
+                report.users_failed += 1
+                logger.error(f"合併使用者記憶失敗: user_id={user_id[:8]}..., error={str(e)[:200]}")
+                continue
+
+            report.clusters += len(plans)
+            report.rows_reclaimed += reclaimed
+            report.merges.extend(plans)
+            if plans:
+                logger.info(
+                    f"記憶已合併: user_id={user_id[:8]}..., clusters={len(plans)}, "
+                    f"reclaimed={reclaimed}, dry_run={dry_run}"
+                )
+
+        logger.info(
+            f"記憶合併作業完成: job_id={job_id}, users={report.users_scanned}, "
+            f"skipped={report.users_skipped}, failed={report.users_failed}, "
+            f"clusters={report.clusters}, reclaimed={report.rows_reclaimed}"
+        )
+        return report
@@ -0,0 +1,135 @@
+"""
+記憶生命週期服務
+
+依 memory_metadata 中的存取時間與命中次數管理記憶的生命週期：
+- 使用者記憶數超過 memory_max_per_user 時，依淘汰策略選出要刪除的記憶
+- 最後存取時間超過 memory_ttl_days 的記憶視為過期，由背景工作分批清除
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from ..config import settings
+from ..utils.logger import get_logger
+from ..storage.memory_store import MemoryMetadataStore, MemoryUsage
+
+logger = get_logger(__name__)
+
+EVICTION_POLICIES = ("lru", "decay", "oldest")
+
+
+class MemoryLifecycleService:
+    """記憶生命週期服務"""
+
+    @staticmethod
+    def decay_score(usage: MemoryUsage, now: datetime, half_life_days: float) -> float:
+        """
+        計算記憶的衰減分數
+
+        分數 = (1 + 命中次數) × 0.5 ^ (距最後存取天數 / 半衰期)，
+        越久未使用、命中越少的記憶分數越低。
+
+        Args:
+            usage: 記憶使用紀錄
+            now: 目前時間
+            half_life_days: 半衰期（天）
+
+        Returns:
+            float: 衰減分數
+        """
+        try:
+            last_accessed = datetime.fromisoformat(usage.last_accessed_at or usage.created_at)
+        except (TypeError, ValueError):
+            return 0.0
+        age_days = max((now - last_accessed).total_seconds(), 0.0) / 86400
+        return (1 + (usage.hit_count or 0)) * 0.5 ** (age_days / half_life_days)
+
+    @classmethod
+    def select_evictions(
+        cls,
+        user_id: str,
+        max_memories: Optional[int] = None,
+        policy: Optional[str] = None,
+    ) -> List[str]:
+        """
+        選出超過上限時要淘汰的記憶
+
+        Args:
+            user_id: 使用者 ID
+            max_memories: 記憶上限（預設使用設定值）
+            policy: 淘汰策略 lru / decay / oldest（預設使用設定值）
+
+        Returns:
+            List[str]: 要淘汰的記憶 ID，未超過上限時為空列表
+
+        Raises:
+            ValueError: 如果淘汰策略不支援
+            DatabaseError: 如果查詢失敗
+        """
+        max_memories = settings.memory_max_per_user if max_memories is None else max_memories
+        policy = policy or settings.memory_eviction_policy
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"不支援的淘汰策略: {policy}")
+
+        excess = MemoryMetadataStore.count_by_user(user_id) - max_memories
+        if excess <= 0:
+            return []
+
+        if policy == "lru":
+            return MemoryMetadataStore.get_oldest_ids(user_id, "last_accessed_at", excess)
+        if policy == "oldest":
+            return MemoryMetadataStore.get_oldest_ids(user_id, "created_at", excess)
+
+        now = datetime.now()
+        half_life = settings.memory_decay_half_life_days
+        usages = MemoryMetadataStore.get_usage(user_id)
+        usages.sort(key=lambda u: (cls.decay_score(u, now, half_life), u.memory_id))
+        return [u.memory_id for u in usages[:excess]]
+
+    @staticmethod
+    def select_expired(
+        batch_size: Optional[int] = None,
+        ttl_days: Optional[int] = None,
+        exclude: Sequence[str] = (),
+    ) -> List[Tuple[str, str]]:
+        """
+        選出一批過期的記憶
+
+        Args:
+            batch_size: 批次大小（預設使用設定值）
+            ttl_days: 保留天數（預設使用設定值）
+            exclude: 略過的記憶 ID
+
+        Returns:
+            List[Tuple[str, str]]: (user_id, memory_id) 列表
+
+        Raises:
+            DatabaseError: 如果查詢失敗
+        """
+        batch_size = batch_size or settings.memory_sweep_batch_size
+        ttl_days = settings.memory_ttl_days if ttl_days is None else ttl_days
+        cutoff = (datetime.now() - timedelta(days=ttl_days)).isoformat()
+        return MemoryMetadataStore.get_expired(cutoff, batch_size, exclude)
+
+    @staticmethod
+    async def run_sweeper(sweep: Callable[[], int], interval_seconds: float) -> None:
+        """
+        定期執行過期清除（背景工作）
+
+        清除本身在執行緒池中執行，不阻塞事件迴圈；單次失敗只記錄錯誤。
+
+        Args:
+            sweep: 執行一次完整清除並返回刪除數的函式
+            interval_seconds: 執行間隔（秒）
+        """
+        while True:
+            try:
+                removed = await run_in_threadpool(sweep)
+                if removed:
+                    logger.info(f"記憶過期清除完成: removed={removed}")
+            except Exception as e:
+                logger.error(f"記憶過期清除失敗: {str(e)}")
+            await asyncio.sleep(interval_seconds)
@@ -4,7 +4,10 @@
 此模組提供長期記憶的管理功能。
 """
 
-from typing import List, Optional, Dict
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, List, Optional, Dict, Tuple
 import uuid
 
 try:
@@ -13,9 +16,17 @@ except ImportError:
     Memory = None
 
 from ..config import settings
+from ..providers import get_provider
 from ..utils.logger import get_logger
-from ..utils.exceptions import MemoryError, DatabaseError
+from ..utils.exceptions import MemoryError, DatabaseError, MemoryNotFoundError
+from ..storage.database import DatabaseManager
+from ..storage.memory_fts import MemoryFtsIndex
+from ..storage.memory_store import MemoryMetadataStore, decode_cursor, encode_cursor
 from .embedding_service import EmbeddingService
+from .memory_lifecycle_service import MemoryLifecycleService
+from .profile_service import ProfileService
+from .rerank import mmr_rerank
+from .retrieval import reciprocal_rank_fusion
 
 logger = get_logger(__name__)
 
@@ -24,33 +35,36 @@ class MemoryService:
     """記憶服務"""
 
     _mem0_client = None
+    # 初始化失敗的錯誤：記憶服務不可用（無記憶模式），之後的操作不再重建客戶端
+    _unavailable: Optional[MemoryError] = None
+    # 查詢文字 -> Mem0 搜索時產生的查詢向量（LRU，重新排序沿用而不再嵌入一次）
+    _query_vectors: "OrderedDict[str, List[float]]" = OrderedDict()
+    _query_vectors_lock = threading.Lock()
 
     @classmethod
     def initialize(cls) -> None:
-        """初始化記憶服務"""
+        """
+        初始化記憶服務
+
+        失敗時記錄為不可用：搜索與自動擷取直接返回空結果，其他操作拋出相同錯誤，
+        不再每次呼叫都重新建立客戶端；明確再次呼叫 initialize() 可重試。
+
+        Raises:
+            MemoryError: 如果初始化失敗
+        """
         try:
             if Memory is None:
                 raise MemoryError("Mem0 庫未安裝")
 
-            # 初始化 Mem0 with Google Gemini
+            # Mem0 的 llm / embedder 與模型提供者一致
+            provider = get_provider()
+            provider_config = provider.mem0_config()
+            if provider_config is None:
+                raise MemoryError(f"模型提供者 {provider.name} 不支援 Mem0")
+
             cls._mem0_client = Memory.from_config(
                 {
-                    "llm": {
-                        "provider": "gemini",  # 正確的 provider 名稱
-                        "config": {
-                            "model": settings.mem0_llm_model,
-                            "temperature": 0.7,
-                            "max_tokens": 2000,
-                            "api_key": settings.google_api_key,
-                        },
-                    },
-                    "embedder": {
-                        "provider": "gemini",  # 正確的 provider 名稱
-                        "config": {
-                            "model": f"models/{settings.mem0_embedder_model}",
-                            "api_key": settings.google_api_key,
-                        },
-                    },
+                    **provider_config,
                     "vector_store": {
                         "provider": "chroma",
                         "config": {
@@ -60,11 +74,33 @@ class MemoryService:
                     },
                 }
             )
-            logger.info("Mem0 客戶端已初始化（使用 Google Gemini）")
+            cls._capture_query_vectors(cls._mem0_client)
+            cls._unavailable = None
+            logger.info(f"Mem0 客戶端已初始化（使用 {provider.name}）")
 
         except Exception as e:
             logger.error(f"Mem0 初始化失敗: {str(e)}")
-            raise MemoryError(f"無法初始化記憶服務: {str(e)}")
+            cls._unavailable = MemoryError(f"無法初始化記憶服務: {str(e)}")
+            raise cls._unavailable
+
+    @classmethod
+    def is_available(cls) -> bool:
+        """記憶服務是否可用（尚未初始化時視為可用，於第一次使用時初始化）"""
+        return cls._mem0_client is not None or cls._unavailable is None
+
+    @classmethod
+    def _client(cls):
+        """
+        取得 Mem0 客戶端（尚未初始化時初始化）
+
+        Raises:
+            MemoryError: 如果記憶服務不可用
+        """
+        if cls._mem0_client is None:
+            if cls._unavailable is not None:
+                raise cls._unavailable
+            cls.initialize()
+        return cls._mem0_client
 
     @classmethod
     def add_memory(cls, user_id: str, content: str, metadata: Optional[Dict] = None) -> str:
@@ -83,8 +119,7 @@ class MemoryService:
             MemoryError: 如果新增失敗
         """
         try:
-            if cls._mem0_client is None:
-                cls.initialize()
+            cls._client()
 
             # Mem0 會自動處理嵌入和儲存
             meta = metadata or {}
@@ -98,6 +133,7 @@ class MemoryService:
             )
 
             logger.info(f"記憶已新增: user_id={user_id}")
+            cls._track_added(user_id, result, content, meta)
             return result.get("memory_id", str(uuid.uuid4()))
 
         except Exception as e:
@@ -110,30 +146,228 @@ class MemoryService:
         user_id: str,
         query: str,
         top_k: int = 5,
+        mode: Optional[str] = None,
+        category: Optional[str] = None,
     ) -> List[Dict]:
         """
         搜索記憶（US2 T038）
 
+        mode 為 hybrid 時合併向量搜索與 FTS5 BM25 結果（reciprocal-rank fusion）；
+        FTS5 不可用或資料庫未初始化時退回純向量搜索。啟用重新排序時以 MMR 去除重複
+        並剔除低於相似度門檻的記憶，因此結果可能少於 top_k。記憶服務不可用時返回空列表。
+        提供 category 時於向量搜索與全文檢索中篩選，取回的 top_k 筆皆屬於該類別。
+
         Args:
             user_id: 使用者 ID
             query: 搜索查詢
             top_k: 返回結果數量
+            mode: 檢索模式 vector / hybrid（預設使用 memory_retrieval_mode 設定）
+            category: 類別篩選（選用）
 
         Returns:
             List[Dict]: 記憶字典列表，包含 id, content, metadata
+        """
+        if not cls.is_available():
+            return []
+        mode = mode or settings.memory_retrieval_mode
+        if mode == "hybrid" and MemoryFtsIndex.available and DatabaseManager.is_initialized():
+            memories = cls._hybrid_search(user_id, query, top_k, category)
+        else:
+            memories = cls._vector_search(user_id, query, top_k, category)
+
+        if settings.memory_rerank_enabled:
+            memories = cls._rerank(query, memories, top_k)
+
+        cls._track_access([m["id"] for m in memories])
+        return memories
+
+    @classmethod
+    def get_vectors(cls, memory_ids: List[str]) -> Dict[str, List[float]]:
+        """
+        從 Chroma 讀取記憶向量（本地讀取，不需呼叫嵌入 API）
+
+        Args:
+            memory_ids: 記憶 ID 列表
+
+        Returns:
+            Dict[str, List[float]]: 記憶 ID -> 向量
+        """
+        cls._client()
+
+        collection = cls._mem0_client.vector_store.collection
+        result = collection.get(ids=memory_ids, include=["embeddings"])
+        embeddings = result.get("embeddings")
+        if embeddings is None:
+            return {}
+        return {
+            memory_id: vector
+            for memory_id, vector in zip(result.get("ids", []), embeddings)
+            if vector is not None
+        }
+
+    @classmethod
+    def _capture_query_vectors(cls, client) -> None:
+        """
+        包裝 Mem0 的嵌入模型，記錄搜索時的查詢向量
+
+        Mem0 的 search() 會先嵌入查詢，重新排序直接沿用該向量，
+        每回合不必再呼叫一次嵌入 API，且與記憶向量出自同一個嵌入模型。
+
+        Args:
+            client: Mem0 客戶端
+        """
+        embedding_model = getattr(client, "embedding_model", None)
+        embed = getattr(embedding_model, "embed", None)
+        if embed is None:
+            return
+
+        def embed_and_capture(text, *args, **kwargs):
+            vector = embed(text, *args, **kwargs)
+            memory_action = kwargs.get("memory_action", args[0] if args else None)
+            if memory_action in (None, "search") and isinstance(text, str):
+                with cls._query_vectors_lock:
+                    cls._query_vectors[text] = list(vector)
+                    cls._query_vectors.move_to_end(text)
+                    while len(cls._query_vectors) > settings.embedding_cache_size:
+                        cls._query_vectors.popitem(last=False)
+            return vector
+
+        embedding_model.embed = embed_and_capture
+
+    @classmethod
+    def _query_vector(cls, query: str) -> List[float]:
+        """
+        取得查詢向量（優先使用 Mem0 搜索時產生的向量）
+
+        Args:
+            query: 搜索查詢
+
+        Returns:
+            List[float]: 查詢向量
 
         Raises:
-            MemoryError: 如果搜索失敗
+            LLMError: 如果需要重新嵌入且嵌入失敗
         """
+        with cls._query_vectors_lock:
+            vector = cls._query_vectors.get(query)
+            if vector is not None:
+                cls._query_vectors.move_to_end(query)
+                return vector
+        return EmbeddingService.embed_text(query)
+
+    @classmethod
+    def _rerank(cls, query: str, memories: List[Dict], top_k: int) -> List[Dict]:
+        """
+        以 MMR 重新排序候選記憶並套用最低相似度門檻
+
+        relevance 改為記憶向量與查詢向量的餘弦相似度。全文檢索命中的記憶（lexical_match）
+        以關鍵字精確比對取得，語義相似度可能偏低，因此不受最低相似度門檻限制。
+        無法取得向量時（例如向量儲存不支援讀取）保留原排序並截斷為 top_k。
+
+        Args:
+            query: 搜索查詢
+            memories: 候選記憶
+            top_k: 最多返回數量
+
+        Returns:
+            List[Dict]: 重新排序後的記憶
+        """
+        if not memories:
+            return memories
         try:
-            if cls._mem0_client is None:
-                cls.initialize()
+            vectors = cls.get_vectors([m["id"] for m in memories])
+            candidates = [m for m in memories if m["id"] in vectors]
+            if not candidates:
+                return memories[:top_k]
+
+            query_vector = cls._query_vector(query)
+            ranked = mmr_rerank(
+                query_vector,
+                [vectors[m["id"]] for m in candidates],
+                top_k=top_k,
+                lambda_mult=settings.memory_mmr_lambda,
+                min_similarity=settings.memory_min_similarity,
+                duplicate_threshold=settings.memory_duplicate_similarity,
+                exempt=[bool((m.get("metadata") or {}).get("lexical_match")) for m in candidates],
+            )
+        except Exception as e:
+            logger.warning(f"記憶重新排序失敗，使用原排序: {str(e)[:100]}")
+            return memories[:top_k]
 
-            # 搜索記憶
+        reranked = []
+        for index, similarity in ranked:
+            memory = dict(candidates[index])
+            memory["metadata"] = {**(memory.get("metadata") or {}), "relevance": round(similarity, 4)}
+            reranked.append(memory)
+        logger.info(f"記憶重新排序: candidates={len(memories)}, kept={len(reranked)}")
+        return reranked
+
+    @classmethod
+    def _hybrid_search(
+        cls, user_id: str, query: str, top_k: int, category: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        混合檢索：向量搜索與 BM25 各取候選後以 reciprocal-rank fusion 合併
+
+        Args:
+            user_id: 使用者 ID
+            query: 搜索查詢
+            top_k: 返回結果數量
+            category: 類別篩選（選用）
+
+        Returns:
+            List[Dict]: 融合後的記憶字典列表（metadata 附 rrf_score，全文檢索命中者附 lexical_match）
+        """
+        candidates = top_k * settings.memory_hybrid_candidate_multiplier
+        vector_results = cls._vector_search(user_id, query, candidates, category)
+        try:
+            lexical_results = MemoryFtsIndex.search(
+                DatabaseManager.get_connection(), user_id, query, candidates, category
+            )
+        except Exception as e:
+            logger.warning(f"全文檢索失敗，僅使用向量結果: {str(e)[:100]}")
+            lexical_results = []
+
+        memories = reciprocal_rank_fusion(
+            [vector_results, lexical_results],
+            k=settings.memory_rrf_k,
+        )[:top_k]
+        lexical_ids = {m["id"] for m in lexical_results}
+        for memory in memories:
+            if memory["id"] in lexical_ids:
+                memory["metadata"]["lexical_match"] = True
+        logger.info(
+            f"混合檢索: user_id={user_id}, vector={len(vector_results)}, "
+            f"lexical={len(lexical_results)}, fused={len(memories)}"
+        )
+        return memories
+
+    @classmethod
+    def _vector_search(
+        cls, user_id: str, query: str, top_k: int, category: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        以 Mem0 向量搜索記憶
+
+        Args:
+            user_id: 使用者 ID
+            query: 搜索查詢
+            top_k: 返回結果數量
+            category: 類別篩選（選用，以 Mem0 中繼資料篩選）
+
+        Returns:
+            List[Dict]: 記憶字典列表；搜索失敗時返回空列表
+        """
+        try:
+            cls._client()
+
+            # 搜索記憶（類別於向量儲存中篩選，避免先取 top_k 再過濾而不足）
+            search_kwargs = {"filters": {"category": category}} if category else {}
             results = cls._mem0_client.search(
                 query=query,
                 user_id=user_id,
                 limit=top_k,
+                **search_kwargs,
             )
 
             # 提取並轉換為字典格式
@@ -191,7 +425,7 @@ class MemoryService:
                         "id": result.get("id") or result.get("memory_id") or f"mem_{idx}",
                         "content": str(content).strip() if content else "",
                         "metadata": {
-                            "relevance": result.get("score", result.get("relevance", 1.0 - (idx * 0.15))),
+                            "relevance": result.get("score", result.get("relevance")),
                             "created_at": result.get("created_at", ""),
                             "category": result.get("category", "general"),
                             **(result.get("metadata", {}) if isinstance(result.get("metadata"), dict) else {}),
@@ -203,7 +437,7 @@ class MemoryService:
                         "id": f"mem_{idx}",
                         "content": str(result).strip() if result else "",
                         "metadata": {
-                            "relevance": 1.0 - (idx * 0.15),
+                            "relevance": None,
                             "category": "general",
                         },
                     }
@@ -230,28 +464,95 @@ class MemoryService:
         cls,
         user_id: str,
         limit: int = 5,
-    ) -> List[str]:
+        category: Optional[str] = None,
+        cursor: Optional[str] = None,
+    ) -> List[Dict]:
         """
-        取得最新的記憶
+        依建立時間取得最新的記憶
+
+        直接查詢記憶目錄的 (user_id, created_at DESC) 索引，不需要嵌入或向量搜索。
 
         Args:
             user_id: 使用者 ID
             limit: 返回數量
+            category: 類別篩選（選用）
+            cursor: 分頁游標（上一頁的 next_cursor，選用）
 
         Returns:
-            List[str]: 最新記憶列表
+            List[Dict]: 記憶字典列表（新到舊），結構與 search_memories 相同
         """
         try:
-            # 使用簡單查詢獲取最新記憶
-            return cls.search_memories(user_id, "latest", top_k=limit)
-        except Exception:
+            memories, _ = cls.get_latest_memories_page(user_id, limit, category, cursor)
+            return memories
+        except Exception as e:
+            logger.warning(f"取得最新記憶失敗: {str(e)[:100]}")
             return []
 
+    @staticmethod
+    def get_latest_memories_page(
+        user_id: str,
+        limit: int = 5,
+        category: Optional[str] = None,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        以鍵集分頁（keyset pagination）取得最新的記憶
+
+        Args:
+            user_id: 使用者 ID
+            limit: 每頁數量
+            category: 類別篩選（選用）
+            cursor: 分頁游標（上一頁的 next_cursor，選用）
+
+        Returns:
+            Tuple[List[Dict], Optional[str]]: (記憶字典列表, 下一頁游標；已無資料時為 None)
+
+        Raises:
+            ValueError: 如果游標格式錯誤
+            DatabaseError: 如果查詢失敗
+        """
+        rows = MemoryMetadataStore.list_by_user(
+            user_id,
+            category=category,
+            limit=limit,
+            before=decode_cursor(cursor) if cursor else None,
+        )
+        memories = [
+            {
+                "id": row["memory_id"],
+                "content": row["content"],
+                "metadata": {
+                    "created_at": row["created_at"],
+                    "category": row["category"],
+                },
+            }
+            for row in rows
+        ]
+        next_cursor = encode_cursor(rows[-1]) if len(rows) == limit else None
+        return memories, next_cursor
+
     @classmethod
     def delete_memory(cls, user_id: str, memory_id: str) -> bool:
         """
         刪除記憶
 
+        Args:
+            user_id: 使用者 ID
+            memory_id: 記憶 ID
+
+        Returns:
+            bool: 是否刪除成功
+        """
+        deleted = cls._delete(user_id, memory_id)
+        if deleted:
+            cls._refresh_profile(user_id)
+        return deleted
+
+    @classmethod
+    def _delete(cls, user_id: str, memory_id: str) -> bool:
+        """
+        從向量儲存與記憶目錄刪除單一記憶（不重建投資輪廓）
+
         Args:
             user_id: 使用者 ID
             memory_id: 記憶 ID
@@ -260,18 +561,64 @@ class MemoryService:
             bool: 是否刪除成功
         """
         try:
-            if cls._mem0_client is None:
-                cls.initialize()
+            cls._client()
 
             # Mem0 刪除 API
             cls._mem0_client.delete(memory_id=memory_id, user_id=user_id)
             logger.info(f"記憶已刪除: memory_id={memory_id}")
-            return True
 
         except Exception as e:
             logger.error(f"刪除記憶失敗: {str(e)}")
             return False
 
+        # 向量已刪除：目錄同步失敗只記錄警告，由回填作業修正
+        if DatabaseManager.is_initialized():
+            try:
+                MemoryMetadataStore.apply_changes(user_id, deletes=[memory_id])
+            except Exception as e:
+                logger.warning(f"同步刪除記憶目錄失敗: memory_id={memory_id}, error={str(e)[:100]}")
+        return True
+
+    @classmethod
+    def update_memory(
+        cls,
+        memory_id: str,
+        content: str,
+        category: Optional[str] = None,
+    ) -> Dict:
+        """
+        更新記憶內容（重新計算向量嵌入）並同步記憶目錄
+
+        Args:
+            memory_id: 記憶 ID
+            content: 新內容
+            category: 新類別（None 時保留原類別）
+
+        Returns:
+            Dict: 更新後的記憶資料
+
+        Raises:
+            MemoryNotFoundError: 如果記憶不存在於目錄
+            MemoryError: 如果更新失敗
+        """
+        if MemoryMetadataStore.get(memory_id) is None:
+            raise MemoryNotFoundError(memory_id)
+
+        try:
+            cls._client()
+
+            cls._mem0_client.update(memory_id=memory_id, data=content)
+            MemoryMetadataStore.update(memory_id, content, category)
+            logger.info(f"記憶已更新: memory_id={memory_id}")
+            memory = MemoryMetadataStore.get(memory_id)
+
+        except Exception as e:
+            logger.error(f"更新記憶失敗: {str(e)}")
+            raise MemoryError(f"無法更新記憶: {str(e)}")
+
+        cls._refresh_profile(memory["user_id"])
+        return memory
+
     @classmethod
     def add_memory_from_message(
         cls,
@@ -291,14 +638,15 @@ class MemoryService:
             metadata: 附加中繼資料
 
         Returns:
-            Optional[str]: 記憶 ID，如果擷取失敗則返回 None
+            Optional[str]: 記憶 ID，如果擷取失敗或記憶服務不可用則返回 None
 
         Raises:
             MemoryError: 如果新增失敗
         """
+        if not cls.is_available():
+            return None
         try:
-            if cls._mem0_client is None:
-                cls.initialize()
+            cls._client()
 
             # 如果訊息過短，跳過記憶擷取
             if not message_content or len(message_content.strip()) < 3:
@@ -328,6 +676,7 @@ class MemoryService:
             )
 
             logger.debug(f"[Mem0] add() 返回結果: type={type(result)}, value={result!r}")
+            cls._track_added(user_id, result, message_content, meta)
 
             # 提取 memory_id，處理多種結果格式
             memory_id = None
@@ -364,3 +713,323 @@ class MemoryService:
             logger.debug(f"   詳細錯誤堆棧:\n{traceback.format_exc()}")
             # 不拋出異常，允許聊天繼續進行
             return None
+
+    @staticmethod
+    def _extract_add_events(result: Any, content: str) -> List[Dict]:
+        """
+        將 Mem0 add() 的各種返回格式轉為事件列表
+
+        Args:
+            result: add() 返回值，可能為 {"results": [...]}、列表或 {"memory_id": ...}
+            content: 原始輸入內容（結果未附記憶文字時使用）
+
+        Returns:
+            List[Dict]: 事件列表，每筆包含 id, memory, event
+        """
+        if isinstance(result, dict) and isinstance(result.get("results"), list):
+            items = result["results"]
+        elif isinstance(result, list):
+            items = result
+        elif isinstance(result, dict) and (result.get("memory_id") or result.get("id")):
+            items = [result]
+        else:
+            return []
+
+        events = []
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            memory_id = item.get("id") or item.get("memory_id")
+            if not memory_id:
+                continue
+            events.append(
+                {
+                    "id": str(memory_id),
+                    "memory": item.get("memory") or item.get("data") or content,
+                    "event": str(item.get("event", "ADD")).upper(),
+                }
+            )
+        return events
+
+    @classmethod
+    def _track_added(cls, user_id: str, result: Any, content: str, metadata: Dict) -> None:
+        """
+        依 add() 結果更新記憶中繼資料與投資輪廓，並執行上限淘汰
+
+        記憶目錄僅在資料庫已初始化時維護；失敗只記錄警告，不影響記憶寫入。
+
+        Args:
+            user_id: 使用者 ID
+            result: add() 返回值
+            content: 原始輸入內容
+            metadata: 寫入時附帶的中繼資料
+        """
+        if not DatabaseManager.is_initialized():
+            return
+        try:
+            upserts, deletes = [], []
+            for event in cls._extract_add_events(result, content):
+                if event["event"] in ("ADD", "UPDATE"):
+                    upserts.append((event["id"], event["memory"], metadata.get("category")))
+                elif event["event"] == "DELETE":
+                    deletes.append(event["id"])
+            # 同一次 add() 的所有目錄變更在單一交易中套用
+            MemoryMetadataStore.apply_changes(user_id, upserts=upserts, deletes=deletes)
+        except Exception as e:
+            logger.warning(f"更新記憶中繼資料失敗: user_id={user_id[:8]}..., error={str(e)[:100]}")
+            return
+        if upserts or deletes:
+            cls._refresh_profile(user_id)
+        try:
+            cls.enforce_limits(user_id)
+        except Exception as e:
+            logger.warning(f"執行記憶上限失敗: user_id={user_id[:8]}..., error={str(e)[:100]}")
+
+    @staticmethod
+    def _refresh_profile(user_id: str) -> None:
+        """
+        以記憶目錄中的全部記憶重建投資輪廓
+
+        記憶目錄每次變更（新增、更新、刪除、淘汰、過期）後呼叫；失敗只記錄警告。
+
+        Args:
+            user_id: 使用者 ID
+        """
+        if not DatabaseManager.is_initialized():
+            return
+        try:
+            ProfileService.rebuild(user_id, MemoryMetadataStore.get_contents(user_id))
+        except Exception as e:
+            logger.warning(f"重建投資輪廓失敗: user_id={user_id[:8]}..., error={str(e)[:100]}")
+
+    @staticmethod
+    def _track_access(memory_ids: List[str]) -> None:
+        """
+        記錄檢索命中的記憶（更新最後存取時間與命中次數）
+
+        Args:
+            memory_ids: 命中的記憶 ID 列表
+        """
+        if not memory_ids or not DatabaseManager.is_initialized():
+            return
+        try:
+            MemoryMetadataStore.record_access(memory_ids)
+        except Exception as e:
+            logger.warning(f"記錄記憶存取失敗: {str(e)[:100]}")
+
+    @classmethod
+    def _evict(cls, items: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """
+        從向量儲存與中繼資料中刪除記憶
+
+        向量儲存刪除失敗的記憶保留中繼資料，待下次清除重試；
+        有記憶被刪除的使用者於全部刪除後各重建一次投資輪廓。
+
+        Args:
+            items: (user_id, memory_id) 列表
+
+        Returns:
+            List[Tuple[str, str]]: 實際刪除的 (user_id, memory_id)
+        """
+        removed = [(user_id, memory_id) for user_id, memory_id in items if cls._delete(user_id, memory_id)]
+        for user_id in dict.fromkeys(user_id for user_id, _ in removed):
+            cls._refresh_profile(user_id)
+        return removed
+
+    @classmethod
+    def _drop_orphans(cls, items: List[Tuple[str, str]]) -> List[str]:
+        """
+        刪除向量已不存在於向量儲存的記憶目錄記錄
+
+        向量已被移除的記憶無法經由 Mem0 刪除，若保留目錄記錄會在每次清除時重試。
+        無法確認向量是否存在時（例如向量儲存無法連線）保留記錄。
+
+        Args:
+            items: 刪除失敗的 (user_id, memory_id) 列表
+
+        Returns:
+            List[str]: 已刪除目錄記錄的記憶 ID
+        """
+        try:
+            cls._client()
+
+            collection = cls._mem0_client.vector_store.collection
+            existing = set(collection.get(ids=[memory_id for _, memory_id in items], include=[])["ids"])
+        except Exception as e:
+            logger.warning(f"確認記憶向量失敗，保留目錄記錄: {str(e)[:100]}")
+            return []
+
+        orphans: Dict[str, List[str]] = {}
+        for user_id, memory_id in items:
+            if memory_id not in existing:
+                orphans.setdefault(user_id, []).append(memory_id)
+        for user_id, memory_ids in orphans.items():
+            MemoryMetadataStore.apply_changes(user_id, deletes=memory_ids)
+            cls._refresh_profile(user_id)
+            logger.info(f"已刪除向量不存在的記憶目錄記錄: user_id={user_id[:8]}..., count={len(memory_ids)}")
+        return [memory_id for memory_ids in orphans.values() for memory_id in memory_ids]
+
+    @classmethod
+    def enforce_limits(cls, user_id: str) -> int:
+        """
+        執行使用者記憶上限（memory_max_per_user）
+
+        Args:
+            user_id: 使用者 ID
+
+        Returns:
+            int: 淘汰的記憶數
+        """
+        victims = MemoryLifecycleService.select_evictions(user_id)
+        if not victims:
+            return 0
+        evicted = len(cls._evict([(user_id, memory_id) for memory_id in victims]))
+        logger.info(
+            f"記憶超過上限，已淘汰: user_id={user_id[:8]}..., evicted={evicted}, "
+            f"policy={settings.memory_eviction_policy}"
+        )
+        return evicted
+
+    @classmethod
+    def sweep_expired(cls, batch_size: Optional[int] = None) -> int:
+        """
+        分批清除過期記憶（memory_ttl_days 內未被存取）
+
+        向量已不存在的記憶直接刪除目錄記錄；其餘刪除失敗的記憶於本次清除中略過，
+        繼續處理後續批次，下次清除時再重試。
+
+        Args:
+            batch_size: 每批數量（預設使用設定值）
+
+        Returns:
+            int: 刪除的記憶數
+        """
+        total = 0
+        skipped: List[str] = []
+        while True:
+            batch = MemoryLifecycleService.select_expired(batch_size, exclude=skipped)
+            if not batch:
+                break
+            removed = cls._evict(batch)
+            total += len(removed)
+            failed = [item for item in batch if item not in removed]
+            if not failed:
+                continue
+            dropped = set(cls._drop_orphans(failed))
+            total += len(dropped)
+            # 向量仍存在的記憶（例如向量儲存暫時無法連線）於本次清除略過，避免同一批反覆重試
+            retry = [memory_id for _, memory_id in failed if memory_id not in dropped]
+            if retry:
+                logger.warning(f"部分過期記憶刪除失敗: failed={len(retry)}")
+                skipped.extend(retry)
+        return total
+
+    @classmethod
+    def delete_user_memories(cls, user_id: str, category: Optional[str] = None) -> int:
+        """
+        批次刪除使用者的記憶（可依類別篩選）
+
+        Args:
+            user_id: 使用者 ID
+            category: 類別篩選（選用）
+
+        Returns:
+            int: 刪除的記憶數
+        """
+        memory_ids = MemoryMetadataStore.get_ids(user_id, category)
+        return len(cls._evict([(user_id, memory_id) for memory_id in memory_ids]))
+
+    @staticmethod
+    def _catalog_timestamp(value: Any) -> Optional[str]:
+        """
+        將 Mem0 payload 的時間轉換為目錄使用的本地時間 ISO 字串
+
+        Mem0 以含時區的 ISO 字串記錄時間，目錄則以本地時間（不含時區）比較與排序。
+
+        Args:
+            value: payload 中的時間
+
+        Returns:
+            Optional[str]: 本地時間 ISO 字串；缺少或無法解析時返回 None
+        """
+        if not value:
+            return None
+        try:
+            parsed = datetime.fromisoformat(str(value))
+        except ValueError:
+            return None
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone().replace(tzinfo=None)
+        return parsed.isoformat()
+
+    @classmethod
+    def backfill_catalog(cls, batch_size: int = 500) -> int:
+        """
+        從向量儲存回填記憶目錄
+
+        掃描 Chroma 中的所有記憶並寫入 memory_metadata，已存在的記憶只更新內容；
+        目錄中已不存在於 Chroma 的記錄一併刪除。新增的記錄沿用向量儲存中的原始建立時間
+        （維持最新排序與分頁），最後存取時間為回填當下，TTL 自回填起算。
+        用於初次啟用記憶目錄或修正目錄與向量儲存之間的差異。
+
+        Args:
+            batch_size: 每個交易寫入的記憶數
+
+        Returns:
+            int: 回填的記憶數
+
+        Raises:
+            MemoryError: 如果讀取向量儲存失敗
+        """
+        try:
+            cls._client()
+
+            listed = cls._mem0_client.vector_store.list(filters={}, limit=None)
+        except Exception as e:
+            logger.error(f"讀取向量儲存失敗: {str(e)}")
+            raise MemoryError(f"無法讀取向量儲存: {str(e)}")
+
+        # Chroma 實作返回 [[OutputData, ...]]
+        if listed and isinstance(listed[0], list):
+            listed = listed[0]
+
+        by_user: Dict[str, List[Tuple[str, str, Optional[str], Optional[str]]]] = {}
+        for item in listed or []:
+            payload = getattr(item, "payload", None) or {}
+            user_id = payload.get("user_id")
+            content = payload.get("data") or payload.get("memory")
+            if not user_id or not content:
+                continue
+            by_user.setdefault(user_id, []).append(
+                (
+                    str(item.id),
+                    content,
+                    payload.get("category"),
+                    cls._catalog_timestamp(payload.get("created_at")),
+                )
+            )
+
+        total = 0
+        for user_id, rows in by_user.items():
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                MemoryMetadataStore.apply_changes(user_id, upserts=batch)
+                total += len(batch)
+
+        # 刪除向量已不存在的目錄記錄
+        removed = 0
+        catalog_users = MemoryMetadataStore.list_user_ids()
+        for user_id in catalog_users:
+            present = {row[0] for row in by_user.get(user_id, [])}
+            stale = [m for m in MemoryMetadataStore.get_ids(user_id) if m not in present]
+            for start in range(0, len(stale), batch_size):
+                MemoryMetadataStore.apply_changes(user_id, deletes=stale[start:start + batch_size])
+            removed += len(stale)
+
+        for user_id in catalog_users:
+            cls._refresh_profile(user_id)
+
+        logger.info(
+            f"記憶目錄回填完成: users={len(by_user)}, memories={total}, removed={removed}"
+        )
+        return total
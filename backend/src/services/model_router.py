@@ -0,0 +1,144 @@
+"""
+模型路由
+
+在呼叫 LLM 前於本地依訊息長度、意圖關鍵字、注入的記憶數與投資輪廓分類回合：
+寒暄、致謝等簡單回合交給較快、較便宜的模型並使用較小的輸出上限，
+資產配置、比較分析等複雜回合交給主要模型。每條路由的決策與延遲記錄於記憶體中，
+由 /metrics/routing 提供。
+"""
+
+import statistics
+import threading
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Deque, Dict
+
+from ..config import settings
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+FAST_ROUTE = "fast"
+STRONG_ROUTE = "strong"
+
+# 出現即視為需要推理的意圖
+_COMPLEX_KEYWORDS = (
+    "配置", "組合", "比較", "分析", "規劃", "策略", "再平衡", "分散",
+    "退休", "稅", "報酬率", "風險", "資產", "怎麼分配", "為什麼",
+    "推薦", "買", "適合",
+)
+
+# 每條路由保留的延遲樣本數
+_LATENCY_SAMPLES = 1000
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    """路由決策"""
+
+    route: str
+    model: str
+    max_output_tokens: int
+    reason: str
+
+
+class ModelRouter:
+    """模型路由器"""
+
+    _lock = threading.Lock()
+    _latencies: Dict[str, Deque[float]] = {}
+    _reasons: Dict[str, Counter] = {}
+    _errors: Counter = Counter()
+
+    @staticmethod
+    def classify(message: str, memory_count: int = 0, has_profile: bool = False) -> RouteDecision:
+        """
+        分類回合並選擇模型
+
+        注入記憶或投資輪廓的回合需依使用者個人情況作答，一律交給主要模型。
+
+        Args:
+            message: 使用者訊息
+            memory_count: 注入的記憶數
+            has_profile: 是否注入投資輪廓
+
+        Returns:
+            RouteDecision: 路由決策
+        """
+        text = message.strip().lower()
+        if not settings.llm_routing_enabled:
+            reason = "disabled"
+        elif any(keyword in text for keyword in _COMPLEX_KEYWORDS):
+            reason = "keyword"
+        elif memory_count >= settings.llm_route_memory_threshold:
+            reason = "memories"
+        elif has_profile:
+            reason = "profile"
+        elif len(text) > settings.llm_fast_max_chars:
+            reason = "length"
+        else:
+            return RouteDecision(
+                route=FAST_ROUTE,
+                model=settings.llm_fast_model,
+                max_output_tokens=settings.llm_fast_max_output_tokens,
+                reason="simple",
+            )
+        return RouteDecision(
+            route=STRONG_ROUTE,
+            model=settings.mem0_llm_model,
+            max_output_tokens=settings.llm_strong_max_output_tokens,
+            reason=reason,
+        )
+
+    @classmethod
+    def record(cls, decision: RouteDecision, latency_ms: float, ok: bool = True) -> None:
+        """
+        記錄路由決策與延遲
+
+        Args:
+            decision: 路由決策
+            latency_ms: LLM 呼叫延遲（毫秒）
+            ok: 呼叫是否成功
+        """
+        with cls._lock:
+            cls._latencies.setdefault(decision.route, deque(maxlen=_LATENCY_SAMPLES)).append(latency_ms)
+            cls._reasons.setdefault(decision.route, Counter())[decision.reason] += 1
+            if not ok:
+                cls._errors[decision.route] += 1
+        logger.info(
+            f"[Router] route={decision.route}, model={decision.model}, reason={decision.reason}, "
+            f"latency={latency_ms:.0f}ms, ok={ok}"
+        )
+
+    @classmethod
+    def stats(cls) -> Dict[str, Dict]:
+        """
+        取得每條路由的統計
+
+        Returns:
+            Dict[str, Dict]: 路由 -> 請求數、錯誤數、決策原因與延遲（avg / p50 / p95，毫秒）
+        """
+        with cls._lock:
+            snapshot = {route: sorted(samples) for route, samples in cls._latencies.items()}
+            reasons = {route: dict(counter) for route, counter in cls._reasons.items()}
+            errors = dict(cls._errors)
+
+        result = {}
+        for route, samples in snapshot.items():
+            result[route] = {
+                "requests": sum(reasons.get(route, {}).values()),
+                "errors": errors.get(route, 0),
+                "reasons": reasons.get(route, {}),
+                "avg_ms": round(statistics.fmean(samples), 1),
+                "p50_ms": round(statistics.median(samples), 1),
+                "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 1),
+            }
+        return result
+
+    @classmethod
+    def reset(cls) -> None:
+        """清除統計"""
+        with cls._lock:
+            cls._latencies.clear()
+            cls._reasons.clear()
+            cls._errors.clear()
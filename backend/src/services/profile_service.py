@@ -0,0 +1,389 @@
+"""
+投資輪廓服務
+
+維護每位使用者的結構化投資輪廓（風險承受度、投資期間、偏好產業、投資目標），
+於記憶寫入時以規則式擷取增量更新，並以數行精簡文字固定注入提示。
+核心事實由輪廓提供後，多數回合不需再以向量搜索重新找回，
+語義搜索只保留給輪廓以外的長尾事實。
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from ..config import settings
+from ..utils.logger import get_logger
+from ..utils.exceptions import DatabaseError
+from ..storage.database import DatabaseManager
+
+logger = get_logger(__name__)
+
+# 關鍵字 -> 正規化值；同一欄位依序比對，先出現者優先
+_RISK_KEYWORDS = [
+    (("保守", "低風險", "風險承受度低", "不想虧", "保本"), "低"),
+    (("穩健", "中等風險", "中風險", "風險承受度中"), "中"),
+    (("積極", "高風險", "風險承受度高", "激進"), "高"),
+]
+
+_HORIZON_KEYWORDS = [
+    (("短期", "一年內", "短線"), "短期（1 年內）"),
+    (("中期",), "中期（1-5 年）"),
+    (("長期", "退休", "十年", "存股"), "長期（5 年以上）"),
+]
+
+_SECTOR_KEYWORDS = {
+    "科技": ("科技", "tech"),
+    "半導體": ("半導體", "晶圓", "ic 設計"),
+    "金融": ("金融", "銀行", "金控"),
+    "生技醫療": ("生技", "醫療", "製藥"),
+    "能源": ("能源", "綠能", "電動車"),
+    "高股息": ("高股息", "配息", "股息"),
+    "ETF": ("etf", "指數"),
+    "債券": ("債券", "公債"),
+    "房地產": ("房地產", "reits", "不動產"),
+}
+
+_GOAL_KEYWORDS = {
+    "退休規劃": ("退休",),
+    "購屋": ("買房", "購屋", "頭期款"),
+    "子女教育": ("教育基金", "小孩", "子女"),
+    "被動收入": ("被動收入", "現金流"),
+    "資產增值": ("增值", "財富自由"),
+}
+
+# 「N 年」形式的投資期間
+_YEARS_RE = re.compile(r"(\d{1,2})\s*年")
+
+# 子句分隔：否定只作用於所在子句（「不碰金融，偏好科技」中的科技不受影響）
+_CLAUSE_RE = re.compile(r"[，,。.；;！!？?\n]|但|可是|不過|\bbut\b")
+
+# 出現在關鍵字之前代表否定或排除
+_NEGATION_CUES = (
+    "不", "沒", "別", "無意", "避開", "避免", "遠離", "排除", "討厭", "拒絕",
+    "don't", "do not", "doesn't", "not ", "no ", "never", "dislike", "avoid", "hate",
+)
+
+# 出現這些字眼代表使用者在引用過去提過的具體事實，需進行語義搜索
+_RECALL_CUES = ("記得", "之前", "上次", "我說過", "我提過", "剛才", "以前", "那檔", "那支")
+
+# 股票代號、金額等具體數字
+_SPECIFIC_RE = re.compile(r"\d{3,}")
+
+# 每個列表欄位最多保留的項目數
+_MAX_LIST_ITEMS = 5
+
+
+@dataclass
+class InvestorProfile:
+    """使用者投資輪廓"""
+
+    user_id: str
+    risk_tolerance: Optional[str] = None
+    investment_horizon: Optional[str] = None
+    sectors: List[str] = field(default_factory=list)
+    goals: List[str] = field(default_factory=list)
+    updated_at: Optional[str] = None
+
+    def is_empty(self) -> bool:
+        """是否尚未擷取到任何欄位"""
+        return not (self.risk_tolerance or self.investment_horizon or self.sectors or self.goals)
+
+    def to_prompt(self) -> str:
+        """
+        轉為注入提示的精簡文字
+
+        Returns:
+            str: 每個已知欄位一行
+        """
+        lines = []
+        if self.risk_tolerance:
+            lines.append(f"風險承受度: {self.risk_tolerance}")
+        if self.investment_horizon:
+            lines.append(f"投資期間: {self.investment_horizon}")
+        if self.sectors:
+            lines.append(f"偏好產業: {'、'.join(self.sectors)}")
+        if self.goals:
+            lines.append(f"投資目標: {'、'.join(self.goals)}")
+        return "\n".join(lines)
+
+
+def _clauses(text: str) -> List[str]:
+    """將文字切分為子句"""
+    return [clause for clause in _CLAUSE_RE.split(text) if clause.strip()]
+
+
+def _negated(clause: str, position: int) -> bool:
+    """關鍵字之前的同一子句內是否出現否定詞"""
+    prefix = clause[:position]
+    return any(cue in prefix for cue in _NEGATION_CUES)
+
+
+def _mentions(clauses: List[str], keywords: Iterable[str]) -> Optional[bool]:
+    """
+    判斷關鍵字的提及方式
+
+    Returns:
+        Optional[bool]: 有肯定提及時為 True，僅有否定提及時為 False，未提及時為 None
+    """
+    found = None
+    for clause in clauses:
+        for keyword in keywords:
+            position = clause.find(keyword)
+            if position < 0:
+                continue
+            if not _negated(clause, position):
+                return True
+            found = False
+    return found
+
+
+def _first_match(clauses: List[str], table) -> Optional[str]:
+    """返回第一個在文字中被肯定提及的值"""
+    for keywords, value in table:
+        if _mentions(clauses, keywords):
+            return value
+    return None
+
+
+def _merge_list(existing: List[str], new: Iterable[str], excluded: Iterable[str] = ()) -> List[str]:
+    """合併列表欄位：新項目排在最前並去重，移除被排除的項目，超過上限時捨棄最舊的項目"""
+    excluded = set(excluded)
+    merged = [item for item in dict.fromkeys(list(new) + existing) if item not in excluded]
+    return merged[:_MAX_LIST_ITEMS]
+
+
+def _merge_fields(profile: InvestorProfile, fields: Dict) -> None:
+    """將一則記憶擷取的欄位併入輪廓：純量欄位覆寫，列表欄位合併"""
+    profile.risk_tolerance = fields.get("risk_tolerance", profile.risk_tolerance)
+    profile.investment_horizon = fields.get("investment_horizon", profile.investment_horizon)
+    profile.sectors = _merge_list(
+        profile.sectors, fields.get("sectors", []), fields.get("excluded_sectors", [])
+    )
+    profile.goals = _merge_list(profile.goals, fields.get("goals", []))
+
+
+class ProfileService:
+    """投資輪廓服務"""
+
+    @staticmethod
+    def extract_fields(text: str) -> Dict:
+        """
+        從記憶文字以規則擷取輪廓欄位
+
+        關鍵字之前的同一子句內出現否定詞（不、沒、避開、don't、dislike 等）時不視為偏好；
+        被否定的產業記錄為 excluded_sectors，合併時自輪廓移除。
+
+        Args:
+            text: 記憶內容
+
+        Returns:
+            Dict: 擷取到的欄位（risk_tolerance, investment_horizon, sectors, excluded_sectors, goals）
+        """
+        lowered = text.lower()
+        clauses = _clauses(lowered)
+        fields: Dict = {}
+
+        risk = _first_match(clauses, _RISK_KEYWORDS)
+        if risk:
+            fields["risk_tolerance"] = risk
+
+        horizon = _first_match(clauses, _HORIZON_KEYWORDS)
+        for clause in clauses:
+            years = _YEARS_RE.search(clause)
+            if years and "投資" in clause and not _negated(clause, years.start()):
+                count = int(years.group(1))
+                horizon = "短期（1 年內）" if count <= 1 else "中期（1-5 年）" if count <= 5 else "長期（5 年以上）"
+                break
+        if horizon:
+            fields["investment_horizon"] = horizon
+
+        mentions = {name: _mentions(clauses, keywords) for name, keywords in _SECTOR_KEYWORDS.items()}
+        sectors = [name for name, mentioned in mentions.items() if mentioned]
+        if sectors:
+            fields["sectors"] = sectors
+        excluded = [name for name, mentioned in mentions.items() if mentioned is False]
+        if excluded:
+            fields["excluded_sectors"] = excluded
+
+        goals = [name for name, keywords in _GOAL_KEYWORDS.items() if _mentions(clauses, keywords)]
+        if goals:
+            fields["goals"] = goals
+
+        return fields
+
+    @staticmethod
+    def get_profile(user_id: str) -> Optional[InvestorProfile]:
+        """
+        取得使用者的投資輪廓
+
+        Args:
+            user_id: 使用者 ID
+
+        Returns:
+            Optional[InvestorProfile]: 投資輪廓，尚未建立時返回 None
+
+        Raises:
+            DatabaseError: 如果查詢失敗
+        """
+        try:
+            conn = DatabaseManager.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT risk_tolerance, investment_horizon, sectors, goals, updated_at
+                FROM user_profiles WHERE user_id = ?
+                """,
+                (user_id,),
+            )
+            row = cursor.fetchone()
+            if not row:
+                return None
+            return InvestorProfile(
+                user_id=user_id,
+                risk_tolerance=row[0],
+                investment_horizon=row[1],
+                sectors=json.loads(row[2] or "[]"),
+                goals=json.loads(row[3] or "[]"),
+                updated_at=row[4],
+            )
+
+        except Exception as e:
+            logger.error(f"查詢投資輪廓失敗: {str(e)}")
+            raise DatabaseError(f"無法查詢投資輪廓: {str(e)}")
+
+    @classmethod
+    def update_from_memories(cls, user_id: str, contents: Iterable[str]) -> Optional[InvestorProfile]:
+        """
+        以新寫入的記憶增量更新投資輪廓
+
+        純量欄位以最新記憶覆寫，列表欄位合併；未擷取到任何欄位時不寫入。
+
+        Args:
+            user_id: 使用者 ID
+            contents: 新增或更新的記憶內容
+
+        Returns:
+            Optional[InvestorProfile]: 更新後的輪廓，未變更時返回 None
+
+        Raises:
+            DatabaseError: 如果寫入失敗
+        """
+        extracted = [cls.extract_fields(content) for content in contents]
+        extracted = [fields for fields in extracted if fields]
+        if not extracted:
+            return None
+
+        profile = cls.get_profile(user_id) or InvestorProfile(user_id=user_id)
+        for fields in extracted:
+            _merge_fields(profile, fields)
+        cls._save(profile)
+        return profile
+
+    @classmethod
+    def rebuild(cls, user_id: str, contents: Iterable[str]) -> Optional[InvestorProfile]:
+        """
+        以使用者目前的全部記憶重建投資輪廓
+
+        記憶更新、刪除、淘汰或過期後呼叫，使輪廓不再保留已移除記憶導出的欄位；
+        重建後沒有任何欄位時刪除輪廓。
+
+        Args:
+            user_id: 使用者 ID
+            contents: 使用者的全部記憶內容（舊到新）
+
+        Returns:
+            Optional[InvestorProfile]: 重建後的輪廓，沒有任何欄位時返回 None
+
+        Raises:
+            DatabaseError: 如果寫入失敗
+        """
+        profile = InvestorProfile(user_id=user_id)
+        for content in contents:
+            _merge_fields(profile, cls.extract_fields(content))
+
+        if profile.is_empty():
+            cls.delete_profile(user_id)
+            return None
+        cls._save(profile)
+        return profile
+
+    @staticmethod
+    def _save(profile: InvestorProfile) -> None:
+        """
+        寫入投資輪廓
+
+        Args:
+            profile: 投資輪廓
+
+        Raises:
+            DatabaseError: 如果寫入失敗
+        """
+        user_id = profile.user_id
+        profile.updated_at = datetime.now().isoformat()
+
+        def upsert(cursor) -> None:
+            cursor.execute(
+                """
+                INSERT OR REPLACE INTO user_profiles
+                    (user_id, risk_tolerance, investment_horizon, sectors, goals, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    user_id,
+                    profile.risk_tolerance,
+                    profile.investment_horizon,
+                    json.dumps(profile.sectors, ensure_ascii=False),
+                    json.dumps(profile.goals, ensure_ascii=False),
+                    profile.updated_at,
+                ),
+            )
+
+        try:
+            DatabaseManager.execute_write(upsert)
+        except Exception as e:
+            logger.error(f"更新投資輪廓失敗: {str(e)}")
+            raise DatabaseError(f"無法更新投資輪廓: {str(e)}")
+
+        logger.info(f"投資輪廓已更新: user_id={user_id[:8]}..., {profile.to_prompt()!r}")
+
+    @staticmethod
+    def delete_profile(user_id: str) -> None:
+        """
+        刪除使用者的投資輪廓
+
+        Args:
+            user_id: 使用者 ID
+
+        Raises:
+            DatabaseError: 如果刪除失敗
+        """
+        try:
+            DatabaseManager.execute_write(
+                lambda cursor: cursor.execute("DELETE FROM user_profiles WHERE user_id = ?", (user_id,))
+            )
+        except Exception as e:
+            logger.error(f"刪除投資輪廓失敗: {str(e)}")
+            raise DatabaseError(f"無法刪除投資輪廓: {str(e)}")
+
+    @staticmethod
+    def needs_search(message: str, profile: Optional[InvestorProfile]) -> bool:
+        """
+        判斷本回合是否需要語義搜索記憶
+
+        尚無輪廓、關閉略過搜索，或訊息引用過去提過的事實、包含代號或金額等具體數字時需要搜索；
+        其餘一般提問由輪廓提供核心事實即可。
+
+        Args:
+            message: 使用者訊息
+            profile: 投資輪廓
+
+        Returns:
+            bool: 是否需要語義搜索
+        """
+        if not settings.memory_profile_skip_search or profile is None or profile.is_empty():
+            return True
+        if any(cue in message for cue in _RECALL_CUES):
+            return True
+        return bool(_SPECIFIC_RE.search(message))
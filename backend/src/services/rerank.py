@@ -0,0 +1,82 @@
+"""
+記憶重新排序
+
+以 NumPy 對候選記憶向量做最大邊際相關（MMR）多樣化與最低相似度篩選，
+讓注入提示的記憶更少、更相關且不重複。
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """將向量正規化為單位長度（零向量保持為零）"""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def mmr_rerank(
+    query_vector: Sequence[float],
+    candidate_vectors: Sequence[Sequence[float]],
+    top_k: int,
+    lambda_mult: float = 0.7,
+    min_similarity: float = 0.0,
+    duplicate_threshold: float = 1.0,
+    exempt: Optional[Sequence[bool]] = None,
+) -> List[Tuple[int, float]]:
+    """
+    最大邊際相關（MMR）重新排序
+
+    每一步選出 λ·sim(q, d) − (1−λ)·max sim(d, 已選) 最高的候選；
+    與查詢的餘弦相似度低於 min_similarity 的候選先行剔除，與已選記憶相似度達
+    duplicate_threshold 的候選視為重複而不再選取，因此結果可能少於 top_k。
+    exempt 標記的候選（例如全文檢索命中的記憶）不受 min_similarity 限制。
+    相似度矩陣一次以矩陣乘法算出，選取迴圈只做向量化的 max 更新。
+
+    Args:
+        query_vector: 查詢向量
+        candidate_vectors: 候選向量（n × d）
+        top_k: 最多選出數量
+        lambda_mult: 相關性權重（1.0 為純相關性排序，越小越重視多樣性）
+        min_similarity: 與查詢的最低餘弦相似度
+        duplicate_threshold: 視為重複的記憶間餘弦相似度
+        exempt: 各候選是否免除最低相似度門檻（選用）
+
+    Returns:
+        List[Tuple[int, float]]: 選中候選的 (原始索引, 與查詢的餘弦相似度)，依選取順序
+    """
+    if top_k <= 0 or len(candidate_vectors) == 0:
+        return []
+
+    docs = _normalize(np.asarray(candidate_vectors, dtype=np.float32))
+    query = _normalize(np.asarray(query_vector, dtype=np.float32))
+    relevance = docs @ query
+
+    keep = relevance >= min_similarity
+    if exempt is not None:
+        keep |= np.asarray(exempt, dtype=bool)
+    eligible = np.flatnonzero(keep)
+    if eligible.size == 0:
+        return []
+
+    docs = docs[eligible]
+    relevance = relevance[eligible]
+    pairwise = docs @ docs.T
+
+    selected: List[int] = []
+    # 每個候選與已選集合的最大相似度
+    redundancy = np.full(eligible.size, -np.inf, dtype=np.float32)
+    available = np.ones(eligible.size, dtype=bool)
+
+    while len(selected) < top_k and available.any():
+        penalty = np.where(np.isfinite(redundancy), redundancy, 0.0)
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * penalty
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, pairwise[best])
+        available &= redundancy < duplicate_threshold
+
+    return [(int(eligible[i]), float(relevance[i])) for i in selected]
@@ -0,0 +1,152 @@
+"""
+語義回應快取
+
+以查詢向量為鍵快取非個人化問題（例如「什麼是 ETF？」）的回應：
+向量與既有查詢的餘弦相似度達門檻即視為同一問題，直接返回快取回應而不呼叫 Gemini。
+項目有 TTL，超過容量時淘汰最久未命中的項目。向量存放於預先配置的矩陣，
+查詢時一次矩陣乘法即可算出與所有項目的相似度。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..config import settings
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class CachedResponse:
+    """快取項目"""
+
+    query: str
+    response: str
+    created_at: float
+    hits: int = 0
+
+
+class SemanticResponseCache:
+    """語義回應快取"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, similarity_threshold: float):
+        """
+        初始化快取
+
+        Args:
+            max_entries: 最大項目數
+            ttl_seconds: 項目存活秒數
+            similarity_threshold: 視為同一問題的餘弦相似度
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._matrix: Optional[np.ndarray] = None
+        # 矩陣列索引 -> 項目，依最近使用排序（最舊在前）
+        self._entries: "OrderedDict[int, CachedResponse]" = OrderedDict()
+        self._free: List[int] = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        """正規化為單位向量"""
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, vector: Sequence[float]) -> Optional[CachedResponse]:
+        """
+        以查詢向量尋找快取回應
+
+        Args:
+            vector: 查詢向量
+
+        Returns:
+            Optional[CachedResponse]: 相似度最高且達門檻、未過期的項目
+        """
+        query = self._normalize(vector)
+        with self._lock:
+            if not self._entries or self._matrix is None or self._matrix.shape[1] != query.shape[0]:
+                self.misses += 1
+                return None
+
+            similarities = self._matrix @ query
+            # 未使用的列為零向量，相似度為 0，不會達門檻
+            slot = int(np.argmax(similarities))
+            entry = self._entries.get(slot)
+            if entry is None or similarities[slot] < self.similarity_threshold:
+                self.misses += 1
+                return None
+
+            if time.monotonic() - entry.created_at > self.ttl_seconds:
+                self._evict(slot)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(slot)
+            entry.hits += 1
+            self.hits += 1
+            return entry
+
+    def store(self, vector: Sequence[float], query: str, response: str) -> None:
+        """
+        寫入快取（超過容量時淘汰最久未使用的項目）
+
+        Args:
+            vector: 查詢向量
+            query: 原始查詢
+            response: 回應
+        """
+        normalized = self._normalize(vector)
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != normalized.shape[0]:
+                # 首次寫入（或嵌入維度改變）時配置矩陣
+                self._matrix = np.zeros((self.max_entries, normalized.shape[0]), dtype=np.float32)
+                self._entries.clear()
+                self._free = list(range(self.max_entries - 1, -1, -1))
+
+            if not self._free:
+                self._evict(next(iter(self._entries)))
+            slot = self._free.pop()
+            self._matrix[slot] = normalized
+            self._entries[slot] = CachedResponse(query=query, response=response, created_at=time.monotonic())
+
+    def _evict(self, slot: int) -> None:
+        """移除項目並釋放矩陣列（呼叫端需持有鎖）"""
+        self._entries.pop(slot, None)
+        self._matrix[slot] = 0.0
+        self._free.append(slot)
+
+    def clear(self) -> None:
+        """清空快取"""
+        with self._lock:
+            self._matrix = None
+            self._entries.clear()
+            self._free = []
+
+    def stats(self) -> Dict:
+        """
+        取得快取統計
+
+        Returns:
+            Dict: 項目數、命中與未命中次數
+        """
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# 全域回應快取
+response_cache = SemanticResponseCache(
+    max_entries=settings.response_cache_max_entries,
+    ttl_seconds=settings.response_cache_ttl_seconds,
+    similarity_threshold=settings.response_cache_similarity,
+)
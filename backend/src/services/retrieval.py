@@ -0,0 +1,38 @@
+"""
+檢索結果融合
+
+合併多個檢索器（向量搜索、BM25 全文檢索）的排序結果。
+"""
+
+from typing import Dict, List, Sequence
+
+
+def reciprocal_rank_fusion(rankings: Sequence[List[Dict]], k: int = 60) -> List[Dict]:
+    """
+    以 reciprocal-rank fusion 合併多個排序結果
+
+    每筆記憶的分數為 Σ 1 / (k + rank)，rank 從 1 起算；只依名次計分，
+    因此不同檢索器的分數尺度（餘弦相似度、BM25）不需要校準。
+
+    Args:
+        rankings: 各檢索器的記憶字典列表（已依相關性排序，需含 id）
+        k: 平滑常數，越大越降低前段名次的權重
+
+    Returns:
+        List[Dict]: 依融合分數排序的記憶字典列表；同一記憶保留最先出現的版本，
+        並於 metadata 附上 rrf_score
+    """
+    scores: Dict[str, float] = {}
+    merged: Dict[str, Dict] = {}
+    for ranking in rankings:
+        for rank, memory in enumerate(ranking, start=1):
+            memory_id = memory["id"]
+            scores[memory_id] = scores.get(memory_id, 0.0) + 1.0 / (k + rank)
+            merged.setdefault(memory_id, memory)
+
+    fused = []
+    for memory_id in sorted(scores, key=lambda m: scores[m], reverse=True):
+        memory = dict(merged[memory_id])
+        memory["metadata"] = {**(memory.get("metadata") or {}), "rrf_score": scores[memory_id]}
+        fused.append(memory)
+    return fused
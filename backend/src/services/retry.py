@@ -0,0 +1,229 @@
+"""
+上游呼叫重試
+
+對 Gemini 等上游服務的暫時性錯誤（429、5xx、連線中斷、逾時）以指數退避加完全抖動
+（full jitter）重試。全程序共用一個重試預算：每個請求存入 retry_budget_ratio 個權杖、
+每次重試花費一個，穩態下重試最多增加約該比例的上游負載，不會在上游故障時放大流量。
+重試也不會超過請求期限（deadline_scope 設定），等待時間不足時直接放棄。
+"""
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, Optional, TypeVar
+
+from ..config import settings
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# 視為暫時性錯誤的 HTTP 狀態碼
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+# 目前請求的期限（time.monotonic() 時間點），由 deadline_scope 設定；執行緒池會複製 context
+_request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: float) -> Iterator[float]:
+    """
+    設定目前請求的期限（已有更早的期限時沿用）
+
+    Args:
+        seconds: 距現在的秒數
+
+    Yields:
+        float: 期限（time.monotonic() 時間點）
+    """
+    deadline = time.monotonic() + seconds
+    current = _request_deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _request_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _request_deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """
+    取得目前請求的剩餘秒數
+
+    Returns:
+        Optional[float]: 剩餘秒數（可能為負），未設定期限時返回 None
+    """
+    deadline = _request_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    判斷錯誤是否為可重試的暫時性錯誤
+
+    google.api_core 的例外以 code 屬性攜帶 HTTP 狀態碼；連線錯誤與逾時亦視為暫時性。
+
+    Args:
+        error: 例外
+
+    Returns:
+        bool: 是否可重試
+    """
+    code = getattr(error, "code", None)
+    if isinstance(code, int) and not isinstance(code, bool):
+        return code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """重試策略"""
+
+    max_attempts: int
+    base_delay: float
+    max_delay: float
+
+    @classmethod
+    def from_settings(cls) -> "RetryPolicy":
+        """由設定建立"""
+        return cls(
+            max_attempts=settings.retry_max_attempts,
+            base_delay=settings.retry_base_delay_ms / 1000,
+            max_delay=settings.retry_max_delay_ms / 1000,
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """
+        第 attempt 次失敗後的等待秒數（完全抖動：0 到指數上限之間均勻取樣）
+
+        Args:
+            attempt: 已失敗的次數（從 1 開始）
+
+        Returns:
+            float: 等待秒數
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+class RetryBudget:
+    """全程序共用的重試預算（權杖桶）"""
+
+    def __init__(self, ratio: float, max_tokens: float):
+        """
+        初始化預算
+
+        Args:
+            ratio: 每個請求存入的權杖數（重試可增加的負載比例）
+            max_tokens: 權杖上限（允許的重試突發量）
+        """
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.rejected = 0
+
+    def record_request(self) -> None:
+        """記錄一個新請求並存入權杖"""
+        with self._lock:
+            self.requests += 1
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        """
+        嘗試為一次重試花費權杖
+
+        Returns:
+            bool: 預算是否允許重試
+        """
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                self.retries += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def reset(self) -> None:
+        """重置預算與統計"""
+        with self._lock:
+            self._tokens = self.max_tokens
+            self.requests = 0
+            self.retries = 0
+            self.rejected = 0
+
+    def stats(self) -> Dict:
+        """
+        取得預算統計
+
+        Returns:
+            Dict: 請求數、重試數、因預算不足放棄的重試數與剩餘權杖
+        """
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "rejected": self.rejected,
+                "tokens": round(self._tokens, 2),
+            }
+
+
+# 全域重試預算
+retry_budget = RetryBudget(
+    ratio=settings.retry_budget_ratio,
+    max_tokens=settings.retry_budget_max_tokens,
+)
+
+
+def call_with_retry(
+    func: Callable[[], T],
+    name: str,
+    policy: Optional[RetryPolicy] = None,
+    budget: Optional[RetryBudget] = None,
+) -> T:
+    """
+    呼叫上游並於暫時性錯誤時重試
+
+    不可重試的錯誤、次數用盡、預算不足或等待會超過請求期限時，直接拋出最後一次的錯誤。
+
+    Args:
+        func: 無參數的上游呼叫
+        name: 呼叫名稱（用於日誌）
+        policy: 重試策略（預設由設定建立）
+        budget: 重試預算（預設為全域 retry_budget）
+
+    Returns:
+        T: func 的返回值
+    """
+    policy = policy or RetryPolicy.from_settings()
+    budget = budget or retry_budget
+    budget.record_request()
+
+    attempt = 1
+    while True:
+        try:
+            return func()
+        except Exception as e:
+            if not is_retryable(e) or attempt >= policy.max_attempts:
+                raise
+
+            delay = policy.backoff(attempt)
+            remaining = remaining_time()
+            if remaining is not None and delay >= remaining:
+                logger.warning(f"[Retry] {name} 放棄重試：剩餘時間不足 ({remaining:.2f}s)")
+                raise
+            if not budget.try_spend():
+                logger.warning(f"[Retry] {name} 放棄重試：重試預算不足")
+                raise
+
+            logger.warning(
+                f"[Retry] {name} 第 {attempt} 次失敗，{delay * 1000:.0f}ms 後重試: {str(e)[:100]}"
+            )
+            time.sleep(delay)
+            attempt += 1
@@ -0,0 +1,162 @@
+"""
+對話摘要服務
+
+為每個對話維護滾動摘要：移出上下文視窗（conversation_context_window）的訊息
+每累積 conversation_summary_every_turns 個回合，就在背景執行緒中併入 conversations.summary。
+提示只攜帶摘要與摘要之後的訊息（視窗加上尚未併入的部分），輸入大小不隨對話長度成長。
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from ..config import settings
+from ..models.conversation import Message
+from ..utils.logger import get_logger
+from ..storage.storage_service import StorageService
+from .llm_service import LLMService
+
+logger = get_logger(__name__)
+
+
+class ConversationSummaryService:
+    """對話摘要服務"""
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    # conversation_id -> 進行中的刷新，同一對話同時只刷新一次
+    _pending: Dict[str, Future] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def history_limit() -> int:
+        """
+        提示歷史的訊息數上限
+
+        摘要每 conversation_summary_every_turns 個回合才刷新一次，移出視窗但尚未併入摘要的訊息
+        仍需以原文提供，因此啟用摘要時上限為視窗加上一次刷新可併入的訊息數。
+
+        Returns:
+            int: 訊息數上限
+        """
+        if not settings.conversation_summary_enabled:
+            return settings.conversation_context_window
+        return settings.conversation_context_window + settings.conversation_summary_batch_messages
+
+    @classmethod
+    def load_context(cls, conversation_id: int) -> Tuple[Optional[str], int, List[Message]]:
+        """
+        取得提示使用的摘要與歷史訊息
+
+        歷史為摘要涵蓋位置之後的最近訊息（最多 history_limit 則），
+        不會遺漏介於摘要與上下文視窗之間的訊息；超出提示預算的部分由 LLMService 捨棄最舊的訊息。
+
+        Args:
+            conversation_id: 對話 ID
+
+        Returns:
+            Tuple[Optional[str], int, List[Message]]: (摘要, 摘要已涵蓋的最後訊息 ID, 歷史訊息由舊到新)
+
+        Raises:
+            DatabaseError: 如果查詢失敗
+        """
+        summary, through_id = None, 0
+        if settings.conversation_summary_enabled:
+            summary, through_id = StorageService.get_conversation_summary(conversation_id)
+        messages = StorageService.get_recent_messages(
+            conversation_id, cls.history_limit(), after_id=through_id
+        )
+        return summary, through_id, messages
+
+    @staticmethod
+    def refresh(conversation_id: str) -> bool:
+        """
+        將移出視窗的訊息併入摘要
+
+        移出視窗但尚未摘要的訊息未達 conversation_summary_every_turns 個回合時不執行；
+        單次最多併入 conversation_summary_batch_messages 則，其餘留待下次刷新。
+
+        Args:
+            conversation_id: 對話 ID
+
+        Returns:
+            bool: 是否已更新摘要
+        """
+        summary, through_id = StorageService.get_conversation_summary(conversation_id)
+        window = StorageService.get_recent_messages(conversation_id, settings.conversation_context_window)
+        if not window:
+            return False
+
+        # 只摘要早於視窗中最舊訊息的部分，視窗內的訊息仍以原文提供
+        boundary = window[0].id
+        evicted = [
+            msg
+            for msg in StorageService.get_conversation_messages(
+                conversation_id,
+                limit=settings.conversation_summary_batch_messages,
+                after_id=through_id,
+            )
+            if msg.id < boundary
+        ]
+        if len(evicted) < settings.conversation_summary_every_turns * 2:
+            return False
+
+        new_summary = LLMService.summarize_conversation(
+            summary,
+            [{"role": msg.role, "content": msg.content} for msg in evicted],
+            max_chars=settings.conversation_summary_max_chars,
+        )
+        if not new_summary:
+            return False
+
+        updated = StorageService.update_conversation_summary(
+            conversation_id, new_summary, evicted[-1].id, through_id
+        )
+        if updated:
+            logger.info(
+                f"對話摘要已更新: conversation_id={conversation_id}, "
+                f"folded={len(evicted)}, through_id={evicted[-1].id}"
+            )
+        return updated
+
+    @classmethod
+    def schedule_refresh(cls, conversation_id: str) -> Optional[Future]:
+        """
+        在背景執行緒刷新摘要（不阻塞回應）
+
+        Args:
+            conversation_id: 對話 ID
+
+        Returns:
+            Optional[Future]: 刷新工作；停用摘要或已有進行中的刷新時返回 None
+        """
+        if not settings.conversation_summary_enabled:
+            return None
+
+        with cls._lock:
+            if conversation_id in cls._pending:
+                return None
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="summary")
+            future = cls._executor.submit(cls._run_refresh, conversation_id)
+            cls._pending[conversation_id] = future
+        return future
+
+    @classmethod
+    def _run_refresh(cls, conversation_id: str) -> bool:
+        """執行刷新並記錄失敗（背景工作不拋出例外）"""
+        try:
+            return cls.refresh(conversation_id)
+        except Exception as e:
+            logger.warning(f"刷新對話摘要失敗: conversation_id={conversation_id}, error={str(e)[:100]}")
+            return False
+        finally:
+            with cls._lock:
+                cls._pending.pop(conversation_id, None)
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """等待進行中的刷新完成並關閉執行緒池"""
+        with cls._lock:
+            executor, cls._executor = cls._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
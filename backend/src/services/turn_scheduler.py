@@ -0,0 +1,80 @@
+"""
+對話回合排程器
+
+依鍵（conversation_id）序列化執行：同一對話的回合依到達順序逐一執行，
+不同對話則在執行緒池中並行。每個鍵的佇列深度有上限，超過時直接拒絕。
+"""
+
+import asyncio
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from ..config import settings
+from ..utils.logger import get_logger
+from ..utils.exceptions import RateLimitError
+
+logger = get_logger(__name__)
+
+
+class KeyedScheduler:
+    """依鍵序列化的排程器"""
+
+    def __init__(self, max_depth: int, retry_after_seconds: int = 5):
+        """
+        初始化排程器
+
+        Args:
+            max_depth: 每個鍵允許的最大排隊數（含執行中）
+            retry_after_seconds: 拒絕時建議的重試秒數
+        """
+        self.max_depth = max_depth
+        self.retry_after_seconds = retry_after_seconds
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self._depth: Dict[Hashable, int] = {}
+
+    def depth(self, key: Hashable) -> int:
+        """取得鍵目前的排隊數（含執行中）"""
+        return self._depth.get(key, 0)
+
+    async def run(self, key: Optional[Hashable], func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        排程執行同步函式
+
+        鍵為 None 時不序列化，直接於執行緒池執行。
+
+        Args:
+            key: 序列化鍵（例如 conversation_id）
+            func: 要執行的同步函式
+            *args: 位置參數
+            **kwargs: 關鍵字參數
+
+        Returns:
+            Any: func 的返回值
+
+        Raises:
+            RateLimitError: 如果該鍵的佇列已滿
+        """
+        if key is None:
+            return await run_in_threadpool(func, *args, **kwargs)
+
+        depth = self._depth.get(key, 0)
+        if depth >= self.max_depth:
+            logger.warning(f"佇列已滿，拒絕請求: key={key}, depth={depth}")
+            raise RateLimitError(retry_after_seconds=self.retry_after_seconds)
+
+        self._depth[key] = depth + 1
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        try:
+            # asyncio.Lock 依等待順序喚醒，確保同一鍵的回合依到達順序執行
+            async with lock:
+                return await run_in_threadpool(func, *args, **kwargs)
+        finally:
+            self._depth[key] -= 1
+            if self._depth[key] == 0:
+                del self._depth[key]
+                self._locks.pop(key, None)
+
+
+# 全域對話回合排程器
+conversation_scheduler = KeyedScheduler(max_depth=settings.conversation_queue_max_depth)
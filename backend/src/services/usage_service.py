@@ -0,0 +1,173 @@
+"""
+Token 用量服務
+
+記錄每次生成的提示、回應與快取 token 數（取自供應商回報的 usage metadata，
+未回報時以本地估算），並在生成前檢查使用者的每日配額，
+避免少數重度使用者耗盡共用的供應商額度。
+
+供應商回報實際用量時同時記錄同一提示的本地估算（local_estimate），
+作為校準本地 token 估算器的樣本。
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+from ..config import settings
+from ..providers import TokenUsage
+from ..storage.database import DatabaseManager
+from ..utils.exceptions import DatabaseError, QuotaExceededError
+from ..utils.logger import get_logger
+from ..utils.tokens import fit_scale, set_calibration_scale
+
+logger = get_logger(__name__)
+
+
+class UsageService:
+    """Token 用量服務"""
+
+    # 上次校準後新增的實際用量樣本數
+    _samples_since_calibration = 0
+
+    @classmethod
+    def record(
+        cls,
+        user_id: str,
+        model: str,
+        usage: TokenUsage,
+        conversation_id: Optional[int] = None,
+        local_estimate: int = 0,
+    ) -> None:
+        """
+        記錄一次生成的用量（失敗時只記錄警告，不影響回應）
+
+        Args:
+            user_id: 使用者 ID
+            model: 模型名稱
+            usage: token 用量
+            conversation_id: 對話 ID（選用）
+            local_estimate: 同一提示的未校準本地估算（校準樣本，選用）
+        """
+
+        def insert_usage(cursor) -> None:
+            cursor.execute(
+                """
+                INSERT INTO usage (
+                    user_id, conversation_id, model, prompt_tokens,
+                    completion_tokens, cached_tokens, estimated, local_estimate, created_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    user_id,
+                    conversation_id,
+                    model,
+                    usage.prompt_tokens,
+                    usage.completion_tokens,
+                    usage.cached_tokens,
+                    int(usage.estimated),
+                    local_estimate,
+                    datetime.now().isoformat(),
+                ),
+            )
+
+        try:
+            DatabaseManager.execute_write(insert_usage)
+        except Exception as e:
+            logger.warning(f"記錄 token 用量失敗: user_id={user_id}, {str(e)[:100]}")
+            return
+
+        if usage.estimated or local_estimate <= 0 or settings.token_calibration_every <= 0:
+            return
+        cls._samples_since_calibration += 1
+        if cls._samples_since_calibration >= settings.token_calibration_every:
+            cls.calibrate_estimator()
+
+    @classmethod
+    def calibrate_estimator(cls) -> Optional[float]:
+        """
+        以近期供應商回報的提示 token 數校準本地估算器（失敗時只記錄警告）
+
+        Returns:
+            Optional[float]: 採用的校準係數；樣本不足或失敗時返回 None
+        """
+        cls._samples_since_calibration = 0
+        try:
+            conn = DatabaseManager.get_connection()
+            rows = conn.execute(
+                """
+                SELECT prompt_tokens, local_estimate
+                FROM usage
+                WHERE estimated = 0 AND local_estimate > 0
+                ORDER BY id DESC
+                LIMIT ?
+                """,
+                (settings.token_calibration_samples,),
+            ).fetchall()
+        except Exception as e:
+            logger.warning(f"讀取 token 校準樣本失敗: {str(e)[:100]}")
+            return None
+
+        if len(rows) < settings.token_calibration_min_samples:
+            logger.debug(f"token 校準樣本不足: {len(rows)}/{settings.token_calibration_min_samples}")
+            return None
+
+        scale = set_calibration_scale(fit_scale((row[0], row[1]) for row in rows))
+        logger.info(f"token 估算器已校準: scale={scale:.3f}, samples={len(rows)}")
+        return scale
+
+    @staticmethod
+    def tokens_used_today(user_id: str) -> int:
+        """
+        取得使用者今日（本地時間）已使用的 token 數
+
+        Args:
+            user_id: 使用者 ID
+
+        Returns:
+            int: 提示與回應 token 總數
+
+        Raises:
+            DatabaseError: 如果查詢失敗
+        """
+        start_of_day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        try:
+            conn = DatabaseManager.get_connection()
+            row = conn.execute(
+                """
+                SELECT COALESCE(SUM(prompt_tokens + completion_tokens), 0)
+                FROM usage
+                WHERE user_id = ? AND created_at >= ?
+                """,
+                (user_id, start_of_day.isoformat()),
+            ).fetchone()
+            return int(row[0])
+        except Exception as e:
+            logger.error(f"查詢 token 用量失敗: {str(e)}")
+            raise DatabaseError(f"無法查詢 token 用量: {str(e)}")
+
+    @staticmethod
+    def check_quota(user_id: str, estimated_tokens: int = 0) -> None:
+        """
+        生成前檢查每日配額（user_daily_token_quota 為 0 時不限制）
+
+        Args:
+            user_id: 使用者 ID
+            estimated_tokens: 本次生成預估使用的 token 數
+
+        Raises:
+            QuotaExceededError: 如果今日用量加上預估用量超過配額
+        """
+        quota = settings.user_daily_token_quota
+        if quota <= 0:
+            return
+
+        used = UsageService.tokens_used_today(user_id)
+        if used + estimated_tokens > quota:
+            now = datetime.now()
+            tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+            logger.warning(f"每日 token 配額已用完: user_id={user_id}, used={used}, quota={quota}")
+            raise QuotaExceededError(
+                used_tokens=used,
+                quota_tokens=quota,
+                retry_after_seconds=max(1, int((tomorrow - now).total_seconds())),
+            )
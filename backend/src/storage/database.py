@@ -6,21 +6,43 @@
 """
 
 import sqlite3
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Optional
 
 from ..config import settings
 from ..utils.logger import get_logger
 from ..utils.exceptions import DatabaseError
+from .group_commit import GroupCommitWriter
+from .memory_fts import MemoryFtsIndex
 
 logger = get_logger(__name__)
 
+# 既有資料庫的欄位遷移：(資料表, 欄位, 欄位定義, 新增後執行的回填 SQL)
+# schema.sql 的 CREATE TABLE IF NOT EXISTS 不會替舊資料表補欄位，須在執行 schema 前補上
+_COLUMN_MIGRATIONS = [
+    (
+        "memory_metadata",
+        "last_accessed_at",
+        "TIMESTAMP",
+        "UPDATE memory_metadata SET last_accessed_at = created_at WHERE last_accessed_at IS NULL",
+    ),
+    ("memory_metadata", "hit_count", "INTEGER DEFAULT 0", None),
+    ("conversations", "summary", "TEXT", None),
+    ("conversations", "summary_through_id", "INTEGER DEFAULT 0", None),
+    ("usage", "local_estimate", "INTEGER NOT NULL DEFAULT 0", None),
+    ("idempotency_keys", "response_headers", "TEXT", None),
+]
+
 
 class DatabaseManager:
     """資料庫管理器"""
 
     _connection: Optional[sqlite3.Connection] = None
     _db_path: Optional[Path] = None
+    # 共用連線的寫入鎖：未啟用群組提交時，確保每個寫入單元（執行 + 提交）不互相交錯
+    _write_lock = threading.RLock()
+    _writer: Optional[GroupCommitWriter] = None
 
     @classmethod
     def initialize(cls, db_path: Optional[str] = None) -> None:
@@ -53,6 +75,15 @@ class DatabaseManager:
             # 建立初始 schema
             cls._init_schema()
 
+            # 啟動群組提交寫入器（專屬執行緒與連線）
+            if settings.group_commit_enabled:
+                cls._writer = GroupCommitWriter(
+                    cls._db_path,
+                    interval_ms=settings.group_commit_interval_ms,
+                    max_batch=settings.group_commit_max_batch,
+                )
+                cls._writer.start()
+
             logger.info(f"資料庫已初始化: {cls._db_path}")
 
         except Exception as e:
@@ -65,6 +96,8 @@ class DatabaseManager:
         if cls._connection is None:
             raise DatabaseError("資料庫未初始化")
 
+        cls._migrate_columns()
+
         # 讀取 schema.sql
         schema_file = Path(__file__).parent / "schema.sql"
         if schema_file.exists():
@@ -73,9 +106,31 @@ class DatabaseManager:
                 cls._connection.executescript(sql)
                 cls._connection.commit()
                 logger.info("資料表已建立")
+            # 記憶全文索引（需要 FTS5，不可用時混合檢索退回向量搜索）
+            MemoryFtsIndex.ensure(cls._connection)
         else:
             logger.warning(f"找不到 schema 檔案: {schema_file}")
 
+    @classmethod
+    def _migrate_columns(cls) -> None:
+        """替既有資料表補上新增的欄位"""
+        conn = cls._connection
+        for table, column, definition, backfill in _COLUMN_MIGRATIONS:
+            columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            # 資料表尚未建立時由 schema.sql 建立完整欄位
+            if not columns or column in columns:
+                continue
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            if backfill:
+                conn.execute(backfill)
+            logger.info(f"已新增欄位: {table}.{column}")
+        conn.commit()
+
+    @classmethod
+    def is_initialized(cls) -> bool:
+        """資料庫是否已初始化"""
+        return cls._connection is not None
+
     @classmethod
     def get_connection(cls) -> sqlite3.Connection:
         """
@@ -95,9 +150,44 @@ class DatabaseManager:
 
         return cls._connection
 
+    @classmethod
+    def execute_write(cls, op: Callable[[sqlite3.Cursor], Any]) -> Any:
+        """
+        執行寫入操作
+
+        啟用群組提交時交由寫入執行緒與其他請求的寫入合併提交；
+        否則在共用連線上持寫入鎖執行並立即提交。
+
+        Args:
+            op: 接收 cursor 並執行寫入的函式
+
+        Returns:
+            Any: op 的返回值（交易提交後）
+
+        Raises:
+            Exception: op 拋出的例外，或提交失敗的例外
+        """
+        writer = cls._writer
+        if writer is not None and writer.running:
+            return writer.submit(op).result(timeout=settings.response_timeout_seconds)
+
+        conn = cls.get_connection()
+        with cls._write_lock:
+            cursor = conn.cursor()
+            try:
+                result = op(cursor)
+                conn.commit()
+                return result
+            except Exception:
+                conn.rollback()
+                raise
+
     @classmethod
     def close(cls) -> None:
         """關閉資料庫連線"""
+        if cls._writer is not None:
+            cls._writer.stop()
+            cls._writer = None
         if cls._connection is not None:
             cls._connection.close()
             cls._connection = None
@@ -114,34 +204,23 @@ class DatabaseManager:
         Returns:
             int: 刪除的記錄數
         """
-        try:
-            conn = cls.get_connection()
-            cursor = conn.cursor()
 
-            # 計算刪除前的對話數
+        def mark_expired(cursor: sqlite3.Cursor) -> int:
+            # 標記為過期
             cursor.execute(
                 """
-                SELECT COUNT(*) FROM conversations
+                UPDATE conversations SET status = 'expired'
                 WHERE datetime('now', '-' || ? || ' days') > last_activity
                 AND status = 'active'
                 """,
                 (ttl_days,),
             )
-            count = cursor.fetchone()[0]
+            return cursor.rowcount
 
+        try:
+            count = cls.execute_write(mark_expired)
             if count > 0:
-                # 標記為過期
-                cursor.execute(
-                    """
-                    UPDATE conversations SET status = 'expired'
-                    WHERE datetime('now', '-' || ? || ' days') > last_activity
-                    AND status = 'active'
-                    """,
-                    (ttl_days,),
-                )
-                conn.commit()
                 logger.info(f"已清理 {count} 個過期對話")
-
             return count
 
         except Exception as e:
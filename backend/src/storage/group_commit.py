@@ -0,0 +1,189 @@
+"""
+群組提交寫入器
+
+以專屬寫入執行緒與獨立連線處理所有寫入：將各請求排隊中的寫入合併到同一個交易中提交
+（group commit），每個寫入各自以 SAVEPOINT 隔離，並透過 Future 將結果回傳給呼叫端。
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Tuple
+
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+WriteOp = Callable[[sqlite3.Cursor], Any]
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """群組提交寫入器"""
+
+    def __init__(
+        self,
+        db_path: Path,
+        interval_ms: float = 2.0,
+        max_batch: int = 256,
+    ):
+        """
+        初始化寫入器
+
+        Args:
+            db_path: SQLite 資料庫路徑
+            interval_ms: 收到第一筆寫入後，等待更多寫入加入同一批次的最長時間（毫秒）
+            max_batch: 每個交易的最大寫入數
+        """
+        self.db_path = db_path
+        self.interval = interval_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._start_error: Optional[BaseException] = None
+
+        # 統計資料
+        self.batches_committed = 0
+        self.writes_committed = 0
+
+    @property
+    def running(self) -> bool:
+        """寫入執行緒是否運行中"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """啟動寫入執行緒（阻塞至連線建立完成）"""
+        if self.running:
+            return
+        self._ready.clear()
+        self._start_error = None
+        self._thread = threading.Thread(
+            target=self._run,
+            name="sqlite-group-commit",
+            daemon=True,
+        )
+        self._thread.start()
+        self._ready.wait()
+        if self._start_error is not None:
+            raise self._start_error
+        logger.info(
+            f"群組提交寫入器已啟動: interval={self.interval * 1000:.1f}ms, "
+            f"max_batch={self.max_batch}"
+        )
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        停止寫入執行緒
+
+        已排隊的寫入會在停止前全部提交。
+
+        Args:
+            timeout: 等待執行緒結束的秒數
+        """
+        if not self.running:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info(
+            f"群組提交寫入器已停止: batches={self.batches_committed}, "
+            f"writes={self.writes_committed}"
+        )
+
+    def submit(self, op: WriteOp) -> Future:
+        """
+        提交寫入操作
+
+        Args:
+            op: 接收 cursor 並執行寫入的函式，其返回值即為 Future 的結果
+
+        Returns:
+            Future: 交易提交後完成的 Future
+        """
+        if not self.running:
+            raise RuntimeError("群組提交寫入器未啟動")
+        future: Future = Future()
+        self._queue.put((op, future))
+        return future
+
+    def _run(self) -> None:
+        """寫入執行緒主迴圈"""
+        try:
+            # isolation_level=None：由寫入器自行控制 BEGIN/COMMIT
+            conn = sqlite3.connect(str(self.db_path), timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        except Exception as e:
+            self._start_error = e
+            self._ready.set()
+            return
+        self._ready.set()
+
+        try:
+            stopping = False
+            while not stopping:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+
+                batch = [item]
+                deadline = time.monotonic() + self.interval
+                while len(batch) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        if remaining > 0:
+                            item = self._queue.get(timeout=remaining)
+                        else:
+                            item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+
+                self._commit_batch(conn, batch)
+        finally:
+            conn.close()
+
+    def _commit_batch(self, conn: sqlite3.Connection, batch: List[Tuple[WriteOp, Future]]) -> None:
+        """在單一交易中執行並提交一批寫入"""
+        outcomes: List[Tuple[Future, Any, Optional[BaseException]]] = []
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for op, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                # 每筆寫入以 SAVEPOINT 隔離，單筆失敗不影響同批次的其他寫入
+                cursor.execute("SAVEPOINT write_op")
+                try:
+                    result = op(cursor)
+                    cursor.execute("RELEASE write_op")
+                    outcomes.append((future, result, None))
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO write_op")
+                    cursor.execute("RELEASE write_op")
+                    outcomes.append((future, None, e))
+            cursor.execute("COMMIT")
+        except Exception as e:
+            logger.error(f"群組提交失敗: {str(e)}")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches_committed += 1
+        self.writes_committed += len(outcomes)
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
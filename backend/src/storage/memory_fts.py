@@ -0,0 +1,234 @@
+"""
+記憶全文檢索索引
+
+以 SQLite FTS5 對記憶內容建立 BM25 索引，補足向量搜索對股票代號、基金代碼等
+精確字詞的召回。FTS5 內建分詞器不會切分中日韓文字，因此寫入前先自行分詞：
+英數字串取完整小寫詞，CJK 連續字串取字元 bigram。
+使用者以 owner 欄位中的單一索引詞表示，查詢時與內容詞一併 MATCH，
+只讀取該使用者的 posting，不需掃描所有使用者的命中結果再過濾。
+"""
+
+import hashlib
+import re
+import sqlite3
+from typing import Dict, Iterable, List, Optional
+
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 英數字串，或連續的 CJK / 假名 / 韓文字元
+_TOKEN_RE = re.compile(
+    r"[0-9a-z]+|[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+"
+)
+
+# memory_fts_map 記錄每筆記憶對應的 FTS rowid，讓更新與刪除以主鍵定位而非掃描 FTS 資料表
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS memory_fts USING fts5(
+    tokens,
+    owner,
+    tokenize = 'unicode61 remove_diacritics 0'
+);
+
+CREATE TABLE IF NOT EXISTS memory_fts_map (
+    memory_id TEXT PRIMARY KEY,
+    fts_rowid INTEGER NOT NULL
+);
+"""
+
+
+class MemoryFtsIndex:
+    """記憶全文檢索索引"""
+
+    # FTS5 是否可用（由 ensure() 偵測）
+    available = False
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """
+        將文字切分為索引詞
+
+        Args:
+            text: 原始文字
+
+        Returns:
+            List[str]: 詞列表（英數為完整詞，CJK 為字元 bigram，單字則保留單字）
+        """
+        tokens = []
+        for match in _TOKEN_RE.finditer(text.lower()):
+            run = match.group()
+            if run.isascii() or len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        return tokens
+
+    @staticmethod
+    def owner_token(user_id: str) -> str:
+        """
+        使用者的索引詞（雜湊為單一英數詞，避免分詞器切分 ID 中的符號）
+
+        Args:
+            user_id: 使用者 ID
+
+        Returns:
+            str: owner 欄位的索引詞
+        """
+        return "u" + hashlib.sha1(user_id.encode("utf-8")).hexdigest()[:20]
+
+    @classmethod
+    def ensure(cls, conn: sqlite3.Connection) -> bool:
+        """
+        建立 FTS5 資料表；新建時從 memory_metadata 重建索引
+
+        舊版以未索引的 user_id 欄位過濾使用者，偵測到時捨棄並以 owner 欄位重建。
+
+        Args:
+            conn: 資料庫連線
+
+        Returns:
+            bool: FTS5 是否可用
+        """
+        try:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(memory_fts)")}
+            if columns and "owner" not in columns:
+                conn.executescript("DROP TABLE memory_fts; DROP TABLE IF EXISTS memory_fts_map;")
+            existed = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'memory_fts_map'"
+            ).fetchone()
+            conn.executescript(FTS_SCHEMA)
+            if not existed:
+                cls.rebuild(conn.cursor())
+            conn.commit()
+            cls.available = True
+        except sqlite3.OperationalError as e:
+            logger.warning(f"FTS5 不可用，混合檢索將退回向量搜索: {str(e)}")
+            cls.available = False
+        return cls.available
+
+    @classmethod
+    def upsert(cls, cursor: sqlite3.Cursor, memory_id: str, user_id: str, content: str) -> None:
+        """
+        在呼叫端的交易中寫入或取代一筆記憶的索引
+
+        Args:
+            cursor: 資料庫 cursor
+            memory_id: 記憶 ID
+            user_id: 使用者 ID
+            content: 記憶內容
+        """
+        if not cls.available:
+            return
+        cls.delete(cursor, [memory_id])
+        cls._insert(cursor, memory_id, user_id, content)
+
+    @classmethod
+    def delete(cls, cursor: sqlite3.Cursor, memory_ids: Iterable[str]) -> None:
+        """
+        在呼叫端的交易中刪除記憶的索引
+
+        Args:
+            cursor: 資料庫 cursor
+            memory_ids: 記憶 ID 列表
+        """
+        if not cls.available:
+            return
+        for memory_id in memory_ids:
+            row = cursor.execute(
+                "SELECT fts_rowid FROM memory_fts_map WHERE memory_id = ?", (memory_id,)
+            ).fetchone()
+            if row:
+                cursor.execute("DELETE FROM memory_fts WHERE rowid = ?", (row[0],))
+                cursor.execute("DELETE FROM memory_fts_map WHERE memory_id = ?", (memory_id,))
+
+    @classmethod
+    def _insert(cls, cursor: sqlite3.Cursor, memory_id: str, user_id: str, content: str) -> None:
+        """寫入一筆新索引並記錄 rowid 對應"""
+        cursor.execute(
+            "INSERT INTO memory_fts (tokens, owner) VALUES (?, ?)",
+            (" ".join(cls.tokenize(content)), cls.owner_token(user_id)),
+        )
+        cursor.execute(
+            "INSERT INTO memory_fts_map (memory_id, fts_rowid) VALUES (?, ?)",
+            (memory_id, cursor.lastrowid),
+        )
+
+    @classmethod
+    def rebuild(cls, cursor: sqlite3.Cursor) -> int:
+        """
+        從 memory_metadata 重建整個索引
+
+        Args:
+            cursor: 資料庫 cursor
+
+        Returns:
+            int: 索引的記憶數
+        """
+        cursor.execute("DELETE FROM memory_fts")
+        cursor.execute("DELETE FROM memory_fts_map")
+        rows = cursor.execute(
+            "SELECT memory_id, user_id, content FROM memory_metadata"
+        ).fetchall()
+        for memory_id, user_id, content in rows:
+            cls._insert(cursor, memory_id, user_id, content)
+        if rows:
+            logger.info(f"記憶全文索引已重建: {len(rows)} 條")
+        return len(rows)
+
+    @classmethod
+    def search(
+        cls,
+        conn: sqlite3.Connection,
+        user_id: str,
+        query: str,
+        limit: int,
+        category: Optional[str] = None,
+    ) -> List[Dict]:
+        """
+        以 BM25 搜索使用者的記憶
+
+        使用者的 owner 詞與查詢詞以 AND 一併 MATCH，BM25 只計算內容欄位。
+
+        Args:
+            conn: 資料庫連線
+            user_id: 使用者 ID
+            query: 查詢文字
+            limit: 返回數量上限
+            category: 類別篩選（選用）
+
+        Returns:
+            List[Dict]: 記憶字典列表（依 BM25 排序），結構與 MemoryService.search_memories 相同
+        """
+        tokens = list(dict.fromkeys(cls.tokenize(query)))
+        if not cls.available or not tokens:
+            return []
+
+        terms = " OR ".join(f'"{token}"' for token in tokens)
+        match = f'owner : "{cls.owner_token(user_id)}" AND tokens : ({terms})'
+        sql = """
+            SELECT m.memory_id, m.content, m.category, m.created_at,
+                   bm25(memory_fts, 1.0, 0.0) AS score
+            FROM memory_fts
+            JOIN memory_fts_map f ON f.fts_rowid = memory_fts.rowid
+            JOIN memory_metadata m ON m.memory_id = f.memory_id
+            WHERE memory_fts MATCH ? AND m.user_id = ?
+        """
+        params: List = [match, user_id]
+        if category:
+            sql += " AND m.category = ?"
+            params.append(category)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+        rows = conn.execute(sql, params).fetchall()
+        return [
+            {
+                "id": memory_id,
+                "content": content,
+                "metadata": {
+                    "bm25": -score,
+                    "category": category,
+                    "created_at": created_at,
+                },
+            }
+            for memory_id, content, category, created_at, score in rows
+        ]
@@ -0,0 +1,586 @@
+"""
+記憶中繼資料儲存
+
+實作 memory_metadata 資料表的存取：作為本地記憶目錄，提供列表、計數與單筆查詢，
+並記錄存取時間與命中次數供記憶生命週期（上限淘汰、TTL 過期）使用。
+向量本體仍儲存在 Chroma。
+"""
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ..utils.logger import get_logger
+from ..utils.exceptions import DatabaseError
+from .database import DatabaseManager
+from .memory_fts import MemoryFtsIndex
+
+logger = get_logger(__name__)
+
+# memory_metadata.category 的 CHECK 限制允許的值
+MEMORY_CATEGORIES = ("preference", "fact", "behavior")
+
+_RECORD_COLUMNS = (
+    "memory_id, user_id, content, category, source_message_id, created_at, updated_at, relevance"
+)
+
+
+def _row_to_dict(row: tuple) -> Dict:
+    """將 _RECORD_COLUMNS 查詢結果轉為字典"""
+    return {
+        "memory_id": row[0],
+        "user_id": row[1],
+        "content": row[2],
+        "category": row[3],
+        "source_message_id": row[4],
+        "created_at": row[5],
+        "updated_at": row[6],
+        "relevance": row[7],
+    }
+
+
+def encode_cursor(row: Dict) -> str:
+    """
+    將記憶資料編碼為分頁游標
+
+    Args:
+        row: 含 created_at 與 memory_id 的記憶資料
+
+    Returns:
+        str: URL 安全的不透明游標
+    """
+    raw = json.dumps([row["created_at"], row["memory_id"]], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    解碼分頁游標
+
+    Args:
+        cursor: encode_cursor 產生的游標
+
+    Returns:
+        Tuple[str, str]: (created_at, memory_id)
+
+    Raises:
+        ValueError: 如果游標格式錯誤
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, memory_id = json.loads(base64.urlsafe_b64decode(padded).decode("utf-8"))
+        return str(created_at), str(memory_id)
+    except Exception:
+        raise ValueError("無效的分頁游標")
+
+
+@dataclass
+class MemoryUsage:
+    """記憶的使用紀錄"""
+
+    memory_id: str
+    user_id: str
+    created_at: str
+    last_accessed_at: str
+    hit_count: int
+
+
+class MemoryMetadataStore:
+    """記憶中繼資料儲存"""
+
+    @staticmethod
+    def _upsert_row(
+        cursor,
+        user_id: str,
+        memory_id: str,
+        content: str,
+        category: Optional[str],
+        now: str,
+        created_at: Optional[str] = None,
+    ) -> None:
+        """
+        在指定 cursor 上新增或更新一筆記憶中繼資料
+
+        新增時以 created_at（例如回填時向量儲存中的原始建立時間）作為建立時間，未提供時使用 now；
+        最後存取時間一律為 now，避免回填的舊記憶立即被 TTL 清除。
+        已存在的記憶僅更新內容、類別與 updated_at，保留建立時間與命中統計。
+        """
+        if category not in MEMORY_CATEGORIES:
+            category = None
+        created_at = created_at or now
+        cursor.execute(
+            """
+            INSERT INTO memory_metadata
+                (memory_id, user_id, content, category, created_at, last_accessed_at, hit_count)
+            VALUES (?, ?, ?, ?, ?, ?, 0)
+            ON CONFLICT(memory_id) DO UPDATE SET
+                content = excluded.content,
+                category = COALESCE(excluded.category, memory_metadata.category),
+                updated_at = ?
+            """,
+            (memory_id, user_id, content, category, created_at, now, now),
+        )
+        MemoryFtsIndex.upsert(cursor, memory_id, user_id, content)
+
+    @classmethod
+    def upsert(
+        cls,
+        user_id: str,
+        memory_id: str,
+        content: str,
+        category: Optional[str] = None,
+    ) -> None:
+        """
+        新增或更新記憶中繼資料
+
+        Args:
+            user_id: 使用者 ID
+            memory_id: 記憶 ID
+            content: 記憶內容
+            category: 記憶類別（不在允許值內時存為 NULL）
+
+        Raises:
+            DatabaseError: 如果寫入失敗
+        """
+        cls.apply_changes(user_id, upserts=[(memory_id, content, category)])
+
+    @classmethod
+    def apply_changes(
+        cls,
+        user_id: str,
+        upserts: Sequence[Tuple[Optional[str], ...]] = (),
+        deletes: Sequence[str] = (),
+    ) -> None:
+        """
+        在單一交易中套用一次記憶操作造成的所有變更
+
+        Args:
+            user_id: 使用者 ID
+            upserts: 新增或更新的 (memory_id, content, category) 列表，
+                可附第四個元素作為新增時的建立時間 (memory_id, content, category, created_at)
+            deletes: 刪除的記憶 ID 列表
+
+        Raises:
+            DatabaseError: 如果寫入失敗（所有變更一併回滾）
+        """
+        if not upserts and not deletes:
+            return
+        now = datetime.now().isoformat()
+
+        def apply(cursor) -> None:
+            for memory_id, content, category, *created_at in upserts:
+                cls._upsert_row(
+                    cursor, user_id, memory_id, content, category, now, *created_at
+                )
+            for memory_id in deletes:
+                cursor.execute(
+                    "DELETE FROM memory_metadata WHERE memory_id = ? AND user_id = ?",
+                    (memory_id, user_id),
+                )
+            MemoryFtsIndex.delete(cursor, deletes)
+
+        try:
+            DatabaseManager.execute_write(apply)
+
+        except Exception as e:
+            logger.error(f"寫入記憶中繼資料失敗: {str(e)}")
+            raise DatabaseError(f"無法寫入記憶中繼資料: {str(e)}")
+
+    @staticmethod
+    def update(memory_id: str, content: str, category: Optional[str] = None) -> bool:
+        """
+        更新記憶內容與類別
+
+        Args:
+            memory_id: 記憶 ID
+            content: 新內容
+            category: 新類別（None 時保留原類別）
+
+        Returns:
+            bool: 記憶是否存在並已更新
+
+        Raises:
+            DatabaseError: 如果更新失敗
+        """
+        now = datetime.now().isoformat()
+        if category not in MEMORY_CATEGORIES:
+            category = None
+
+        def update_row(cursor) -> int:
+            cursor.execute(
+                """
+                UPDATE memory_metadata
+                SET content = ?, category = COALESCE(?, category), updated_at = ?
+                WHERE memory_id = ?
+                """,
+                (content, category, now, memory_id),
+            )
+            updated = cursor.rowcount
+            if updated:
+                user_id = cursor.execute(
+                    "SELECT user_id FROM memory_metadata WHERE memory_id = ?", (memory_id,)
+                ).fetchone()[0]
+                MemoryFtsIndex.upsert(cursor, memory_id, user_id, content)
+            return updated
+
+        try:
+            return DatabaseManager.execute_write(update_row) > 0
+
+        except Exception as e:
+            logger.error(f"更新記憶中繼資料失敗: {str(e)}")
+            raise DatabaseError(f"無法更新記憶中繼資料: {str(e)}")
+
+    @staticmethod
+    def get(memory_id: str) -> Optional[Dict]:
+        """
+        取得單一記憶
+
+        Args:
+            memory_id: 記憶 ID
+
+        Returns:
+            Optional[Dict]: 記憶資料，不存在時返回 None
+
+        Raises:
+            DatabaseError: 如果查詢失敗
+        """
+        try:
+            conn = DatabaseManager.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT {_RECORD_COLUMNS} FROM memory_metadata WHERE memory_id = ?",
+                (memory_id,),
+            )
+            row = cursor.fetchone()
+            return _row_to_dict(row) if row else None
+
+        except Exception as e:
+            logger.error(f"查詢記憶失敗: {str(e)}")
+            raise DatabaseError(f"無法查詢記憶: {str(e)}")
+
+    @staticmethod
+    def list_by_user(
+        user_id: str,
+        category: Optional[str] = None,
+        limit: int = 20,
+        before: Optional[Tuple[str, str]] = None,
+    ) -> List[Dict]:
+        """
+        依建立時間（新到舊）列出使用者的記憶
+
+        以 (created_at, memory_id) 作為鍵集分頁的鍵，
+        查詢沿 (user_id[, category], created_at DESC, memory_id DESC) 索引進行，不需排序或 OFFSET。
+
+        Args:
+            user_id: 使用者 ID
+            category: 類別篩選（選用）
+            limit: 返回數量上限
+            before: 僅返回排在此 (created_at, memory_id) 之後的記憶（選用）
+
+        Returns:
+            List[Dict]: 記憶資料列表
+
+        Raises:
+            DatabaseError: 如果查詢失敗
+        """
+        try:
+            conn = DatabaseManager.get_connection()
+            cursor = conn.cursor()
+            sql = f"SELECT {_RECORD_COLUMNS} FROM memory_metadata WHERE user_id = ?"
+            params: List = [user_id]
+            if category:
+                sql += " AND category = ?"
+                params.append(category)
+            if before:
+                sql += " AND (created_at, memory_id) < (?, ?)"
+                params.extend(before)
+            sql += " ORDER BY created_at DESC, memory_id DESC LIMIT ?"
+            params.append(limit)
+            cursor.execute(sql, params)
+            return [_row_to_dict(row) for row in cursor.fetchall()]
+
+        except Exception as e:
+            logger.error(f"列出記憶失敗: {str(e)}")
+            raise DatabaseError(f"無法列出記憶: {str(e)}")
+
+    @staticmethod
+    def get_ids(user_id: str, category: Optional[str] = None) -> List[str]:
+        """
+        取得使用者的記憶 ID
+
+        Args:
+            user_id: 使用者 ID
+            category: 類別篩選（選用）
+
+        Returns:
+            List[str]: 記憶 ID 列表
+
+        Raises:
+            DatabaseError: 如果查詢失敗
+        """
+        try:
+            conn = DatabaseManager.get_connection()
+            cursor = conn.cursor()
+            sql = "SELECT memory_id FROM memory_metadata WHERE user_id = ?"
+            params: List = [user_id]
+            if category:
+                sql += " AND category = ?"
+                params.append(category)
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+        except Exception as e:
+            logger.error(f"查詢記憶 ID 失敗: {str(e)}")
+            raise DatabaseError(f"無法查詢記憶 ID: {str(e)}")
+
+    @staticmethod
+    def get_contents(user_id: str) -> List[str]:
+        """
+        依建立時間（舊到新）取得使用者的全部記憶內容
+
+        Args:
+            user_id: 使用者 ID
+
+        Returns:
+            List[str]: 記憶內容列表
+
+        Raises:
+            DatabaseError: 如果查詢失敗
+        """
+        try:
+            conn = DatabaseManager.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT content FROM memory_metadata WHERE user_id = ? ORDER BY created_at, memory_id",
+                (user_id,),
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+        except Exception as e:
+            logger.error(f"查詢記憶內容失敗: {str(e)}")
+            raise DatabaseError(f"無法查詢記憶內容: {str(e)}")
+
+    @staticmethod
+    def list_user_ids() -> List[str]:
+        """
+        取得擁有記憶的所有使用者 ID
+
+        Returns:
+            List[str]: 使用者 ID 列表（已排序）
+
+        Raises:
+            DatabaseError: 如果查詢失敗
+        """
+        try:
+            conn = DatabaseManager.get_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT DISTINCT user_id FROM memory_metadata ORDER BY user_id")
+            return [row[0] for row in cursor.fetchall()]
+
+        except Exception as e:
+            logger.error(f"查詢記憶使用者失敗: {str(e)}")
+            raise DatabaseError(f"無法查詢記憶使用者: {str(e)}")
+
+    @staticmethod
+    def record_access(memory_ids: Sequence[str]) -> int:
+        """
+        記錄記憶被檢索命中
+
+        Args:
+            memory_ids: 命中的記憶 ID 列表
+
+        Returns:
+            int: 更新的記錄數
+
+        Raises:
+            DatabaseError: 如果更新失敗
+        """
+        if not memory_ids:
+            return 0
+        now = datetime.now().isoformat()
+        placeholders = ",".join("?" * len(memory_ids))
+
+        def touch(cursor) -> int:
+            cursor.execute(
+                f"""
+                UPDATE memory_metadata
+                SET last_accessed_at = ?, hit_count = hit_count + 1
+                WHERE memory_id IN ({placeholders})
+                """,
+                (now, *memory_ids),
+            )
+            return cursor.rowcount
+
+        try:
+            return DatabaseManager.execute_write(touch)
+
+        except Exception as e:
+            logger.error(f"記錄記憶存取失敗: {str(e)}")
+            raise DatabaseError(f"無法記錄記憶存取: {str(e)}")
+
+    @staticmethod
+    def count_by_user(user_id: str, category: Optional[str] = None) -> int:
+        """
+        計算使用者的記憶數
+
+        Args:
+            user_id: 使用者 ID
+            category: 類別篩選（選用）
+
+        Returns:
+            int: 記憶數
+
+        Raises:
+            DatabaseError: 如果查詢失敗
+        """
+        try:
+            conn = DatabaseManager.get_connection()
+            cursor = conn.cursor()
+            sql = "SELECT COUNT(*) FROM memory_metadata WHERE user_id = ?"
+            params: List = [user_id]
+            if category:
+                sql += " AND category = ?"
+                params.append(category)
+            cursor.execute(sql, params)
+            return cursor.fetchone()[0]
+
+        except Exception as e:
+            logger.error(f"計算記憶數失敗: {str(e)}")
+            raise DatabaseError(f"無法計算記憶數: {str(e)}")
+
+    @staticmethod
+    def get_usage(user_id: str) -> List[MemoryUsage]:
+        """
+        取得使用者所有記憶的使用紀錄
+
+        Args:
+            user_id: 使用者 ID
+
+        Returns:
+            List[MemoryUsage]: 使用紀錄列表
+
+        Raises:
+            DatabaseError: 如果查詢失敗
+        """
+        try:
+            conn = DatabaseManager.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT memory_id, user_id, created_at, last_accessed_at, hit_count
+                FROM memory_metadata
+                WHERE user_id = ?
+                """,
+                (user_id,),
+            )
+            return [MemoryUsage(*row) for row in cursor.fetchall()]
+
+        except Exception as e:
+            logger.error(f"查詢記憶使用紀錄失敗: {str(e)}")
+            raise DatabaseError(f"無法查詢記憶使用紀錄: {str(e)}")
+
+    @staticmethod
+    def get_oldest_ids(user_id: str, order_column: str, limit: int) -> List[str]:
+        """
+        依時間欄位取得最舊的記憶 ID
+
+        Args:
+            user_id: 使用者 ID
+            order_column: 排序欄位（created_at 或 last_accessed_at）
+            limit: 返回數量
+
+        Returns:
+            List[str]: 記憶 ID 列表（由舊到新）
+
+        Raises:
+            DatabaseError: 如果查詢失敗
+        """
+        if order_column not in ("created_at", "last_accessed_at"):
+            raise ValueError(f"不支援的排序欄位: {order_column}")
+        try:
+            conn = DatabaseManager.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                SELECT memory_id FROM memory_metadata
+                WHERE user_id = ?
+                ORDER BY {order_column} ASC, memory_id ASC
+                LIMIT ?
+                """,
+                (user_id, limit),
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+        except Exception as e:
+            logger.error(f"查詢最舊記憶失敗: {str(e)}")
+            raise DatabaseError(f"無法查詢最舊記憶: {str(e)}")
+
+    @staticmethod
+    def get_expired(cutoff: str, limit: int, exclude: Sequence[str] = ()) -> List[Tuple[str, str]]:
+        """
+        取得最後存取時間早於 cutoff 的記憶
+
+        Args:
+            cutoff: ISO 格式時間
+            limit: 返回數量上限
+            exclude: 略過的記憶 ID（例如本次清除中已刪除失敗的記憶）
+
+        Returns:
+            List[Tuple[str, str]]: (user_id, memory_id) 列表
+
+        Raises:
+            DatabaseError: 如果查詢失敗
+        """
+        try:
+            conn = DatabaseManager.get_connection()
+            cursor = conn.cursor()
+            sql = "SELECT user_id, memory_id FROM memory_metadata WHERE last_accessed_at < ?"
+            params: List = [cutoff]
+            if exclude:
+                sql += f" AND memory_id NOT IN ({', '.join('?' * len(exclude))})"
+                params.extend(exclude)
+            sql += " ORDER BY last_accessed_at ASC LIMIT ?"
+            params.append(limit)
+            cursor.execute(sql, params)
+            return [(row[0], row[1]) for row in cursor.fetchall()]
+
+        except Exception as e:
+            logger.error(f"查詢過期記憶失敗: {str(e)}")
+            raise DatabaseError(f"無法查詢過期記憶: {str(e)}")
+
+    @staticmethod
+    def delete_many(memory_ids: Iterable[str]) -> int:
+        """
+        批次刪除記憶中繼資料
+
+        Args:
+            memory_ids: 記憶 ID 列表
+
+        Returns:
+            int: 刪除的記錄數
+
+        Raises:
+            DatabaseError: 如果刪除失敗
+        """
+        memory_ids = list(memory_ids)
+        if not memory_ids:
+            return 0
+        placeholders = ",".join("?" * len(memory_ids))
+
+        def delete_rows(cursor) -> int:
+            cursor.execute(
+                f"DELETE FROM memory_metadata WHERE memory_id IN ({placeholders})",
+                memory_ids,
+            )
+            deleted = cursor.rowcount
+            MemoryFtsIndex.delete(cursor, memory_ids)
+            return deleted
+
+        try:
+            return DatabaseManager.execute_write(delete_rows)
+
+        except Exception as e:
+            logger.error(f"刪除記憶中繼資料失敗: {str(e)}")
+            raise DatabaseError(f"無法刪除記憶中繼資料: {str(e)}")
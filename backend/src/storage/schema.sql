@@ -5,7 +5,9 @@ CREATE TABLE IF NOT EXISTS conversations (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     status TEXT DEFAULT 'active' CHECK(status IN ('active', 'archived', 'expired')),
-    message_count INTEGER DEFAULT 0
+    message_count INTEGER DEFAULT 0,
+    summary TEXT,
+    summary_through_id INTEGER DEFAULT 0
 );
 
 -- 訊息資料表
@@ -29,9 +31,90 @@ CREATE TABLE IF NOT EXISTS memory_metadata (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP,
     relevance REAL DEFAULT 0.0,
+    last_accessed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    hit_count INTEGER DEFAULT 0,
     FOREIGN KEY (source_message_id) REFERENCES messages(id) ON DELETE SET NULL
 );
 
+-- 冪等鍵資料表（POST /chat 的 Idempotency-Key 回應快取）
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    user_id TEXT NOT NULL,
+    idempotency_key TEXT NOT NULL,
+    request_hash TEXT NOT NULL,
+    status_code INTEGER NOT NULL,
+    response_body TEXT NOT NULL,
+    response_headers TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (user_id, idempotency_key)
+);
+
+-- 使用者投資輪廓（由記憶增量更新，固定注入提示）
+CREATE TABLE IF NOT EXISTS user_profiles (
+    user_id TEXT PRIMARY KEY,
+    risk_tolerance TEXT,
+    investment_horizon TEXT,
+    sectors TEXT DEFAULT '[]',
+    goals TEXT DEFAULT '[]',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 記憶合併作業檢查點（重新執行同一 job_id 時跳過已完成的使用者）
+CREATE TABLE IF NOT EXISTS consolidation_checkpoints (
+    job_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    clusters INTEGER NOT NULL DEFAULT 0,
+    reclaimed INTEGER NOT NULL DEFAULT 0,
+    completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (job_id, user_id)
+);
+
+-- 批量聊天作業檢查點（重新執行同一 job_id 時跳過已成功的記錄）
+CREATE TABLE IF NOT EXISTS bulk_chat_checkpoints (
+    job_id TEXT NOT NULL,
+    record_key TEXT NOT NULL,
+    conversation_id TEXT,
+    completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (job_id, record_key)
+);
+
+-- 每次生成的 token 用量（供應商回報；供應商未回報時為本地估算）
+CREATE TABLE IF NOT EXISTS usage (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    conversation_id INTEGER,
+    model TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    cached_tokens INTEGER NOT NULL DEFAULT 0,
+    estimated INTEGER NOT NULL DEFAULT 0,
+    local_estimate INTEGER NOT NULL DEFAULT 0,  -- 同一提示的未校準本地估算（校準樣本）
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_usage_user_created
+ON usage(user_id, created_at);
+
+-- 非同步聊天作業（狀態保存於此，重新啟動後繼續執行未完成的作業）
+CREATE TABLE IF NOT EXISTS chat_jobs (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    conversation_id TEXT,
+    message TEXT NOT NULL,
+    callback_url TEXT,
+    status TEXT NOT NULL DEFAULT 'queued',  -- queued, running, succeeded, failed
+    result TEXT,  -- 成功時的回應資料（JSON）
+    error_code TEXT,
+    error_message TEXT,
+    callback_status TEXT,  -- delivered, failed
+    created_at TIMESTAMP NOT NULL,
+    started_at TIMESTAMP,
+    completed_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_chat_jobs_status
+ON chat_jobs(status, created_at);
+
 -- 索引以加快查詢
 CREATE INDEX IF NOT EXISTS idx_conversations_user_id 
 ON conversations(user_id);
@@ -53,3 +136,18 @@ ON memory_metadata(user_id);
 
 CREATE INDEX IF NOT EXISTS idx_memory_created 
 ON memory_metadata(created_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_memory_user_created 
+ON memory_metadata(user_id, created_at DESC, memory_id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_memory_user_category_created 
+ON memory_metadata(user_id, category, created_at DESC, memory_id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_memory_user_accessed 
+ON memory_metadata(user_id, last_accessed_at);
+
+CREATE INDEX IF NOT EXISTS idx_memory_accessed 
+ON memory_metadata(last_accessed_at);
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_expires 
+ON idempotency_keys(expires_at);
@@ -4,13 +4,14 @@
 實作對話和訊息的 CRUD 操作。
 """
 
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from datetime import datetime
 import uuid
 
 from ..config import settings
 from ..utils.logger import get_logger
 from ..utils.exceptions import DatabaseError, NotFoundError
+from ..utils.tokens import estimate_tokens
 from ..storage.database import DatabaseManager
 from ..models.conversation import ConversationDB, MessageDB, Conversation, Message
 
@@ -34,13 +35,10 @@ class StorageService:
         Raises:
             DatabaseError: 如果建立失敗
         """
-        try:
-            conn = DatabaseManager.get_connection()
-            cursor = conn.cursor()
-
-            conversation_id = str(uuid.uuid4())
-            now = datetime.now().isoformat()
+        conversation_id = str(uuid.uuid4())
+        now = datetime.now().isoformat()
 
+        def insert_conversation(cursor) -> None:
             cursor.execute(
                 """
                 INSERT INTO conversations (id, user_id, created_at, last_activity, status, message_count)
@@ -48,7 +46,9 @@ class StorageService:
                 """,
                 (conversation_id, user_id, now, now, "active", 0),
             )
-            conn.commit()
+
+        try:
+            DatabaseManager.execute_write(insert_conversation)
 
             logger.info(f"對話已建立: conversation_id={conversation_id}, user_id={user_id}")
 
@@ -184,16 +184,10 @@ class StorageService:
         Raises:
             DatabaseError: 如果儲存失敗
         """
-        try:
-            conn = DatabaseManager.get_connection()
-            cursor = conn.cursor()
-
-            now = datetime.now().isoformat()
-            token_count = len(content.split())
-
-            # 開始事務
-            cursor.execute("BEGIN TRANSACTION")
+        now = datetime.now().isoformat()
+        token_count = estimate_tokens(content)
 
+        def insert_message(cursor) -> int:
             # 儲存訊息
             cursor.execute(
                 """
@@ -202,10 +196,9 @@ class StorageService:
                 """,
                 (conversation_id, role, content, now, token_count),
             )
-
             message_id = cursor.lastrowid
 
-            # 更新對話最後活動時間和訊息計數
+            # 更新對話最後活動時間和訊息計數（與訊息於同一交易中提交）
             cursor.execute(
                 """
                 UPDATE conversations
@@ -214,8 +207,10 @@ class StorageService:
                 """,
                 (now, conversation_id),
             )
+            return message_id
 
-            conn.commit()
+        try:
+            message_id = DatabaseManager.execute_write(insert_message)
 
             logger.info(
                 f"訊息已儲存: message_id={message_id}, conversation_id={conversation_id}, role={role}"
@@ -231,7 +226,6 @@ class StorageService:
             )
 
         except Exception as e:
-            conn.rollback()
             logger.error(f"儲存訊息失敗: {str(e)}")
             raise DatabaseError(f"無法儲存訊息: {str(e)}")
 
@@ -239,6 +233,7 @@ class StorageService:
     def get_conversation_messages(
         conversation_id: int,
         limit: int = 50,
+        after_id: Optional[int] = None,
     ) -> List[Message]:
         """
         取得對話的所有訊息
@@ -246,6 +241,7 @@ class StorageService:
         Args:
             conversation_id: 對話 ID
             limit: 最大返回數量
+            after_id: 僅返回 ID 大於此值的訊息（增量查詢，選用）
 
         Returns:
             List[Message]: 訊息列表
@@ -257,16 +253,29 @@ class StorageService:
             conn = DatabaseManager.get_connection()
             cursor = conn.cursor()
 
-            cursor.execute(
-                """
-                SELECT id, conversation_id, role, content, timestamp, token_count
-                FROM messages
-                WHERE conversation_id = ?
-                ORDER BY timestamp ASC
-                LIMIT ?
-                """,
-                (conversation_id, limit),
-            )
+            if after_id is not None:
+                # 增量模式：訊息 ID 單調遞增，依 ID 排序即為時間順序
+                cursor.execute(
+                    """
+                    SELECT id, conversation_id, role, content, timestamp, token_count
+                    FROM messages
+                    WHERE conversation_id = ? AND id > ?
+                    ORDER BY id ASC
+                    LIMIT ?
+                    """,
+                    (conversation_id, after_id, limit),
+                )
+            else:
+                cursor.execute(
+                    """
+                    SELECT id, conversation_id, role, content, timestamp, token_count
+                    FROM messages
+                    WHERE conversation_id = ?
+                    ORDER BY timestamp ASC
+                    LIMIT ?
+                    """,
+                    (conversation_id, limit),
+                )
 
             rows = cursor.fetchall()
             messages = []
@@ -291,6 +300,124 @@ class StorageService:
             logger.error(f"取得對話訊息失敗: {str(e)}")
             raise DatabaseError(f"無法取得對話訊息: {str(e)}")
 
+    @staticmethod
+    def get_recent_messages(conversation_id: int, limit: int, after_id: int = 0) -> List[Message]:
+        """
+        取得對話最近的訊息（依時間順序）
+
+        Args:
+            conversation_id: 對話 ID
+            limit: 最大返回數量
+            after_id: 只返回 ID 大於此值的訊息（例如摘要已涵蓋的位置）
+
+        Returns:
+            List[Message]: 最近 limit 則訊息，由舊到新
+
+        Raises:
+            DatabaseError: 如果查詢失敗
+        """
+        try:
+            conn = DatabaseManager.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT id, conversation_id, role, content, timestamp, token_count
+                FROM messages
+                WHERE conversation_id = ? AND id > ?
+                ORDER BY id DESC
+                LIMIT ?
+                """,
+                (conversation_id, after_id, limit),
+            )
+            return [
+                Message(
+                    conversation_id=row[1],
+                    role=row[2],
+                    content=row[3],
+                    message_id=row[0],
+                    timestamp=row[4],
+                    token_count=row[5],
+                )
+                for row in reversed(cursor.fetchall())
+            ]
+
+        except Exception as e:
+            logger.error(f"取得最近訊息失敗: {str(e)}")
+            raise DatabaseError(f"無法取得最近訊息: {str(e)}")
+
+    @staticmethod
+    def get_conversation_summary(conversation_id: int) -> Tuple[Optional[str], int]:
+        """
+        取得對話的滾動摘要
+
+        Args:
+            conversation_id: 對話 ID
+
+        Returns:
+            Tuple[Optional[str], int]: (摘要, 摘要已涵蓋的最後訊息 ID)
+
+        Raises:
+            DatabaseError: 如果查詢失敗
+        """
+        try:
+            conn = DatabaseManager.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT summary, summary_through_id FROM conversations WHERE id = ?",
+                (conversation_id,),
+            )
+            row = cursor.fetchone()
+            if not row:
+                return None, 0
+            return row[0], row[1] or 0
+
+        except Exception as e:
+            logger.error(f"取得對話摘要失敗: {str(e)}")
+            raise DatabaseError(f"無法取得對話摘要: {str(e)}")
+
+    @staticmethod
+    def update_conversation_summary(
+        conversation_id: int,
+        summary: str,
+        through_id: int,
+        expected_through_id: int,
+    ) -> bool:
+        """
+        更新對話的滾動摘要
+
+        僅在摘要仍涵蓋至 expected_through_id 時寫入，避免並行的刷新互相覆蓋。
+
+        Args:
+            conversation_id: 對話 ID
+            summary: 新摘要
+            through_id: 新摘要涵蓋的最後訊息 ID
+            expected_through_id: 讀取舊摘要時的涵蓋位置
+
+        Returns:
+            bool: 是否已寫入
+
+        Raises:
+            DatabaseError: 如果更新失敗
+        """
+
+        def update_summary(cursor) -> int:
+            cursor.execute(
+                """
+                UPDATE conversations
+                SET summary = ?, summary_through_id = ?
+                WHERE id = ? AND COALESCE(summary_through_id, 0) = ?
+                """,
+                (summary, through_id, conversation_id, expected_through_id),
+            )
+            return cursor.rowcount
+
+        try:
+            return DatabaseManager.execute_write(update_summary) > 0
+
+        except Exception as e:
+            logger.error(f"更新對話摘要失敗: {str(e)}")
+            raise DatabaseError(f"無法更新對話摘要: {str(e)}")
+
     @staticmethod
     def archive_conversation(conversation_id: int) -> bool:
         """
@@ -305,10 +432,8 @@ class StorageService:
         Raises:
             DatabaseError: 如果操作失敗
         """
-        try:
-            conn = DatabaseManager.get_connection()
-            cursor = conn.cursor()
 
+        def mark_archived(cursor) -> None:
             cursor.execute(
                 """
                 UPDATE conversations
@@ -318,7 +443,8 @@ class StorageService:
                 (conversation_id,),
             )
 
-            conn.commit()
+        try:
+            DatabaseManager.execute_write(mark_archived)
 
             logger.info(f"對話已封存: conversation_id={conversation_id}")
             return True
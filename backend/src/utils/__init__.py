@@ -10,6 +10,7 @@ from .exceptions import (
     NotFoundError,
     ConversationNotFoundError,
     MemoryNotFoundError,
+    IdempotencyKeyMismatchError,
     RateLimitError,
 )
 
@@ -23,5 +24,6 @@ __all__ = [
     "NotFoundError",
     "ConversationNotFoundError",
     "MemoryNotFoundError",
+    "IdempotencyKeyMismatchError",
     "RateLimitError",
 ]
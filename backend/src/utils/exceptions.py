@@ -89,6 +89,28 @@ class MemoryNotFoundError(NotFoundError):
         super().__init__("記憶", memory_id)
 
 
+class ChatJobNotFoundError(NotFoundError):
+    """聊天作業不存在"""
+
+    def __init__(self, job_id: str):
+        super().__init__("聊天作業", job_id)
+
+
+class IdempotencyKeyMismatchError(ApplicationError):
+    """冪等鍵重複使用於不同請求內容"""
+
+    def __init__(self, idempotency_key: str):
+        """
+        初始化冪等鍵衝突錯誤
+
+        Args:
+            idempotency_key: 衝突的冪等鍵
+        """
+        self.idempotency_key = idempotency_key
+        message = "Idempotency-Key 已用於內容不同的請求"
+        super().__init__(message, code="IDEMPOTENCY_KEY_MISMATCH")
+
+
 class RateLimitError(ApplicationError):
     """速率限制錯誤"""
 
@@ -102,3 +124,23 @@ class RateLimitError(ApplicationError):
         self.retry_after = retry_after_seconds
         message = f"已超過速率限制，請稍後再試"
         super().__init__(message, code="RATE_LIMIT_EXCEEDED")
+
+
+class QuotaExceededError(RateLimitError):
+    """使用者每日 token 配額用盡"""
+
+    def __init__(self, used_tokens: int, quota_tokens: int, retry_after_seconds: int):
+        """
+        初始化配額錯誤
+
+        Args:
+            used_tokens: 今日已使用的 token 數
+            quota_tokens: 每日配額
+            retry_after_seconds: 距配額重置的秒數
+        """
+        super().__init__(retry_after_seconds=retry_after_seconds)
+        self.used_tokens = used_tokens
+        self.quota_tokens = quota_tokens
+        self.message = "今日的使用額度已用完，請明天再試"
+        self.code = "QUOTA_EXCEEDED"
+        self.args = (self.message,)
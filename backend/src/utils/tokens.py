@@ -0,0 +1,112 @@
+"""
+Token 估算
+
+以字元類別近似供應商的分詞結果，供配額、提示預算與訊息的 token_count 使用：
+CJK 字元約每字一個 token，英文詞約每 4 個字元一個 token，數字約每 3 位一個 token，
+標點與其他符號各算一個 token。以空白切分會把整句中文算成一個 token，不可用於預算。
+
+估算結果乘上校準係數：係數由供應商回報的實際提示 token 數與同一提示的本地估算
+以最小平方法擬合（見 UsageService.calibrate_estimator）。各文字的未校準估算會被快取，
+同一則訊息在儲存、組裝提示與預算計算之間只分析一次。
+"""
+
+import functools
+import math
+import re
+import threading
+from typing import Iterable, Tuple
+
+# CJK 統一表意文字、假名、韓文與全形字元
+_CJK_CLASS = "぀-ヿ㐀-䶿一-鿿가-힯豈-﫿＀-￯"
+_CJK_RE = re.compile(f"[{_CJK_CLASS}]")
+_LATIN_RE = re.compile(r"[A-Za-z]+")
+_DIGIT_RE = re.compile(r"\d+")
+_SYMBOL_RE = re.compile(rf"[^\sA-Za-z\d{_CJK_CLASS}]")
+
+CJK_TOKENS_PER_CHAR = 1.0
+LATIN_CHARS_PER_TOKEN = 4.0
+DIGITS_PER_TOKEN = 3.0
+
+# 校準係數的合理範圍，避免少量或異常樣本造成極端縮放
+_MIN_SCALE = 0.5
+_MAX_SCALE = 2.0
+
+_scale = 1.0
+_scale_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=8192)
+def _raw_estimate(text: str) -> float:
+    """未校準的估算（依文字快取）"""
+    tokens = len(_CJK_RE.findall(text)) * CJK_TOKENS_PER_CHAR
+    tokens += sum(math.ceil(len(word) / LATIN_CHARS_PER_TOKEN) for word in _LATIN_RE.findall(text))
+    tokens += sum(math.ceil(len(digits) / DIGITS_PER_TOKEN) for digits in _DIGIT_RE.findall(text))
+    tokens += len(_SYMBOL_RE.findall(text))
+    return tokens
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算文字的 token 數
+
+    Args:
+        text: 文字
+
+    Returns:
+        int: 校準後的估算 token 數（非空文字至少為 1）
+    """
+    if not text:
+        return 0
+    return max(1, round(_raw_estimate(text) * _scale))
+
+
+def uncalibrated_tokens(text: str) -> int:
+    """
+    未校準的估算 token 數（作為校準樣本的本地估算）
+
+    Args:
+        text: 文字
+
+    Returns:
+        int: 估算 token 數
+    """
+    return round(_raw_estimate(text)) if text else 0
+
+
+def calibration_scale() -> float:
+    """目前的校準係數"""
+    return _scale
+
+
+def set_calibration_scale(scale: float) -> float:
+    """
+    設定校準係數（限制於合理範圍內）
+
+    Args:
+        scale: 係數
+
+    Returns:
+        float: 實際採用的係數
+    """
+    global _scale
+    with _scale_lock:
+        _scale = min(_MAX_SCALE, max(_MIN_SCALE, scale))
+        return _scale
+
+
+def fit_scale(samples: Iterable[Tuple[int, int]]) -> float:
+    """
+    以最小平方法（過原點）擬合校準係數
+
+    Args:
+        samples: (實際 token 數, 未校準估算) 配對
+
+    Returns:
+        float: 係數；沒有有效樣本時返回 1.0
+    """
+    numerator = denominator = 0.0
+    for actual, estimated in samples:
+        if actual > 0 and estimated > 0:
+            numerator += actual * estimated
+            denominator += estimated * estimated
+    return numerator / denominator if denominator else 1.0
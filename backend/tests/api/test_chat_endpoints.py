@@ -586,3 +586,225 @@ class TestChatEndpointMemoriesUsed:
         assert len(response_1["data"]["memories_used"]) == 0
         assert len(response_2["data"]["memories_used"]) > 0
 
+
+
+class TestChatEndpointFastResponsePath:
+    """測試聊天與歷史端點的快速序列化路徑"""
+
+    @pytest.fixture
+    def turn_result(self) -> Dict[str, Any]:
+        """模擬 ConversationService.process_message 的回傳值"""
+        conversation_id = str(uuid.uuid4())
+        return {
+            "conversation_id": conversation_id,
+            "user_message": {
+                "id": 1,
+                "conversation_id": conversation_id,
+                "role": "user",
+                "content": "我偏好投資科技股",
+                "timestamp": "2025-01-01T00:00:00",
+                "token_count": 1,
+            },
+            "assistant_message": {
+                "id": 2,
+                "conversation_id": conversation_id,
+                "role": "assistant",
+                "content": "科技股是不錯的選擇",
+                "timestamp": "2025-01-01T00:00:05",
+                "token_count": 1,
+            },
+            "memories_used": [
+                {"id": "mem_001", "content": "偏好科技股", "metadata": {"relevance": 0.9}},
+                "非字典記憶會被略過",
+            ],
+        }
+
+    def test_chat_returns_serialized_payload(self, client, turn_result):
+        """測試 /chat 直接序列化服務層結果"""
+        with patch("src.api.routes.chat.ConversationService") as mock_conv:
+            mock_conv.process_message.return_value = turn_result
+
+            response = client.post(
+                "/api/v1/chat",
+                json={"user_id": str(uuid.uuid4()), "message": "我偏好投資科技股"},
+            )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["code"] == "SUCCESS"
+        assert body["data"]["assistant_message"]["content"] == "科技股是不錯的選擇"
+        assert body["data"]["memories_used"] == [
+            {"id": "mem_001", "content": "偏好科技股", "metadata": {"relevance": 0.9}}
+        ]
+
+    def test_messages_endpoint_returns_history(self, client, turn_result):
+        """測試訊息列表端點回傳服務層的訊息字典"""
+        history = [turn_result["user_message"], turn_result["assistant_message"]]
+        with patch("src.api.routes.chat.ConversationService") as mock_conv:
+            mock_conv.get_conversation.return_value = MagicMock(message_count=2)
+            mock_conv.get_history_etag.return_value = 'W/"v1"'
+            mock_conv.get_conversation_history.return_value = history
+
+            response = client.get(
+                f"/api/v1/conversations/{turn_result['conversation_id']}/messages"
+            )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["data"] == history
+        assert body["meta"] == {"total": 2, "count": 2, "last_id": 2}
+
+
+class TestConversationMessagesConditionalGet:
+    """測試訊息歷史的 ETag 與增量查詢"""
+
+    @pytest.fixture
+    def conversation_db(self, test_db):
+        """建立含兩則訊息的真實對話"""
+        from src.storage.storage_service import StorageService
+
+        conversation = StorageService.create_conversation(str(uuid.uuid4()))
+        StorageService.save_message(conversation.id, "user", "我偏好科技股")
+        StorageService.save_message(conversation.id, "assistant", "了解")
+        return conversation.id
+
+    def test_response_includes_etag(self, client, conversation_db):
+        """測試回應包含 ETag 與 no-cache"""
+        response = client.get(f"/api/v1/conversations/{conversation_db}/messages")
+
+        assert response.status_code == 200
+        assert response.headers["etag"].startswith('W/"')
+        assert "no-cache" in response.headers["cache-control"]
+        assert response.json()["meta"]["total"] == 2
+
+    def test_if_none_match_returns_304_without_loading_messages(self, client, conversation_db):
+        """測試 ETag 相符時返回 304 且不查詢訊息"""
+        etag = client.get(f"/api/v1/conversations/{conversation_db}/messages").headers["etag"]
+
+        with patch(
+            "src.api.routes.chat.ConversationService.get_conversation_history"
+        ) as mock_history:
+            response = client.get(
+                f"/api/v1/conversations/{conversation_db}/messages",
+                headers={"If-None-Match": etag},
+            )
+
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        mock_history.assert_not_called()
+
+    def test_etag_changes_after_new_message(self, client, conversation_db):
+        """測試新增訊息後 ETag 改變"""
+        from src.storage.storage_service import StorageService
+
+        etag = client.get(f"/api/v1/conversations/{conversation_db}/messages").headers["etag"]
+        StorageService.save_message(conversation_db, "user", "再問一個問題")
+
+        response = client.get(
+            f"/api/v1/conversations/{conversation_db}/messages",
+            headers={"If-None-Match": etag},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+    def test_after_id_returns_only_new_messages(self, client, conversation_db):
+        """測試 after_id 僅返回較新的訊息"""
+        first = client.get(f"/api/v1/conversations/{conversation_db}/messages").json()
+        first_id = first["data"][0]["id"]
+
+        response = client.get(
+            f"/api/v1/conversations/{conversation_db}/messages",
+            params={"after_id": first_id},
+        )
+
+        body = response.json()
+        assert [m["content"] for m in body["data"]] == ["了解"]
+        assert body["meta"]["last_id"] == first["data"][1]["id"]
+
+    def test_unknown_conversation_returns_404(self, client, test_db):
+        """測試不存在的對話返回 404"""
+        response = client.get(f"/api/v1/conversations/{uuid.uuid4()}/messages")
+
+        assert response.status_code == 404
+
+
+class TestChatEndpointIdempotency:
+    """測試 POST /chat 的 Idempotency-Key 支援"""
+
+    def test_repeat_key_does_not_reprocess(self, client, test_db):
+        """測試相同 Idempotency-Key 的重試只處理一次"""
+        payload = {"user_id": str(uuid.uuid4()), "message": "我偏好投資科技股"}
+        result = {
+            "conversation_id": "c1",
+            "user_message": {"id": 1, "content": "我偏好投資科技股"},
+            "assistant_message": {"id": 2, "content": "好的"},
+            "memories_used": [],
+        }
+        with patch("src.api.routes.chat.ConversationService") as mock_conv:
+            mock_conv.process_message.return_value = result
+
+            first = client.post("/api/v1/chat", json=payload, headers={"Idempotency-Key": "k1"})
+            second = client.post("/api/v1/chat", json=payload, headers={"Idempotency-Key": "k1"})
+
+        assert first.status_code == second.status_code == 200
+        assert first.json() == second.json()
+        assert first.headers["idempotent-replayed"] == "false"
+        assert second.headers["idempotent-replayed"] == "true"
+        mock_conv.process_message.assert_called_once()
+
+    def test_rate_limited_response_not_replayed(self, client, test_db):
+        """測試 429 回應保留 Retry-After 且不儲存，等待後以同一鍵重試會重新處理"""
+        from src.utils.exceptions import RateLimitError
+
+        payload = {"user_id": str(uuid.uuid4()), "message": "你好"}
+        result = {
+            "conversation_id": "c1",
+            "user_message": {"id": 1, "content": "你好"},
+            "assistant_message": {"id": 2, "content": "你好！"},
+            "memories_used": [],
+        }
+        with patch("src.api.routes.chat.ConversationService") as mock_conv:
+            mock_conv.process_message.side_effect = [RateLimitError(7), result]
+
+            first = client.post("/api/v1/chat", json=payload, headers={"Idempotency-Key": "k3"})
+            second = client.post("/api/v1/chat", json=payload, headers={"Idempotency-Key": "k3"})
+
+        assert (first.status_code, first.headers["retry-after"]) == (429, "7")
+        assert second.status_code == 200
+        assert second.headers["idempotent-replayed"] == "false"
+        assert mock_conv.process_message.call_count == 2
+
+    def test_lookup_failure_returns_database_error(self, client, test_db):
+        """測試冪等鍵查詢失敗時返回結構化錯誤且不處理訊息"""
+        from src.utils.exceptions import DatabaseError
+
+        payload = {"user_id": str(uuid.uuid4()), "message": "你好"}
+        with patch("src.api.routes.chat.ConversationService") as mock_conv, \
+             patch("src.api.routes.chat.IdempotencyService.get_stored", side_effect=DatabaseError("locked")):
+            response = client.post("/api/v1/chat", json=payload, headers={"Idempotency-Key": "k4"})
+
+        assert response.status_code == 500
+        assert response.json()["code"] == "DATABASE_ERROR"
+        assert "request_id" in response.json()
+        mock_conv.process_message.assert_not_called()
+
+    def test_reused_key_with_different_payload_rejected(self, client, test_db):
+        """測試同一鍵用於不同訊息時返回 422"""
+        user_id = str(uuid.uuid4())
+        with patch("src.api.routes.chat.ConversationService") as mock_conv:
+            mock_conv.process_message.return_value = {"memories_used": []}
+
+            client.post(
+                "/api/v1/chat",
+                json={"user_id": user_id, "message": "訊息一"},
+                headers={"Idempotency-Key": "k2"},
+            )
+            response = client.post(
+                "/api/v1/chat",
+                json={"user_id": user_id, "message": "訊息二"},
+                headers={"Idempotency-Key": "k2"},
+            )
+
+        assert response.status_code == 422
+        assert response.json()["code"] == "IDEMPOTENCY_KEY_MISMATCH"
@@ -0,0 +1,164 @@
+"""
+記憶 API 端點測試
+
+測試 /api/v1/memories 端點由記憶目錄提供列表與計數，並同步向量儲存的更新與刪除。
+"""
+
+import uuid
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.services.memory_service import MemoryService
+from src.storage.memory_store import MemoryMetadataStore
+
+
+@pytest.fixture
+def mem0_client():
+    """模擬 Mem0 客戶端"""
+    client = MagicMock()
+    MemoryService._mem0_client = client
+    return client
+
+
+@pytest.fixture
+def catalog(test_db):
+    """建立含三筆記憶的使用者"""
+    user_id = str(uuid.uuid4())
+    MemoryMetadataStore.apply_changes(
+        user_id,
+        upserts=[
+            (f"{user_id}-1", "偏好科技股", "preference"),
+            (f"{user_id}-2", "風險承受度中等", "preference"),
+            (f"{user_id}-3", "任職於金融業", "fact"),
+        ],
+    )
+    return user_id
+
+
+class TestMemoryEndpoints:
+    """測試記憶管理端點"""
+
+    def test_list_uses_catalog_without_vector_search(self, client, catalog, mem0_client):
+        """測試列表與計數直接查詢記憶目錄"""
+        response = client.get("/api/v1/memories", params={"user_id": catalog})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["total"] == 3
+        assert len(body["memories"]) == 3
+        mem0_client.search.assert_not_called()
+
+    def test_search_with_category_filters_inside_search(self, client, catalog, mem0_client):
+        """測試同時提供 query 與 category 時於搜索中篩選類別，而非取回後再過濾"""
+        mem0_client.search.return_value = {
+            "results": [
+                {"id": f"{catalog}-3", "memory": "任職於金融業", "score": 0.9, "metadata": {"category": "fact"}}
+            ]
+        }
+
+        with patch("src.services.memory_service.settings.memory_rerank_enabled", False):
+            response = client.get(
+                "/api/v1/memories",
+                params={"user_id": catalog, "query": "金融", "category": "fact", "limit": 1},
+            )
+
+        body = response.json()
+        assert [m["memory_id"] for m in body["memories"]] == [f"{catalog}-3"]
+        assert mem0_client.search.call_args.kwargs["filters"] == {"category": "fact"}
+
+    def test_list_filters_by_category(self, client, catalog, mem0_client):
+        """測試類別篩選"""
+        response = client.get(
+            "/api/v1/memories",
+            params={"user_id": catalog, "category": "fact", "limit": 10},
+        )
+
+        body = response.json()
+        assert body["total"] == 1
+        assert [m["content"] for m in body["memories"]] == ["任職於金融業"]
+
+    def test_list_with_query_uses_semantic_search(self, client, catalog, mem0_client):
+        """測試提供 query 時使用語義搜索"""
+        mem0_client.search.return_value = {
+            "results": [{"id": f"{catalog}-1", "memory": "偏好科技股", "score": 0.91}]
+        }
+
+        response = client.get(
+            "/api/v1/memories", params={"user_id": catalog, "query": "科技"}
+        )
+
+        body = response.json()
+        assert body["total"] == 3
+        assert body["memories"][0]["relevance"] == 0.91
+
+    def test_list_rejects_invalid_user_id(self, client, test_db):
+        """測試無效的 user_id"""
+        response = client.get("/api/v1/memories", params={"user_id": "not-a-uuid"})
+
+        assert response.status_code == 400
+
+    def test_get_memory_detail(self, client, catalog):
+        """測試取得單一記憶"""
+        response = client.get(f"/api/v1/memories/{catalog}-3")
+
+        assert response.status_code == 200
+        assert response.json()["category"] == "fact"
+
+    def test_get_unknown_memory_returns_404(self, client, test_db):
+        """測試記憶不存在"""
+        response = client.get("/api/v1/memories/missing")
+
+        assert response.status_code == 404
+        assert response.json()["code"] == "MEMORY_NOT_FOUND"
+
+    def test_update_memory_syncs_vector_store_and_catalog(self, client, catalog, mem0_client):
+        """測試更新記憶"""
+        response = client.put(
+            f"/api/v1/memories/{catalog}-1",
+            json={"content": "偏好 AI 相關科技股"},
+        )
+
+        assert response.status_code == 200
+        assert response.json()["content"] == "偏好 AI 相關科技股"
+        assert response.json()["category"] == "preference"
+        mem0_client.update.assert_called_once_with(
+            memory_id=f"{catalog}-1", data="偏好 AI 相關科技股"
+        )
+
+    def test_delete_memory_removes_catalog_row(self, client, catalog, mem0_client):
+        """測試刪除記憶"""
+        response = client.delete(f"/api/v1/memories/{catalog}-2")
+
+        assert response.status_code == 204
+        assert MemoryMetadataStore.get(f"{catalog}-2") is None
+        assert MemoryMetadataStore.count_by_user(catalog) == 2
+
+    def test_batch_delete_by_category(self, client, catalog, mem0_client):
+        """測試依類別批量刪除"""
+        response = client.post(
+            "/api/v1/memories/batch-delete",
+            json={"user_id": catalog, "category": "preference"},
+        )
+
+        assert response.json()["deleted_count"] == 2
+        assert mem0_client.delete.call_count == 2
+        assert MemoryMetadataStore.count_by_user(catalog) == 1
+
+    def test_list_paginates_with_cursor(self, client, catalog, mem0_client):
+        """測試依建立時間列出時以 next_cursor 分頁"""
+        first = client.get("/api/v1/memories", params={"user_id": catalog, "limit": 2}).json()
+        second = client.get(
+            "/api/v1/memories",
+            params={"user_id": catalog, "limit": 2, "cursor": first["next_cursor"]},
+        ).json()
+
+        ids = [m["memory_id"] for m in first["memories"] + second["memories"]]
+        assert len(set(ids)) == 3
+        assert second["next_cursor"] is None
+
+    def test_list_rejects_invalid_cursor(self, client, catalog):
+        """測試無效游標"""
+        response = client.get("/api/v1/memories", params={"user_id": catalog, "cursor": "bad"})
+
+        assert response.status_code == 400
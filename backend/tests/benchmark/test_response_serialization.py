@@ -0,0 +1,77 @@
+"""
+回應序列化效能測試
+
+比較 Pydantic 模型路徑與 FastJSONResponse 快速路徑，
+以 50 則訊息的對話歷史回應為基準。
+"""
+
+import json
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from src.api.responses import FastJSONResponse
+from src.api.schemas.chat import MessageListResponse
+from src.models.conversation import Message
+
+
+HISTORY_SIZE = 50
+
+
+@pytest.fixture
+def history_payload() -> dict:
+    """50 則訊息的歷史回應內容"""
+    messages = [
+        Message(
+            conversation_id="550e8400-e29b-41d4-a716-446655440000",
+            role="user" if i % 2 == 0 else "assistant",
+            content="根據您的風險承受度，建議將資產分散配置於台股 ETF 與債券基金。" * 8,
+            message_id=i + 1,
+            timestamp="2025-01-01T00:00:00",
+        ).to_dict()
+        for i in range(HISTORY_SIZE)
+    ]
+    return {
+        "code": "SUCCESS",
+        "data": messages,
+        "meta": {"total": HISTORY_SIZE, "count": HISTORY_SIZE},
+    }
+
+
+def _render_via_model(payload: dict) -> bytes:
+    """原有路徑：建立 Pydantic 模型後再由 FastAPI 編碼"""
+    model = MessageListResponse(**payload)
+    return JSONResponse(content=jsonable_encoder(model)).body
+
+
+def _render_fast(payload: dict) -> bytes:
+    """快速路徑：直接序列化可信任的字典"""
+    return FastJSONResponse(content=payload).body
+
+
+@pytest.mark.benchmark(group="history-response")
+def test_history_response_via_model(benchmark, history_payload):
+    """基準：Pydantic 模型路徑"""
+    body = benchmark(_render_via_model, history_payload)
+    assert len(json.loads(body)["data"]) == HISTORY_SIZE
+
+
+@pytest.mark.benchmark(group="history-response")
+def test_history_response_fast_path(benchmark, history_payload):
+    """基準：FastJSONResponse 快速路徑"""
+    body = benchmark(_render_fast, history_payload)
+    assert len(json.loads(body)["data"]) == HISTORY_SIZE
+
+
+def test_fast_path_matches_model_output(history_payload):
+    """測試快速路徑輸出與模型路徑語意一致"""
+    assert json.loads(_render_fast(history_payload)) == json.loads(
+        _render_via_model(history_payload)
+    )
+
+
+def test_fast_path_preserves_cjk_text(history_payload):
+    """測試快速路徑不會將中文轉義為 \\u 序列"""
+    body = _render_fast(history_payload)
+    assert "資產分散".encode("utf-8") in body
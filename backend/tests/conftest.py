@@ -15,10 +15,13 @@ from fastapi.testclient import TestClient
 
 from src.config import settings
 from src.main import app
+from src.providers import set_provider
 from src.storage.database import DatabaseManager
 from src.services.embedding_service import EmbeddingService
 from src.services.llm_service import LLMService
 from src.services.memory_service import MemoryService
+from src.services.usage_service import UsageService
+from src.utils.tokens import set_calibration_scale
 
 
 # ============================================================================
@@ -49,9 +52,14 @@ def reset_services():
     yield
     # 重置後
     DatabaseManager._db = None
-    EmbeddingService._client = None
-    LLMService._model = None
+    EmbeddingService._provider = None
+    LLMService._provider = None
+    set_provider(None)
     MemoryService._mem0_client = None
+    MemoryService._unavailable = None
+    MemoryService._query_vectors.clear()
+    UsageService._samples_since_calibration = 0
+    set_calibration_scale(1.0)
 
 
 # ============================================================================
@@ -296,7 +304,7 @@ def patch_google_api():
     Yields:
         None
     """
-    with patch("src.services.embedding_service.genai") as mock_genai:
+    with patch("src.providers.gemini.genai") as mock_genai:
         mock_genai.embed_content.return_value = {
             "embedding": [0.1] * 768,
         }
@@ -336,3 +344,4 @@ def pytest_configure(config):
     config.addinivalue_line("markers", "integration: 整合測試")
     config.addinivalue_line("markers", "api: API 測試")
     config.addinivalue_line("markers", "slow: 慢速測試")
+    config.addinivalue_line("markers", "benchmark: 效能基準測試")
@@ -0,0 +1,155 @@
+"""
+批量聊天單元測試
+
+測試 NDJSON 輸入輸出、檢查點續跑、同一對話的順序與依上游回饋調整的節奏。
+"""
+
+import io
+import json
+import threading
+import time
+import uuid
+from unittest.mock import patch
+
+from src.services.bulk_chat_service import AdaptivePacer, BulkChatService
+from src.utils.exceptions import LLMError, ValidationError
+
+PROCESS_MESSAGE = "src.services.bulk_chat_service.ConversationService.process_message"
+
+
+def _fake_process_message(calls=None, fail_messages=()):
+    """模擬 process_message：記錄呼叫順序，指定訊息拋出 LLMError"""
+    lock = threading.Lock()
+
+    def process_message(user_id, conversation_id, message):
+        if not user_id:
+            raise ValidationError("user_id 不能為空")
+        if message in fail_messages:
+            raise LLMError("upstream unavailable")
+        time.sleep(0.01)
+        if calls is not None:
+            with lock:
+                calls.append((conversation_id, message))
+        return {
+            "conversation_id": conversation_id or 99,
+            "user_message": {"role": "user", "content": message},
+            "assistant_message": {"role": "assistant", "content": f"回覆：{message}"},
+            "memories_used": [],
+        }
+
+    return process_message
+
+
+def _lines(*records):
+    return [json.dumps(record, ensure_ascii=False) + "\n" for record in records]
+
+
+def _results(output: io.StringIO):
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+class TestBulkChatRun:
+    """測試批量執行"""
+
+    async def test_writes_ndjson_and_resumes_from_checkpoint(self, test_db):
+        """測試結果寫為 NDJSON，以相同 job_id 重跑時只處理失敗的記錄"""
+        job_id = f"bulk-{uuid.uuid4()}"
+        user_id = str(uuid.uuid4())
+        lines = _lines(
+            {"id": "a", "user_id": user_id, "conversation_id": 1, "message": "近況如何？"},
+            {"id": "b", "user_id": user_id, "conversation_id": 2, "message": "失敗"},
+        ) + ["\n", "not json\n"]
+
+        output = io.StringIO()
+        with patch(PROCESS_MESSAGE, side_effect=_fake_process_message(fail_messages={"失敗"})):
+            report = await BulkChatService.run(lines, output, job_id=job_id, rate=0)
+
+        results = {result["key"]: result for result in _results(output)}
+        assert (report.processed, report.succeeded, report.failed) == (3, 1, 2)
+        assert results["a"]["status"] == "succeeded"
+        assert results["a"]["conversation_id"] == "1"
+        assert results["a"]["result"]["assistant_message"]["content"] == "回覆：近況如何？"
+        assert results["b"]["error"]["code"] == "LLM_SERVICE_UNAVAILABLE"
+        assert results["line-4"]["error"]["code"] == "VALIDATION_ERROR"
+        assert BulkChatService.completed_keys(job_id) == {"a"}
+
+        calls = []
+        with patch(PROCESS_MESSAGE, side_effect=_fake_process_message(calls)):
+            rerun = await BulkChatService.run(lines, io.StringIO(), job_id=job_id, rate=0)
+
+        assert rerun.skipped == 1
+        assert calls == [("2", "失敗")]
+
+    async def test_same_conversation_runs_in_input_order(self, test_db):
+        """測試並行處理時同一對話的記錄依輸入順序執行"""
+        user_id = str(uuid.uuid4())
+        records = [
+            {"user_id": user_id, "conversation_id": 7 if i % 2 else 8, "message": f"第{i}則"}
+            for i in range(10)
+        ]
+        calls = []
+        with patch(PROCESS_MESSAGE, side_effect=_fake_process_message(calls)):
+            report = await BulkChatService.run(
+                _lines(*records), io.StringIO(), job_id=f"bulk-{uuid.uuid4()}", concurrency=4, rate=0
+            )
+
+        assert report.succeeded == 10
+        for conversation_id in ("7", "8"):
+            expected = [r["message"] for r in records if str(r["conversation_id"]) == conversation_id]
+            assert [message for key, message in calls if key == conversation_id] == expected
+
+    async def test_progress_callback(self, test_db):
+        """測試依指定筆數回報進度"""
+        user_id = str(uuid.uuid4())
+        records = [{"user_id": user_id, "message": f"第{i}則"} for i in range(5)]
+        progress = []
+        with patch(PROCESS_MESSAGE, side_effect=_fake_process_message()):
+            await BulkChatService.run(
+                _lines(*records),
+                io.StringIO(),
+                job_id=f"bulk-{uuid.uuid4()}",
+                rate=0,
+                progress_every=2,
+                on_progress=lambda report: progress.append(report.processed),
+            )
+        assert progress == [2, 4]
+
+    async def test_upstream_errors_slow_the_pace(self, test_db):
+        """測試 LLM 錯誤時減速"""
+        user_id = str(uuid.uuid4())
+        records = [{"user_id": user_id, "conversation_id": 1, "message": "失敗"}]
+        with patch(PROCESS_MESSAGE, side_effect=_fake_process_message(fail_messages={"失敗"})), \
+             patch("src.services.bulk_chat_service.AdaptivePacer.on_throttled") as on_throttled:
+            report = await BulkChatService.run(
+                _lines(*records), io.StringIO(), job_id=f"bulk-{uuid.uuid4()}", rate=1000
+            )
+        assert report.throttled == 1
+        on_throttled.assert_called_once()
+
+
+class TestAdaptivePacer:
+    """測試節奏控制"""
+
+    def test_halves_on_throttle_and_recovers(self):
+        """測試受限時減半、成功時逐步回升且不超過目標"""
+        pacer = AdaptivePacer(rate=10.0, min_rate=1.0, recovery=0.1)
+        pacer.on_throttled()
+        pacer.on_throttled()
+        assert pacer.rate == 2.5
+        for _ in range(3):
+            pacer.on_success()
+        assert pacer.rate == 5.5
+        for _ in range(10):
+            pacer.on_success()
+        assert pacer.rate == 10.0
+        for _ in range(10):
+            pacer.on_throttled()
+        assert pacer.rate == 1.0
+
+    async def test_spaces_starts(self):
+        """測試依速率間隔開始"""
+        pacer = AdaptivePacer(rate=50.0)
+        started = time.monotonic()
+        for _ in range(4):
+            await pacer.wait()
+        assert time.monotonic() - started >= 3 / 50 - 0.005
@@ -0,0 +1,226 @@
+"""
+非同步聊天作業單元測試
+
+測試 POST /chat/jobs 立即返回、背景執行、輪詢、回呼與重新啟動後的恢復。
+"""
+
+import asyncio
+import json
+import socket
+import urllib.request
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.services.chat_job_service import ChatJobService, _callback_opener
+from src.utils.exceptions import QuotaExceededError, RateLimitError
+
+
+def _resolves_to(address: str):
+    """模擬主機名稱解析為指定位址"""
+    return patch(
+        "src.services.chat_job_service.socket.getaddrinfo",
+        return_value=[(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", (address, 443))],
+    )
+
+
+def _turn_result(message: str = "你好") -> dict:
+    """process_message 的模擬結果"""
+    return {
+        "conversation_id": 42,
+        "user_message": {"id": 1, "role": "user", "content": message},
+        "assistant_message": {"id": 2, "role": "assistant", "content": "您好"},
+        "memories_used": [{"id": "mem_1", "content": "偏好科技股", "metadata": None}],
+    }
+
+
+class TestChatJobRoutes:
+    """測試作業 API"""
+
+    def test_create_returns_202_and_polls_pending(self, client, test_db):
+        """測試建立作業立即返回 202，未完成時輪詢附帶 Retry-After"""
+        user_id = str(uuid.uuid4())
+        with patch.object(ChatJobService, "start") as start:
+            response = client.post("/api/v1/chat/jobs", json={"user_id": user_id, "message": "你好"})
+
+        assert response.status_code == 202
+        job = response.json()["data"]
+        assert job["status"] == "queued"
+        assert response.headers["Location"] == f"/api/v1/chat/jobs/{job['id']}"
+        start.assert_called_once_with(job["id"])
+
+        polled = client.get(f"/api/v1/chat/jobs/{job['id']}")
+        assert polled.status_code == 200
+        assert polled.json()["data"]["status"] == "queued"
+        assert polled.headers["Retry-After"] == "1"
+
+    def test_rejects_invalid_callback_url(self, client, test_db):
+        """測試回呼網址必須為 http/https"""
+        response = client.post(
+            "/api/v1/chat/jobs",
+            json={"user_id": str(uuid.uuid4()), "message": "你好", "callback_url": "file:///etc/passwd"},
+        )
+        assert response.status_code == 422
+
+    @pytest.mark.parametrize(
+        "callback_url",
+        [
+            "http://127.0.0.1:8000/hook",
+            "http://169.254.169.254/latest/meta-data/",
+            "http://10.0.0.5/hook",
+            "http://[::1]/hook",
+        ],
+    )
+    def test_rejects_internal_callback_url(self, client, test_db, callback_url):
+        """測試回呼網址不可指向迴路、私有或鏈路本地位址"""
+        with patch.object(ChatJobService, "start") as start:
+            response = client.post(
+                "/api/v1/chat/jobs",
+                json={"user_id": str(uuid.uuid4()), "message": "你好", "callback_url": callback_url},
+            )
+        assert response.status_code == 422
+        assert response.json()["details"]["field"] == "callback_url"
+        start.assert_not_called()
+
+    def test_unknown_job_returns_404(self, client, test_db):
+        """測試不存在的作業返回 404"""
+        response = client.get("/api/v1/chat/jobs/missing")
+        assert response.status_code == 404
+        assert response.json()["code"] == "NOT_FOUND"
+
+
+class TestChatJobExecution:
+    """測試作業執行"""
+
+    async def test_run_stores_result_once(self, client, test_db):
+        """測試執行成功後可輪詢到與 /chat 相同結構的結果，且作業只執行一次"""
+        job = ChatJobService.create(str(uuid.uuid4()), "你好")
+        with patch(
+            "src.services.chat_job_service.ConversationService.process_message",
+            return_value=_turn_result(),
+        ) as process:
+            await ChatJobService.run(job["id"])
+            await ChatJobService.run(job["id"])
+
+        process.assert_called_once()
+        data = client.get(f"/api/v1/chat/jobs/{job['id']}").json()["data"]
+        assert data["status"] == "succeeded"
+        assert data["result"]["conversation_id"] == "42"
+        assert data["result"]["assistant_message"]["content"] == "您好"
+        assert data["result"]["memories_used"][0]["id"] == "mem_1"
+        assert data["error"] is None
+
+    async def test_run_records_failure(self, test_db):
+        """測試回合失敗時記錄錯誤代碼"""
+        job = ChatJobService.create(str(uuid.uuid4()), "你好")
+        error = QuotaExceededError(used_tokens=10, quota_tokens=10, retry_after_seconds=60)
+        with patch(
+            "src.services.chat_job_service.ConversationService.process_message",
+            side_effect=error,
+        ):
+            await ChatJobService.run(job["id"])
+
+        stored = ChatJobService.get(job["id"])
+        assert stored["status"] == "failed"
+        assert stored["error_code"] == "QUOTA_EXCEEDED"
+        assert stored["completed_at"] is not None
+
+    async def test_waits_when_conversation_queue_is_full(self, test_db):
+        """測試對話佇列已滿時等待重試而非失敗"""
+        job = ChatJobService.create(str(uuid.uuid4()), "你好", conversation_id="7")
+        scheduler_run = AsyncMock(side_effect=[RateLimitError(retry_after_seconds=0), _turn_result()])
+        with patch("src.services.chat_job_service.conversation_scheduler.run", scheduler_run):
+            await ChatJobService.run(job["id"])
+
+        assert scheduler_run.await_count == 2
+        assert scheduler_run.await_args.args[0] == "7"
+        assert ChatJobService.get(job["id"])["status"] == "succeeded"
+
+    async def test_callback_receives_result(self, test_db):
+        """測試完成後以 POST 通知回呼網址"""
+        job = ChatJobService.create(str(uuid.uuid4()), "你好", callback_url="https://example.com/hook")
+        with patch(
+            "src.services.chat_job_service.ConversationService.process_message",
+            return_value=_turn_result(),
+        ), _resolves_to("93.184.216.34"), patch.object(_callback_opener, "open", MagicMock()) as post:
+            await ChatJobService.run(job["id"])
+
+        request = post.call_args.args[0]
+        assert request.full_url == "https://example.com/hook"
+        assert request.get_method() == "POST"
+        body = json.loads(request.data)
+        assert (body["id"], body["status"]) == (job["id"], "succeeded")
+        assert ChatJobService.get(job["id"])["callback_status"] == "delivered"
+
+    async def test_failed_callback_is_recorded(self, test_db):
+        """測試回呼失敗不影響作業結果"""
+        job = ChatJobService.create(str(uuid.uuid4()), "你好", callback_url="https://example.com/hook")
+        with patch(
+            "src.services.chat_job_service.ConversationService.process_message",
+            return_value=_turn_result(),
+        ), _resolves_to("93.184.216.34"), patch.object(
+            _callback_opener, "open", side_effect=ValueError("bad response"),
+        ):
+            await ChatJobService.run(job["id"])
+
+        stored = ChatJobService.get(job["id"])
+        assert (stored["status"], stored["callback_status"]) == ("succeeded", "failed")
+
+    async def test_callback_rechecks_address_before_sending(self, test_db):
+        """測試送出前重新解析，主機改指向內部位址時不送出"""
+        job = ChatJobService.create(str(uuid.uuid4()), "你好", callback_url="https://example.com/hook")
+        with patch(
+            "src.services.chat_job_service.ConversationService.process_message",
+            return_value=_turn_result(),
+        ), _resolves_to("169.254.169.254"), patch.object(_callback_opener, "open") as post:
+            await ChatJobService.run(job["id"])
+
+        post.assert_not_called()
+        assert ChatJobService.get(job["id"])["callback_status"] == "failed"
+
+    def test_callback_does_not_follow_redirects(self):
+        """測試回呼不跟隨重新導向"""
+        assert not any(
+            type(handler) is urllib.request.HTTPRedirectHandler
+            for handler in _callback_opener.handlers
+        )
+        request = urllib.request.Request("https://example.com/hook", data=b"{}", method="POST")
+        handler = next(
+            handler for handler in _callback_opener.handlers
+            if isinstance(handler, urllib.request.HTTPRedirectHandler)
+        )
+        assert handler.redirect_request(request, None, 302, "Found", {}, "http://169.254.169.254/") is None
+
+
+class TestChatJobRecovery:
+    """測試重新啟動後的恢復"""
+
+    def test_resume_requeues_queued_and_fails_interrupted_jobs(self, test_db):
+        """測試排隊中的作業重新排程，中斷於執行中的作業標記為失敗而不重新執行"""
+        running = ChatJobService.create(str(uuid.uuid4()), "執行中")
+        assert ChatJobService._claim(running["id"])
+        queued = ChatJobService.create(str(uuid.uuid4()), "排隊中")
+
+        with patch.object(ChatJobService, "start") as start:
+            assert ChatJobService.resume_pending() == 1
+
+        started = [call.args[0] for call in start.call_args_list]
+        assert queued["id"] in started and running["id"] not in started
+        interrupted = ChatJobService.get(running["id"])
+        assert (interrupted["status"], interrupted["error_code"]) == ("failed", "JOB_INTERRUPTED")
+        assert interrupted["completed_at"] is not None
+
+    async def test_interrupted_job_notifies_callback(self, test_db):
+        """測試中斷的作業有回呼網址時送出失敗通知"""
+        running = ChatJobService.create(
+            str(uuid.uuid4()), "執行中", callback_url="https://example.com/hook"
+        )
+        assert ChatJobService._claim(running["id"])
+
+        with patch.object(ChatJobService, "_notify", AsyncMock()) as notify:
+            ChatJobService.resume_pending()
+            await asyncio.gather(*ChatJobService._tasks)
+
+        notified = notify.await_args.args[0]
+        assert (notified["id"], notified["status"]) == (running["id"], "failed")
@@ -0,0 +1,196 @@
+"""
+WebSocket 聊天單元測試
+
+測試工作階段保留的上下文、串流片段、錯誤訊框與閒置逾時。
+"""
+
+import asyncio
+import uuid
+from concurrent.futures import Future
+from unittest.mock import MagicMock, patch
+
+import pytest
+from starlette.websockets import WebSocket
+
+from src.providers import set_provider
+from src.providers.local import LocalProvider
+from src.services.chat_session import ChatSession
+from src.services.llm_service import LLMService
+from src.services.summary_service import ConversationSummaryService
+from src.storage.storage_service import StorageService
+from src.utils.exceptions import LLMError
+
+
+@pytest.fixture
+def local_chat(test_db):
+    """以本地提供者執行回合，略過記憶擷取與搜索、背景摘要刷新並停用語義快取"""
+    set_provider(LocalProvider())
+    with patch("src.services.conversation_service.MemoryService.add_memory_from_message", return_value=None), \
+         patch("src.services.conversation_service.ConversationSummaryService.schedule_refresh", return_value=None), \
+         patch("src.services.conversation_service.MemoryService.search_memories", return_value=[]), \
+         patch("src.services.conversation_service.settings.response_cache_enabled", False):
+        yield
+
+
+def _send_turn(ws, message: str):
+    """送出訊息並接收片段與結束訊框"""
+    ws.send_json({"type": "message", "message": message})
+    deltas = []
+    while True:
+        frame = ws.receive_json()
+        if frame["type"] != "chunk":
+            return "".join(deltas), frame
+        deltas.append(frame["delta"])
+
+
+class TestChatWebSocket:
+    """測試 WebSocket 聊天"""
+
+    def test_streams_turns_with_warm_session(self, client, local_chat):
+        """測試串流回應，且回合中不再重新查詢對話與歷史"""
+        user_id = str(uuid.uuid4())
+        with client.websocket_connect(f"/api/v1/chat/ws?user_id={user_id}") as ws:
+            session = ws.receive_json()
+            assert (session["type"], session["history"]) == ("session", 0)
+
+            with patch.object(StorageService, "get_conversation") as get_conversation, \
+                 patch.object(StorageService, "get_recent_messages") as get_recent:
+                streamed, done = _send_turn(ws, "最近市場如何？")
+                assert done["type"] == "done"
+                assert len(streamed) > 16  # 本地提供者以 16 字元分片
+                assert streamed == done["data"]["assistant_message"]["content"]
+                assert "對話回合數: 1" in streamed
+
+                streamed, done = _send_turn(ws, "台積電呢？")
+
+            get_conversation.assert_not_called()
+            get_recent.assert_not_called()
+            # 第二回合帶入工作階段保留的上一回合（user、model、user）
+            assert "對話回合數: 3" in streamed
+            assert done["data"]["conversation_id"] == session["conversation_id"]
+
+        history = StorageService.get_recent_messages(session["conversation_id"], 10)
+        assert [message.role for message in history] == ["user", "assistant", "user", "assistant"]
+
+    def test_reconnect_preloads_history(self, client, local_chat):
+        """測試重新連線時預載既有對話的近期訊息"""
+        user_id = str(uuid.uuid4())
+        with client.websocket_connect(f"/api/v1/chat/ws?user_id={user_id}") as ws:
+            conversation_id = ws.receive_json()["conversation_id"]
+            _send_turn(ws, "你好")
+
+        with client.websocket_connect(
+            f"/api/v1/chat/ws?user_id={user_id}&conversation_id={conversation_id}"
+        ) as ws:
+            session = ws.receive_json()
+            assert (session["conversation_id"], session["history"]) == (conversation_id, 2)
+
+    def test_rejects_other_users_conversation(self, client, local_chat):
+        """測試對話不屬於該使用者時拒絕連線"""
+        conversation = StorageService.create_conversation(str(uuid.uuid4()))
+        with client.websocket_connect(
+            f"/api/v1/chat/ws?user_id={uuid.uuid4()}&conversation_id={conversation.id}"
+        ) as ws:
+            frame = ws.receive_json()
+        assert (frame["type"], frame["code"]) == ("error", "VALIDATION_ERROR")
+
+    def test_invalid_frames_and_ping(self, client, local_chat):
+        """測試無效訊框回報錯誤但保持連線，ping 回應 pong"""
+        with client.websocket_connect(f"/api/v1/chat/ws?user_id={uuid.uuid4()}") as ws:
+            ws.receive_json()
+            ws.send_text("not json")
+            assert ws.receive_json()["code"] == "INVALID_FRAME"
+            _, frame = _send_turn(ws, "   ")
+            assert frame["code"] == "VALIDATION_ERROR"
+            ws.send_json({"type": "ping"})
+            assert ws.receive_json() == {"type": "pong"}
+
+    def test_binary_frame_is_rejected_without_closing(self, client, local_chat):
+        """測試二進位訊框回報 INVALID_FRAME 並保持連線"""
+        with client.websocket_connect(f"/api/v1/chat/ws?user_id={uuid.uuid4()}") as ws:
+            ws.receive_json()
+            ws.send_bytes(b"\x00\x01")
+            assert ws.receive_json()["code"] == "INVALID_FRAME"
+            ws.send_json({"type": "ping"})
+            assert ws.receive_json() == {"type": "pong"}
+
+    def test_idle_timeout_closes_connection(self, client, local_chat):
+        """測試閒置逾時後關閉連線"""
+        with patch("src.api.routes.chat_ws.settings.ws_idle_timeout_seconds", 0.05):
+            with client.websocket_connect(f"/api/v1/chat/ws?user_id={uuid.uuid4()}") as ws:
+                ws.receive_json()
+                assert ws.receive_json()["code"] == "IDLE_TIMEOUT"
+                assert ws.receive()["type"] == "websocket.close"
+
+    def test_slow_consumer_closes_connection(self, client, local_chat):
+        """測試客戶端讀取過慢時中斷連線，不因回合結束時佇列已滿而卡住"""
+        original_send_text = WebSocket.send_text
+
+        async def stalled_send_text(self, data):
+            if '"chunk"' in data:
+                await asyncio.sleep(60)
+            await original_send_text(self, data)
+
+        # 第一個片段卡在送出中，第二個片段填滿佇列後回合即結束
+        with patch.object(WebSocket, "send_text", stalled_send_text), \
+             patch.object(LocalProvider, "stream", return_value=iter(["甲", "乙"])), \
+             patch("src.api.routes.chat_ws.settings.ws_send_queue_size", 1), \
+             patch("src.api.routes.chat_ws.settings.ws_send_timeout_seconds", 0.2):
+            with client.websocket_connect(f"/api/v1/chat/ws?user_id={uuid.uuid4()}") as ws:
+                assert ws.receive_json()["type"] == "session"
+                ws.send_json({"type": "message", "message": "你好"})
+                frame = ws.receive()
+        assert (frame["type"], frame["code"]) == ("websocket.close", 1008)
+
+
+class TestChatSession:
+    """測試工作階段狀態"""
+
+    def test_history_is_bounded_and_summary_follows_refresh(self):
+        """測試近期訊息緩衝不超過歷史上限，背景摘要更新後重新讀取並捨棄已摘要的訊息"""
+        with patch.object(ConversationSummaryService, "history_limit", return_value=4):
+            session = ChatSession(str(uuid.uuid4()), MagicMock(id="c1"))
+        for i in range(5):
+            session.append(MagicMock(id=i + 1, role="user", content=f"第{i}則", token_count=3))
+        assert [message["content"] for message in session.history()] == ["第1則", "第2則", "第3則", "第4則"]
+
+        with patch.object(StorageService, "get_conversation_summary", return_value=("新摘要", 3)):
+            unchanged, updated = Future(), Future()
+            session.track_summary_refresh(unchanged)
+            unchanged.set_result(False)
+            assert session.summary is None
+            session.track_summary_refresh(updated)
+            updated.set_result(True)
+        assert session.summary == "新摘要"
+        assert [message["content"] for message in session.history()] == ["第3則", "第4則"]
+
+
+class TestStreamingGeneration:
+    """測試串流生成"""
+
+    def test_on_chunk_receives_stream(self):
+        """測試提供 on_chunk 時以串流生成並逐片段回呼"""
+        LLMService._provider = MagicMock()
+        LLMService._provider.stream.return_value = iter(["你好", "，世界"])
+        received = []
+
+        assert LLMService.generate_response("嗨", on_chunk=received.append) == "你好，世界"
+        assert received == ["你好", "，世界"]
+        LLMService._provider.generate.assert_not_called()
+
+    def test_no_retry_after_chunks_were_sent(self):
+        """測試已送出片段後的暫時性錯誤不重試，避免重複片段"""
+        transient = ConnectionError("reset")
+
+        def stream(*args, **kwargs):
+            yield "你好"
+            raise transient
+
+        LLMService._provider = MagicMock()
+        LLMService._provider.stream.side_effect = stream
+        received = []
+
+        with pytest.raises(LLMError):
+            LLMService.generate_response("嗨", on_chunk=received.append)
+        assert LLMService._provider.stream.call_count == 1
+        assert received == ["你好"]
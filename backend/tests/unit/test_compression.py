@@ -0,0 +1,100 @@
+"""
+回應壓縮中介軟體單元測試
+
+測試 CompressionMiddleware 的編碼協商、門檻與串流略過行為。
+"""
+
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from src.api import compression
+from src.api.compression import CompressionMiddleware, negotiate_encoding
+
+
+LARGE_TEXT = "根據您的風險承受度，建議分散投資於 ETF 與債券。" * 200
+
+
+@pytest.fixture
+def client() -> TestClient:
+    """建立掛載壓縮中介軟體的測試應用"""
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/large")
+    async def large():
+        return PlainTextResponse(LARGE_TEXT)
+
+    @app.get("/small")
+    async def small():
+        return PlainTextResponse("ok")
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(3):
+                yield LARGE_TEXT.encode("utf-8")
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return TestClient(app)
+
+
+class TestNegotiateEncoding:
+    """測試 Accept-Encoding 協商"""
+
+    def test_prefers_brotli_when_equal_weight(self):
+        assert negotiate_encoding("gzip, br", ["br", "gzip"]) == "br"
+
+    def test_respects_q_values(self):
+        assert negotiate_encoding("br;q=0.1, gzip;q=0.9", ["br", "gzip"]) == "gzip"
+
+    def test_wildcard_and_refusal(self):
+        assert negotiate_encoding("*", ["br", "gzip"]) == "br"
+        assert negotiate_encoding("gzip;q=0", ["gzip"]) is None
+        assert negotiate_encoding("", ["br", "gzip"]) is None
+
+
+class TestCompressionMiddleware:
+    """測試壓縮中介軟體行為"""
+
+    def test_gzip_large_response(self, client):
+        """測試大於門檻的回應以 gzip 壓縮"""
+        response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert response.text == LARGE_TEXT
+
+    @pytest.mark.skipif(compression.brotli is None, reason="Brotli 未安裝")
+    def test_brotli_preferred_when_available(self, client):
+        """測試支援 Brotli 時優先使用 br"""
+        response = client.get("/large", headers={"Accept-Encoding": "gzip, br"})
+
+        assert response.headers["content-encoding"] == "br"
+        assert response.text == LARGE_TEXT
+
+    def test_small_response_not_compressed(self, client):
+        """測試小於門檻的回應不壓縮"""
+        response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+
+        assert "content-encoding" not in response.headers
+        assert response.text == "ok"
+
+    def test_streaming_response_bypassed(self, client):
+        """測試串流回應不壓縮"""
+        response = client.get("/stream", headers={"Accept-Encoding": "gzip, br"})
+
+        assert "content-encoding" not in response.headers
+        assert response.text == LARGE_TEXT * 3
+
+    def test_compressed_size_smaller(self):
+        """測試 gzip 壓縮後體積確實縮小"""
+        middleware = CompressionMiddleware(app=None)
+        body = LARGE_TEXT.encode("utf-8")
+
+        assert len(middleware.compress(body, "gzip")) < len(body) / 4
+        assert gzip.decompress(middleware.compress(body, "gzip")) == body
@@ -0,0 +1,108 @@
+"""
+對話滾動摘要單元測試
+
+測試移出上下文視窗的訊息併入摘要、刷新門檻與並行寫入保護。
+"""
+
+import uuid
+from unittest.mock import patch
+
+import pytest
+
+from src.services.summary_service import ConversationSummaryService
+from src.storage.storage_service import StorageService
+
+
+@pytest.fixture
+def conversation_id(test_db) -> str:
+    """建立含 6 個回合（12 則訊息）的對話"""
+    conversation = StorageService.create_conversation(str(uuid.uuid4()))
+    for turn in range(6):
+        StorageService.save_message(conversation.id, "user", f"問題 {turn}")
+        StorageService.save_message(conversation.id, "assistant", f"回答 {turn}")
+    return conversation.id
+
+
+@pytest.fixture
+def summary_settings():
+    """上下文視窗 4 則、每 2 個回合刷新"""
+    with patch("src.services.summary_service.settings") as mock_settings:
+        mock_settings.conversation_summary_enabled = True
+        mock_settings.conversation_context_window = 4
+        mock_settings.conversation_summary_every_turns = 2
+        mock_settings.conversation_summary_batch_messages = 40
+        mock_settings.conversation_summary_max_chars = 800
+        yield mock_settings
+
+
+class TestRecentMessages:
+    """測試最近訊息查詢"""
+
+    def test_returns_latest_in_chronological_order(self, conversation_id):
+        """測試返回最新的訊息且由舊到新排列"""
+        messages = StorageService.get_recent_messages(conversation_id, 3)
+        assert [m.content for m in messages] == ["回答 4", "問題 5", "回答 5"]
+
+
+class TestSummaryRefresh:
+    """測試摘要刷新"""
+
+    def test_folds_messages_leaving_window(self, conversation_id, summary_settings):
+        """測試只摘要移出視窗的訊息"""
+        with patch(
+            "src.services.summary_service.LLMService.summarize_conversation",
+            return_value="使用者問了 0 到 3 號問題",
+        ) as summarize:
+            assert ConversationSummaryService.refresh(conversation_id) is True
+
+        previous, messages = summarize.call_args.args
+        assert previous is None
+        assert [m["content"] for m in messages] == [
+            f"{role} {turn}" for turn in range(4) for role in ("問題", "回答")
+        ]
+
+        summary, through_id = StorageService.get_conversation_summary(conversation_id)
+        assert summary == "使用者問了 0 到 3 號問題"
+        window = StorageService.get_recent_messages(conversation_id, 4)
+        assert through_id == window[0].id - 1
+
+    def test_waits_for_enough_evicted_turns(self, conversation_id, summary_settings):
+        """測試移出視窗的回合不足時不呼叫 LLM"""
+        with patch(
+            "src.services.summary_service.LLMService.summarize_conversation",
+            return_value="摘要",
+        ) as summarize:
+            ConversationSummaryService.refresh(conversation_id)
+            StorageService.save_message(conversation_id, "user", "問題 6")
+            StorageService.save_message(conversation_id, "assistant", "回答 6")
+
+            assert ConversationSummaryService.refresh(conversation_id) is False
+            assert summarize.call_count == 1
+
+    def test_context_includes_messages_not_yet_summarized(self, conversation_id, summary_settings):
+        """測試歷史包含摘要之後、上下文視窗之前尚未摘要的訊息"""
+        messages = StorageService.get_conversation_messages(conversation_id, limit=12)
+        StorageService.update_conversation_summary(conversation_id, "前兩回合", messages[3].id, 0)
+
+        summary, through_id, history = ConversationSummaryService.load_context(conversation_id)
+
+        assert (summary, through_id) == ("前兩回合", messages[3].id)
+        assert [m.content for m in history] == [m.content for m in messages[4:]]
+        assert len(history) > summary_settings.conversation_context_window
+
+    def test_stale_refresh_does_not_overwrite(self, conversation_id):
+        """測試涵蓋位置已變更時不覆寫摘要"""
+        assert StorageService.update_conversation_summary(conversation_id, "新", 5, 0) is True
+        assert StorageService.update_conversation_summary(conversation_id, "舊", 3, 0) is False
+        assert StorageService.get_conversation_summary(conversation_id) == ("新", 5)
+
+    def test_schedule_runs_in_background(self, conversation_id, summary_settings):
+        """測試背景刷新"""
+        with patch(
+            "src.services.summary_service.LLMService.summarize_conversation",
+            return_value="背景摘要",
+        ):
+            future = ConversationSummaryService.schedule_refresh(conversation_id)
+            assert future.result(timeout=5) is True
+
+        assert StorageService.get_conversation_summary(conversation_id)[0] == "背景摘要"
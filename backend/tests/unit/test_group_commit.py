@@ -0,0 +1,108 @@
+"""
+群組提交寫入器單元測試
+
+測試 GroupCommitWriter 的批次提交、單筆失敗隔離與停止時排空佇列。
+"""
+
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from src.storage.group_commit import GroupCommitWriter
+
+
+@pytest.fixture
+def db_path(tmp_path) -> Path:
+    """建立含測試資料表的資料庫"""
+    path = tmp_path / "writer.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY AUTOINCREMENT, value TEXT UNIQUE)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def writer(db_path):
+    """啟動中的寫入器"""
+    writer = GroupCommitWriter(db_path, interval_ms=20, max_batch=64)
+    writer.start()
+    yield writer
+    writer.stop()
+
+
+def _insert(value: str):
+    def op(cursor):
+        cursor.execute("INSERT INTO items (value) VALUES (?)", (value,))
+        return cursor.lastrowid
+
+    return op
+
+
+def _count(db_path: Path) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+    finally:
+        conn.close()
+
+
+class TestGroupCommitWriter:
+    """測試 GroupCommitWriter"""
+
+    def test_submit_returns_result_after_commit(self, writer, db_path):
+        """測試 Future 於提交後返回 op 結果"""
+        row_id = writer.submit(_insert("a")).result(timeout=2)
+
+        assert row_id == 1
+        assert _count(db_path) == 1
+
+    def test_concurrent_writes_share_transactions(self, writer, db_path):
+        """測試多個執行緒的寫入被合併至較少的交易"""
+        start = threading.Barrier(16)
+
+        def write(n):
+            start.wait()
+            return writer.submit(_insert(f"v{n}")).result(timeout=5)
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            ids = list(pool.map(write, range(16)))
+
+        assert sorted(ids) == list(range(1, 17))
+        assert _count(db_path) == 16
+        assert writer.writes_committed == 16
+        assert writer.batches_committed < 16
+
+    def test_failed_write_does_not_abort_batch(self, writer, db_path):
+        """測試單筆寫入失敗不影響同批次的其他寫入"""
+        futures = [
+            writer.submit(_insert("dup")),
+            writer.submit(_insert("dup")),
+            writer.submit(_insert("ok")),
+        ]
+
+        assert futures[0].result(timeout=2) is not None
+        with pytest.raises(sqlite3.IntegrityError):
+            futures[1].result(timeout=2)
+        assert futures[2].result(timeout=2) is not None
+        assert _count(db_path) == 2
+
+    def test_stop_drains_pending_writes(self, db_path):
+        """測試停止時已排隊的寫入全部提交"""
+        writer = GroupCommitWriter(db_path, interval_ms=50)
+        writer.start()
+        futures = [writer.submit(_insert(f"x{n}")) for n in range(10)]
+        writer.stop()
+
+        assert all(f.done() and f.exception() is None for f in futures)
+        assert _count(db_path) == 10
+
+    def test_submit_requires_running_writer(self, db_path):
+        """測試未啟動時提交會失敗"""
+        writer = GroupCommitWriter(db_path)
+
+        with pytest.raises(RuntimeError):
+            writer.submit(_insert("a"))
@@ -0,0 +1,120 @@
+"""
+對沖請求單元測試
+"""
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.services.hedging import HedgedGenerator
+from src.services.llm_service import LLMService
+from src.services.retry import RetryBudget
+
+
+def _fast_stream():
+    yield "快速"
+    yield "回應"
+
+
+@pytest.fixture
+def hedger():
+    """首個樣本後即開始對沖的生成器"""
+    generator = HedgedGenerator(
+        quantile=0.9,
+        min_samples=1,
+        budget=RetryBudget(ratio=0.5, max_tokens=1.0),
+        max_workers=4,
+    )
+    yield generator
+    generator.shutdown()
+
+
+class TestHedgedGenerator:
+    """測試對沖生成"""
+
+    def test_no_hedge_without_samples(self, hedger):
+        """測試沒有延遲樣本時不對沖"""
+        stream_fn = MagicMock(side_effect=_fast_stream)
+
+        assert hedger.generate(stream_fn) == "快速回應"
+        stream_fn.assert_called_once()
+        assert hedger.stats()["hedged"] == 0
+
+    def test_slow_first_token_starts_hedge_and_cancels_loser(self, hedger):
+        """測試首個片段過慢時啟動對沖，先完成者勝出，主要嘗試被取消"""
+        hedger.generate(_fast_stream)
+        release = threading.Event()
+        closed = threading.Event()
+
+        def slow_stream():
+            try:
+                release.wait(5)
+                yield "慢"
+                yield "回應"
+            finally:
+                closed.set()
+
+        streams = iter([slow_stream, _fast_stream])
+        result = hedger.generate(lambda: next(streams)())
+        release.set()
+
+        assert result == "快速回應"
+        assert closed.wait(5)
+        stats = hedger.stats()
+        assert stats["hedged"] == 1
+        assert stats["hedge_wins"] == 1
+        assert stats["hedge_rate"] == 0.5
+        assert stats["p99_improvement_ms"] >= 0
+
+    def test_hedge_ttft_excludes_hedge_delay(self, hedger):
+        """測試對沖嘗試的 TTFT 從其本身開始計算，不含等待對沖的時間"""
+
+        def delayed_stream():
+            time.sleep(0.1)
+            yield "回應"
+
+        hedger.generate(delayed_stream)
+        release = threading.Event()
+
+        def stuck_stream():
+            release.wait(5)
+            yield "慢"
+
+        streams = iter([stuck_stream, _fast_stream])
+        assert hedger.generate(lambda: next(streams)()) == "快速回應"
+        release.set()
+
+        assert hedger.stats()["hedge_wins"] == 1
+        assert hedger._ttft[-1] < 0.05
+
+    def test_budget_caps_hedges(self):
+        """測試預算用盡後不再對沖"""
+        hedger = HedgedGenerator(
+            quantile=0.9, min_samples=1, budget=RetryBudget(ratio=0.0, max_tokens=1.0), max_workers=4
+        )
+        for _ in range(50):
+            hedger.generate(_fast_stream)
+
+        def slow_stream():
+            time.sleep(0.05)
+            yield "慢回應"
+
+        for _ in range(3):
+            hedger.generate(slow_stream)
+        hedger.shutdown()
+
+        stats = hedger.stats()
+        assert stats["hedged"] == 1
+        assert stats["budget_rejected"] == 2
+
+    def test_generate_response_uses_stream_when_enabled(self):
+        """測試啟用對沖時 LLM 生成改用串流"""
+        LLMService._provider = MagicMock()
+        LLMService._provider.stream.side_effect = lambda *args, **kwargs: iter(["好", "的"])
+
+        with patch("src.services.llm_service.settings.llm_hedging_enabled", True):
+            assert LLMService.generate_response("你好") == "好的"
+
+        LLMService._provider.generate.assert_not_called()
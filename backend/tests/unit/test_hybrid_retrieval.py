@@ -0,0 +1,188 @@
+"""
+混合檢索單元測試
+
+測試 CJK 分詞、FTS5 索引同步、reciprocal-rank fusion 與混合檢索模式。
+"""
+
+import uuid
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.services.embedding_service import EmbeddingService
+from src.services.memory_service import MemoryService
+from src.services.retrieval import reciprocal_rank_fusion
+from src.storage.database import DatabaseManager
+from src.storage.memory_fts import MemoryFtsIndex
+from src.storage.memory_store import MemoryMetadataStore
+
+
+@pytest.fixture
+def user_id() -> str:
+    """測試使用者 ID"""
+    return str(uuid.uuid4())
+
+
+@pytest.fixture
+def mem0_client():
+    """模擬 Mem0 客戶端"""
+    client = MagicMock()
+    MemoryService._mem0_client = client
+    return client
+
+
+@pytest.fixture
+def catalog(test_db, user_id):
+    """建立含股票代號與中文內容的記憶"""
+    MemoryMetadataStore.apply_changes(
+        user_id,
+        upserts=[
+            (f"{user_id}-etf", "定期定額買 0050", "behavior"),
+            (f"{user_id}-tsmc", "長期持有 TSMC 台積電", "preference"),
+            (f"{user_id}-risk", "風險承受度中等", "fact"),
+        ],
+    )
+    return user_id
+
+
+def _search(user_id: str, query: str):
+    return MemoryFtsIndex.search(DatabaseManager.get_connection(), user_id, query, 10)
+
+
+class TestTokenize:
+    """測試分詞"""
+
+    def test_mixed_text(self):
+        """測試英數取完整詞、CJK 取 bigram"""
+        assert MemoryFtsIndex.tokenize("偏好科技股 0050 TSMC") == [
+            "偏好", "好科", "科技", "技股", "0050", "tsmc",
+        ]
+
+    def test_single_cjk_character_kept(self):
+        """測試單一 CJK 字保留為詞"""
+        assert MemoryFtsIndex.tokenize("和") == ["和"]
+
+
+class TestMemoryFtsIndex:
+    """測試 FTS5 索引"""
+
+    def test_exact_code_match(self, catalog):
+        """測試精確比對基金代碼"""
+        results = _search(catalog, "0050 的績效")
+
+        assert [r["id"] for r in results] == [f"{catalog}-etf"]
+
+    def test_cjk_bigram_match(self, catalog):
+        """測試中文 bigram 比對"""
+        results = _search(catalog, "台積電還能買嗎")
+
+        assert results[0]["id"] == f"{catalog}-tsmc"
+
+    def test_filters_by_category(self, catalog):
+        """測試類別篩選在全文檢索中套用"""
+        conn = DatabaseManager.get_connection()
+        assert MemoryFtsIndex.search(conn, catalog, "0050 台積電", 10, category="preference")[0]["id"] == (
+            f"{catalog}-tsmc"
+        )
+        assert [r["id"] for r in MemoryFtsIndex.search(conn, catalog, "0050 台積電", 10, category="fact")] == []
+
+    def test_scoped_to_user(self, catalog):
+        """測試僅返回該使用者的記憶"""
+        assert _search(str(uuid.uuid4()), "0050") == []
+
+    def test_update_and_delete_keep_index_in_sync(self, catalog):
+        """測試更新與刪除同步索引"""
+        MemoryMetadataStore.update(f"{catalog}-risk", "持有 00878 高股息")
+        assert [r["id"] for r in _search(catalog, "00878")] == [f"{catalog}-risk"]
+        assert _search(catalog, "風險") == []
+
+        MemoryMetadataStore.delete_many([f"{catalog}-risk"])
+        assert _search(catalog, "00878") == []
+
+    def test_user_is_matched_through_index(self, catalog):
+        """測試使用者以 owner 索引詞比對，而非在 MATCH 後過濾"""
+        other = str(uuid.uuid4())
+        MemoryMetadataStore.upsert(other, f"{other}-etf", "也買 0050")
+        owner = MemoryFtsIndex.owner_token(catalog)
+
+        rows = DatabaseManager.get_connection().execute(
+            "SELECT rowid FROM memory_fts WHERE memory_fts MATCH ?", (f'owner : "{owner}" AND "0050"',)
+        ).fetchall()
+
+        assert len(rows) == 1
+        assert [r["id"] for r in _search(other, "0050")] == [f"{other}-etf"]
+
+    def test_legacy_index_is_rebuilt(self, catalog):
+        """測試舊版以 user_id 欄位過濾的索引會被重建"""
+        conn = DatabaseManager.get_connection()
+        conn.executescript(
+            "DROP TABLE memory_fts; DROP TABLE memory_fts_map;"
+            "CREATE VIRTUAL TABLE memory_fts USING fts5(tokens, user_id UNINDEXED);"
+            "CREATE TABLE memory_fts_map (memory_id TEXT PRIMARY KEY, fts_rowid INTEGER NOT NULL);"
+        )
+
+        assert MemoryFtsIndex.ensure(conn) is True
+        assert [r["id"] for r in _search(catalog, "0050")] == [f"{catalog}-etf"]
+
+    def test_rebuild_from_catalog(self, catalog):
+        """測試從記憶目錄重建索引"""
+        DatabaseManager.execute_write(lambda cursor: cursor.execute("DELETE FROM memory_fts"))
+        assert _search(catalog, "0050") == []
+
+        DatabaseManager.execute_write(MemoryFtsIndex.rebuild)
+        assert [r["id"] for r in _search(catalog, "0050")] == [f"{catalog}-etf"]
+
+
+class TestReciprocalRankFusion:
+    """測試 reciprocal-rank fusion"""
+
+    def test_items_in_both_rankings_rank_first(self):
+        """測試兩個檢索器都命中的項目排在最前"""
+        vector = [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+        lexical = [{"id": "c"}, {"id": "d"}]
+
+        fused = reciprocal_rank_fusion([vector, lexical], k=60)
+
+        assert [m["id"] for m in fused] == ["c", "a", "b", "d"]
+        assert fused[0]["metadata"]["rrf_score"] == pytest.approx(1 / 63 + 1 / 61)
+
+
+class TestHybridSearch:
+    """測試混合檢索模式"""
+
+    def test_hybrid_recovers_code_missed_by_vector_search(self, catalog, mem0_client):
+        """測試向量搜索漏掉的代碼由全文檢索補回"""
+        mem0_client.search.return_value = {
+            "results": [{"id": f"{catalog}-risk", "memory": "風險承受度中等", "score": 0.4}]
+        }
+
+        results = MemoryService.search_memories(catalog, "0050", top_k=2, mode="hybrid")
+
+        assert {m["id"] for m in results} == {f"{catalog}-risk", f"{catalog}-etf"}
+        assert all("rrf_score" in m["metadata"] for m in results)
+
+    def test_rerank_keeps_lexical_hit_below_similarity_cutoff(self, catalog, mem0_client):
+        """測試重新排序不以相似度門檻剔除全文檢索補回的記憶"""
+        mem0_client.search.return_value = {
+            "results": [{"id": f"{catalog}-risk", "memory": "風險承受度中等", "score": 0.4}]
+        }
+        # 查詢向量與 risk 相近，與 etf（僅全文檢索命中）幾乎正交
+        mem0_client.vector_store.collection.get.return_value = {
+            "ids": [f"{catalog}-risk", f"{catalog}-etf"],
+            "embeddings": [[0.9, 0.1, 0.0], [0.1, 0.0, 0.99]],
+        }
+
+        with patch.object(EmbeddingService, "embed_text", return_value=[1.0, 0.0, 0.0]), patch(
+            "src.services.memory_service.settings.memory_min_similarity", 0.5
+        ):
+            results = MemoryService.search_memories(catalog, "0050", top_k=2, mode="hybrid")
+
+        assert [m["id"] for m in results] == [f"{catalog}-risk", f"{catalog}-etf"]
+        assert results[1]["metadata"]["relevance"] < 0.5
+        assert results[1]["metadata"]["lexical_match"] is True
+
+    def test_vector_mode_skips_full_text(self, catalog, mem0_client):
+        """測試 vector 模式不使用全文檢索"""
+        mem0_client.search.return_value = {"results": []}
+
+        assert MemoryService.search_memories(catalog, "0050", mode="vector") == []
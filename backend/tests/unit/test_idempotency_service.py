@@ -0,0 +1,166 @@
+"""
+冪等服務單元測試
+
+測試 IdempotencyService 的儲存重播、內容衝突與 single-flight 行為。
+"""
+
+import asyncio
+import json
+import uuid
+from unittest.mock import patch
+
+import pytest
+
+from src.services.idempotency_service import IdempotencyService
+from src.utils.exceptions import DatabaseError, IdempotencyKeyMismatchError
+
+
+@pytest.fixture
+def user_id() -> str:
+    """測試使用者 ID"""
+    return str(uuid.uuid4())
+
+
+async def _wait_inflight(user_id: str, key: str) -> None:
+    """等待請求進入處理中狀態（查詢已儲存回應在執行緒池中執行）"""
+    for _ in range(100):
+        if (user_id, key) in IdempotencyService._inflight:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("request never became in-flight")
+
+
+class TestIdempotencyService:
+    """測試 IdempotencyService"""
+
+    async def test_first_call_executes_and_stores(self, test_db, user_id):
+        """測試首次呼叫執行 handler 並儲存結果"""
+        calls = []
+
+        async def handler():
+            calls.append(1)
+            return 200, json.dumps({"code": "SUCCESS"}), {}
+
+        result = await IdempotencyService.execute(user_id, "key-1", "hash-a", handler)
+
+        assert result == (200, '{"code": "SUCCESS"}', {}, False)
+        assert len(calls) == 1
+        assert IdempotencyService.get_stored(user_id, "key-1").status_code == 200
+
+    async def test_repeat_key_replays_stored_response(self, test_db, user_id):
+        """測試重複的鍵重播已儲存的回應"""
+        calls = []
+
+        async def handler():
+            calls.append(1)
+            return 200, "{}", {"x-request-id": "r1"}
+
+        await IdempotencyService.execute(user_id, "key-2", "hash-a", handler)
+        status_code, body, headers, replayed = await IdempotencyService.execute(
+            user_id, "key-2", "hash-a", handler
+        )
+
+        assert (status_code, body, replayed) == (200, "{}", True)
+        assert headers == {"x-request-id": "r1"}
+        assert len(calls) == 1
+
+    async def test_mismatched_payload_raises(self, test_db, user_id):
+        """測試同一鍵用於不同內容時拋出例外"""
+
+        async def handler():
+            return 200, "{}", {}
+
+        await IdempotencyService.execute(user_id, "key-3", "hash-a", handler)
+
+        with pytest.raises(IdempotencyKeyMismatchError):
+            await IdempotencyService.execute(user_id, "key-3", "hash-b", handler)
+
+    @pytest.mark.parametrize("status_code", [503, 429, 409])
+    async def test_retryable_results_not_stored(self, test_db, user_id, status_code):
+        """測試可重試的結果（5xx、429 等）不儲存，重試會重新執行"""
+        calls = []
+
+        async def handler():
+            calls.append(1)
+            return status_code, "{}", {"retry-after": "5"}
+
+        await IdempotencyService.execute(user_id, "key-4", "hash-a", handler)
+        await IdempotencyService.execute(user_id, "key-4", "hash-a", handler)
+
+        assert len(calls) == 2
+        assert IdempotencyService.get_stored(user_id, "key-4") is None
+
+    async def test_store_failure_still_returns_result(self, test_db, user_id):
+        """測試儲存失敗時仍返回已完成的結果"""
+
+        async def handler():
+            return 200, "{}", {}
+
+        with patch.object(IdempotencyService, "store", side_effect=DatabaseError("locked")):
+            result = await IdempotencyService.execute(user_id, "key-7", "hash-a", handler)
+
+        assert result == (200, "{}", {}, False)
+        assert IdempotencyService._inflight == {}
+
+    async def test_concurrent_calls_share_inflight_result(self, test_db, user_id):
+        """測試進行中的請求被後續相同鍵的請求共用"""
+        calls = []
+        release = asyncio.Event()
+
+        async def handler():
+            calls.append(1)
+            await release.wait()
+            return 200, '{"n": 1}', {}
+
+        first = asyncio.create_task(
+            IdempotencyService.execute(user_id, "key-5", "hash-a", handler)
+        )
+        await _wait_inflight(user_id, "key-5")
+        second = asyncio.create_task(
+            IdempotencyService.execute(user_id, "key-5", "hash-a", handler)
+        )
+        await asyncio.sleep(0.05)
+        release.set()
+
+        results = await asyncio.gather(first, second)
+
+        assert len(calls) == 1
+        assert results[0] == (200, '{"n": 1}', {}, False)
+        assert results[1] == (200, '{"n": 1}', {}, True)
+
+    async def test_cancelled_caller_does_not_abort_turn(self, test_db, user_id):
+        """測試發起請求的客戶端中斷時回合仍完成並儲存，等待者取得同一結果"""
+        calls = []
+        release = asyncio.Event()
+
+        async def handler():
+            calls.append(1)
+            await release.wait()
+            return 200, '{"n": 1}', {}
+
+        first = asyncio.create_task(
+            IdempotencyService.execute(user_id, "key-7", "hash-a", handler)
+        )
+        await _wait_inflight(user_id, "key-7")
+        second = asyncio.create_task(
+            IdempotencyService.execute(user_id, "key-7", "hash-a", handler)
+        )
+        await asyncio.sleep(0.05)
+        first.cancel()
+        release.set()
+
+        assert await second == (200, '{"n": 1}', {}, True)
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert len(calls) == 1
+        assert IdempotencyService.get_stored(user_id, "key-7").body == '{"n": 1}'
+        assert IdempotencyService._inflight == {}
+
+    async def test_expired_keys_are_ignored_and_purged(self, test_db, user_id):
+        """測試過期的鍵不會重播且可被清理"""
+        with patch("src.services.idempotency_service.settings") as mock_settings:
+            mock_settings.idempotency_ttl_hours = -1
+            IdempotencyService.store(user_id, "key-6", "hash-a", 200, "{}")
+
+        assert IdempotencyService.get_stored(user_id, "key-6") is None
+        assert IdempotencyService.purge_expired() >= 1
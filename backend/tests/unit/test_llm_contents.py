@@ -0,0 +1,40 @@
+"""
+LLM 多輪 contents 單元測試
+"""
+
+from src.services.llm_service import SYSTEM_INSTRUCTION, LLMService
+
+
+class TestBuildContents:
+    """測試 contents 組裝"""
+
+    def test_history_becomes_turns_without_duplicate_question(self):
+        """測試歷史轉為 user/model 回合且不重複本回合提問"""
+        contents = LLMService.build_contents(
+            "那 0050 呢？",
+            memories=[{"content": "偏好 ETF"}, {"content": ""}],
+            conversation_history=[
+                {"role": "user", "content": "推薦什麼？"},
+                {"role": "assistant", "content": "可以考慮指數型基金"},
+                {"role": "user", "content": "那 0050 呢？"},
+            ],
+            profile="風險承受度: 低",
+        )
+
+        assert [turn["role"] for turn in contents] == ["user", "model", "user"]
+        final = contents[-1]["parts"][0]
+        assert final.startswith("使用者投資輪廓：\n風險承受度: 低")
+        assert "• 偏好 ETF" in final
+        assert final.endswith("【當前提問】\n那 0050 呢？")
+        assert SYSTEM_INSTRUCTION not in final
+
+    def test_consecutive_roles_are_merged(self):
+        """測試相鄰同角色訊息合併為單一回合"""
+        contents = LLMService.build_contents(
+            "問題",
+            conversation_history=[
+                {"role": "user", "content": "第一則"},
+                {"role": "user", "content": "第二則"},
+            ],
+        )
+        assert contents == [{"role": "user", "parts": ["第一則\n\n第二則\n\n【當前提問】\n問題"]}]
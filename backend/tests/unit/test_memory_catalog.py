@@ -0,0 +1,205 @@
+"""
+記憶目錄單元測試
+
+測試 MemoryService 在新增、刪除時維護 memory_metadata，以及從向量儲存回填。
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.services.memory_service import MemoryService
+from src.storage.database import DatabaseManager
+from src.storage.memory_store import MemoryMetadataStore
+
+
+@pytest.fixture
+def user_id() -> str:
+    """測試使用者 ID"""
+    return str(uuid.uuid4())
+
+
+@pytest.fixture
+def mem0_client():
+    """模擬 Mem0 客戶端"""
+    client = MagicMock()
+    MemoryService._mem0_client = client
+    return client
+
+
+class TestMemoryCatalog:
+    """測試記憶目錄維護"""
+
+    def test_add_applies_all_events(self, test_db, user_id, mem0_client):
+        """測試 add() 的新增、更新與刪除事件全部套用"""
+        MemoryMetadataStore.upsert(user_id, f"{user_id}-old", "舊記憶")
+        MemoryMetadataStore.upsert(user_id, f"{user_id}-upd", "待更新")
+        mem0_client.add.return_value = {
+            "results": [
+                {"id": f"{user_id}-new", "memory": "新記憶", "event": "ADD"},
+                {"id": f"{user_id}-upd", "memory": "已更新", "event": "UPDATE"},
+                {"id": f"{user_id}-old", "memory": "舊記憶", "event": "DELETE"},
+            ]
+        }
+
+        MemoryService.add_memory(user_id, "內容", {"category": "fact"})
+
+        assert MemoryMetadataStore.get(f"{user_id}-old") is None
+        assert MemoryMetadataStore.get(f"{user_id}-upd")["content"] == "已更新"
+        assert MemoryMetadataStore.get(f"{user_id}-new")["category"] == "fact"
+
+    def test_failed_vector_delete_keeps_catalog_row(self, test_db, user_id, mem0_client):
+        """測試向量刪除失敗時保留目錄記錄"""
+        MemoryMetadataStore.upsert(user_id, f"{user_id}-1", "記憶")
+        mem0_client.delete.side_effect = Exception("chroma unavailable")
+
+        assert MemoryService.delete_memory(user_id, f"{user_id}-1") is False
+        assert MemoryMetadataStore.get(f"{user_id}-1") is not None
+
+    def test_backfill_from_vector_store(self, test_db, user_id, mem0_client):
+        """測試從向量儲存回填目錄"""
+        mem0_client.vector_store.list.return_value = [
+            [
+                SimpleNamespace(id=f"{user_id}-a", payload={"user_id": user_id, "data": "記憶 A"}),
+                SimpleNamespace(
+                    id=f"{user_id}-b",
+                    payload={"user_id": user_id, "data": "記憶 B", "category": "preference"},
+                ),
+                SimpleNamespace(id="orphan", payload={"data": "無使用者"}),
+            ]
+        ]
+
+        assert MemoryService.backfill_catalog(batch_size=1) == 2
+        assert MemoryMetadataStore.count_by_user(user_id) == 2
+        assert MemoryMetadataStore.count_by_user(user_id, "preference") == 1
+
+    def test_backfill_keeps_original_timestamps(self, test_db, user_id, mem0_client):
+        """測試回填的記錄保留向量儲存中的建立時間，缺少時才使用目前時間"""
+        original = datetime(2024, 1, 2, 3, 4, 5).astimezone()
+        mem0_client.vector_store.list.return_value = [
+            [
+                SimpleNamespace(
+                    id=f"{user_id}-old",
+                    payload={"user_id": user_id, "data": "舊記憶", "created_at": original.isoformat()},
+                ),
+                SimpleNamespace(id=f"{user_id}-new", payload={"user_id": user_id, "data": "無時間"}),
+            ]
+        ]
+
+        MemoryService.backfill_catalog()
+
+        row = DatabaseManager.get_connection().execute(
+            "SELECT created_at, last_accessed_at FROM memory_metadata WHERE memory_id = ?",
+            (f"{user_id}-old",),
+        ).fetchone()
+        assert row[0] == "2024-01-02T03:04:05"
+        assert row[1] > "2024-01-02T03:04:05"
+        assert MemoryMetadataStore.get(f"{user_id}-new")["created_at"] > "2024-01-02T03:04:05"
+        latest = MemoryService.get_latest_memories(user_id, limit=2)
+        assert [memory["id"] for memory in latest] == [f"{user_id}-new", f"{user_id}-old"]
+
+    def test_backfilled_old_memory_survives_ttl_sweep(self, test_db, user_id, mem0_client):
+        """測試回填的舊記憶不會在下一次 TTL 清除時被刪除"""
+        created = (datetime.now() - timedelta(days=400)).astimezone().isoformat()
+        mem0_client.vector_store.list.return_value = [
+            [
+                SimpleNamespace(
+                    id=f"{user_id}-old",
+                    payload={"user_id": user_id, "data": "舊記憶", "created_at": created},
+                ),
+            ]
+        ]
+
+        MemoryService.backfill_catalog()
+        with patch("src.services.memory_lifecycle_service.settings.memory_ttl_days", 30):
+            assert MemoryService.sweep_expired() == 0
+
+        mem0_client.delete.assert_not_called()
+        assert MemoryMetadataStore.get(f"{user_id}-old") is not None
+
+    def test_backfill_removes_rows_missing_from_vector_store(self, test_db, user_id, mem0_client):
+        """測試回填刪除向量儲存中已不存在的目錄記錄"""
+        MemoryMetadataStore.upsert(user_id, f"{user_id}-gone", "已刪除的記憶")
+        mem0_client.vector_store.list.return_value = [
+            [SimpleNamespace(id=f"{user_id}-kept", payload={"user_id": user_id, "data": "記憶"})]
+        ]
+
+        assert MemoryService.backfill_catalog() == 1
+        assert MemoryMetadataStore.get(f"{user_id}-gone") is None
+        assert MemoryMetadataStore.get(f"{user_id}-kept") is not None
+
+
+class TestLatestMemories:
+    """測試依建立時間取得最新記憶"""
+
+    @pytest.fixture
+    def seeded(self, test_db, user_id):
+        """建立 5 筆記憶，建立時間依序遞增"""
+
+        def insert(cursor):
+            for n in range(5):
+                cursor.execute(
+                    """
+                    INSERT INTO memory_metadata (memory_id, user_id, content, category, created_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    (
+                        f"{user_id}-{n}",
+                        user_id,
+                        f"記憶 {n}",
+                        "fact" if n % 2 else "preference",
+                        f"2025-01-0{n + 1}T00:00:00",
+                    ),
+                )
+
+        DatabaseManager.execute_write(insert)
+        return user_id
+
+    def test_returns_newest_first_without_vector_search(self, seeded, mem0_client):
+        """測試返回最新記憶且不呼叫向量搜索"""
+        memories = MemoryService.get_latest_memories(seeded, limit=2)
+
+        assert [m["content"] for m in memories] == ["記憶 4", "記憶 3"]
+        mem0_client.search.assert_not_called()
+
+    def test_keyset_pagination_walks_all_pages(self, seeded):
+        """測試游標分頁依序走訪所有記憶"""
+        seen, cursor = [], None
+        while True:
+            page, cursor = MemoryService.get_latest_memories_page(seeded, limit=2, cursor=cursor)
+            seen.extend(m["content"] for m in page)
+            if cursor is None:
+                break
+
+        assert seen == [f"記憶 {n}" for n in range(4, -1, -1)]
+
+    def test_category_filter(self, seeded):
+        """測試類別篩選"""
+        memories = MemoryService.get_latest_memories(seeded, limit=10, category="fact")
+
+        assert [m["content"] for m in memories] == ["記憶 3", "記憶 1"]
+
+    def test_invalid_cursor_raises(self, seeded):
+        """測試無效游標"""
+        with pytest.raises(ValueError):
+            MemoryService.get_latest_memories_page(seeded, cursor="%%%")
+
+    def test_query_uses_recency_index(self, seeded):
+        """測試查詢使用 (user_id, created_at DESC) 索引而非額外排序"""
+        conn = DatabaseManager.get_connection()
+        plan = conn.execute(
+            """
+            EXPLAIN QUERY PLAN
+            SELECT memory_id FROM memory_metadata
+            WHERE user_id = ? AND (created_at, memory_id) < (?, ?)
+            ORDER BY created_at DESC, memory_id DESC LIMIT 2
+            """,
+            (seeded, "2025-01-04T00:00:00", "x"),
+        ).fetchall()
+        details = " ".join(row[-1] for row in plan)
+
+        assert "idx_memory_user_created" in details
+        assert "TEMP B-TREE" not in details
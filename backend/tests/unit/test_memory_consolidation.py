@@ -0,0 +1,140 @@
+"""
+記憶合併單元測試
+
+測試重複記憶分群、代表記憶選擇、試跑模式與檢查點續跑。
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.services.memory_consolidation_service import MemoryConsolidationService
+from src.services.memory_service import MemoryService
+from src.storage.database import DatabaseManager
+from src.storage.memory_store import MemoryMetadataStore, MemoryUsage
+
+
+@pytest.fixture
+def user_id() -> str:
+    """測試使用者 ID"""
+    return str(uuid.uuid4())
+
+
+@pytest.fixture
+def seeded(test_db, user_id):
+    """建立兩條重複記憶與一條無關記憶，並模擬其向量"""
+    now = datetime.now()
+    rows = [
+        (f"{user_id}-a", "每月定期定額 0050 五千元", [1.0, 0.0, 0.0], 0),
+        (f"{user_id}-b", "每月定額買 0050 五千", [0.99, 0.05, 0.0], 4),
+        (f"{user_id}-c", "風險承受度低", [0.0, 1.0, 0.0], 0),
+    ]
+
+    def insert(cursor):
+        for memory_id, content, _, hits in rows:
+            cursor.execute(
+                """
+                INSERT INTO memory_metadata
+                    (memory_id, user_id, content, created_at, last_accessed_at, hit_count)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (memory_id, user_id, content, now.isoformat(), now.isoformat(), hits),
+            )
+
+    DatabaseManager.execute_write(insert)
+
+    vectors = {memory_id: vector for memory_id, _, vector, _ in rows}
+    client = MagicMock()
+    client.vector_store.collection.get.side_effect = lambda ids, include: {
+        "ids": [i for i in ids if i in vectors],
+        "embeddings": [vectors[i] for i in ids if i in vectors],
+    }
+    MemoryService._mem0_client = client
+    return client
+
+
+class TestFindClusters:
+    """測試相似度分群"""
+
+    def test_groups_members_similar_to_each_other(self):
+        """測試群內記憶兩兩達門檻時分為同一群"""
+        vectors = [[1.0, 0.0], [0.0, 1.0], [0.99, 0.1], [0.98, 0.15]]
+        assert MemoryConsolidationService.find_clusters(vectors, 0.97) == [[0, 2, 3]]
+
+    def test_does_not_chain_through_intermediate_memory(self):
+        """測試 A≈B、B≈C 但 A 與 C 未達門檻時不合併 A 與 C"""
+        # cos(A, B) ≈ 0.980、cos(B, C) ≈ 0.988、cos(A, C) ≈ 0.931
+        vectors = [[1.0, 0.0], [0.0, 1.0], [0.98, 0.2], [0.93, 0.37]]
+        clusters = MemoryConsolidationService.find_clusters(vectors, 0.97)
+
+        assert clusters == [[0, 2]]
+        assert not any({0, 3} <= set(members) for members in clusters)
+
+    def test_no_duplicates(self):
+        """測試沒有重複時不分群"""
+        assert MemoryConsolidationService.find_clusters([[1.0, 0.0], [0.0, 1.0]], 0.9) == []
+        assert MemoryConsolidationService.find_clusters([[1.0, 0.0]], 0.9) == []
+
+    def test_choose_canonical_prefers_most_hits(self):
+        """測試代表記憶優先選命中次數多者"""
+        now = datetime.now()
+        usages = [
+            MemoryUsage("a", "u", now.isoformat(), now.isoformat(), 1),
+            MemoryUsage("b", "u", (now - timedelta(days=9)).isoformat(), now.isoformat(), 5),
+        ]
+        assert MemoryConsolidationService.choose_canonical(usages) == 1
+
+
+class TestConsolidationRun:
+    """測試合併作業"""
+
+    def test_dry_run_reports_without_changes(self, seeded, user_id):
+        """測試試跑只產生報告"""
+        report = MemoryConsolidationService.run(user_ids=[user_id], threshold=0.95, dry_run=True)
+
+        assert report.clusters == 1
+        assert report.rows_reclaimed == 1
+        assert report.merges[0]["canonical_id"] == f"{user_id}-b"
+        seeded.delete.assert_not_called()
+        assert MemoryMetadataStore.count_by_user(user_id) == 3
+        assert MemoryConsolidationService.completed_users(report.job_id) == set()
+
+    def test_merges_duplicates_and_checkpoints(self, seeded, user_id):
+        """測試刪除重複記憶並寫入檢查點，續跑時跳過已完成使用者"""
+        job_id = f"job-{user_id}"
+        report = MemoryConsolidationService.run(job_id=job_id, user_ids=[user_id], threshold=0.95)
+
+        seeded.delete.assert_called_once_with(memory_id=f"{user_id}-a", user_id=user_id)
+        assert report.rows_reclaimed == 1
+        assert set(MemoryMetadataStore.get_ids(user_id)) == {f"{user_id}-b", f"{user_id}-c"}
+        assert MemoryConsolidationService.completed_users(job_id) == {user_id}
+
+        rerun = MemoryConsolidationService.run(job_id=job_id, user_ids=[user_id], threshold=0.95)
+        assert rerun.users_skipped == 1
+        assert rerun.users_scanned == 0
+
+    def test_llm_merge_rewrites_canonical(self, seeded, user_id):
+        """測試 LLM 合併內容寫回代表記憶"""
+        with patch(
+            "src.services.memory_consolidation_service.LLMService.merge_memories",
+            return_value="每月定期定額 0050 新台幣五千元",
+        ) as merge:
+            MemoryConsolidationService.run(user_ids=[user_id], threshold=0.95, llm_merge=True)
+
+        merge.assert_called_once_with(["每月定額買 0050 五千", "每月定期定額 0050 五千元"])
+        seeded.update.assert_called_once_with(
+            memory_id=f"{user_id}-b", data="每月定期定額 0050 新台幣五千元"
+        )
+        assert MemoryMetadataStore.get(f"{user_id}-b")["content"] == "每月定期定額 0050 新台幣五千元"
+
+    def test_failed_user_is_not_checkpointed(self, seeded, user_id):
+        """測試失敗的使用者不寫入檢查點以便重試"""
+        seeded.vector_store.collection.get.side_effect = Exception("chroma unavailable")
+        job_id = f"job-fail-{user_id}"
+
+        report = MemoryConsolidationService.run(job_id=job_id, user_ids=[user_id])
+
+        assert report.users_failed == 1
+        assert MemoryConsolidationService.completed_users(job_id) == set()
@@ -0,0 +1,242 @@
+"""
+記憶生命週期單元測試
+
+測試記憶中繼資料追蹤、上限淘汰策略與 TTL 過期清除。
+"""
+
+import sqlite3
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.services.memory_lifecycle_service import MemoryLifecycleService
+from src.services.memory_service import MemoryService
+from src.storage.database import DatabaseManager
+from src.storage.memory_store import MemoryMetadataStore, MemoryUsage
+
+
+@pytest.fixture
+def user_id() -> str:
+    """測試使用者 ID"""
+    return str(uuid.uuid4())
+
+
+@pytest.fixture
+def mem0_client():
+    """模擬 Mem0 客戶端"""
+    client = MagicMock()
+    MemoryService._mem0_client = client
+    return client
+
+
+def _seed(user_id: str, rows):
+    """建立記憶：rows 為 (memory_id, created_days_ago, accessed_days_ago, hit_count)"""
+    now = datetime.now()
+
+    def insert(cursor):
+        for memory_id, created_ago, accessed_ago, hits in rows:
+            cursor.execute(
+                """
+                INSERT INTO memory_metadata
+                    (memory_id, user_id, content, created_at, last_accessed_at, hit_count)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    memory_id,
+                    user_id,
+                    f"content {memory_id}",
+                    (now - timedelta(days=created_ago)).isoformat(),
+                    (now - timedelta(days=accessed_ago)).isoformat(),
+                    hits,
+                ),
+            )
+
+    DatabaseManager.execute_write(insert)
+
+
+class TestEvictionPolicies:
+    """測試淘汰策略"""
+
+    @pytest.fixture
+    def seeded(self, test_db, user_id):
+        prefix = user_id[:8]
+        _seed(
+            user_id,
+            [
+                (f"{prefix}-a", 30, 1, 0),   # 最舊建立，最近存取
+                (f"{prefix}-b", 20, 15, 10),  # 久未存取但命中多
+                (f"{prefix}-c", 10, 12, 0),   # 久未存取且無命中
+                (f"{prefix}-d", 1, 1, 3),
+            ],
+        )
+        return prefix
+
+    def test_under_cap_selects_nothing(self, seeded, user_id):
+        """測試未超過上限時不淘汰"""
+        assert MemoryLifecycleService.select_evictions(user_id, max_memories=4, policy="lru") == []
+
+    def test_lru_evicts_least_recently_accessed(self, seeded, user_id):
+        """測試 LRU 淘汰最久未存取的記憶"""
+        victims = MemoryLifecycleService.select_evictions(user_id, max_memories=2, policy="lru")
+        assert victims == [f"{seeded}-b", f"{seeded}-c"]
+
+    def test_oldest_evicts_earliest_created(self, seeded, user_id):
+        """測試 oldest 淘汰最早建立的記憶"""
+        victims = MemoryLifecycleService.select_evictions(user_id, max_memories=3, policy="oldest")
+        assert victims == [f"{seeded}-a"]
+
+    def test_decay_keeps_frequently_hit_memories(self, seeded, user_id):
+        """測試 decay 策略保留命中多的記憶"""
+        victims = MemoryLifecycleService.select_evictions(user_id, max_memories=3, policy="decay")
+        assert victims == [f"{seeded}-c"]
+
+    def test_unknown_policy_raises(self, seeded, user_id):
+        """測試不支援的策略"""
+        with pytest.raises(ValueError):
+            MemoryLifecycleService.select_evictions(user_id, max_memories=1, policy="random")
+
+    def test_decay_score_halves_per_half_life(self):
+        """測試衰減分數每個半衰期減半"""
+        now = datetime.now()
+        usage = MemoryUsage(
+            memory_id="m",
+            user_id="u",
+            created_at=now.isoformat(),
+            last_accessed_at=(now - timedelta(days=7)).isoformat(),
+            hit_count=1,
+        )
+        assert MemoryLifecycleService.decay_score(usage, now, 7.0) == pytest.approx(1.0)
+
+
+class TestMemoryServiceLifecycle:
+    """測試 MemoryService 的生命週期整合"""
+
+    def test_add_records_metadata_from_results(self, test_db, user_id, mem0_client):
+        """測試新增記憶時寫入中繼資料"""
+        mem0_client.add.return_value = {
+            "results": [{"id": f"{user_id}-1", "memory": "偏好科技股", "event": "ADD"}]
+        }
+
+        MemoryService.add_memory_from_message(user_id, "我偏好投資科技股")
+
+        assert MemoryMetadataStore.count_by_user(user_id) == 1
+
+    def test_add_over_cap_evicts(self, test_db, user_id, mem0_client):
+        """測試超過上限時淘汰並刪除向量"""
+        _seed(user_id, [(f"{user_id}-old", 5, 5, 0)])
+        mem0_client.add.return_value = {
+            "results": [{"id": f"{user_id}-new", "memory": "新記憶", "event": "ADD"}]
+        }
+
+        with patch("src.services.memory_lifecycle_service.settings") as mock_settings:
+            mock_settings.memory_max_per_user = 1
+            mock_settings.memory_eviction_policy = "lru"
+            MemoryService.add_memory(user_id, "新記憶")
+
+        mem0_client.delete.assert_called_once_with(memory_id=f"{user_id}-old", user_id=user_id)
+        assert MemoryMetadataStore.get_oldest_ids(user_id, "created_at", 10) == [f"{user_id}-new"]
+
+    def test_search_records_access(self, test_db, user_id, mem0_client):
+        """測試檢索命中時更新存取統計"""
+        memory_id = f"{user_id}-hit"
+        _seed(user_id, [(memory_id, 3, 3, 0)])
+        mem0_client.search.return_value = {
+            "results": [{"id": memory_id, "memory": "內容", "score": 0.9}]
+        }
+
+        MemoryService.search_memories(user_id, "科技股")
+
+        usage = MemoryMetadataStore.get_usage(user_id)[0]
+        assert usage.hit_count == 1
+        assert usage.last_accessed_at > (datetime.now() - timedelta(minutes=1)).isoformat()
+
+    def test_sweep_removes_expired_in_batches(self, test_db, user_id, mem0_client):
+        """測試分批清除過期記憶"""
+        _seed(
+            user_id,
+            [(f"{user_id}-x{n}", 400, 400, 0) for n in range(5)] + [(f"{user_id}-fresh", 1, 1, 0)],
+        )
+
+        removed = MemoryService.sweep_expired(batch_size=2)
+
+        assert removed == 5
+        assert mem0_client.delete.call_count == 5
+        assert MemoryMetadataStore.count_by_user(user_id) == 1
+
+    def test_sweep_keeps_metadata_when_vector_delete_fails(self, test_db, user_id, mem0_client):
+        """測試向量刪除失敗時保留中繼資料以便重試"""
+        _seed(user_id, [(f"{user_id}-stuck", 400, 400, 0)])
+        mem0_client.delete.side_effect = Exception("chroma unavailable")
+        mem0_client.vector_store.collection.get.side_effect = Exception("chroma unavailable")
+
+        assert MemoryService.sweep_expired() == 0
+        assert MemoryMetadataStore.count_by_user(user_id) == 1
+
+        MemoryMetadataStore.delete_many([f"{user_id}-stuck"])
+
+    def test_sweep_continues_past_failed_deletes(self, test_db, user_id, mem0_client):
+        """測試刪除失敗的記憶不阻擋後續批次，向量已不存在的記憶直接刪除目錄記錄"""
+        _seed(
+            user_id,
+            [
+                (f"{user_id}-gone", 500, 500, 0),
+                (f"{user_id}-stuck", 450, 450, 0),
+                (f"{user_id}-x1", 400, 400, 0),
+                (f"{user_id}-x2", 400, 400, 0),
+            ],
+        )
+        failing = {f"{user_id}-gone", f"{user_id}-stuck"}
+
+        def delete(memory_id, user_id):
+            if memory_id in failing:
+                raise Exception("delete failed")
+
+        mem0_client.delete.side_effect = delete
+        # gone 的向量已不存在，stuck 的向量仍在
+        mem0_client.vector_store.collection.get.side_effect = lambda ids, include: {
+            "ids": [memory_id for memory_id in ids if memory_id.endswith("-stuck")]
+        }
+
+        assert MemoryService.sweep_expired(batch_size=2) == 3
+        assert MemoryMetadataStore.get_ids(user_id) == [f"{user_id}-stuck"]
+
+        MemoryMetadataStore.delete_many([f"{user_id}-stuck"])
+
+
+class TestMemoryMetadataMigration:
+    """測試既有資料庫的欄位遷移"""
+
+    def test_adds_lifecycle_columns_to_existing_table(self, tmp_path):
+        """測試舊版 memory_metadata 補上生命週期欄位"""
+        db_path = tmp_path / "legacy.db"
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            """
+            CREATE TABLE memory_metadata (
+                memory_id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                content TEXT NOT NULL,
+                category TEXT,
+                source_message_id INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP,
+                relevance REAL DEFAULT 0.0
+            )
+            """
+        )
+        conn.execute(
+            "INSERT INTO memory_metadata (memory_id, user_id, content, created_at) "
+            "VALUES ('m1', 'u1', 'c', '2024-01-01T00:00:00')"
+        )
+        conn.commit()
+        conn.close()
+
+        DatabaseManager.initialize(f"sqlite:///{db_path}")
+        try:
+            usage = MemoryMetadataStore.get_usage("u1")[0]
+            assert usage.last_accessed_at == "2024-01-01T00:00:00"
+            assert usage.hit_count == 0
+        finally:
+            DatabaseManager.close()
@@ -0,0 +1,79 @@
+"""
+模型路由單元測試
+"""
+
+import pytest
+
+from src.config import settings
+from src.services.model_router import FAST_ROUTE, STRONG_ROUTE, ModelRouter
+
+
+@pytest.fixture(autouse=True)
+def reset_stats():
+    """重置路由統計"""
+    ModelRouter.reset()
+    yield
+    ModelRouter.reset()
+
+
+class TestClassify:
+    """測試回合分類"""
+
+    def test_short_courtesy_goes_to_fast_model(self):
+        """測試簡短致謝走快速模型與較小輸出上限"""
+        decision = ModelRouter.classify("謝謝")
+        assert decision.route == FAST_ROUTE
+        assert decision.model == settings.llm_fast_model
+        assert decision.max_output_tokens == settings.llm_fast_max_output_tokens
+
+    @pytest.mark.parametrize(
+        "message, memory_count, reason",
+        [
+            ("股債要怎麼配置比較好？", 0, "keyword"),
+            ("推薦我一檔", 0, "keyword"),
+            ("現在適合買嗎", 0, "keyword"),
+            ("那 0050 呢", 3, "memories"),
+            ("我最近剛換工作，每個月可以多存一萬五千元左右，想知道接下來應該先處理什麼事情才好呢", 0, "length"),
+        ],
+    )
+    def test_complex_turns_go_to_strong_model(self, message, memory_count, reason):
+        """測試複雜回合走主要模型"""
+        decision = ModelRouter.classify(message, memory_count=memory_count)
+        assert decision.route == STRONG_ROUTE
+        assert decision.model == settings.mem0_llm_model
+        assert decision.reason == reason
+
+
+    def test_profile_turn_goes_to_strong_model(self):
+        """測試注入投資輪廓但沒有記憶的個人化回合走主要模型"""
+        decision = ModelRouter.classify("那 0050 呢", memory_count=0, has_profile=True)
+        assert decision.route == STRONG_ROUTE
+        assert decision.reason == "profile"
+        assert decision.max_output_tokens == settings.llm_strong_max_output_tokens
+
+
+class TestRouteMetrics:
+    """測試路由統計"""
+
+    def test_records_latency_per_route(self):
+        """測試每條路由分別記錄延遲與原因"""
+        fast = ModelRouter.classify("你好")
+        strong = ModelRouter.classify("幫我分析投資組合")
+        for latency in (100.0, 200.0, 300.0):
+            ModelRouter.record(fast, latency)
+        ModelRouter.record(strong, 1200.0, ok=False)
+
+        stats = ModelRouter.stats()
+        assert stats[FAST_ROUTE]["requests"] == 3
+        assert stats[FAST_ROUTE]["p50_ms"] == 200.0
+        assert stats[FAST_ROUTE]["reasons"] == {"simple": 3}
+        assert stats[STRONG_ROUTE]["errors"] == 1
+
+    def test_metrics_endpoint(self, client):
+        """測試 /metrics/routing 端點"""
+        ModelRouter.record(ModelRouter.classify("好的"), 50.0)
+
+        response = client.get("/metrics/routing")
+
+        assert response.status_code == 200
+        assert response.json()["routes"][FAST_ROUTE]["requests"] == 1
@@ -0,0 +1,165 @@
+"""
+投資輪廓服務單元測試
+
+測試規則式欄位擷取（含否定）、增量更新與重建、記憶變更掛鉤與略過搜索的判斷。
+"""
+
+import uuid
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.services.memory_service import MemoryService
+from src.services.profile_service import InvestorProfile, ProfileService
+
+
+@pytest.fixture
+def user_id() -> str:
+    """測試使用者 ID"""
+    return str(uuid.uuid4())
+
+
+class TestExtractFields:
+    """測試欄位擷取"""
+
+    def test_extracts_risk_horizon_and_sectors(self):
+        """測試擷取風險、期間與產業"""
+        fields = ProfileService.extract_fields("我是保守型投資人，打算長期持有半導體和 ETF")
+        assert fields == {
+            "risk_tolerance": "低",
+            "investment_horizon": "長期（5 年以上）",
+            "sectors": ["半導體", "ETF"],
+        }
+
+    def test_years_map_to_horizon(self):
+        """測試「N 年」轉為投資期間"""
+        fields = ProfileService.extract_fields("預計投資 3 年")
+        assert fields["investment_horizon"] == "中期（1-5 年）"
+
+    def test_unrelated_text(self):
+        """測試無相關資訊時不擷取"""
+        assert ProfileService.extract_fields("今天天氣很好") == {}
+
+    def test_negated_risk_is_ignored(self):
+        """測試否定的風險描述不視為風險承受度"""
+        assert "risk_tolerance" not in ProfileService.extract_fields("我不想要高風險的投資")
+        assert ProfileService.extract_fields("我不想虧錢")["risk_tolerance"] == "低"
+
+    @pytest.mark.parametrize("text", ["不喜歡科技股", "Dislikes tech stocks", "I don't like tech"])
+    def test_negated_sector_is_excluded(self, text):
+        """測試否定的產業記錄為排除而非偏好"""
+        fields = ProfileService.extract_fields(text)
+        assert "sectors" not in fields
+        assert fields["excluded_sectors"] == ["科技"]
+
+    def test_negation_is_scoped_to_clause(self):
+        """測試否定只作用於所在子句"""
+        fields = ProfileService.extract_fields("避開金融股，偏好半導體")
+        assert fields["sectors"] == ["半導體"]
+        assert fields["excluded_sectors"] == ["金融"]
+
+
+class TestProfileUpdates:
+    """測試輪廓增量更新"""
+
+    def test_merges_incrementally(self, test_db, user_id):
+        """測試純量欄位覆寫、列表欄位合併"""
+        ProfileService.update_from_memories(user_id, ["風險承受度低，偏好金融股"])
+        ProfileService.update_from_memories(user_id, ["現在想積極一點，加碼科技股", "無關內容"])
+
+        profile = ProfileService.get_profile(user_id)
+        assert profile.risk_tolerance == "高"
+        assert profile.sectors == ["科技", "金融"]
+        assert profile.to_prompt() == "風險承受度: 高\n偏好產業: 科技、金融"
+
+    def test_exclusion_removes_sector(self, test_db, user_id):
+        """測試後來排除的產業自輪廓移除"""
+        ProfileService.update_from_memories(user_id, ["偏好金融和科技股"])
+        ProfileService.update_from_memories(user_id, ["避開金融股"])
+
+        assert ProfileService.get_profile(user_id).sectors == ["科技"]
+
+    def test_rebuild_replaces_profile(self, test_db, user_id):
+        """測試重建只保留目前記憶導出的欄位，沒有欄位時刪除輪廓"""
+        ProfileService.update_from_memories(user_id, ["風險承受度低，偏好金融股"])
+
+        profile = ProfileService.rebuild(user_id, ["加碼科技股"])
+        assert profile.risk_tolerance is None
+        assert ProfileService.get_profile(user_id).sectors == ["科技"]
+
+        assert ProfileService.rebuild(user_id, ["你好"]) is None
+        assert ProfileService.get_profile(user_id) is None
+
+    def test_no_fields_does_not_create_profile(self, test_db, user_id):
+        """測試未擷取到欄位時不建立輪廓"""
+        assert ProfileService.update_from_memories(user_id, ["你好"]) is None
+        assert ProfileService.get_profile(user_id) is None
+
+    def test_memory_add_updates_profile(self, test_db, user_id):
+        """測試寫入記憶時同步更新輪廓，刪除全部記憶時一併清除"""
+        client = MagicMock()
+        client.add.return_value = {
+            "results": [{"id": f"{user_id}-1", "memory": "為退休做長期投資", "event": "ADD"}]
+        }
+        MemoryService._mem0_client = client
+
+        MemoryService.add_memory_from_message(user_id, "我想為退休做長期投資")
+
+        profile = ProfileService.get_profile(user_id)
+        assert profile.investment_horizon == "長期（5 年以上）"
+        assert profile.goals == ["退休規劃"]
+
+        assert MemoryService.delete_user_memories(user_id) == 1
+        assert ProfileService.get_profile(user_id) is None
+
+    def test_memory_mutations_rebuild_profile(self, test_db, user_id):
+        """測試更新與刪除記憶後輪廓依剩餘記憶重建"""
+        client = MagicMock()
+        client.add.return_value = {
+            "results": [
+                {"id": f"{user_id}-1", "memory": "偏好科技股", "event": "ADD"},
+                {"id": f"{user_id}-2", "memory": "風險承受度高", "event": "ADD"},
+            ]
+        }
+        MemoryService._mem0_client = client
+        MemoryService.add_memory_from_message(user_id, "偏好科技股，風險承受度高")
+        assert ProfileService.get_profile(user_id).sectors == ["科技"]
+
+        MemoryService.update_memory(f"{user_id}-1", "偏好債券")
+        assert ProfileService.get_profile(user_id).sectors == ["債券"]
+
+        assert MemoryService.delete_memory(user_id, f"{user_id}-2") is True
+        profile = ProfileService.get_profile(user_id)
+        assert profile.risk_tolerance is None
+        assert profile.sectors == ["債券"]
+
+
+class TestNeedsSearch:
+    """測試略過搜索的判斷"""
+
+    @pytest.fixture
+    def profile(self, user_id) -> InvestorProfile:
+        return InvestorProfile(user_id=user_id, risk_tolerance="低", sectors=["ETF"])
+
+    @pytest.fixture(autouse=True)
+    def skip_search(self):
+        with patch("src.services.profile_service.settings.memory_profile_skip_search", True):
+            yield
+
+    def test_general_question_skips_search(self, profile):
+        """測試一般提問由輪廓涵蓋"""
+        assert ProfileService.needs_search("現在適合進場嗎？", profile) is False
+
+    def test_disabled_by_default(self, profile):
+        """測試預設不略過搜索"""
+        with patch("src.services.profile_service.settings.memory_profile_skip_search", False):
+            assert ProfileService.needs_search("現在適合進場嗎？", profile) is True
+
+    def test_recall_or_specific_question_searches(self, profile):
+        """測試引用過去事實或具體代號時需要搜索"""
+        assert ProfileService.needs_search("我之前說的那筆錢怎麼規劃？", profile) is True
+        assert ProfileService.needs_search("0050 還要扣款嗎？", profile) is True
+
+    def test_missing_profile_searches(self):
+        """測試尚無輪廓時一律搜索"""
+        assert ProfileService.needs_search("現在適合進場嗎？", None) is True
@@ -0,0 +1,150 @@
+"""
+模型提供者單元測試
+
+測試 Gemini 提供者的系統指令、安全阻擋對應的備用回應，
+以及本地提供者的確定性嵌入、模板生成與離線啟動。
+"""
+
+import uuid
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.config import settings
+from src.main import app
+from src.providers import GenerationResult, get_provider, set_provider
+from src.providers import gemini
+from src.providers.gemini import GeminiProvider
+from src.providers.local import LocalProvider
+from src.services.embedding_service import EmbeddingService
+from src.services.llm_service import SAFETY_FALLBACK_RESPONSE, SYSTEM_INSTRUCTION, LLMService
+from src.services.memory_service import MemoryService
+from src.utils.exceptions import MemoryError
+
+
+def _response(text: str) -> MagicMock:
+    """建立 generate_content 的模擬回應"""
+    response = MagicMock()
+    response.finish_reason = None
+    response.prompt_feedback.block_reason = None
+    response.candidates = [MagicMock(content=MagicMock(parts=[MagicMock(text=text)]))]
+    return response
+
+
+class TestGeminiProvider:
+    """測試 Gemini 提供者"""
+
+    @pytest.fixture
+    def provider(self):
+        with patch.object(gemini.genai, "configure"):
+            provider = GeminiProvider()
+        LLMService._provider = provider
+        return provider
+
+    def test_uses_system_instruction_when_supported(self, provider):
+        """測試 SDK 支援時以 system_instruction 建立模型並重複使用"""
+        with patch.object(gemini, "_supports_system_instruction", return_value=True), \
+             patch.object(gemini.genai, "GenerativeModel") as model_cls:
+            model_cls.return_value.generate_content.return_value = _response("好的")
+
+            assert LLMService.generate_response("你好") == "好的"
+            LLMService.generate_response("再問一次")
+
+        model_cls.assert_called_once_with(settings.mem0_llm_model, system_instruction=SYSTEM_INSTRUCTION)
+        contents = model_cls.return_value.generate_content.call_args.args[0]
+        assert contents == [{"role": "user", "parts": ["【當前提問】\n再問一次"]}]
+
+    def test_inlines_instruction_on_older_sdk(self, provider):
+        """測試舊版 SDK 將系統指令併入第一個使用者回合"""
+        with patch.object(gemini, "_supports_system_instruction", return_value=False), \
+             patch.object(gemini.genai, "GenerativeModel") as model_cls:
+            model_cls.return_value.generate_content.return_value = _response("好的")
+            LLMService.generate_response("你好")
+
+        contents = model_cls.return_value.generate_content.call_args.args[0]
+        assert contents[0]["parts"][0].startswith(SYSTEM_INSTRUCTION)
+
+    def test_safety_block_maps_to_fallback(self):
+        """測試提供者回報安全阻擋時返回備用回應"""
+        LLMService._provider = MagicMock()
+        LLMService._provider.generate.return_value = GenerationResult(text="", blocked_reason="SAFETY")
+
+        assert LLMService.generate_response("你好") == SAFETY_FALLBACK_RESPONSE
+
+    def test_batch_embedding_uses_single_call(self):
+        """測試批量嵌入只對快取未命中的文本發出一次 API 呼叫"""
+        EmbeddingService._cache.clear()
+        with patch.object(gemini, "genai") as mock_genai:
+            mock_genai.embed_content.return_value = {"embedding": [[1.0, 0.0], [0.0, 1.0]]}
+            vectors = EmbeddingService.embed_batch(["批量一", "批量二", "批量一"])
+
+        assert vectors == [[1.0, 0.0], [0.0, 1.0], [1.0, 0.0]]
+        mock_genai.embed_content.assert_called_once()
+        assert mock_genai.embed_content.call_args.kwargs["content"] == ["批量一", "批量二"]
+
+
+class TestLocalProvider:
+    """測試本地提供者"""
+
+    def test_embeddings_are_deterministic_and_normalized(self):
+        """測試相同文字得到相同單位向量，字詞重疊越多越相似"""
+        provider = LocalProvider(dim=256)
+        first = np.array(provider.embed("我偏好投資科技股"))
+        again = np.array(LocalProvider(dim=256).embed("我偏好投資科技股"))
+        similar = np.array(provider.embed("我偏好投資科技類股票"))
+        unrelated = np.array(provider.embed("今天天氣很好"))
+
+        assert first.shape == (256,)
+        assert np.allclose(first, again)
+        assert np.isclose(np.linalg.norm(first), 1.0)
+        assert first @ similar > first @ unrelated
+
+    def test_generate_and_stream_share_template(self):
+        """測試模板回應包含當前提問，串流片段組合後與一次生成相同"""
+        provider = LocalProvider(latency_ms=0)
+        contents = LLMService.build_contents("什麼是ETF", memories=[{"content": "偏好 ETF"}])
+
+        result = provider.generate(contents, model="any")
+
+        assert "什麼是ETF" in result.text
+        assert "".join(provider.stream(contents, model="any")) == result.text
+
+    def test_simulated_latency(self):
+        """測試可設定的模擬延遲"""
+        provider = LocalProvider(latency_ms=30)
+        with patch("src.providers.local.time.sleep") as sleep:
+            provider.generate(LocalProvider.single_turn("你好"), model="any")
+        sleep.assert_called_once_with(0.03)
+
+    def test_app_boots_and_chats_offline(self, tmp_path):
+        """測試本地提供者可在無網路、無 Mem0 的情況下啟動並完成對話"""
+        with patch.object(settings, "llm_provider", "local"), \
+             patch.object(settings, "database_url", f"sqlite:///{tmp_path / 'offline.db'}"), \
+             patch.object(settings, "local_llm_latency_ms", 0.0), \
+             patch("src.services.memory_service.Memory", None):
+            set_provider(None)
+            with TestClient(app) as offline_client:
+                response = offline_client.post(
+                    "/api/v1/chat",
+                    json={"user_id": str(uuid.uuid4()), "message": "什麼是定期定額"},
+                )
+
+        assert response.status_code == 200
+        assert "什麼是定期定額" in response.json()["data"]["assistant_message"]["content"]
+
+    def test_unavailable_memory_is_not_rebuilt(self):
+        """測試記憶服務初始化失敗後，搜索與擷取直接返回空結果而不重新初始化"""
+        set_provider(LocalProvider())
+        with patch("src.services.memory_service.Memory") as memory,              patch("src.services.memory_service.get_provider", wraps=get_provider) as provider:
+            with pytest.raises(MemoryError):
+                MemoryService.initialize()
+
+            assert MemoryService.search_memories("user", "科技股") == []
+            assert MemoryService.add_memory_from_message("user", "我偏好投資科技股") is None
+            with pytest.raises(MemoryError):
+                MemoryService.add_memory("user", "偏好 ETF")
+
+        provider.assert_called_once()
+        memory.from_config.assert_not_called()
@@ -0,0 +1,137 @@
+"""
+記憶重新排序單元測試
+
+測試 MMR 多樣化、相似度門檻、MemoryService 重新排序整合與查詢嵌入快取。
+"""
+
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from src.services.embedding_service import EmbeddingService
+from src.services.memory_service import MemoryService
+from src.services.rerank import mmr_rerank
+
+QUERY = [1.0, 0.0, 0.0]
+# 0 與 1 幾乎相同（"偏好科技股" / "喜歡科技類股票"），2 相關但不同，3 無關
+CANDIDATES = [
+    [0.9, 0.43, 0.0],
+    [0.88, 0.45, 0.05],
+    [0.7, 0.0, 0.71],
+    [0.0, 1.0, 0.0],
+]
+
+
+class TestMmrRerank:
+    """測試 mmr_rerank"""
+
+    def test_pure_relevance_orders_by_similarity(self):
+        """測試 λ=1 時依相似度排序"""
+        ranked = mmr_rerank(QUERY, CANDIDATES, top_k=4, lambda_mult=1.0)
+
+        assert [i for i, _ in ranked] == [0, 1, 2, 3]
+        assert ranked[0][1] == pytest.approx(0.9 / np.linalg.norm(CANDIDATES[0]), rel=1e-5)
+
+    def test_diversifies_near_duplicates(self):
+        """測試近似重複的記憶被延後"""
+        ranked = mmr_rerank(QUERY, CANDIDATES, top_k=2, lambda_mult=0.5)
+
+        assert [i for i, _ in ranked] == [0, 2]
+
+    def test_drops_duplicates_and_irrelevant(self):
+        """測試剔除重複與低於門檻的記憶，返回少於 top_k 的結果"""
+        ranked = mmr_rerank(
+            QUERY, CANDIDATES, top_k=4, min_similarity=0.5, duplicate_threshold=0.95
+        )
+
+        assert [i for i, _ in ranked] == [0, 2]
+
+    def test_exempt_candidates_skip_cutoff(self):
+        """測試免除門檻的候選即使相似度低仍可選取"""
+        ranked = mmr_rerank(
+            QUERY, CANDIDATES, top_k=4, min_similarity=0.5, exempt=[False, False, False, True]
+        )
+
+        assert 3 in [i for i, _ in ranked]
+
+    def test_nothing_above_cutoff(self):
+        """測試沒有候選達門檻"""
+        assert mmr_rerank(QUERY, CANDIDATES, top_k=3, min_similarity=0.99) == []
+
+
+class TestMemoryServiceRerank:
+    """測試 MemoryService 的重新排序整合"""
+
+    @pytest.fixture
+    def mem0_client(self):
+        client = MagicMock()
+        client.search.return_value = {
+            "results": [
+                {"id": f"m{i}", "memory": f"記憶 {i}", "score": 0.3} for i in range(4)
+            ]
+        }
+        client.vector_store.collection.get.return_value = {
+            "ids": [f"m{i}" for i in range(4)],
+            "embeddings": CANDIDATES,
+        }
+        MemoryService._mem0_client = client
+        return client
+
+    def test_search_returns_fewer_better_memories(self, mem0_client):
+        """測試搜索結果去重、剔除無關並以餘弦相似度作為 relevance"""
+        with patch.object(EmbeddingService, "embed_text", return_value=QUERY):
+            results = MemoryService.search_memories("user", "科技股", top_k=4, mode="vector")
+
+        assert [m["id"] for m in results] == ["m0", "m2"]
+        assert results[0]["metadata"]["relevance"] > results[1]["metadata"]["relevance"] > 0.5
+
+    def test_reuses_query_vector_from_search(self, mem0_client):
+        """測試重新排序沿用 Mem0 搜索時的查詢向量，不再呼叫嵌入服務"""
+        mem0_client.embedding_model.embed.return_value = QUERY
+        MemoryService._capture_query_vectors(mem0_client)
+
+        def search(query, user_id, limit):
+            mem0_client.embedding_model.embed(query, "search")
+            return {"results": [{"id": f"m{i}", "memory": f"記憶 {i}", "score": 0.3} for i in range(4)]}
+
+        mem0_client.search.side_effect = search
+        with patch.object(EmbeddingService, "embed_text") as embed_text:
+            results = MemoryService.search_memories("user", "科技股", top_k=4, mode="vector")
+
+        embed_text.assert_not_called()
+        assert [m["id"] for m in results] == ["m0", "m2"]
+
+    def test_add_embeddings_are_not_captured(self, mem0_client):
+        """測試新增記憶時的嵌入不當作查詢向量"""
+        mem0_client.embedding_model.embed.return_value = CANDIDATES[3]
+        MemoryService._capture_query_vectors(mem0_client)
+
+        mem0_client.embedding_model.embed("科技股", "add")
+
+        assert "科技股" not in MemoryService._query_vectors
+
+    def test_falls_back_to_original_order_without_vectors(self, mem0_client):
+        """測試無法取得向量時保留原排序"""
+        mem0_client.vector_store.collection.get.side_effect = Exception("unsupported")
+
+        results = MemoryService.search_memories("user", "科技股", top_k=2, mode="vector")
+
+        assert [m["id"] for m in results] == ["m0", "m1"]
+        assert results[0]["metadata"]["relevance"] == 0.3
+
+
+class TestEmbeddingCache:
+    """測試查詢嵌入快取"""
+
+    def test_repeated_text_hits_cache(self):
+        """測試相同文本只呼叫一次嵌入 API"""
+        text = "快取測試查詢"
+        with patch("src.providers.gemini.genai") as mock_genai:
+            mock_genai.embed_content.return_value = {"embedding": [0.1, 0.2]}
+
+            first = EmbeddingService.embed_text(text)
+            second = EmbeddingService.embed_text(text)
+
+        assert first == second == [0.1, 0.2]
+        mock_genai.embed_content.assert_called_once()
@@ -0,0 +1,87 @@
+"""
+語義回應快取單元測試
+
+測試相似度門檻、TTL、容量淘汰，以及對話流程只在非個人化回合使用快取。
+"""
+
+import uuid
+from unittest.mock import patch
+
+import pytest
+
+from src.services.conversation_service import ConversationService
+from src.services.response_cache import SemanticResponseCache, response_cache
+
+
+@pytest.fixture
+def cache() -> SemanticResponseCache:
+    """容量 2 的快取"""
+    return SemanticResponseCache(max_entries=2, ttl_seconds=60, similarity_threshold=0.95)
+
+
+class TestSemanticResponseCache:
+    """測試快取行為"""
+
+    def test_similar_query_hits(self, cache):
+        """測試相似查詢命中、不相似查詢未命中"""
+        cache.store([1.0, 0.0, 0.0], "什麼是ETF?", "ETF 是指數股票型基金")
+
+        assert cache.lookup([0.98, 0.1, 0.0]).response == "ETF 是指數股票型基金"
+        assert cache.lookup([0.0, 1.0, 0.0]) is None
+        assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+    def test_expired_entry_is_evicted(self, cache):
+        """測試過期項目視為未命中並移除"""
+        with patch("src.services.response_cache.time.monotonic", return_value=0.0):
+            cache.store([1.0, 0.0], "q", "a")
+        with patch("src.services.response_cache.time.monotonic", return_value=61.0):
+            assert cache.lookup([1.0, 0.0]) is None
+        assert len(cache) == 0
+
+    def test_evicts_least_recently_used(self, cache):
+        """測試超過容量時淘汰最久未命中的項目"""
+        cache.store([1.0, 0.0, 0.0], "a", "A")
+        cache.store([0.0, 1.0, 0.0], "b", "B")
+        cache.lookup([1.0, 0.0, 0.0])
+        cache.store([0.0, 0.0, 1.0], "c", "C")
+
+        assert cache.lookup([0.0, 1.0, 0.0]) is None
+        assert cache.lookup([1.0, 0.0, 0.0]).response == "A"
+        assert cache.lookup([0.0, 0.0, 1.0]).response == "C"
+
+
+class TestConversationCacheUse:
+    """測試對話流程使用快取"""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        response_cache.clear()
+        yield
+        response_cache.clear()
+
+    def test_generic_question_reuses_answer_across_users(self, test_db):
+        """測試不同使用者的相同通用問題只呼叫一次 LLM"""
+        with patch(
+            "src.services.conversation_service.EmbeddingService.embed_text",
+            return_value=[0.6, 0.8],
+        ), patch(
+            "src.services.conversation_service.LLMService.generate_response",
+            return_value="定期定額是每月固定金額投資",
+        ) as generate:
+            first = ConversationService.process_message(str(uuid.uuid4()), message="定期定額是什麼")
+            second = ConversationService.process_message(str(uuid.uuid4()), message="定期定額是什麼？")
+
+        generate.assert_called_once()
+        assert second["assistant_message"]["content"] == first["assistant_message"]["content"]
+
+    def test_personalized_turn_skips_cache(self):
+        """測試注入記憶或輪廓、或有先前對話的回合不使用快取"""
+        assert ConversationService._cache_eligible([{"content": "偏好 ETF"}], None, [], None) is False
+        assert ConversationService._cache_eligible([], "風險承受度: 低", [], None) is False
+        follow_up = [
+            {"role": "user", "content": "台積電如何？"},
+            {"role": "assistant", "content": "..."},
+            {"role": "user", "content": "它呢？"},
+        ]
+        assert ConversationService._cache_eligible([], None, follow_up, None) is False
+        assert ConversationService._cache_eligible([], None, follow_up[:1], None) is True
@@ -0,0 +1,127 @@
+"""
+上游重試單元測試
+
+測試錯誤分類、完全抖動退避、重試預算與請求期限。
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from src.providers import GenerationResult
+from src.services.llm_service import LLMService
+from src.services.retry import (
+    RetryBudget,
+    RetryPolicy,
+    call_with_retry,
+    deadline_scope,
+    is_retryable,
+    remaining_time,
+    retry_budget,
+)
+
+POLICY = RetryPolicy(max_attempts=3, base_delay=0.1, max_delay=1.0)
+
+
+@pytest.fixture(autouse=True)
+def no_sleep():
+    """不實際等待並重置全域預算"""
+    retry_budget.reset()
+    with patch("src.services.retry.time.sleep") as sleep:
+        yield sleep
+    retry_budget.reset()
+
+
+class TestClassification:
+    """測試錯誤分類"""
+
+    @pytest.mark.parametrize(
+        "error, expected",
+        [
+            (google_exceptions.ResourceExhausted("quota"), True),
+            (google_exceptions.ServiceUnavailable("down"), True),
+            (google_exceptions.DeadlineExceeded("slow"), True),
+            (ConnectionResetError(), True),
+            (google_exceptions.InvalidArgument("bad"), False),
+            (google_exceptions.PermissionDenied("key"), False),
+            (ValueError("blocked"), False),
+        ],
+    )
+    def test_is_retryable(self, error, expected):
+        """測試 429 / 5xx / 連線錯誤可重試，其他錯誤不重試"""
+        assert is_retryable(error) is expected
+
+    def test_full_jitter_backoff_is_bounded(self):
+        """測試退避在 0 與指數上限之間"""
+        with patch("src.services.retry.random.uniform", side_effect=lambda low, high: high) as uniform:
+            assert POLICY.backoff(1) == 0.1
+            assert POLICY.backoff(3) == 0.4
+            assert POLICY.backoff(10) == 1.0
+        assert all(call.args[0] == 0 for call in uniform.call_args_list)
+
+
+class TestCallWithRetry:
+    """測試重試流程"""
+
+    def test_recovers_from_transient_error(self, no_sleep):
+        """測試暫時性錯誤重試後成功"""
+        func = MagicMock(side_effect=[google_exceptions.ServiceUnavailable("down"), "ok"])
+
+        assert call_with_retry(func, "test", policy=POLICY) == "ok"
+        assert func.call_count == 2
+        no_sleep.assert_called_once()
+
+    def test_non_retryable_error_raises_immediately(self):
+        """測試不可重試的錯誤不重試"""
+        func = MagicMock(side_effect=google_exceptions.InvalidArgument("bad"))
+
+        with pytest.raises(google_exceptions.InvalidArgument):
+            call_with_retry(func, "test", policy=POLICY)
+        func.assert_called_once()
+
+    def test_budget_limits_extra_load(self):
+        """測試上游持續失敗時重試不超過預算比例"""
+        budget = RetryBudget(ratio=0.1, max_tokens=1.0)
+        func = MagicMock(side_effect=google_exceptions.ServiceUnavailable("down"))
+
+        for _ in range(100):
+            with pytest.raises(google_exceptions.ServiceUnavailable):
+                call_with_retry(func, "test", policy=POLICY, budget=budget)
+
+        stats = budget.stats()
+        assert stats["requests"] == 100
+        assert stats["retries"] <= 0.1 * 100 + 1
+        assert func.call_count == 100 + stats["retries"]
+
+    def test_stops_when_deadline_would_be_exceeded(self):
+        """測試等待會超過請求期限時不重試"""
+        func = MagicMock(side_effect=google_exceptions.ResourceExhausted("quota"))
+
+        with deadline_scope(0.05), patch("src.services.retry.random.uniform", return_value=0.5):
+            assert remaining_time() <= 0.05
+            with pytest.raises(google_exceptions.ResourceExhausted):
+                call_with_retry(func, "test", policy=POLICY)
+
+        func.assert_called_once()
+        assert remaining_time() is None
+
+    def test_generate_response_retries_rate_limit(self):
+        """測試 LLM 生成遇到 429 時重試而非直接失敗"""
+        LLMService._provider = MagicMock()
+        LLMService._provider.generate.side_effect = [
+            google_exceptions.ResourceExhausted("quota"),
+            GenerationResult(text="好的"),
+        ]
+
+        assert LLMService.generate_response("你好") == "好的"
+        assert LLMService._provider.generate.call_count == 2
+
+    def test_metrics_endpoint(self, client):
+        """測試 /metrics/retries 端點"""
+        call_with_retry(MagicMock(return_value="ok"), "test", policy=POLICY)
+
+        response = client.get("/metrics/retries")
+
+        assert response.status_code == 200
+        assert response.json()["budget"]["requests"] == 1
@@ -0,0 +1,154 @@
+"""
+Token 估算器、校準與提示預算單元測試
+"""
+
+import uuid
+from unittest.mock import MagicMock, patch
+
+from src.providers import GenerationResult, TokenUsage
+from src.services.llm_service import LLMService
+from src.services.usage_service import UsageService
+from src.storage.database import DatabaseManager
+from src.storage.storage_service import StorageService
+from src.utils import tokens
+from src.utils.tokens import (
+    calibration_scale,
+    estimate_tokens,
+    fit_scale,
+    set_calibration_scale,
+    uncalibrated_tokens,
+)
+
+
+class TestEstimator:
+    """測試本地估算"""
+
+    def test_symbols_and_long_words(self):
+        """測試標點各算一個，長英文詞依字元數分段"""
+        assert estimate_tokens("你好！") == 3
+        assert estimate_tokens("diversification") == 4
+
+    def test_estimates_are_memoized(self):
+        """測試同一文字只分析一次"""
+        text = f"台積電 {uuid.uuid4()}"
+        tokens._raw_estimate.cache_clear()
+        estimate_tokens(text)
+        estimate_tokens(text)
+        uncalibrated_tokens(text)
+        info = tokens._raw_estimate.cache_info()
+        assert (info.misses, info.hits) == (1, 2)
+
+    def test_calibration_scale_applies_and_clamps(self):
+        """測試校準係數套用於估算並限制範圍"""
+        assert set_calibration_scale(1.5) == 1.5
+        assert estimate_tokens("我偏好投資科技股") == 12
+        assert uncalibrated_tokens("我偏好投資科技股") == 8
+        assert set_calibration_scale(10.0) == 2.0
+        assert set_calibration_scale(0.0) == 0.5
+
+    def test_fit_scale(self):
+        """測試過原點最小平方法擬合"""
+        assert fit_scale([(120, 100), (240, 200)]) == 1.2
+        assert fit_scale([]) == 1.0
+        assert fit_scale([(0, 100)]) == 1.0
+
+
+class TestCalibration:
+    """測試以實際用量校準"""
+
+    def test_calibrates_from_reported_usage(self, test_db):
+        """測試以供應商回報的提示 token 數校準（忽略本地估算的紀錄）"""
+        DatabaseManager.execute_write(lambda cursor: cursor.execute("DELETE FROM usage"))
+        user_id = str(uuid.uuid4())
+        for _ in range(3):
+            UsageService.record(user_id, "gemini", TokenUsage(prompt_tokens=130), local_estimate=100)
+        UsageService.record(user_id, "gemini", TokenUsage(prompt_tokens=999, estimated=True), local_estimate=100)
+
+        with patch("src.services.usage_service.settings.token_calibration_min_samples", 5):
+            assert UsageService.calibrate_estimator() is None
+        with patch("src.services.usage_service.settings.token_calibration_min_samples", 3):
+            assert UsageService.calibrate_estimator() == 1.3
+        assert calibration_scale() == 1.3
+
+    def test_recalibrates_periodically(self, test_db):
+        """測試累積指定數量的實際用量後重新校準"""
+        user_id = str(uuid.uuid4())
+        with patch("src.services.usage_service.settings.token_calibration_every", 2), \
+             patch.object(UsageService, "calibrate_estimator") as calibrate:
+            UsageService.record(user_id, "gemini", TokenUsage(prompt_tokens=10), local_estimate=8)
+            UsageService.record(user_id, "gemini", TokenUsage(prompt_tokens=10, estimated=True), local_estimate=8)
+            calibrate.assert_not_called()
+            UsageService.record(user_id, "gemini", TokenUsage(prompt_tokens=10), local_estimate=8)
+            calibrate.assert_called_once()
+
+    def test_generate_response_records_local_estimate(self, test_db):
+        """測試生成時記錄同一提示的本地估算"""
+        user_id = str(uuid.uuid4())
+        LLMService._provider = MagicMock()
+        LLMService._provider.generate.return_value = GenerationResult(
+            text="好的", usage=TokenUsage(prompt_tokens=300, completion_tokens=2)
+        )
+
+        LLMService.generate_response("你好", user_id=user_id)
+
+        row = DatabaseManager.get_connection().execute(
+            "SELECT local_estimate FROM usage WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        contents = LLMService._provider.generate.call_args.args[0]
+        assert row[0] == sum(uncalibrated_tokens(part) for part in LLMService._prompt_parts(contents))
+
+
+class TestPromptBudget:
+    """測試提示預算"""
+
+    @staticmethod
+    def _history(turns: int):
+        history = []
+        for i in range(turns):
+            history.append({"role": "user", "content": f"第{i}個問題" * 10})
+            history.append({"role": "assistant", "content": f"第{i}個回答" * 10})
+        return history
+
+    def test_drops_oldest_history_beyond_budget(self):
+        """測試超過預算時由最舊的歷史開始捨棄，且不以助理訊息開頭"""
+        history = self._history(10)
+        reserved = LLMService.estimate_prompt_tokens(LLMService.build_contents("現在呢？"))
+
+        with patch("src.services.llm_service.settings.llm_prompt_token_budget", reserved + 250):
+            contents = LLMService.build_contents("現在呢？", conversation_history=history)
+
+        assert 1 < len(contents) < 21
+        assert contents[0]["role"] == "user"
+        assert contents[-2]["parts"] == [history[-1]["content"]]
+        assert LLMService.estimate_prompt_tokens(contents) <= reserved + 250
+
+    def test_stored_token_count_is_ignored(self):
+        """測試以內容估算成本，不採用舊訊息以空白切分計算的 token_count"""
+        history = [
+            {"role": "user", "content": "舊問題" * 2000, "token_count": 1},
+            {"role": "assistant", "content": "舊回答"},
+            {"role": "user", "content": "新問題"},
+            {"role": "assistant", "content": "新回答"},
+        ]
+        with patch("src.services.llm_service.settings.llm_prompt_token_budget", 5000):
+            contents = LLMService.build_contents("現在呢？", conversation_history=history)
+
+        assert [turn["parts"][0] for turn in contents[:2]] == ["新問題", "新回答"]
+
+    def test_unlimited_budget_keeps_history(self):
+        """測試預算為 0 時不捨棄"""
+        history = self._history(10)
+        with patch("src.services.llm_service.settings.llm_prompt_token_budget", 0):
+            contents = LLMService.build_contents("現在呢？", conversation_history=history)
+        assert len(contents) == 21
+
+
+class TestStoredTokenCount:
+    """測試儲存的 token_count"""
+
+    def test_save_message_counts_cjk_per_character(self, test_db):
+        """測試中文訊息的 token_count 不再以空白切分計算"""
+        user_id = str(uuid.uuid4())
+        conversation = StorageService.create_conversation(user_id)
+        message = StorageService.save_message(conversation.id, "user", "我想買台積電")
+        assert message.token_count == 6
@@ -0,0 +1,93 @@
+"""
+對話回合排程器單元測試
+
+測試 KeyedScheduler 的同鍵序列化、跨鍵並行與佇列深度限制。
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.services.turn_scheduler import KeyedScheduler
+from src.utils.exceptions import RateLimitError
+
+
+class TestKeyedScheduler:
+    """測試 KeyedScheduler"""
+
+    async def test_same_key_runs_in_arrival_order(self):
+        """測試同一鍵的工作依到達順序逐一執行"""
+        scheduler = KeyedScheduler(max_depth=10)
+        order = []
+        active = []
+
+        def turn(n):
+            active.append(n)
+            assert len(active) == 1, "同一鍵的回合不應重疊"
+            time.sleep(0.01)
+            order.append(n)
+            active.remove(n)
+            return n
+
+        results = await asyncio.gather(*(scheduler.run("conv-1", turn, n) for n in range(5)))
+
+        assert results == [0, 1, 2, 3, 4]
+        assert order == [0, 1, 2, 3, 4]
+        assert scheduler.depth("conv-1") == 0
+
+    async def test_different_keys_run_in_parallel(self):
+        """測試不同鍵的工作並行執行"""
+        scheduler = KeyedScheduler(max_depth=10)
+        barrier = threading.Barrier(2, timeout=2)
+
+        def turn():
+            # 兩個回合必須同時執行才能通過屏障
+            barrier.wait()
+            return True
+
+        results = await asyncio.gather(
+            scheduler.run("conv-a", turn),
+            scheduler.run("conv-b", turn),
+        )
+
+        assert results == [True, True]
+
+    async def test_queue_depth_limit_rejects_flood(self):
+        """測試超過佇列深度時拒絕新的回合"""
+        scheduler = KeyedScheduler(max_depth=2)
+        release = threading.Event()
+
+        def slow_turn():
+            release.wait(timeout=2)
+
+        running = [asyncio.create_task(scheduler.run("conv-1", slow_turn)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(RateLimitError):
+            await scheduler.run("conv-1", slow_turn)
+
+        release.set()
+        await asyncio.gather(*running)
+        assert scheduler.depth("conv-1") == 0
+
+    async def test_none_key_is_not_serialized(self):
+        """測試鍵為 None 時不佔用佇列"""
+        scheduler = KeyedScheduler(max_depth=1)
+
+        results = await asyncio.gather(*(scheduler.run(None, lambda: 1) for _ in range(3)))
+
+        assert results == [1, 1, 1]
+
+    async def test_exception_releases_slot(self):
+        """測試工作拋出例外後釋放佇列位置"""
+        scheduler = KeyedScheduler(max_depth=1)
+
+        def failing():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            await scheduler.run("conv-1", failing)
+
+        assert await scheduler.run("conv-1", lambda: "ok") == "ok"
@@ -0,0 +1,112 @@
+"""
+Token 用量與每日配額單元測試
+"""
+
+import uuid
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.providers import GenerationResult, TokenUsage
+from src.providers.gemini import GeminiProvider
+from src.services.llm_service import LLMService
+from src.services.usage_service import UsageService
+from src.storage.database import DatabaseManager
+from src.utils.exceptions import QuotaExceededError
+from src.utils.tokens import estimate_tokens
+
+
+class TestEstimateTokens:
+    """測試本地 token 估算"""
+
+    def test_cjk_counts_per_character(self):
+        """測試中文依字數估算而非整句算一個"""
+        text = "我偏好投資科技股"
+        assert len(text.split()) == 1
+        assert estimate_tokens(text) == 8
+
+    def test_mixed_text(self):
+        """測試中英數混合文字"""
+        assert estimate_tokens("買 0050 ETF") == 1 + 2 + 1
+        assert estimate_tokens("") == 0
+
+
+class TestUsageRecording:
+    """測試用量記錄"""
+
+    def test_parses_gemini_usage_metadata(self):
+        """測試取出 Gemini 回報的提示、回應與快取 token 數"""
+        response = SimpleNamespace(
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=120, candidates_token_count=30, cached_content_token_count=100
+            )
+        )
+        usage = GeminiProvider._usage(response)
+        assert (usage.prompt_tokens, usage.completion_tokens, usage.cached_tokens) == (120, 30, 100)
+        assert GeminiProvider._usage(SimpleNamespace()) is None
+
+    def test_generate_response_records_reported_usage(self, test_db):
+        """測試生成後記錄供應商回報的用量"""
+        user_id = str(uuid.uuid4())
+        LLMService._provider = MagicMock()
+        LLMService._provider.generate.return_value = GenerationResult(
+            text="好的", usage=TokenUsage(prompt_tokens=120, completion_tokens=30, cached_tokens=100)
+        )
+
+        LLMService.generate_response("你好", user_id=user_id, conversation_id=7)
+
+        row = DatabaseManager.get_connection().execute(
+            "SELECT conversation_id, prompt_tokens, completion_tokens, cached_tokens, estimated "
+            "FROM usage WHERE user_id = ?",
+            (user_id,),
+        ).fetchone()
+        assert tuple(row) == (7, 120, 30, 100, 0)
+        assert UsageService.tokens_used_today(user_id) == 150
+
+    def test_missing_usage_is_estimated(self, test_db):
+        """測試供應商未回報用量時以本地估算記錄"""
+        user_id = str(uuid.uuid4())
+        LLMService._provider = MagicMock()
+        LLMService._provider.generate.return_value = GenerationResult(text="好的")
+
+        LLMService.generate_response("你好", user_id=user_id)
+
+        row = DatabaseManager.get_connection().execute(
+            "SELECT prompt_tokens, completion_tokens, estimated FROM usage WHERE user_id = ?",
+            (user_id,),
+        ).fetchone()
+        assert row[0] > 0
+        assert row[1] == 2
+        assert row[2] == 1
+
+
+class TestDailyQuota:
+    """測試每日配額"""
+
+    def test_quota_exceeded_raises(self, test_db):
+        """測試今日用量加上預估超過配額時拒絕"""
+        user_id = str(uuid.uuid4())
+        UsageService.record(user_id, "gemini", TokenUsage(prompt_tokens=900, completion_tokens=50))
+
+        with patch("src.services.usage_service.settings.user_daily_token_quota", 1000):
+            UsageService.check_quota(user_id, estimated_tokens=50)
+            with pytest.raises(QuotaExceededError) as exc_info:
+                UsageService.check_quota(user_id, estimated_tokens=51)
+
+        assert exc_info.value.used_tokens == 950
+        assert 0 < exc_info.value.retry_after <= 86400
+
+    def test_chat_returns_429_when_quota_exhausted(self, client, test_db):
+        """測試配額用完時 /chat 返回 429 且不呼叫 LLM"""
+        user_id = str(uuid.uuid4())
+        UsageService.record(user_id, "gemini", TokenUsage(prompt_tokens=1000))
+
+        with patch("src.services.usage_service.settings.user_daily_token_quota", 1000), \
+             patch("src.services.conversation_service.LLMService.generate_response") as generate:
+            response = client.post("/api/v1/chat", json={"user_id": user_id, "message": "你好"})
+
+        assert response.status_code == 429
+        assert response.json()["code"] == "QUOTA_EXCEEDED"
+        assert int(response.headers["Retry-After"]) > 0
+        generate.assert_not_called()
@@ -104,17 +104,24 @@ async function createConversation(userId) {
 /**
  * 取得對話訊息
  * 
- * @param {number} conversationId - 對話 ID
+ * 伺服器回應附帶 ETag 且設定 Cache-Control: no-cache，
+ * 瀏覽器會自動以 If-None-Match 重新驗證，未變更時直接使用快取。
+ * 
+ * @param {string} conversationId - 對話 ID
  * @param {number} limit - 最大返回數量
+ * @param {number|null} afterId - 僅取得 ID 大於此值的新訊息 (可選)
  * @returns {Promise<Object>} 訊息列表
  * @throws {Error} 如果請求失敗
  */
-async function getConversationMessages(conversationId, limit = 50) {
-  console.log(`[API] 取得對話訊息: conversation_id=${conversationId}`);
+async function getConversationMessages(conversationId, limit = 50, afterId = null) {
+  console.log(`[API] 取得對話訊息: conversation_id=${conversationId}, after_id=${afterId}`);
   
   try {
     const url = new URL(`${API_BASE_URL}/conversations/${conversationId}/messages`, window.location.origin);
     url.searchParams.append('limit', limit);
+    if (afterId !== null && afterId !== undefined) {
+      url.searchParams.append('after_id', afterId);
+    }
     
     const response = await fetch(url.toString(), {
       method: 'GET',